@@ -10,53 +10,542 @@ Prodi: Pendidikan Teknik Informatika
 """
 
 import os
+import json
+import uuid
+import queue
 import logging
+import zipfile
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, flash, redirect, url_for
+from typing import Iterator, List, Optional, Tuple
+import click
+from flask import (
+    Flask,
+    Request,
+    Response,
+    render_template,
+    request,
+    jsonify,
+    flash,
+    redirect,
+    stream_with_context,
+    url_for
+)
+from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 
 from config import Config
-from services import ComputerVisionService, DatabaseService
+from services import (
+    AntrianDeteksi,
+    BackendBerkasLokal,
+    PenyimpananBerkas,
+    PenyimpananJobMemori,
+    PenyimpananJobSQLite,
+    SpoolDatabase,
+    STATUS_GAGAL,
+    STATUS_MENUNGGU,
+    CacheBaca,
+    CacheDeteksi,
+    CacheLRU,
+    CacheSQLite,
+    ComputerVisionService,
+    DatabaseService,
+    DeteksiUbin,
+    DeteksiUrutan,
+    DetektorLokal,
+    IndeksHashPerseptual,
+    LayananTidakTersedia,
+    PembatasLaju,
+    PemutusSirkuit,
+    hasilkan_metrik,
+    kelompokkan_duplikat,
+    susun_baris_interval,
+    ukur_tahap
+)
 from utils import (
     file_diizinkan,
-    simpan_file_upload,
+    ekstrak_gambar_zip,
+    parse_tanggal,
     format_confidence,
-    validasi_ukuran_file
+    format_ukuran_file,
+    PenampungUnggahan,
+    UnggahanDitolak,
+    parse_level_logger,
+    siapkan_logging,
+    FORMAT_EKSPOR,
+    hasilkan_ekspor,
+    parquet_tersedia
 )
 
 # Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(f'logs/app_{datetime.now().strftime("%Y%m%d")}.log'),
-        logging.StreamHandler()
-    ]
+siapkan_logging(
+    level=Config.LOG_LEVEL,
+    level_per_logger=parse_level_logger(Config.LOG_LEVEL_LOGGER),
+    format_log=Config.LOG_FORMAT,
+    folder_log=Config.LOG_FOLDER,
+    rotasi=Config.LOG_ROTASI,
+    ukuran_maks=Config.LOG_UKURAN_MAKS,
+    jumlah_cadangan=Config.LOG_JUMLAH_CADANGAN,
+    konsol=Config.LOG_KONSOL,
+    ukuran_antrian=Config.LOG_UKURAN_ANTRIAN,
+    rasio_sampling=Config.LOG_SAMPLING_DEBUG
 )
 logger = logging.getLogger(__name__)
 
+class RequestAplikasi(Request):
+    """
+    Request dengan batas ukuran body yang lebih besar untuk deteksi batch dan
+    validasi file upload gambar selama body masih diterima.
+    """
+
+    @property
+    def max_content_length(self):  # type: ignore[override]
+        if self.endpoint == 'api_deteksi_batch':
+            return Config.BATCH_UKURAN_REQUEST_MAKS
+        if self.endpoint == 'api_deteksi_video':
+            return Config.VIDEO_UKURAN_MAKS
+        return super().max_content_length
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Deteksi tunggal: file ditolak di potongan pertama yang tidak valid
+        # dan ditampung di memori karena langsung dipakai untuk deteksi
+        if self.endpoint == 'api_deteksi':
+            return PenampungUnggahan(Config.MAX_CONTENT_LENGTH, Config.ALLOWED_EXTENSIONS)
+
+        # Deteksi batch: gambar ditulis langsung ke folder upload; gambar yang
+        # tidak valid dibuang tanpa menggagalkan gambar lain
+        if self.endpoint == 'api_deteksi_batch' and filename and \
+                file_diizinkan(filename, Config.ALLOWED_EXTENSIONS):
+            return PenampungUnggahan(
+                Config.MAX_CONTENT_LENGTH,
+                Config.ALLOWED_EXTENSIONS,
+                folder_tujuan=Config.UPLOAD_FOLDER,
+                lempar_error=False
+            )
+
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+
 # Inisialisasi Flask app
 app = Flask(__name__)
+app.request_class = RequestAplikasi
 app.config.from_object(Config)
 
 # Pastikan folder upload ada
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs('logs', exist_ok=True)
+
+# Inisialisasi cache hasil deteksi
+cache_deteksi = None
+if Config.CACHE_DETEKSI_AKTIF:
+    cache_disk = None
+    if Config.CACHE_DETEKSI_PATH_DISK:
+        os.makedirs(os.path.dirname(Config.CACHE_DETEKSI_PATH_DISK) or '.', exist_ok=True)
+        cache_disk = CacheSQLite(
+            Config.CACHE_DETEKSI_PATH_DISK,
+            ttl=Config.CACHE_DETEKSI_TTL,
+            maks_entri=Config.CACHE_DETEKSI_MAKS_ENTRI_DISK
+        )
+    cache_deteksi = CacheDeteksi(
+        CacheLRU(Config.CACHE_DETEKSI_UKURAN_MEMORI, ttl=Config.CACHE_DETEKSI_TTL),
+        cache_disk
+    )
+
+# Inisialisasi detektor lokal (jika dipilih di konfigurasi atau sebagai cadangan Azure)
+detektor_lokal = None
+if Config.DETEKTOR_BACKEND in ('lokal', 'lokal+azure') or Config.AZURE_CADANGAN_LOKAL:
+    detektor_lokal = DetektorLokal(
+        Config.DETEKTOR_LOKAL_FOLDER_LOGO,
+        ambang_confidence=Config.DETEKTOR_LOKAL_AMBANG_CONFIDENCE,
+        folder_indeks=Config.DETEKTOR_LOKAL_PATH_INDEKS or None
+    )
+
+# Inisialisasi indeks gambar hampir sama
+indeks_duplikat = None
+if Config.DUPLIKAT_AKTIF:
+    indeks_duplikat = IndeksHashPerseptual(
+        ambang=Config.DUPLIKAT_AMBANG_HAMMING,
+        maks_entri=Config.DUPLIKAT_MAKS_ENTRI
+    )
+
+# Pembatas laju dan circuit breaker Azure, dipakai bersama semua thread
+pembatas_azure = None
+if Config.AZURE_LAJU_PER_DETIK > 0:
+    pembatas_azure = PembatasLaju(Config.AZURE_LAJU_PER_DETIK, Config.AZURE_LAJU_BURST or None)
+
+pemutus_azure = PemutusSirkuit(
+    ambang_gagal=Config.AZURE_SIRKUIT_AMBANG_GAGAL,
+    waktu_pemulihan=Config.AZURE_SIRKUIT_WAKTU_PEMULIHAN
+)
 
 # Inisialisasi services
+# Deteksi per ubin untuk gambar besar
+deteksi_ubin = None
+if Config.DETEKSI_UBIN_AKTIF:
+    deteksi_ubin = DeteksiUbin(
+        ukuran_ubin=Config.DETEKSI_UBIN_UKURAN,
+        tumpang_tindih=Config.DETEKSI_UBIN_TUMPANG_TINDIH,
+        maks_ubin=Config.DETEKSI_UBIN_MAKS,
+        konkurensi=Config.DETEKSI_UBIN_KONKURENSI,
+        ambang_iou=Config.DETEKSI_UBIN_AMBANG_IOU,
+        sertakan_gambar_penuh=Config.DETEKSI_UBIN_GAMBAR_PENUH,
+        sisi_maks_ubin=Config.PRAPROSES_SISI_MAKS,
+        kualitas_jpeg=Config.PRAPROSES_KUALITAS_JPEG
+    )
+
 vision_service = ComputerVisionService(
     Config.COMPUTER_VISION_ENDPOINT,
-    Config.COMPUTER_VISION_KEY
+    Config.COMPUTER_VISION_KEY,
+    cache=cache_deteksi,
+    sisi_maks=Config.PRAPROSES_SISI_MAKS,
+    kualitas_jpeg=Config.PRAPROSES_KUALITAS_JPEG,
+    backend=Config.DETEKTOR_BACKEND,
+    detektor_lokal=detektor_lokal,
+    indeks_duplikat=indeks_duplikat,
+    timeout_azure=Config.AZURE_TIMEOUT,
+    maks_percobaan=Config.AZURE_MAKS_PERCOBAAN,
+    pembatas_laju=pembatas_azure,
+    pemutus_sirkuit=pemutus_azure,
+    detektor_cadangan=detektor_lokal if Config.AZURE_CADANGAN_LOKAL else None,
+    maks_koneksi_async=Config.ASYNC_MAKS_KONEKSI_AZURE,
+    deteksi_ubin=deteksi_ubin
+)
+
+# Deteksi video/urutan frame dengan melewati frame yang hampir sama
+deteksi_urutan = DeteksiUrutan(
+    vision_service,
+    fps_sampel=Config.VIDEO_FPS_SAMPEL,
+    ambang_hamming=Config.VIDEO_AMBANG_HAMMING,
+    interval_paksa=Config.VIDEO_INTERVAL_PAKSA,
+    toleransi_jeda=Config.VIDEO_TOLERANSI_JEDA,
+    konkurensi=Config.VIDEO_KONKURENSI,
+    maks_frame=Config.VIDEO_MAKS_FRAME,
+    kualitas_jpeg=Config.PRAPROSES_KUALITAS_JPEG,
+    ukuran_maks_frame=Config.MAX_CONTENT_LENGTH
 )
 
+# Inisialisasi cache baca statistik dan riwayat
+cache_baca = None
+if Config.CACHE_BACA_AKTIF:
+    if Config.CACHE_BACA_PATH_DISK:
+        os.makedirs(os.path.dirname(Config.CACHE_BACA_PATH_DISK) or '.', exist_ok=True)
+        backend_cache_baca = CacheSQLite(
+            Config.CACHE_BACA_PATH_DISK,
+            ttl=Config.CACHE_BACA_TTL,
+            maks_entri=Config.CACHE_BACA_UKURAN_MEMORI
+        )
+    else:
+        backend_cache_baca = CacheLRU(Config.CACHE_BACA_UKURAN_MEMORI, ttl=Config.CACHE_BACA_TTL)
+    cache_baca = CacheBaca(backend_cache_baca, ttl=Config.CACHE_BACA_TTL)
+
 db_service = DatabaseService(
     Config.SQL_CONNECTION_STRING,
-    Config.SQL_PASSWORD
+    Config.SQL_PASSWORD,
+    ukuran_pool=Config.SQL_POOL_UKURAN,
+    idle_maks=Config.SQL_POOL_IDLE_MAKS,
+    umur_maks=Config.SQL_POOL_UMUR_MAKS,
+    timeout_pool=Config.SQL_POOL_TIMEOUT,
+    cache_baca=cache_baca
 )
 
 # Inisialisasi database
 db_service.inisialisasi_database()
 
+# Spool write-behind: hasil deteksi ditulis ke file lokal lalu di-flush ke SQL
+spool_database = None
+if Config.SPOOL_PATH_DB:
+    os.makedirs(os.path.dirname(Config.SPOOL_PATH_DB) or '.', exist_ok=True)
+    spool_database = SpoolDatabase(
+        Config.SPOOL_PATH_DB,
+        db_service,
+        ukuran_batch=Config.SPOOL_UKURAN_BATCH,
+        interval_flush=Config.SPOOL_INTERVAL_FLUSH,
+        backoff_maks=Config.SPOOL_BACKOFF_MAKS,
+        maks_percobaan=Config.SPOOL_MAKS_PERCOBAAN,
+        sewa=Config.SPOOL_SEWA
+    )
+    spool_database.mulai()
+
+
+def simpan_hasil(daftar_simpan: List[dict]) -> bool:
+    """
+    Simpan baris hasil deteksi lewat spool jika aktif, selain itu langsung ke database.
+
+    Args:
+        daftar_simpan: Baris untuk simpan_hasil_deteksi_batch
+
+    Returns:
+        bool: True jika tersimpan (di spool atau database)
+    """
+    if spool_database is not None and spool_database.simpan(daftar_simpan):
+        return True
+    return db_service.simpan_hasil_deteksi_batch(daftar_simpan)
+
+
+def referensi_gambar() -> Optional[dict]:
+    """Referensi file upload dari database ditambah hasil yang masih di spool."""
+    referensi = db_service.dapatkan_referensi_gambar()
+    if referensi is None or spool_database is None:
+        return referensi
+    try:
+        for path, jumlah in spool_database.referensi_gambar().items():
+            referensi[path] = referensi.get(path, 0) + jumlah
+    except Exception as e:
+        logger.error(f"Gagal membaca referensi file dari spool: {str(e)}")
+        return None
+    return referensi
+
+
+# Penyimpanan file upload berbasis hash isi (deduplikasi + penyapu)
+penyimpanan_berkas = PenyimpananBerkas(
+    BackendBerkasLokal(Config.UPLOAD_FOLDER),
+    Config.PENYIMPANAN_PATH_INDEKS
+)
+if Config.PENYIMPANAN_INTERVAL_SAPU > 0:
+    penyimpanan_berkas.mulai_penyapu(
+        referensi_gambar,
+        interval=Config.PENYIMPANAN_INTERVAL_SAPU,
+        masa_tenggang=Config.PENYIMPANAN_MASA_TENGGANG
+    )
+
+
+@ukur_tahap('simpan_berkas')
+def simpan_berkas_upload(data_gambar: bytes) -> Optional[str]:
+    """
+    Simpan isi gambar upload ke penyimpanan berkas.
+
+    Args:
+        data_gambar: Isi gambar
+
+    Returns:
+        str: Lokasi file untuk kolom image_path, atau None jika gagal
+    """
+    try:
+        lokasi = penyimpanan_berkas.simpan_bytes(data_gambar)
+        logger.info(f"File berhasil disimpan: {lokasi}")
+        return lokasi
+    except Exception as e:
+        logger.error(f"Gagal menyimpan file: {str(e)}")
+        return None
+
+
+@ukur_tahap('simpan_berkas')
+def simpan_file_batch(file: FileStorage) -> Optional[str]:
+    """
+    Simpan file upload batch ke penyimpanan berkas.
+
+    File yang sudah ditampung di folder upload saat request diterima cukup
+    dipindahkan; hash isinya sudah dihitung oleh PenampungUnggahan.
+
+    Args:
+        file: File upload dari request
+
+    Returns:
+        str: Lokasi file untuk kolom image_path, atau None jika gagal
+    """
+    stream = file.stream
+    path_sementara = stream.lepaskan() if isinstance(stream, PenampungUnggahan) else None
+    if path_sementara is None:
+        return simpan_berkas_upload(file.read())
+
+    try:
+        lokasi = penyimpanan_berkas.simpan_file(path_sementara, stream.hash_isi)
+        logger.info(f"File berhasil disimpan: {lokasi}")
+        return lokasi
+    except Exception as e:
+        logger.error(f"Gagal menyimpan file: {str(e)}")
+        if os.path.exists(path_sementara):
+            os.remove(path_sementara)
+        return None
+
+
+def analisis_gambar(
+    nama_file: str,
+    path_file: Optional[str],
+    data_gambar: Optional[bytes] = None
+) -> Tuple[dict, List[dict]]:
+    """
+    Deteksi brand pada sebuah gambar tanpa menulis ke database.
+
+    Gambar hanya dibaca sekali: info gambar dan deteksi brand sama-sama
+    memakai buffer data_gambar. Jika data_gambar tidak diberikan, file di
+    path_file dibaca satu kali.
+
+    Args:
+        nama_file: Nama file asli dari upload
+        path_file: Lokasi file di penyimpanan berkas (None jika tidak disimpan)
+        data_gambar: Isi gambar yang sudah dibaca ke memori (optional)
+
+    Returns:
+        Tuple berisi response sukses (brand dan info gambar) dan daftar baris
+        yang siap disimpan dengan simpan_hasil_deteksi_batch
+
+    Raises:
+        Exception: Jika deteksi brand gagal
+    """
+    if data_gambar is None:
+        if not path_file:
+            raise Exception("Tidak ada data gambar")
+        data_gambar = penyimpanan_berkas.baca(path_file)
+
+    # Dapatkan info gambar
+    info_gambar = vision_service.dapatkan_info_gambar_bytes(data_gambar)
+
+    # Deteksi brand
+    brand_terdeteksi = vision_service.deteksi_brand_bytes(data_gambar, nama_file, info_gambar)
+
+    return susun_hasil_analisis(nama_file, path_file, info_gambar, brand_terdeteksi)
+
+
+def susun_hasil_analisis(
+    nama_file: str,
+    path_file: Optional[str],
+    info_gambar: dict,
+    brand_terdeteksi: List[dict]
+) -> Tuple[dict, List[dict]]:
+    """
+    Susun response API dan baris database dari hasil deteksi.
+
+    Dipakai bersama oleh jalur sync (analisis_gambar) dan jalur async
+    (asgi.py) agar format response keduanya sama.
+
+    Args:
+        nama_file: Nama file asli dari upload
+        path_file: Path file gambar di folder upload (None jika tidak disimpan)
+        info_gambar: Info gambar dari dapatkan_info_gambar_bytes
+        brand_terdeteksi: Hasil deteksi brand
+
+    Returns:
+        Tuple berisi response sukses dan daftar baris untuk simpan_hasil_deteksi_batch
+    """
+    # Semua baris dari satu unggahan disimpan sebagai satu gambar
+    info_simpan = {
+        'upload_key': uuid.uuid4().hex,
+        'image_name': nama_file,
+        'image_path': path_file,
+        'resolution': info_gambar.get('resolusi', 'unknown'),
+        'size_bytes': info_gambar.get('size'),
+        'content_hash': info_gambar.get('hash_isi'),
+        'perceptual_hash': info_gambar.get('hash_perseptual')
+    }
+    if brand_terdeteksi:
+        daftar_simpan = [
+            {
+                **info_simpan,
+                'brand_name': brand['brand'],
+                'confidence_score': brand['confidence'],
+                'rectangle': brand['rectangle']
+            }
+            for brand in brand_terdeteksi
+        ]
+    else:
+        # Simpan record tanpa brand jika tidak ada yang terdeteksi
+        daftar_simpan = [{**info_simpan, 'notes': 'Tidak ada brand yang terdeteksi'}]
+
+    response = {
+        'sukses': True,
+        'pesan': f"Ditemukan {len(brand_terdeteksi)} brand" if brand_terdeteksi else "Tidak ada brand terdeteksi",
+        'jumlah_brand': len(brand_terdeteksi),
+        'brand': brand_terdeteksi,
+        'info_gambar': info_gambar
+    }
+    return response, daftar_simpan
+
+
+def proses_deteksi(
+    nama_file: str,
+    path_file: Optional[str],
+    data_gambar: Optional[bytes] = None
+) -> dict:
+    """
+    Jalankan pipeline deteksi lalu simpan hasilnya ke database.
+
+    Dipakai langsung oleh /api/deteksi dan oleh worker antrian deteksi.
+
+    Args:
+        nama_file: Nama file asli dari upload
+        path_file: Lokasi file di penyimpanan berkas (None jika tidak disimpan)
+        data_gambar: Isi gambar yang sudah dibaca ke memori (optional)
+
+    Returns:
+        dict: Response sukses berisi brand dan info gambar
+
+    Raises:
+        Exception: Jika deteksi brand gagal
+    """
+    response, daftar_simpan = analisis_gambar(nama_file, path_file, data_gambar)
+
+    # Simpan semua baris hasil deteksi ke database dalam satu transaksi
+    with ukur_tahap('simpan_database'):
+        response['tersimpan'] = simpan_hasil(daftar_simpan)
+    if not response['tersimpan']:
+        logger.error(f"Hasil deteksi {nama_file} tidak tersimpan ke spool maupun database")
+
+    logger.info(f"Deteksi berhasil: {response['jumlah_brand']} brand ditemukan")
+    return response
+
+
+def proses_deteksi_video(nama_file: str, path_sumber: str, hapus_sumber: bool = False) -> dict:
+    """
+    Deteksi brand pada video/urutan frame lalu simpan interval per brand.
+
+    Args:
+        nama_file: Nama sumber asli (untuk kolom image_name)
+        path_sumber: Path file video, folder gambar, atau arsip zip gambar
+        hapus_sumber: Hapus file sumber setelah selesai (file upload sementara)
+
+    Returns:
+        dict: Response sukses berisi interval brand dan statistik frame
+
+    Raises:
+        Exception: Jika sumber tidak bisa dibaca atau detektor tidak tersedia
+    """
+    try:
+        hasil = deteksi_urutan.deteksi_sumber(path_sumber, nama_file, Config.VIDEO_FPS_SUMBER)
+    finally:
+        if hapus_sumber and os.path.isfile(path_sumber):
+            os.remove(path_sumber)
+
+    with ukur_tahap('simpan_database'):
+        tersimpan = simpan_hasil(susun_baris_interval(hasil))
+
+    jumlah_brand = len({interval['brand'] for interval in hasil['interval']})
+    logger.info(
+        f"Deteksi video berhasil: {jumlah_brand} brand, {len(hasil['interval'])} interval, "
+        f"{hasil['frame_dianalisis']}/{hasil['jumlah_frame']} frame dianalisis"
+    )
+    return {
+        'sukses': True,
+        'pesan': f"Ditemukan {jumlah_brand} brand" if jumlah_brand else "Tidak ada brand terdeteksi",
+        'jumlah_brand': jumlah_brand,
+        'tersimpan': tersimpan,
+        **hasil
+    }
+
+
+def _proses_job_deteksi(payload: dict) -> dict:
+    """Fungsi proses untuk worker antrian deteksi."""
+    if payload.get('jenis') == 'video':
+        return proses_deteksi_video(payload['nama_file'], payload['path_sumber'], hapus_sumber=True)
+    return proses_deteksi(payload['nama_file'], payload['path_file'], payload['data_gambar'])
+
+
+# Inisialisasi antrian job deteksi
+if Config.ANTRIAN_PATH_DB:
+    os.makedirs(os.path.dirname(Config.ANTRIAN_PATH_DB) or '.', exist_ok=True)
+    penyimpanan_job = PenyimpananJobSQLite(Config.ANTRIAN_PATH_DB)
+else:
+    penyimpanan_job = PenyimpananJobMemori()
+
+antrian_deteksi = AntrianDeteksi(
+    _proses_job_deteksi,
+    penyimpanan_job,
+    jumlah_worker=Config.ANTRIAN_JUMLAH_WORKER,
+    ukuran_maks=Config.ANTRIAN_UKURAN_MAKS,
+    retensi_job=Config.ANTRIAN_RETENSI_JOB,
+    sewa_job=Config.ANTRIAN_SEWA_JOB
+)
+
 
 @app.route('/')
 def beranda():
@@ -79,10 +568,16 @@ def riwayat():
         Rendered template halaman riwayat dengan data dari database
     """
     logger.info("Mengakses halaman riwayat")
-    data_riwayat = db_service.dapatkan_riwayat(limit=50)
+    limit = 50
+    data_riwayat = db_service.dapatkan_riwayat(
+        limit=limit,
+        before_id=request.args.get('before_id', type=int)
+    )
+    cursor_berikutnya = data_riwayat[-1]['id'] if len(data_riwayat) == limit else None
     return render_template(
         'riwayat.html',
         riwayat=data_riwayat,
+        cursor_berikutnya=cursor_berikutnya,
         info_pengembang=Config.INFO_PENGEMBANG
     )
 
@@ -125,22 +620,26 @@ def api_deteksi():
         - Method: POST
         - Content-Type: multipart/form-data
         - Body: file dengan key 'gambar'
+        - mode (optional): 'job' untuk memproses di background dan langsung
+          mengembalikan job id (HTTP 202)
 
     Returns:
-        JSON response dengan hasil deteksi atau error message
+        JSON response dengan hasil deteksi, job id, atau error message
     """
     logger.info("Request deteksi brand diterima")
 
+    # Body multipart diterima dan divalidasi saat request.files pertama diakses
+    with ukur_tahap('baca_upload'):
+        file = request.files.get('gambar')
+
     # Validasi ada file dalam request
-    if 'gambar' not in request.files:
+    if file is None:
         logger.warning("Request tidak mengandung file gambar")
         return jsonify({
             'sukses': False,
             'pesan': 'Tidak ada file gambar dalam request'
         }), 400
 
-    file = request.files['gambar']
-
     # Validasi nama file tidak kosong
     if not file.filename or file.filename == '':
         logger.warning("Nama file kosong")
@@ -157,59 +656,63 @@ def api_deteksi():
             'pesan': f"Ekstensi file tidak diizinkan. Gunakan: {', '.join(app.config['ALLOWED_EXTENSIONS'])}"
         }), 400
 
+    # Baca upload sekali ke memori; semua tahap berikutnya memakai buffer ini
+    data_gambar = file.read()
+
     # Validasi ukuran file
-    if not validasi_ukuran_file(file, app.config['MAX_CONTENT_LENGTH']):
+    if len(data_gambar) > app.config['MAX_CONTENT_LENGTH']:
         logger.warning("Ukuran file melebihi batas")
         return jsonify({
             'sukses': False,
             'pesan': f"Ukuran file terlalu besar. Maksimal {app.config['MAX_CONTENT_LENGTH'] / (1024*1024)} MB"
         }), 400
 
+    # File ditulis ke penyimpanan setelah response terkirim (jika diaktifkan);
+    # lokasinya sudah pasti dari hash isi sehingga bisa langsung dicatat
+    path_file = None
+    if Config.UPLOAD_SIMPAN_FILE:
+        path_file = penyimpanan_berkas.lokasi_untuk(data_gambar)
+
     try:
-        # Simpan file
-        path_file = simpan_file_upload(file, app.config['UPLOAD_FOLDER'])
-        if not path_file:
-            raise Exception("Gagal menyimpan file")
-
-        # Dapatkan info gambar
-        info_gambar = vision_service.dapatkan_info_gambar(path_file)
-
-        # Deteksi brand
-        brand_terdeteksi = vision_service.deteksi_brand(path_file)
-
-        # Simpan setiap brand yang terdeteksi ke database
-        if brand_terdeteksi:
-            for brand in brand_terdeteksi:
-                data_simpan = {
-                    'image_name': file.filename,
-                    'brand_name': brand['brand'],
-                    'confidence_score': brand['confidence'],
-                    'image_path': path_file,
-                    'resolution': info_gambar.get('resolusi', 'unknown'),
-                    'notes': f"Deteksi otomatis - posisi: {brand['rectangle']}"
-                }
-                db_service.simpan_hasil_deteksi(data_simpan)
+        # Mode job: kembalikan job id, deteksi dikerjakan worker background
+        if request.args.get('mode', request.form.get('mode')) == 'job':
+            try:
+                job_id = antrian_deteksi.kirim({
+                    'nama_file': file.filename,
+                    'path_file': path_file,
+                    'data_gambar': data_gambar
+                })
+            except queue.Full:
+                logger.warning("Antrian deteksi penuh")
+                return jsonify({
+                    'sukses': False,
+                    'pesan': 'Server sedang sibuk, silakan coba beberapa saat lagi'
+                }), 503
+
+            response = jsonify({
+                'sukses': True,
+                'job_id': job_id,
+                'status': STATUS_MENUNGGU,
+                'url_status': url_for('api_status_deteksi', job_id=job_id)
+            })
+            status_http = 202
         else:
-            # Simpan record tanpa brand jika tidak ada yang terdeteksi
-            data_simpan = {
-                'image_name': file.filename,
-                'image_path': path_file,
-                'resolution': info_gambar.get('resolusi', 'unknown'),
-                'notes': 'Tidak ada brand yang terdeteksi'
-            }
-            db_service.simpan_hasil_deteksi(data_simpan)
+            response = jsonify(proses_deteksi(file.filename, path_file, data_gambar))
+            status_http = 200
 
-        # Response sukses
-        response = {
-            'sukses': True,
-            'pesan': f"Ditemukan {len(brand_terdeteksi)} brand" if brand_terdeteksi else "Tidak ada brand terdeteksi",
-            'jumlah_brand': len(brand_terdeteksi),
-            'brand': brand_terdeteksi,
-            'info_gambar': info_gambar
-        }
+        if path_file:
+            response.call_on_close(lambda: simpan_berkas_upload(data_gambar))
+        return response, status_http
 
-        logger.info(f"Deteksi berhasil: {len(brand_terdeteksi)} brand ditemukan")
-        return jsonify(response), 200
+    except LayananTidakTersedia as e:
+        # Layanan deteksi sedang dibatasi/down: tolak cepat agar klien mundur
+        logger.warning(f"Deteksi ditolak, layanan tidak tersedia: {str(e)}")
+        response = jsonify({
+            'sukses': False,
+            'pesan': 'Layanan deteksi sedang sibuk, silakan coba beberapa saat lagi'
+        })
+        response.headers['Retry-After'] = str(max(1, round(e.coba_lagi_setelah)))
+        return response, 503
 
     except Exception as e:
         logger.error(f"Error saat deteksi: {str(e)}")
@@ -219,27 +722,252 @@ def api_deteksi():
         }), 500
 
 
+@app.route('/api/deteksi/batch', methods=['POST'])
+def api_deteksi_batch():
+    """
+    API endpoint untuk deteksi brand pada banyak gambar sekaligus.
+
+    Request:
+        - Method: POST
+        - Content-Type: multipart/form-data
+        - Body: beberapa file dengan key 'gambar' dan/atau arsip zip
+          dengan key 'arsip'
+
+    Returns:
+        Response NDJSON (application/x-ndjson): satu baris JSON per gambar
+        sesuai urutan selesai, diakhiri satu baris ringkasan
+    """
+    logger.info("Request deteksi batch diterima")
+
+    daftar_file: List[Tuple[str, str]] = []
+    jumlah_maks = Config.BATCH_JUMLAH_MAKS
+
+    try:
+        for file in request.files.getlist('gambar'):
+            if len(daftar_file) >= jumlah_maks:
+                break
+            if not file.filename or not file_diizinkan(file.filename, app.config['ALLOWED_EXTENSIONS']):
+                logger.warning(f"File batch dilewati: {file.filename}")
+                continue
+            if isinstance(file.stream, PenampungUnggahan) and file.stream.error is not None:
+                logger.warning(f"File batch dilewati: {file.filename} ({file.stream.error.pesan})")
+                continue
+            path_file = simpan_file_batch(file)
+            if path_file:
+                daftar_file.append((file.filename, path_file))
+
+        for arsip in request.files.getlist('arsip'):
+            daftar_file.extend(ekstrak_gambar_zip(
+                arsip,
+                app.config['UPLOAD_FOLDER'],
+                app.config['ALLOWED_EXTENSIONS'],
+                app.config['MAX_CONTENT_LENGTH'],
+                jumlah_maks - len(daftar_file),
+                simpan_berkas=simpan_berkas_upload
+            ))
+    except zipfile.BadZipFile:
+        logger.warning("Arsip batch bukan file zip yang valid")
+        return jsonify({
+            'sukses': False,
+            'pesan': 'Arsip harus berupa file zip yang valid'
+        }), 400
+
+    if not daftar_file:
+        return jsonify({
+            'sukses': False,
+            'pesan': f"Tidak ada gambar valid. Gunakan: {', '.join(app.config['ALLOWED_EXTENSIONS'])}"
+        }), 400
+
+    def hasilkan() -> Iterator[str]:
+        """Jalankan deteksi paralel dan kirim hasil per gambar saat selesai."""
+        baris_tertunda: List[dict] = []
+        jumlah_gagal = 0
+        semua_tersimpan = True
+
+        with ThreadPoolExecutor(max_workers=Config.BATCH_KONKURENSI_MAKS) as executor:
+            futures = {
+                executor.submit(analisis_gambar, nama_file, path_file): (indeks, nama_file)
+                for indeks, (nama_file, path_file) in enumerate(daftar_file)
+            }
+
+            for future in as_completed(futures):
+                indeks, nama_file = futures[future]
+                try:
+                    response, daftar_simpan = future.result()
+                    baris_tertunda.extend(daftar_simpan)
+                except Exception as e:
+                    logger.error(f"Error saat deteksi batch {nama_file}: {str(e)}")
+                    jumlah_gagal += 1
+                    response = {
+                        'sukses': False,
+                        'pesan': f"Terjadi kesalahan: {str(e)}"
+                    }
+
+                # Tulis ke database per kelompok agar round trip tetap sedikit
+                if len(baris_tertunda) >= Config.BATCH_UKURAN_INSERT:
+                    semua_tersimpan &= simpan_hasil(baris_tertunda)
+                    baris_tertunda = []
+
+                yield json.dumps({'indeks': indeks, 'nama_file': nama_file, **response}) + '\n'
+
+        if baris_tertunda:
+            semua_tersimpan &= simpan_hasil(baris_tertunda)
+
+        logger.info(f"Deteksi batch selesai: {len(daftar_file)} gambar, {jumlah_gagal} gagal")
+        yield json.dumps({
+            'selesai': True,
+            'jumlah_gambar': len(daftar_file),
+            'jumlah_gagal': jumlah_gagal,
+            'tersimpan': semua_tersimpan
+        }) + '\n'
+
+    return Response(stream_with_context(hasilkan()), mimetype='application/x-ndjson')
+
+
+@app.route('/api/deteksi/video', methods=['POST'])
+def api_deteksi_video():
+    """
+    API endpoint untuk deteksi brand pada video atau urutan frame kamera.
+
+    Video selalu diproses di background karena durasinya bisa panjang;
+    hasilnya (interval waktu per brand) diambil lewat polling status job.
+
+    Request:
+        - Method: POST
+        - Content-Type: multipart/form-data
+        - Body: file video atau arsip zip berisi frame dengan key 'video'
+
+    Returns:
+        JSON response dengan job id (HTTP 202) atau error message
+    """
+    logger.info("Request deteksi video diterima")
+
+    file = request.files.get('video')
+    if file is None or not file.filename:
+        logger.warning("Request tidak mengandung file video")
+        return jsonify({
+            'sukses': False,
+            'pesan': 'Tidak ada file video dalam request'
+        }), 400
+
+    if not file_diizinkan(file.filename, Config.VIDEO_EKSTENSI):
+        logger.warning(f"Ekstensi file video tidak diizinkan: {file.filename}")
+        return jsonify({
+            'sukses': False,
+            'pesan': f"Ekstensi file tidak diizinkan. Gunakan: {', '.join(sorted(Config.VIDEO_EKSTENSI))}"
+        }), 400
+
+    # File sementara dihapus worker setelah deteksi selesai, atau oleh
+    # pembersihan antrian jika worker pemilik job berhenti sebelum selesai
+    ekstensi = file.filename.rsplit('.', 1)[1].lower()
+    fd, path_sumber = tempfile.mkstemp(prefix='video-', suffix=f'.{ekstensi}', dir=app.config['UPLOAD_FOLDER'])
+    with os.fdopen(fd, 'wb') as tujuan:
+        file.save(tujuan)
+
+    try:
+        job_id = antrian_deteksi.kirim({
+            'jenis': 'video',
+            'nama_file': file.filename,
+            'path_sumber': path_sumber
+        }, berkas=path_sumber)
+    except queue.Full:
+        os.remove(path_sumber)
+        logger.warning("Antrian deteksi penuh")
+        return jsonify({
+            'sukses': False,
+            'pesan': 'Server sedang sibuk, silakan coba beberapa saat lagi'
+        }), 503
+
+    return jsonify({
+        'sukses': True,
+        'job_id': job_id,
+        'status': STATUS_MENUNGGU,
+        'url_status': url_for('api_status_deteksi', job_id=job_id)
+    }), 202
+
+
+@app.route('/api/deteksi/<job_id>', methods=['GET'])
+def api_status_deteksi(job_id: str):
+    """
+    API endpoint untuk polling status job deteksi.
+
+    Query parameters:
+        - tunggu (optional): Detik maksimal menunggu job selesai (long-poll)
+
+    Returns:
+        JSON response dengan status job dan hasil deteksi jika sudah selesai
+    """
+    tunggu = min(
+        max(request.args.get('tunggu', 0, type=float), 0),
+        Config.ANTRIAN_LONG_POLL_MAKS
+    )
+    job = antrian_deteksi.status(job_id, tunggu=tunggu)
+
+    if job is None:
+        return jsonify({
+            'sukses': False,
+            'pesan': 'Job tidak ditemukan'
+        }), 404
+
+    response = {
+        'sukses': job['status'] != STATUS_GAGAL,
+        'job_id': job_id,
+        'status': job['status']
+    }
+    if job['hasil']:
+        response['hasil'] = job['hasil']
+    if job['error']:
+        response['pesan'] = f"Terjadi kesalahan: {job['error']}"
+
+    return jsonify(response), 200
+
+
 @app.route('/api/riwayat', methods=['GET'])
 def api_riwayat():
     """
     API endpoint untuk mengambil riwayat deteksi.
 
     Query parameters:
-        - limit (optional): Jumlah maksimal record (default: 100)
+        - limit (optional): Jumlah maksimal record (default: 100, maksimal 500)
+        - before_id (optional): Cursor halaman berikutnya (id record terakhir)
+        - after_timestamp (optional): Hanya record setelah waktu ini (ISO 8601)
+        - brand (optional): Filter nama brand
+        - dari, sampai (optional): Rentang tanggal upload (ISO 8601)
 
     Returns:
-        JSON response dengan list riwayat deteksi
+        JSON response dengan list riwayat deteksi dan cursor halaman berikutnya
     """
     logger.info("Request riwayat deteksi diterima")
 
     try:
-        limit = request.args.get('limit', 100, type=int)
-        data_riwayat = db_service.dapatkan_riwayat(limit=limit)
+        after_timestamp = parse_tanggal(request.args.get('after_timestamp'))
+        tanggal_mulai = parse_tanggal(request.args.get('dari'))
+        tanggal_selesai = parse_tanggal(request.args.get('sampai'))
+    except ValueError:
+        return jsonify({
+            'sukses': False,
+            'pesan': 'Format tanggal tidak valid. Gunakan ISO 8601 (contoh: 2024-01-31)'
+        }), 400
+
+    try:
+        limit = min(
+            request.args.get('limit', 100, type=int),
+            DatabaseService.LIMIT_RIWAYAT_MAKS
+        )
+        data_riwayat = db_service.dapatkan_riwayat(
+            limit=limit,
+            before_id=request.args.get('before_id', type=int),
+            after_timestamp=after_timestamp,
+            brand=request.args.get('brand') or None,
+            tanggal_mulai=tanggal_mulai,
+            tanggal_selesai=tanggal_selesai
+        )
 
         return jsonify({
             'sukses': True,
             'jumlah': len(data_riwayat),
-            'data': data_riwayat
+            'data': data_riwayat,
+            'cursor_berikutnya': data_riwayat[-1]['id'] if len(data_riwayat) == limit else None
         }), 200
 
     except Exception as e:
@@ -250,6 +978,95 @@ def api_riwayat():
         }), 500
 
 
+@app.route('/api/riwayat/ekspor', methods=['GET'])
+def api_ekspor_riwayat():
+    """
+    API endpoint untuk mengekspor seluruh riwayat deteksi secara streaming.
+
+    Record dibaca per potongan dan langsung dikirim, urut id naik, sehingga
+    memori server tetap datar berapa pun jumlah recordnya.
+
+    Query parameters:
+        - format (optional): csv (default), ndjson, atau parquet
+        - brand (optional): Filter nama brand
+        - dari, sampai (optional): Rentang tanggal upload (ISO 8601)
+        - setelah_id (optional): Lanjutkan ekspor setelah id record terakhir
+          yang sudah diterima
+        - sampai_id (optional): Batas atas id; default id terbaru saat ekspor
+          dimulai (dikirim di header X-Ekspor-Sampai-Id agar ekspor yang
+          dilanjutkan mencakup rentang yang sama)
+
+    Returns:
+        Response streaming berisi file ekspor, atau JSON error message
+    """
+    logger.info("Request ekspor riwayat diterima")
+
+    format_ekspor = request.args.get('format', 'csv').lower()
+    if format_ekspor not in FORMAT_EKSPOR:
+        return jsonify({
+            'sukses': False,
+            'pesan': f"Format ekspor tidak dikenal. Gunakan: {', '.join(FORMAT_EKSPOR)}"
+        }), 400
+    if format_ekspor == 'parquet' and not parquet_tersedia():
+        return jsonify({
+            'sukses': False,
+            'pesan': 'Ekspor Parquet membutuhkan pyarrow yang belum terpasang di server'
+        }), 501
+
+    try:
+        tanggal_mulai = parse_tanggal(request.args.get('dari'))
+        tanggal_selesai = parse_tanggal(request.args.get('sampai'))
+    except ValueError:
+        return jsonify({
+            'sukses': False,
+            'pesan': 'Format tanggal tidak valid. Gunakan ISO 8601 (contoh: 2024-01-31)'
+        }), 400
+
+    try:
+        sampai_id = request.args.get('sampai_id', type=int)
+        if sampai_id is None:
+            sampai_id = db_service.dapatkan_id_terakhir() or 0
+
+        potongan = db_service.ekspor_riwayat(
+            setelah_id=request.args.get('setelah_id', type=int),
+            sampai_id=sampai_id,
+            brand=request.args.get('brand') or None,
+            tanggal_mulai=tanggal_mulai,
+            tanggal_selesai=tanggal_selesai,
+            ukuran_potongan=Config.EKSPOR_UKURAN_POTONGAN
+        )
+        # Potongan pertama dibaca sebelum response dikirim agar error query
+        # masih bisa dijawab dengan status 500
+        potongan_pertama = next(potongan, [])
+    except Exception as e:
+        logger.error(f"Error memulai ekspor riwayat: {str(e)}")
+        return jsonify({
+            'sukses': False,
+            'pesan': f"Terjadi kesalahan: {str(e)}"
+        }), 500
+
+    def semua_potongan() -> Iterator[List[dict]]:
+        try:
+            yield potongan_pertama
+            yield from potongan
+        except Exception as e:
+            # Status sudah terkirim; klien melanjutkan dengan setelah_id
+            logger.error(f"Ekspor riwayat terputus: {str(e)}")
+            raise
+        finally:
+            potongan.close()
+
+    mimetype, ekstensi = FORMAT_EKSPOR[format_ekspor]
+    response = Response(
+        stream_with_context(hasilkan_ekspor(format_ekspor, semua_potongan(), Config.EKSPOR_BARIS_PER_GRUP)),
+        mimetype=mimetype
+    )
+    nama_file = f"riwayat_deteksi_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{ekstensi}"
+    response.headers['Content-Disposition'] = f'attachment; filename="{nama_file}"'
+    response.headers['X-Ekspor-Sampai-Id'] = str(sampai_id)
+    return response
+
+
 @app.route('/api/statistik', methods=['GET'])
 def api_statistik():
     """
@@ -276,6 +1093,199 @@ def api_statistik():
         }), 500
 
 
+@app.route('/api/duplikat', methods=['GET'])
+def api_duplikat():
+    """
+    API endpoint untuk melihat kelompok gambar yang hampir sama.
+
+    Query parameters:
+        - limit (optional): Jumlah gambar terbaru yang diperiksa
+          (default dan maksimal: DUPLIKAT_LIMIT_KLUSTER)
+        - ambang (optional): Jarak Hamming maksimal hash perseptual
+          (default: DUPLIKAT_AMBANG_HAMMING)
+
+    Returns:
+        JSON response dengan daftar kelompok duplikat, terbesar lebih dulu
+    """
+    logger.info("Request kelompok duplikat diterima")
+
+    try:
+        limit = max(1, min(
+            request.args.get('limit', Config.DUPLIKAT_LIMIT_KLUSTER, type=int),
+            Config.DUPLIKAT_LIMIT_KLUSTER
+        ))
+        ambang = max(0, min(
+            request.args.get('ambang', Config.DUPLIKAT_AMBANG_HAMMING, type=int),
+            16
+        ))
+
+        daftar_gambar = db_service.dapatkan_hash_gambar(limit)
+        gambar_per_id = {gambar['id']: gambar for gambar in daftar_gambar}
+        kelompok = kelompokkan_duplikat(
+            [(gambar['id'], gambar['perceptual_hash']) for gambar in daftar_gambar],
+            ambang=ambang
+        )
+
+        return jsonify({
+            'sukses': True,
+            'jumlah_gambar_diperiksa': len(daftar_gambar),
+            'jumlah_kelompok': len(kelompok),
+            'data': [
+                {
+                    'jumlah': len(anggota),
+                    'gambar': [gambar_per_id[id_gambar] for id_gambar in anggota]
+                }
+                for anggota in kelompok
+            ]
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error mengambil kelompok duplikat: {str(e)}")
+        return jsonify({
+            'sukses': False,
+            'pesan': f"Terjadi kesalahan: {str(e)}"
+        }), 500
+
+
+@app.route('/api/cache', methods=['GET'])
+def api_cache():
+    """
+    API endpoint untuk melihat statistik cache hasil deteksi dan cache baca.
+
+    Returns:
+        JSON response dengan jumlah hit/miss dan panggilan API yang dihemat
+    """
+    if not cache_deteksi and not cache_baca:
+        return jsonify({
+            'sukses': False,
+            'pesan': 'Cache tidak aktif'
+        }), 404
+
+    data = cache_deteksi.statistik() if cache_deteksi else {}
+    if cache_baca:
+        data['cache_baca'] = cache_baca.statistik()
+
+    return jsonify({
+        'sukses': True,
+        'data': data
+    }), 200
+
+
+@app.route('/metrics', methods=['GET'])
+def metrik_prometheus():
+    """
+    Endpoint metrik format teks Prometheus (latensi per tahap, panggilan
+    Vision, pool/query database, dan hit cache dari semua worker).
+    """
+    hasil = hasilkan_metrik() if Config.METRIK_AKTIF else None
+    if hasil is None:
+        return Response("Metrik tidak aktif\n", status=404, mimetype='text/plain')
+
+    isi, content_type = hasil
+    return Response(isi, content_type=content_type)
+
+
+@app.cli.command('bangun-ulang-statistik')
+def perintah_bangun_ulang_statistik():
+    """Hitung ulang tabel ringkasan statistik dari seluruh riwayat deteksi."""
+    if db_service.bangun_ulang_statistik():
+        print("Tabel ringkasan statistik berhasil dibangun ulang")
+    else:
+        print("Gagal membangun ulang statistik, cek log untuk detail")
+        raise SystemExit(1)
+
+
+@app.cli.command('migrasi-skema')
+@click.option('--ukuran-batch', default=5000, show_default=True, help="Jumlah baris lama per transaksi")
+@click.option('--hapus-tabel-lama', is_flag=True, help="Hapus tabel BrandDetection setelah semua baris pindah")
+def perintah_migrasi_skema(ukuran_batch: int, hapus_tabel_lama: bool):
+    """Pindahkan riwayat dari tabel lama BrandDetection ke Images/Detections/Brands."""
+    statistik = db_service.migrasi_skema(ukuran_batch, hapus_tabel_lama)
+    if statistik is None:
+        print("Migrasi skema gagal, cek log untuk detail (aman dijalankan ulang)")
+        raise SystemExit(1)
+
+    print(
+        f"{statistik['baris']} baris dari {statistik['gambar']} gambar dipindahkan, "
+        f"{statistik['sisa']} baris belum pindah"
+    )
+
+
+@app.cli.command('spool-database')
+@click.option('--flush', 'kirim', is_flag=True, help="Kirim seluruh isi spool ke database sekarang")
+@click.option('--ulang-gagal', is_flag=True, help="Kembalikan entri yang ditandai gagal ke antrian")
+def perintah_spool_database(kirim: bool, ulang_gagal: bool):
+    """Tampilkan isi spool write-behind dan kirim ulang entri yang tertunda."""
+    if spool_database is None:
+        print("Spool database tidak aktif (SPOOL_PATH_DB kosong)")
+        raise SystemExit(1)
+
+    if ulang_gagal:
+        print(f"{spool_database.ulang_gagal()} entri gagal dikembalikan ke antrian")
+    if kirim:
+        total = 0
+        while True:
+            jumlah = spool_database.flush()
+            if jumlah == 0:
+                break
+            total += jumlah
+        print(f"{total} baris dikirim ke database")
+
+    statistik = spool_database.statistik()
+    print(
+        f"{statistik['entri_menunggu']} entri ({statistik['baris_menunggu']} baris) menunggu, "
+        f"{statistik['entri_gagal']} entri gagal, entri tertua {statistik['umur_tertua']} detik"
+    )
+
+
+@app.cli.command('deteksi-video')
+@click.argument('path_sumber', type=click.Path(exists=True))
+def perintah_deteksi_video(path_sumber: str):
+    """Deteksi brand pada file video, folder frame, atau zip frame lalu simpan hasilnya."""
+    try:
+        hasil = proses_deteksi_video(os.path.basename(os.path.normpath(path_sumber)), path_sumber)
+    except Exception as e:
+        print(f"Deteksi video gagal: {str(e)}")
+        raise SystemExit(1)
+
+    print(
+        f"{hasil['jumlah_frame']} frame sampel, {hasil['frame_dianalisis']} dianalisis, "
+        f"{hasil['frame_dilewati']} dilewati, {hasil['frame_gagal']} gagal"
+    )
+    for interval in hasil['interval']:
+        print(
+            f"  {interval['brand']}: {interval['mulai']:.2f}-{interval['selesai']:.2f} detik "
+            f"({interval['jumlah_frame']} frame, confidence maks {interval['confidence_maks']:.2f})"
+        )
+    if not hasil['tersimpan']:
+        print("Gagal menyimpan hasil ke database, cek log untuk detail")
+        raise SystemExit(1)
+
+
+@app.cli.command('sapu-berkas')
+def perintah_sapu_berkas():
+    """Hapus file upload yang tidak lagi dirujuk riwayat deteksi."""
+    referensi = referensi_gambar()
+    if referensi is None:
+        print("Gagal mengambil referensi dari database, tidak ada file yang dihapus")
+        raise SystemExit(1)
+
+    statistik = penyimpanan_berkas.sapu(referensi, Config.PENYIMPANAN_MASA_TENGGANG)
+    print(
+        f"{statistik['diperiksa']} file diperiksa, {statistik['dihapus']} dihapus "
+        f"({format_ukuran_file(statistik['byte_dibebaskan'])} dibebaskan)"
+    )
+
+
+@app.errorhandler(UnggahanDitolak)
+def unggahan_ditolak(e: UnggahanDitolak):
+    """Handler untuk upload yang ditolak saat body request masih diterima."""
+    return jsonify({
+        'sukses': False,
+        'pesan': e.pesan
+    }), e.status_http
+
+
 @app.errorhandler(404)
 def halaman_tidak_ditemukan(e):
     """Handler untuk error 404 - halaman tidak ditemukan."""
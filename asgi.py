@@ -0,0 +1,397 @@
+"""
+Entry point ASGI untuk Sistem Deteksi Merek.
+
+Endpoint /api/deteksi, /api/riwayat, dan /api/statistik dilayani secara
+native dengan asyncio: panggilan Azure memakai HTTP client non-blocking dan
+query database dijalankan di thread pool terbatas, sehingga satu proses bisa
+menahan ratusan panggilan Azure sekaligus. Semua route lain diteruskan ke
+aplikasi Flask (WSGI) tanpa perubahan.
+
+Menjalankan:
+    uvicorn asgi:aplikasi --host 0.0.0.0 --port 5000 --workers 3
+"""
+
+import time
+import asyncio
+import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+from a2wsgi import WSGIMiddleware  # type: ignore
+from python_multipart.multipart import MultipartParser, parse_options_header  # type: ignore
+from starlette.applications import Starlette  # type: ignore
+from starlette.background import BackgroundTask  # type: ignore
+from starlette.requests import Request  # type: ignore
+from starlette.responses import JSONResponse  # type: ignore
+from starlette.routing import Mount, Route  # type: ignore
+
+from app import (
+    app as aplikasi_flask,
+    antrian_deteksi,
+    db_service,
+    penyimpanan_berkas,
+    simpan_berkas_upload,
+    simpan_hasil,
+    susun_hasil_analisis,
+    vision_service
+)
+from config import Config
+from services import STATUS_AKHIR, STATUS_GAGAL, STATUS_MENUNGGU, DatabaseService, LayananTidakTersedia, ukur_tahap
+from utils import (
+    PenampungUnggahan,
+    UnggahanDitolak,
+    file_diizinkan,
+    parse_tanggal
+)
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Thread pool khusus query database, seukuran pool koneksi agar thread
+# tidak menunggu koneksi yang sedang dipakai
+executor_database = ThreadPoolExecutor(
+    max_workers=Config.ASYNC_THREAD_DATABASE or Config.SQL_POOL_UKURAN,
+    thread_name_prefix='database-async'
+)
+
+
+async def jalankan_database(fungsi: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Jalankan operasi DatabaseService di thread pool database."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor_database, lambda: fungsi(*args, **kwargs))
+
+
+# Batas isi field teks (mis. 'mode') di form upload
+UKURAN_FIELD_MAKS = 1024
+
+# Jeda antar pengecekan status job saat long-poll (detik)
+INTERVAL_LONG_POLL = 0.2
+
+
+async def terima_unggahan(request: Request) -> Tuple[Dict[str, str], Optional[str], PenampungUnggahan]:
+    """
+    Parse body multipart sepotong demi sepotong sambil validasi file 'gambar'.
+
+    Potongan body diteruskan ke PenampungUnggahan begitu diterima, sehingga
+    ekstensi, magic bytes, dan ukuran dicek sebelum seluruh body dibaca.
+    Verifikasi PIL atas file yang sudah lengkap dijalankan di thread.
+
+    Returns:
+        Tuple (field teks, nama file, penampung file gambar)
+
+    Raises:
+        UnggahanDitolak: Jika request atau file gambar tidak valid
+    """
+    tipe_konten, opsi = parse_options_header(request.headers.get('content-type', ''))
+    if tipe_konten != b'multipart/form-data' or b'boundary' not in opsi:
+        raise UnggahanDitolak('Tidak ada file gambar dalam request', 400)
+
+    field: Dict[str, str] = {}
+    bagian: Dict[str, Any] = {}
+    hasil: Dict[str, Any] = {'nama_file': None, 'penampung': None}
+
+    def awal_bagian() -> None:
+        bagian.clear()
+        bagian.update({'header': {}, 'nama_header': b'', 'nilai_header': b'', 'tujuan': None})
+
+    def nama_header(data: bytes, awal: int, akhir: int) -> None:
+        bagian['nama_header'] += data[awal:akhir]
+
+    def nilai_header(data: bytes, awal: int, akhir: int) -> None:
+        bagian['nilai_header'] += data[awal:akhir]
+
+    def akhir_header() -> None:
+        bagian['header'][bagian['nama_header'].lower()] = bagian['nilai_header']
+        bagian['nama_header'] = bagian['nilai_header'] = b''
+
+    def header_selesai() -> None:
+        _, disposisi = parse_options_header(bagian['header'].get(b'content-disposition', b''))
+        nama = disposisi.get(b'name', b'').decode('utf-8', 'replace')
+        nama_file = disposisi.get(b'filename')
+        bagian['nama'] = nama
+
+        if nama_file is None:
+            bagian['tujuan'] = bytearray()
+            return
+        if nama != 'gambar' or hasil['penampung'] is not None:
+            return
+
+        nama_file = nama_file.decode('utf-8', 'replace')
+        if not nama_file:
+            raise UnggahanDitolak('Nama file tidak boleh kosong', 400)
+        if not file_diizinkan(nama_file, Config.ALLOWED_EXTENSIONS):
+            logger.warning(f"Ekstensi file tidak diizinkan: {nama_file}")
+            raise UnggahanDitolak(
+                f"Ekstensi file tidak diizinkan. Gunakan: {', '.join(Config.ALLOWED_EXTENSIONS)}", 400
+            )
+        hasil['nama_file'] = nama_file
+        hasil['penampung'] = bagian['tujuan'] = PenampungUnggahan(
+            Config.MAX_CONTENT_LENGTH, Config.ALLOWED_EXTENSIONS
+        )
+
+    def data_bagian(data: bytes, awal: int, akhir: int) -> None:
+        tujuan = bagian['tujuan']
+        if isinstance(tujuan, PenampungUnggahan):
+            tujuan.write(data[awal:akhir])
+        elif tujuan is not None and len(tujuan) < UKURAN_FIELD_MAKS:
+            tujuan.extend(data[awal:akhir][:UKURAN_FIELD_MAKS - len(tujuan)])
+
+    def akhir_bagian() -> None:
+        if isinstance(bagian['tujuan'], bytearray):
+            field[bagian['nama']] = bagian['tujuan'].decode('utf-8', 'replace')
+
+    parser = MultipartParser(opsi[b'boundary'], {
+        'on_part_begin': awal_bagian,
+        'on_header_field': nama_header,
+        'on_header_value': nilai_header,
+        'on_header_end': akhir_header,
+        'on_headers_finished': header_selesai,
+        'on_part_data': data_bagian,
+        'on_part_end': akhir_bagian
+    })
+    async for potongan in request.stream():
+        parser.write(potongan)
+    parser.finalize()
+
+    penampung = hasil['penampung']
+    if penampung is None:
+        raise UnggahanDitolak('Tidak ada file gambar dalam request', 400)
+
+    # seek(0) menjalankan validasi akhir (termasuk verifikasi PIL) yang
+    # bisa memakan waktu untuk gambar besar
+    await asyncio.to_thread(penampung.seek, 0)
+    return field, hasil['nama_file'], penampung
+
+
+async def api_deteksi(request: Request) -> JSONResponse:
+    """
+    API endpoint async untuk deteksi brand (format sama dengan versi Flask).
+
+    Request:
+        - Method: POST
+        - Content-Type: multipart/form-data
+        - Body: file dengan key 'gambar'
+        - mode (optional): 'job' untuk memproses di background (HTTP 202)
+
+    Returns:
+        JSON response dengan hasil deteksi, job id, atau error message
+    """
+    logger.info("Request deteksi brand (async) diterima")
+
+    ukuran_maks = Config.MAX_CONTENT_LENGTH
+    if int(request.headers.get('content-length') or 0) > ukuran_maks:
+        return JSONResponse({
+            'sukses': False,
+            'pesan': f"Ukuran file terlalu besar. Maksimal {ukuran_maks / (1024*1024)} MB"
+        }, status_code=413)
+
+    # File divalidasi (ekstensi, magic bytes, ukuran, PIL) selagi diterima
+    try:
+        with ukur_tahap('baca_upload'):
+            form, nama_file, penampung = await terima_unggahan(request)
+    except UnggahanDitolak as e:
+        logger.warning(f"Upload ditolak: {e.pesan}")
+        return JSONResponse({'sukses': False, 'pesan': e.pesan}, status_code=e.status_http)
+
+    # Baca upload sekali ke memori; semua tahap berikutnya memakai buffer ini
+    data_gambar = penampung.read()
+
+    # File ditulis ke penyimpanan setelah response terkirim (jika diaktifkan)
+    path_file = None
+    tugas_simpan = None
+    if Config.UPLOAD_SIMPAN_FILE:
+        path_file = penyimpanan_berkas.lokasi_untuk(data_gambar)
+        tugas_simpan = BackgroundTask(simpan_berkas_upload, data_gambar)
+
+    try:
+        # Mode job: kembalikan job id, deteksi dikerjakan worker background
+        if request.query_params.get('mode', form.get('mode')) == 'job':
+            try:
+                job_id = antrian_deteksi.kirim({
+                    'nama_file': nama_file,
+                    'path_file': path_file,
+                    'data_gambar': data_gambar
+                })
+            except queue.Full:
+                logger.warning("Antrian deteksi penuh")
+                return JSONResponse({
+                    'sukses': False,
+                    'pesan': 'Server sedang sibuk, silakan coba beberapa saat lagi'
+                }, status_code=503)
+
+            return JSONResponse({
+                'sukses': True,
+                'job_id': job_id,
+                'status': STATUS_MENUNGGU,
+                'url_status': request.url_for('api_status_deteksi', job_id=job_id).path
+            }, status_code=202, background=tugas_simpan)
+
+        info_gambar = await asyncio.to_thread(vision_service.dapatkan_info_gambar_bytes, data_gambar)
+        brand_terdeteksi = await vision_service.deteksi_brand_bytes_async(
+            data_gambar, nama_file, info_gambar
+        )
+        response, daftar_simpan = susun_hasil_analisis(
+            nama_file, path_file, info_gambar, brand_terdeteksi
+        )
+
+        # Simpan semua baris hasil deteksi ke database dalam satu transaksi
+        with ukur_tahap('simpan_database'):
+            response['tersimpan'] = await jalankan_database(simpan_hasil, daftar_simpan)
+        if not response['tersimpan']:
+            logger.error(f"Hasil deteksi {nama_file} tidak tersimpan ke spool maupun database")
+
+        logger.info(f"Deteksi berhasil: {response['jumlah_brand']} brand ditemukan")
+        return JSONResponse(response, status_code=200, background=tugas_simpan)
+
+    except LayananTidakTersedia as e:
+        # Layanan deteksi sedang dibatasi/down: tolak cepat agar klien mundur
+        logger.warning(f"Deteksi ditolak, layanan tidak tersedia: {str(e)}")
+        return JSONResponse({
+            'sukses': False,
+            'pesan': 'Layanan deteksi sedang sibuk, silakan coba beberapa saat lagi'
+        }, status_code=503, headers={'Retry-After': str(max(1, round(e.coba_lagi_setelah)))})
+
+    except Exception as e:
+        logger.error(f"Error saat deteksi: {str(e)}")
+        return JSONResponse({
+            'sukses': False,
+            'pesan': f"Terjadi kesalahan: {str(e)}"
+        }, status_code=500)
+
+
+async def api_status_deteksi(request: Request) -> JSONResponse:
+    """
+    API endpoint async untuk polling status job deteksi (format sama dengan versi Flask).
+
+    Long-poll (?tunggu=detik) menunggu dengan asyncio.sleep sehingga tidak
+    menahan thread selama job belum selesai.
+    """
+    job_id = request.path_params['job_id']
+    try:
+        tunggu = max(float(request.query_params.get('tunggu', 0)), 0)
+    except ValueError:
+        tunggu = 0
+    batas_waktu = time.monotonic() + min(tunggu, Config.ANTRIAN_LONG_POLL_MAKS)
+
+    while True:
+        job = await asyncio.to_thread(antrian_deteksi.status, job_id)
+        if job is None or job['status'] in STATUS_AKHIR or time.monotonic() >= batas_waktu:
+            break
+        await asyncio.sleep(INTERVAL_LONG_POLL)
+
+    if job is None:
+        return JSONResponse({
+            'sukses': False,
+            'pesan': 'Job tidak ditemukan'
+        }, status_code=404)
+
+    response = {
+        'sukses': job['status'] != STATUS_GAGAL,
+        'job_id': job_id,
+        'status': job['status']
+    }
+    if job['hasil']:
+        response['hasil'] = job['hasil']
+    if job['error']:
+        response['pesan'] = f"Terjadi kesalahan: {job['error']}"
+
+    return JSONResponse(response, status_code=200)
+
+
+async def api_riwayat(request: Request) -> JSONResponse:
+    """
+    API endpoint async untuk mengambil riwayat deteksi.
+
+    Query parameter dan format response sama dengan versi Flask.
+    """
+    logger.info("Request riwayat deteksi (async) diterima")
+    parameter = request.query_params
+
+    try:
+        after_timestamp = parse_tanggal(parameter.get('after_timestamp'))
+        tanggal_mulai = parse_tanggal(parameter.get('dari'))
+        tanggal_selesai = parse_tanggal(parameter.get('sampai'))
+    except ValueError:
+        return JSONResponse({
+            'sukses': False,
+            'pesan': 'Format tanggal tidak valid. Gunakan ISO 8601 (contoh: 2024-01-31)'
+        }, status_code=400)
+
+    try:
+        limit = min(_ambil_int(parameter, 'limit', 100), DatabaseService.LIMIT_RIWAYAT_MAKS)
+        data_riwayat = await jalankan_database(
+            db_service.dapatkan_riwayat,
+            limit=limit,
+            before_id=_ambil_int(parameter, 'before_id', None),
+            after_timestamp=after_timestamp,
+            brand=parameter.get('brand') or None,
+            tanggal_mulai=tanggal_mulai,
+            tanggal_selesai=tanggal_selesai
+        )
+
+        return JSONResponse({
+            'sukses': True,
+            'jumlah': len(data_riwayat),
+            'data': data_riwayat,
+            'cursor_berikutnya': data_riwayat[-1]['id'] if len(data_riwayat) == limit else None
+        }, status_code=200)
+
+    except Exception as e:
+        logger.error(f"Error mengambil riwayat: {str(e)}")
+        return JSONResponse({
+            'sukses': False,
+            'pesan': f"Terjadi kesalahan: {str(e)}"
+        }, status_code=500)
+
+
+async def api_statistik(request: Request) -> JSONResponse:
+    """API endpoint async untuk statistik deteksi (format sama dengan versi Flask)."""
+    logger.info("Request statistik (async) diterima")
+
+    try:
+        data_statistik = await jalankan_database(db_service.dapatkan_statistik)
+
+        return JSONResponse({
+            'sukses': True,
+            'data': data_statistik
+        }, status_code=200)
+
+    except Exception as e:
+        logger.error(f"Error mengambil statistik: {str(e)}")
+        return JSONResponse({
+            'sukses': False,
+            'pesan': f"Terjadi kesalahan: {str(e)}"
+        }, status_code=500)
+
+
+def _ambil_int(parameter: Any, nama: str, default: Any) -> Any:
+    """Ambil query parameter integer; nilai tidak valid memakai default (seperti Flask type=int)."""
+    try:
+        return int(parameter[nama])
+    except (KeyError, ValueError):
+        return default
+
+
+@asynccontextmanager
+async def siklus_hidup(_aplikasi: Starlette):
+    """Tutup HTTP client async dan thread pool database saat aplikasi berhenti."""
+    yield
+    await vision_service.detektor_azure.tutup_async()
+    executor_database.shutdown(wait=False)
+
+
+aplikasi = Starlette(
+    routes=[
+        Route('/api/deteksi', api_deteksi, methods=['POST']),
+        Route('/api/deteksi/{job_id}', api_status_deteksi, methods=['GET'], name='api_status_deteksi'),
+        Route('/api/riwayat', api_riwayat, methods=['GET']),
+        Route('/api/statistik', api_statistik, methods=['GET']),
+        # Route lain (halaman, batch, status job, dll.) tetap dilayani Flask
+        Mount('/', app=WSGIMiddleware(aplikasi_flask))
+    ],
+    lifespan=siklus_hidup
+)
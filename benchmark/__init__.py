@@ -0,0 +1,14 @@
+"""
+Benchmark beban dan latensi Sistem Deteksi Merek.
+
+Aplikasi Flask yang sebenarnya dijalankan di proses server terpisah dengan
+dua pengganti lokal: server HTTP tiruan Azure Computer Vision (latensi dan
+rasio error bisa diatur) dan DatabaseLokal (penyimpanan di memori dengan
+latensi query buatan). Klien mengirim campuran request /api/deteksi,
+/api/riwayat, dan /api/statistik dengan konkurensi tertentu lalu melaporkan
+latensi p50/p95/p99, throughput, dan memori proses server.
+
+Menjalankan:
+    python -m benchmark --konkurensi 16 --durasi 30 --simpan hasil.json
+    python -m benchmark --konkurensi 16 --durasi 30 --baseline hasil.json
+"""
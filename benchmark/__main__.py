@@ -0,0 +1,298 @@
+"""
+CLI benchmark beban dan latensi.
+
+Contoh:
+    # Simpan hasil sebagai baseline
+    python -m benchmark --konkurensi 16 --durasi 30 --simpan baseline.json
+
+    # Jalankan ulang setelah perubahan dan bandingkan (exit code 1 jika regresi)
+    python -m benchmark --konkurensi 16 --durasi 30 --baseline baseline.json
+
+    # Server produksi (gunicorn) dengan Vision lambat dan 5% error
+    python -m benchmark --server gunicorn --workers 3 --latensi-vision 0.8 --error-vision 0.05
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import logging
+import tempfile
+import subprocess
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+
+from benchmark.beban import (
+    CAMPURAN_DEFAULT,
+    PengukurMemori,
+    buat_gambar_uji,
+    jalankan_beban,
+    parse_campuran
+)
+from benchmark.laporan import bandingkan, format_laporan, ringkas_latensi
+from benchmark.vision_tiruan import ServerVisionTiruan
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+FOLDER_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _port_kosong() -> int:
+    """Cari port TCP lokal yang sedang tidak dipakai."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _perintah_server(args: argparse.Namespace, port: int) -> List[str]:
+    """Susun perintah untuk menjalankan proses server aplikasi."""
+    if args.server == 'gunicorn':
+        return [
+            sys.executable, '-m', 'gunicorn',
+            '--workers', str(args.workers),
+            '--threads', str(args.threads),
+            '--bind', f'127.0.0.1:{port}',
+            '--timeout', '300',
+            'benchmark.server:app'
+        ]
+    if args.server == 'uvicorn':
+        return [
+            sys.executable, '-m', 'uvicorn',
+            '--workers', str(args.workers),
+            '--host', '127.0.0.1',
+            '--port', str(port),
+            '--no-access-log',
+            'benchmark.server:aplikasi_asgi'
+        ]
+    return [sys.executable, '-m', 'benchmark.server', '--port', str(port)]
+
+
+def _env_server(args: argparse.Namespace, url_vision: str, folder_kerja: str) -> Dict[str, str]:
+    """Susun environment proses server: semua state lokal di folder kerja sementara."""
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': os.pathsep.join(filter(None, [FOLDER_ROOT, env.get('PYTHONPATH')])),
+        'COMPUTER_VISION_ENDPOINT': url_vision,
+        'COMPUTER_VISION_KEY': 'benchmark',
+        'DETEKTOR_BACKEND': 'azure',
+        'UPLOAD_FOLDER': os.path.join(folder_kerja, 'uploads'),
+        'PENYIMPANAN_PATH_INDEKS': os.path.join(folder_kerja, 'berkas.sqlite3'),
+        'PENYIMPANAN_INTERVAL_SAPU': '0',
+        'CACHE_DETEKSI_PATH_DISK': '',
+        'CACHE_BACA_PATH_DISK': '',
+        'ANTRIAN_PATH_DB': '',
+        'SPOOL_PATH_DB': '',
+        'BENCHMARK_LATENSI_DB': str(args.latensi_db)
+    })
+    if args.server == 'werkzeug':
+        env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    else:
+        env['PROMETHEUS_MULTIPROC_DIR'] = os.path.join(folder_kerja, 'metrik')
+
+    for pasangan in args.env:
+        nama, _, nilai = pasangan.partition('=')
+        env[nama] = nilai
+    return env
+
+
+def _tunggu_siap(url: str, proses: subprocess.Popen, timeout: float = 60.0) -> bool:
+    """Tunggu sampai server menjawab /api/statistik atau proses berhenti."""
+    batas_waktu = time.monotonic() + timeout
+    while time.monotonic() < batas_waktu:
+        if proses.poll() is not None:
+            return False
+        try:
+            if requests.get(f"{url}/api/statistik", timeout=2).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def _hentikan_server(proses: subprocess.Popen) -> None:
+    proses.terminate()
+    try:
+        proses.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proses.kill()
+        proses.wait()
+
+
+def jalankan_benchmark(args: argparse.Namespace) -> Dict:
+    """
+    Jalankan satu putaran benchmark lengkap.
+
+    Args:
+        args: Argumen CLI
+
+    Returns:
+        Dict: Hasil benchmark (format yang sama dengan file --simpan)
+
+    Raises:
+        RuntimeError: Jika server aplikasi gagal dijalankan
+    """
+    campuran = parse_campuran(args.campuran)
+    lebar, _, tinggi = args.ukuran_gambar.partition('x')
+    daftar_gambar = buat_gambar_uji(args.gambar_unik, int(lebar), int(tinggi), args.seed)
+
+    vision = ServerVisionTiruan(
+        latensi=args.latensi_vision,
+        jitter=args.jitter_vision,
+        rasio_error=args.error_vision,
+        status_error=args.status_error_vision,
+        seed=args.seed
+    )
+    vision.mulai()
+
+    with tempfile.TemporaryDirectory(prefix='benchmark-') as folder_kerja:
+        port = _port_kosong()
+        url = f"http://127.0.0.1:{port}"
+        path_log = os.path.join(folder_kerja, 'server.log')
+        with open(path_log, 'wb') as log_server:
+            proses = subprocess.Popen(
+                _perintah_server(args, port),
+                cwd=folder_kerja,
+                env=_env_server(args, vision.url, folder_kerja),
+                stdout=log_server,
+                stderr=subprocess.STDOUT
+            )
+
+        try:
+            if not _tunggu_siap(url, proses):
+                with open(path_log, 'r', errors='replace') as f:
+                    log = f.read()[-4000:]
+                raise RuntimeError(f"Server aplikasi gagal dijalankan:\n{log}")
+
+            if args.pemanasan > 0:
+                logger.info(f"Pemanasan {args.pemanasan} detik...")
+                jalankan_beban(url, args.konkurensi, args.pemanasan, campuran,
+                               daftar_gambar, args.seed + 1, args.timeout)
+
+            logger.info(f"Mengukur {args.durasi} detik dengan {args.konkurensi} klien...")
+            vision_awal = vision.statistik()
+            pengukur = PengukurMemori(proses.pid)
+            pengukur.mulai()
+            mulai = time.perf_counter()
+            catatan = jalankan_beban(url, args.konkurensi, args.durasi, campuran,
+                                     daftar_gambar, args.seed, args.timeout)
+            durasi = time.perf_counter() - mulai
+            memori = pengukur.hentikan()
+            vision_akhir = vision.statistik()
+        finally:
+            _hentikan_server(proses)
+            vision.hentikan()
+
+    return {
+        'versi': 1,
+        'waktu': datetime.now().isoformat(timespec='seconds'),
+        'konfigurasi': {
+            'server': args.server,
+            'workers': args.workers,
+            'threads': args.threads,
+            'konkurensi': args.konkurensi,
+            'durasi': args.durasi,
+            'campuran': campuran,
+            'gambar_unik': args.gambar_unik,
+            'ukuran_gambar': args.ukuran_gambar,
+            'latensi_vision': args.latensi_vision,
+            'jitter_vision': args.jitter_vision,
+            'error_vision': args.error_vision,
+            'status_error_vision': args.status_error_vision,
+            'latensi_db': args.latensi_db,
+            'env': sorted(args.env),
+            'seed': args.seed
+        },
+        'durasi': round(durasi, 3),
+        'endpoint': {
+            nama: ringkas_latensi(
+                ((latensi, status) for endpoint, latensi, status in catatan if endpoint == nama),
+                durasi
+            )
+            for nama in campuran
+        },
+        'total': ringkas_latensi(((latensi, status) for _, latensi, status in catatan), durasi),
+        'memori': memori,
+        'vision_tiruan': {
+            kunci: vision_akhir[kunci] - vision_awal[kunci] for kunci in vision_akhir
+        }
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point CLI benchmark."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark beban dan latensi /api/deteksi, /api/riwayat, dan /api/statistik"
+    )
+    parser.add_argument('--server', choices=('werkzeug', 'gunicorn', 'uvicorn'), default='werkzeug',
+                        help="Server aplikasi (werkzeug multi-thread, gunicorn = produksi, uvicorn = asgi.py)")
+    parser.add_argument('--workers', type=int, default=3, help="Jumlah worker gunicorn/uvicorn")
+    parser.add_argument('--threads', type=int, default=1, help="Thread per worker gunicorn")
+    parser.add_argument('--konkurensi', type=int, default=8, help="Jumlah klien paralel")
+    parser.add_argument('--durasi', type=float, default=30, help="Lama pengukuran (detik)")
+    parser.add_argument('--pemanasan', type=float, default=3, help="Lama pemanasan sebelum diukur (detik)")
+    parser.add_argument('--campuran', default=CAMPURAN_DEFAULT, help="Bobot endpoint, contoh: deteksi=6,riwayat=3")
+    parser.add_argument('--gambar-unik', type=int, default=50, help="Jumlah gambar berbeda yang dikirim")
+    parser.add_argument('--ukuran-gambar', default='800x600', help="Ukuran gambar uji (LEBARxTINGGI)")
+    parser.add_argument('--latensi-vision', type=float, default=0.3, help="Latensi Vision tiruan (detik)")
+    parser.add_argument('--jitter-vision', type=float, default=0.1, help="Jitter latensi Vision tiruan (detik)")
+    parser.add_argument('--error-vision', type=float, default=0.0, help="Rasio error Vision tiruan (0-1)")
+    parser.add_argument('--status-error-vision', type=int, default=503, help="Status HTTP error Vision tiruan")
+    parser.add_argument('--latensi-db', type=float, default=0.005, help="Latensi per query database lokal (detik)")
+    parser.add_argument('--env', action='append', default=[], metavar='NAMA=NILAI',
+                        help="Environment tambahan untuk server aplikasi (bisa diulang)")
+    parser.add_argument('--timeout', type=float, default=60, help="Timeout satu request (detik)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--simpan', help="Simpan hasil ke file JSON (untuk baseline)")
+    parser.add_argument('--baseline', help="File JSON hasil sebelumnya untuk dibandingkan")
+    parser.add_argument('--ambang-regresi', type=float, default=10.0,
+                        help="Perubahan (persen) yang dianggap regresi")
+    parser.add_argument('--toleransi-ms', type=float, default=2.0,
+                        help="Kenaikan latensi minimal (ms) untuk dianggap regresi")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+
+    try:
+        parse_campuran(args.campuran)
+    except ValueError as e:
+        parser.error(str(e))
+    for pasangan in args.env:
+        if '=' not in pasangan:
+            parser.error(f"format --env harus NAMA=NILAI: {pasangan}")
+
+    try:
+        hasil = jalankan_benchmark(args)
+    except RuntimeError as e:
+        logger.error(str(e))
+        return 2
+
+    print()
+    print(format_laporan(hasil))
+
+    if args.simpan:
+        with open(args.simpan, 'w', encoding='utf-8') as f:
+            json.dump(hasil, f, indent=2)
+        print(f"\nHasil disimpan ke {args.simpan}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        baris, regresi = bandingkan(baseline, hasil, args.ambang_regresi, args.toleransi_ms)
+        print(f"\nPerbandingan dengan {args.baseline} (ambang {args.ambang_regresi}%):")
+        print('\n'.join(baris))
+        if regresi:
+            print(f"\n{len(regresi)} regresi terdeteksi:")
+            for teks in regresi:
+                print(f"  - {teks}")
+            return 1
+        print("\nTidak ada regresi")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
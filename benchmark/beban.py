@@ -0,0 +1,240 @@
+"""
+Pembangkit beban HTTP, pembuat gambar uji, dan pengukur memori server.
+"""
+
+import io
+import os
+import time
+import random
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import requests
+from PIL import Image, ImageDraw
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Endpoint yang bisa dibebani beserta bobot default campurannya
+ENDPOINT = ('deteksi', 'riwayat', 'statistik')
+CAMPURAN_DEFAULT = 'deteksi=6,riwayat=3,statistik=1'
+
+
+def parse_campuran(teks: str) -> Dict[str, float]:
+    """
+    Parse campuran endpoint dengan format 'deteksi=6,riwayat=3,statistik=1'.
+
+    Args:
+        teks: Daftar nama=bobot dipisah koma
+
+    Returns:
+        Dict[str, float]: Bobot per endpoint (hanya yang bobotnya > 0)
+
+    Raises:
+        ValueError: Jika nama endpoint tidak dikenal atau bobot tidak valid
+    """
+    campuran: Dict[str, float] = {}
+    for bagian in teks.split(','):
+        nama, _, bobot = bagian.strip().partition('=')
+        if nama not in ENDPOINT:
+            raise ValueError(f"Endpoint tidak dikenal: {nama} (pilihan: {', '.join(ENDPOINT)})")
+        if float(bobot) > 0:
+            campuran[nama] = float(bobot)
+    if not campuran:
+        raise ValueError("Campuran endpoint kosong")
+    return campuran
+
+
+def buat_gambar_uji(jumlah: int, lebar: int, tinggi: int, seed: int) -> List[bytes]:
+    """
+    Buat gambar JPEG berbeda-beda untuk request deteksi.
+
+    Setiap gambar berisi latar dan beberapa bentuk acak, sehingga hash isi
+    dan hash perseptualnya berbeda (tidak langsung kena cache/duplikat).
+
+    Args:
+        jumlah: Jumlah gambar
+        lebar: Lebar gambar (piksel)
+        tinggi: Tinggi gambar (piksel)
+        seed: Seed random agar gambar sama di setiap run
+
+    Returns:
+        List[bytes]: Data JPEG
+    """
+    acak = random.Random(seed)
+    daftar_gambar = []
+    for _ in range(jumlah):
+        warna_latar = tuple(acak.randrange(256) for _ in range(3))
+        gambar = Image.new('RGB', (lebar, tinggi), warna_latar)
+        gambar_draw = ImageDraw.Draw(gambar)
+        for _ in range(12):
+            x1, x2 = sorted(acak.randrange(lebar) for _ in range(2))
+            y1, y2 = sorted(acak.randrange(tinggi) for _ in range(2))
+            warna = tuple(acak.randrange(256) for _ in range(3))
+            if acak.random() < 0.5:
+                gambar_draw.rectangle((x1, y1, x2, y2), fill=warna)
+            else:
+                gambar_draw.ellipse((x1, y1, x2, y2), fill=warna)
+
+        buffer = io.BytesIO()
+        gambar.save(buffer, format='JPEG', quality=85)
+        daftar_gambar.append(buffer.getvalue())
+    return daftar_gambar
+
+
+def jalankan_beban(
+    url_dasar: str,
+    konkurensi: int,
+    durasi: float,
+    campuran: Dict[str, float],
+    daftar_gambar: Sequence[bytes],
+    seed: int,
+    timeout: float = 60.0
+) -> List[Tuple[str, float, int]]:
+    """
+    Kirim request dari beberapa klien paralel selama durasi tertentu.
+
+    Setiap klien mengirim request berikutnya segera setelah response
+    diterima (closed loop), memilih endpoint secara acak sesuai bobot
+    campuran. Urutan pilihan endpoint dan gambar ditentukan dari seed.
+
+    Args:
+        url_dasar: URL server aplikasi (contoh: http://127.0.0.1:5055)
+        konkurensi: Jumlah klien paralel
+        durasi: Lama pengiriman request (detik)
+        campuran: Bobot per endpoint
+        daftar_gambar: Gambar untuk request deteksi
+        seed: Seed random
+        timeout: Timeout satu request (detik)
+
+    Returns:
+        List[Tuple[str, float, int]]: (endpoint, latensi detik, status HTTP)
+                                      untuk setiap request; status 0 jika
+                                      request gagal tanpa response
+    """
+    nama_endpoint = list(campuran)
+    bobot = [campuran[nama] for nama in nama_endpoint]
+    batas_waktu = time.perf_counter() + durasi
+    catatan: List[Tuple[str, float, int]] = []
+    kunci = threading.Lock()
+
+    def klien(nomor: int) -> None:
+        acak = random.Random(seed * 1000 + nomor)
+        sesi = requests.Session()
+        hasil_lokal: List[Tuple[str, float, int]] = []
+        try:
+            while time.perf_counter() < batas_waktu:
+                endpoint = acak.choices(nama_endpoint, bobot)[0]
+                mulai = time.perf_counter()
+                try:
+                    if endpoint == 'deteksi':
+                        indeks = acak.randrange(len(daftar_gambar))
+                        response = sesi.post(
+                            f"{url_dasar}/api/deteksi",
+                            files={'gambar': (f"benchmark_{indeks}.jpg", daftar_gambar[indeks], 'image/jpeg')},
+                            timeout=timeout
+                        )
+                    elif endpoint == 'riwayat':
+                        response = sesi.get(f"{url_dasar}/api/riwayat", params={'limit': 50}, timeout=timeout)
+                    else:
+                        response = sesi.get(f"{url_dasar}/api/statistik", timeout=timeout)
+                    status = response.status_code
+                except requests.RequestException as e:
+                    logger.debug(f"Request {endpoint} gagal: {str(e)}")
+                    status = 0
+                hasil_lokal.append((endpoint, time.perf_counter() - mulai, status))
+        finally:
+            sesi.close()
+            with kunci:
+                catatan.extend(hasil_lokal)
+
+    daftar_thread = [
+        threading.Thread(target=klien, args=(nomor,), name=f'klien-{nomor}')
+        for nomor in range(konkurensi)
+    ]
+    for thread in daftar_thread:
+        thread.start()
+    for thread in daftar_thread:
+        thread.join()
+    return catatan
+
+
+def rss_proses(pid: int) -> Optional[int]:
+    """
+    Hitung RSS (bytes) sebuah proses beserta seluruh proses anaknya.
+
+    Proses anak ikut dihitung agar worker gunicorn/uvicorn tercakup.
+
+    Args:
+        pid: PID proses induk
+
+    Returns:
+        int: Total RSS dalam bytes, atau None jika /proc tidak tersedia
+    """
+    total = 0
+    antrian = [pid]
+    while antrian:
+        pid_sekarang = antrian.pop()
+        try:
+            with open(f'/proc/{pid_sekarang}/status') as f:
+                for baris in f:
+                    if baris.startswith('VmRSS:'):
+                        total += int(baris.split()[1]) * 1024
+                        break
+            folder_task = f'/proc/{pid_sekarang}/task'
+            for tid in os.listdir(folder_task):
+                with open(f'{folder_task}/{tid}/children') as f:
+                    antrian.extend(int(anak) for anak in f.read().split())
+        except (OSError, ValueError):
+            if pid_sekarang == pid:
+                return None
+    return total
+
+
+class PengukurMemori:
+    """Ambil sampel RSS proses server secara berkala di thread background."""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        """
+        Args:
+            pid: PID proses server
+            interval: Jeda antar sampel (detik)
+        """
+        self.pid = pid
+        self.interval = interval
+        self.sampel: List[int] = []
+        self._berhenti = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name='pengukur-memori', daemon=True)
+
+    def mulai(self) -> None:
+        self._thread.start()
+
+    def hentikan(self) -> Dict[str, Optional[float]]:
+        """
+        Hentikan pengukuran.
+
+        Returns:
+            Dict: rss_awal_mb, rss_rata_mb, rss_puncak_mb, rss_akhir_mb
+                  (None jika tidak ada sampel)
+        """
+        self._berhenti.set()
+        self._thread.join()
+        if not self.sampel:
+            return {'rss_awal_mb': None, 'rss_rata_mb': None, 'rss_puncak_mb': None, 'rss_akhir_mb': None}
+
+        mb = 1024 * 1024
+        return {
+            'rss_awal_mb': round(self.sampel[0] / mb, 1),
+            'rss_rata_mb': round(sum(self.sampel) / len(self.sampel) / mb, 1),
+            'rss_puncak_mb': round(max(self.sampel) / mb, 1),
+            'rss_akhir_mb': round(self.sampel[-1] / mb, 1)
+        }
+
+    def _loop(self) -> None:
+        while True:
+            rss = rss_proses(self.pid)
+            if rss is not None:
+                self.sampel.append(rss)
+            if self._berhenti.wait(self.interval):
+                break
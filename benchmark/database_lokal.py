@@ -0,0 +1,269 @@
+"""
+Pengganti lokal DatabaseService untuk benchmark.
+
+DatabaseLokal menyimpan hasil deteksi di memori proses, tetapi setiap
+operasi tetap meminjam koneksi dari PoolKoneksi, lewat cache baca, dan
+dicatat di metrik seperti DatabaseService. Latensi query Azure SQL ditiru
+dengan menahan koneksi selama latensi_query detik, sehingga antrian pool
+dan efek cache tetap terukur tanpa server database.
+"""
+
+import time
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from services.database import DatabaseService
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+class _CursorLokal:
+    """Cursor kosong untuk cek kesehatan koneksi di PoolKoneksi."""
+
+    def execute(self, *args: Any) -> '_CursorLokal':
+        return self
+
+    def fetchall(self) -> List[Any]:
+        return []
+
+    def close(self) -> None:
+        pass
+
+
+class _KoneksiLokal:
+    """Koneksi tiruan yang dikelola PoolKoneksi."""
+
+    def cursor(self) -> _CursorLokal:
+        return _CursorLokal()
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class DatabaseLokal(DatabaseService):
+    """
+    DatabaseService dengan penyimpanan di memori.
+
+    Signature konstruktor sama dengan DatabaseService sehingga kelas ini
+    bisa dipasang menggantikan DatabaseService sebelum app diimport.
+
+    Attributes:
+        latensi_query: Detik koneksi ditahan per operasi (tiruan round trip
+                       ke Azure SQL)
+    """
+
+    latensi_query: float = 0.005
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._kunci = threading.Lock()
+        self._baris: List[Dict] = []
+        self._id_berikutnya = 1
+
+    def _buat_koneksi(self) -> _KoneksiLokal:
+        """Buat koneksi tiruan untuk pool."""
+        return _KoneksiLokal()
+
+    def _tunggu(self) -> None:
+        if self.latensi_query > 0:
+            time.sleep(self.latensi_query)
+
+    def dapatkan_koneksi(self) -> Optional[_KoneksiLokal]:
+        return _KoneksiLokal()
+
+    def inisialisasi_database(self) -> bool:
+        logger.info("Database lokal (benchmark) siap")
+        return True
+
+    def bangun_ulang_statistik(self) -> bool:
+        return True
+
+    def simpan_hasil_deteksi(self, data: Dict) -> bool:
+        return self.simpan_hasil_deteksi_batch([data])
+
+    def simpan_hasil_deteksi_batch(self, daftar_data: List[Dict], lempar_error_koneksi: bool = False) -> bool:
+        if not daftar_data:
+            return True
+
+        def operasi(koneksi: _KoneksiLokal) -> None:
+            self._tunggu()
+            sekarang = datetime.now()
+            with self._kunci:
+                for data in daftar_data:
+                    self._baris.append({
+                        'id': self._id_berikutnya,
+                        'upload_key': data.get('upload_key'),
+                        'image_name': data.get('image_name', ''),
+                        'brand_name': data.get('brand_name'),
+                        'confidence_score': data.get('confidence_score'),
+                        'upload_timestamp': sekarang,
+                        'image_path': data.get('image_path'),
+                        'resolution': data.get('resolution'),
+                        'position_type': data.get('position_type'),
+                        'notes': data.get('notes'),
+                        'rectangle': data.get('rectangle'),
+                        'perceptual_hash': data.get('perceptual_hash')
+                    })
+                    self._id_berikutnya += 1
+
+        try:
+            self._jalankan(operasi)
+            self._invalidasi_cache()
+            return True
+        except Exception as e:
+            logger.error(f"Gagal menyimpan hasil deteksi: {str(e)}")
+            return False
+
+    def dapatkan_upload_key_tersimpan(self, daftar_kunci: List[str]) -> Set[str]:
+        def operasi(koneksi: _KoneksiLokal) -> Set[str]:
+            self._tunggu()
+            dicari = set(daftar_kunci)
+            with self._kunci:
+                return {baris['upload_key'] for baris in self._baris if baris['upload_key'] in dicari}
+
+        return self._jalankan(operasi)
+
+    def dapatkan_riwayat(
+        self,
+        limit: int = 100,
+        before_id: Optional[int] = None,
+        after_timestamp: Optional[datetime] = None,
+        brand: Optional[str] = None,
+        tanggal_mulai: Optional[datetime] = None,
+        tanggal_selesai: Optional[datetime] = None
+    ) -> List[Dict]:
+        limit = max(1, min(limit, self.LIMIT_RIWAYAT_MAKS))
+
+        def cocok(baris: Dict) -> bool:
+            waktu = baris['upload_timestamp']
+            return (
+                (before_id is None or baris['id'] < before_id)
+                and (after_timestamp is None or waktu > after_timestamp)
+                and (not brand or baris['brand_name'] == brand)
+                and (tanggal_mulai is None or waktu >= tanggal_mulai)
+                and (tanggal_selesai is None or waktu < tanggal_selesai)
+            )
+
+        def operasi(koneksi: _KoneksiLokal) -> List[Dict]:
+            self._tunggu()
+            hasil: List[Dict] = []
+            with self._kunci:
+                for baris in reversed(self._baris):
+                    if len(hasil) >= limit:
+                        break
+                    if cocok(baris):
+                        hasil.append({
+                            'id': baris['id'],
+                            'image_name': baris['image_name'],
+                            'brand_name': baris['brand_name'],
+                            'confidence': baris['confidence_score'],
+                            'timestamp': baris['upload_timestamp'].isoformat(),
+                            'image_path': baris['image_path'],
+                            'resolution': baris['resolution'],
+                            'position_type': baris['position_type'],
+                            'notes': baris['notes'],
+                            'rectangle': baris['rectangle']
+                        })
+            return hasil
+
+        kunci_cache = (
+            f"riwayat:{limit}:{before_id}:{after_timestamp}:{brand}:"
+            f"{tanggal_mulai}:{tanggal_selesai}"
+        )
+
+        try:
+            return self._baca(kunci_cache, operasi)
+        except Exception as e:
+            logger.error(f"Gagal mengambil riwayat: {str(e)}")
+            return []
+
+    def dapatkan_hash_gambar(self, limit: int = 1000) -> List[Dict]:
+        def operasi(koneksi: _KoneksiLokal) -> List[Dict]:
+            self._tunggu()
+            per_gambar: Dict[tuple, Dict] = {}
+            with self._kunci:
+                for baris in reversed(self._baris):
+                    if not baris['perceptual_hash']:
+                        continue
+                    kunci = (baris['image_name'], baris['image_path'], baris['perceptual_hash'])
+                    if kunci in per_gambar:
+                        continue
+                    if len(per_gambar) >= limit:
+                        break
+                    per_gambar[kunci] = {
+                        'id': baris['id'],
+                        'image_name': baris['image_name'],
+                        'image_path': baris['image_path'],
+                        'perceptual_hash': baris['perceptual_hash'],
+                        'timestamp': baris['upload_timestamp'].isoformat(),
+                        'brand': baris['brand_name']
+                    }
+            return list(per_gambar.values())
+
+        try:
+            return self._baca(f"hash_gambar:{limit}", operasi)
+        except Exception as e:
+            logger.error(f"Gagal mengambil hash gambar: {str(e)}")
+            return []
+
+    def dapatkan_referensi_gambar(self) -> Optional[Dict[str, int]]:
+        def operasi(koneksi: _KoneksiLokal) -> Dict[str, int]:
+            self._tunggu()
+            referensi: Dict[str, int] = defaultdict(int)
+            with self._kunci:
+                for baris in self._baris:
+                    if baris['image_path']:
+                        referensi[baris['image_path']] += 1
+            return dict(referensi)
+
+        try:
+            return self._jalankan(operasi)
+        except Exception as e:
+            logger.error(f"Gagal mengambil referensi file gambar: {str(e)}")
+            return None
+
+    def dapatkan_statistik(self) -> Dict:
+        def operasi(koneksi: _KoneksiLokal) -> Dict:
+            self._tunggu()
+            per_brand: Dict[str, List[float]] = defaultdict(list)
+            per_hari: Dict[str, int] = defaultdict(int)
+            with self._kunci:
+                for baris in self._baris:
+                    if baris['brand_name'] is None:
+                        continue
+                    per_brand[baris['brand_name']].append(baris['confidence_score'] or 0)
+                    per_hari[baris['upload_timestamp'].date().isoformat()] += 1
+
+            semua_confidence = [c for daftar in per_brand.values() for c in daftar]
+            populer = sorted(per_brand.items(), key=lambda item: len(item[1]), reverse=True)[:5]
+            return {
+                'total_deteksi': len(semua_confidence),
+                'jumlah_brand_unik': len(per_brand),
+                'rata_confidence': (
+                    round(sum(semua_confidence) / len(semua_confidence), 4)
+                    if semua_confidence else 0
+                ),
+                'brand_populer': [
+                    {'brand': brand, 'jumlah': len(daftar)} for brand, daftar in populer
+                ],
+                'deteksi_harian': [
+                    {'tanggal': tanggal, 'jumlah': jumlah}
+                    for tanggal, jumlah in sorted(per_hari.items(), reverse=True)[:30]
+                ]
+            }
+
+        try:
+            return self._baca('statistik', operasi)
+        except Exception as e:
+            logger.error(f"Gagal mengambil statistik: {str(e)}")
+            return {}
@@ -0,0 +1,209 @@
+"""
+Ringkasan hasil benchmark dan perbandingan dengan baseline.
+
+Hasil disimpan sebagai JSON agar bisa dipakai sebagai baseline run
+berikutnya. Perbandingan menandai regresi jika latensi persentil atau
+memori naik, atau throughput turun, melebihi ambang persen yang diberikan.
+"""
+
+import math
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Metrik per endpoint yang dibandingkan: (nama, True jika lebih besar = lebih buruk)
+METRIK_BANDING = (
+    ('p50_ms', True),
+    ('p95_ms', True),
+    ('p99_ms', True),
+    ('throughput', False),
+)
+
+
+def persentil(data_terurut: Sequence[float], p: float) -> float:
+    """
+    Hitung persentil dengan interpolasi linear.
+
+    Args:
+        data_terurut: Data yang sudah diurutkan naik
+        p: Persentil (0-100)
+
+    Returns:
+        float: Nilai persentil, 0 jika data kosong
+    """
+    if not data_terurut:
+        return 0.0
+    posisi = (len(data_terurut) - 1) * p / 100
+    bawah = math.floor(posisi)
+    atas = math.ceil(posisi)
+    if bawah == atas:
+        return data_terurut[int(posisi)]
+    return data_terurut[bawah] + (data_terurut[atas] - data_terurut[bawah]) * (posisi - bawah)
+
+
+def ringkas_latensi(catatan: Iterable[Tuple[float, int]], durasi: float) -> Dict:
+    """
+    Ringkas latensi dan status satu kelompok request.
+
+    Args:
+        catatan: Pasangan (latensi detik, status HTTP; 0 jika gagal terhubung)
+        durasi: Lama jendela pengukuran (detik)
+
+    Returns:
+        Dict: jumlah, error, rasio_error, throughput (request sukses per
+              detik), p50/p95/p99/maks dalam milidetik, dan jumlah per status
+    """
+    latensi: List[float] = []
+    per_status: Dict[str, int] = {}
+    error = 0
+    for detik, status in catatan:
+        latensi.append(detik * 1000)
+        per_status[str(status)] = per_status.get(str(status), 0) + 1
+        if not 200 <= status < 300:
+            error += 1
+
+    latensi.sort()
+    jumlah = len(latensi)
+    return {
+        'jumlah': jumlah,
+        'error': error,
+        'rasio_error': round(error / jumlah, 4) if jumlah else 0.0,
+        'throughput': round((jumlah - error) / durasi, 2) if durasi > 0 else 0.0,
+        'p50_ms': round(persentil(latensi, 50), 2),
+        'p95_ms': round(persentil(latensi, 95), 2),
+        'p99_ms': round(persentil(latensi, 99), 2),
+        'maks_ms': round(latensi[-1], 2) if latensi else 0.0,
+        'per_status': per_status
+    }
+
+
+def format_laporan(hasil: Dict) -> str:
+    """
+    Susun tabel teks dari hasil benchmark.
+
+    Args:
+        hasil: Hasil dari harness (kunci 'endpoint', 'total', 'memori', ...)
+
+    Returns:
+        str: Laporan siap dicetak
+    """
+    baris = [
+        f"Durasi pengukuran: {hasil['durasi']:.1f} detik, konkurensi {hasil['konfigurasi']['konkurensi']}, "
+        f"server {hasil['konfigurasi']['server']}",
+        '',
+        f"{'Endpoint':<12}{'Request':>9}{'Error':>8}{'Req/detik':>11}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'Maks ms':>10}"
+    ]
+    kelompok = list(hasil['endpoint'].items()) + [('TOTAL', hasil['total'])]
+    for nama, data in kelompok:
+        baris.append(
+            f"{nama:<12}{data['jumlah']:>9}{data['error']:>8}{data['throughput']:>11.2f}"
+            f"{data['p50_ms']:>10.1f}{data['p95_ms']:>10.1f}{data['p99_ms']:>10.1f}{data['maks_ms']:>10.1f}"
+        )
+
+    status_error = {
+        status: jumlah for status, jumlah in hasil['total']['per_status'].items()
+        if not status.startswith('2')
+    }
+    if status_error:
+        baris.append(f"Status error: {', '.join(f'{s}={n}' for s, n in sorted(status_error.items()))}")
+
+    memori = hasil.get('memori') or {}
+    if memori.get('rss_puncak_mb') is not None:
+        baris.append('')
+        baris.append(
+            f"Memori server (RSS): awal {memori['rss_awal_mb']:.1f} MB, "
+            f"rata-rata {memori['rss_rata_mb']:.1f} MB, puncak {memori['rss_puncak_mb']:.1f} MB"
+        )
+    else:
+        baris.append('')
+        baris.append("Memori server: tidak tersedia (butuh /proc, hanya Linux)")
+
+    vision = hasil.get('vision_tiruan') or {}
+    if vision:
+        baris.append(f"Vision tiruan: {vision['request']} panggilan, {vision['error']} error")
+    return '\n'.join(baris)
+
+
+def _perubahan_persen(lama: float, baru: float) -> Optional[float]:
+    if lama == 0:
+        return None
+    return (baru - lama) / lama * 100
+
+
+def bandingkan(
+    baseline: Dict,
+    hasil: Dict,
+    ambang_persen: float = 10.0,
+    toleransi_ms: float = 2.0
+) -> Tuple[List[str], List[str]]:
+    """
+    Bandingkan hasil benchmark dengan baseline.
+
+    Latensi dianggap regresi jika naik lebih dari ambang_persen dan lebih
+    dari toleransi_ms (agar selisih kecil pada latensi sangat rendah tidak
+    dianggap regresi). Throughput regresi jika turun lebih dari
+    ambang_persen, rasio error jika naik lebih dari 1 poin persen, dan
+    memori puncak jika naik lebih dari ambang_persen.
+
+    Args:
+        baseline: Hasil benchmark sebelumnya
+        hasil: Hasil benchmark sekarang
+        ambang_persen: Batas perubahan yang masih dianggap wajar (persen)
+        toleransi_ms: Selisih latensi absolut minimal untuk dianggap regresi
+
+    Returns:
+        Tuple[List[str], List[str]]: (baris laporan perbandingan, daftar regresi)
+    """
+    baris: List[str] = []
+    regresi: List[str] = []
+
+    beda_konfigurasi = [
+        f"{kunci}: {baseline['konfigurasi'].get(kunci)} -> {nilai}"
+        for kunci, nilai in hasil['konfigurasi'].items()
+        if baseline.get('konfigurasi', {}).get(kunci) != nilai
+    ]
+    if beda_konfigurasi:
+        baris.append("PERINGATAN: konfigurasi berbeda dengan baseline, hasil mungkin tidak sebanding")
+        baris.extend(f"  {teks}" for teks in beda_konfigurasi)
+        baris.append('')
+
+    baris.append(f"{'Endpoint':<12}{'Metrik':<14}{'Baseline':>12}{'Sekarang':>12}{'Perubahan':>12}")
+    kelompok = list(hasil['endpoint'].items()) + [('TOTAL', hasil['total'])]
+    for nama, data in kelompok:
+        data_lama = baseline['total'] if nama == 'TOTAL' else baseline['endpoint'].get(nama)
+        if not data_lama:
+            continue
+
+        for metrik, naik_buruk in METRIK_BANDING:
+            lama, baru = data_lama[metrik], data[metrik]
+            perubahan = _perubahan_persen(lama, baru)
+            buruk = perubahan is not None and (
+                perubahan > ambang_persen and baru - lama > toleransi_ms
+                if naik_buruk else -perubahan > ambang_persen
+            )
+            tanda = '  << REGRESI' if buruk else ''
+            teks_perubahan = f"{perubahan:+.1f}%" if perubahan is not None else '-'
+            baris.append(f"{nama:<12}{metrik:<14}{lama:>12.2f}{baru:>12.2f}{teks_perubahan:>12}{tanda}")
+            if buruk:
+                regresi.append(f"{nama} {metrik}: {lama:.2f} -> {baru:.2f} ({teks_perubahan})")
+
+        selisih_error = (data['rasio_error'] - data_lama['rasio_error']) * 100
+        if selisih_error > 1:
+            regresi.append(
+                f"{nama} rasio_error: {data_lama['rasio_error']:.2%} -> {data['rasio_error']:.2%}"
+            )
+            baris.append(f"{nama:<12}{'rasio_error':<14}{data_lama['rasio_error']:>12.2%}"
+                         f"{data['rasio_error']:>12.2%}{selisih_error:>+11.1f}p  << REGRESI")
+
+    puncak_lama = (baseline.get('memori') or {}).get('rss_puncak_mb')
+    puncak_baru = (hasil.get('memori') or {}).get('rss_puncak_mb')
+    if puncak_lama and puncak_baru:
+        perubahan = _perubahan_persen(puncak_lama, puncak_baru) or 0.0
+        buruk = perubahan > ambang_persen
+        baris.append(
+            f"{'memori':<12}{'rss_puncak_mb':<14}{puncak_lama:>12.1f}{puncak_baru:>12.1f}"
+            f"{perubahan:>+11.1f}%{'  << REGRESI' if buruk else ''}"
+        )
+        if buruk:
+            regresi.append(f"memori rss_puncak_mb: {puncak_lama:.1f} -> {puncak_baru:.1f} ({perubahan:+.1f}%)")
+
+    return baris, regresi
@@ -0,0 +1,48 @@
+"""
+Entry point aplikasi untuk proses server benchmark.
+
+DatabaseLokal dipasang menggantikan DatabaseService sebelum app diimport,
+sehingga seluruh kode aplikasi (route, cache, pool, penyimpanan berkas)
+berjalan apa adanya tanpa server database. Endpoint Vision diarahkan ke
+server tiruan lewat environment COMPUTER_VISION_ENDPOINT oleh harness.
+
+Menjalankan (biasanya dipanggil oleh python -m benchmark):
+    python -m benchmark.server --port 5055
+    gunicorn --workers 3 benchmark.server:app
+    uvicorn benchmark.server:aplikasi_asgi
+"""
+
+import os
+import argparse
+from typing import Any, List, Optional
+
+import services
+from benchmark.database_lokal import DatabaseLokal
+
+DatabaseLokal.latensi_query = float(os.getenv('BENCHMARK_LATENSI_DB', 0.005))
+services.DatabaseService = DatabaseLokal
+
+from app import app  # noqa: E402
+
+
+def __getattr__(nama: str) -> Any:
+    # Aplikasi ASGI hanya diimport saat diminta (butuh starlette/a2wsgi)
+    if nama == 'aplikasi_asgi':
+        from asgi import aplikasi
+        return aplikasi
+    raise AttributeError(nama)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Jalankan aplikasi dengan server werkzeug multi-thread."""
+    parser = argparse.ArgumentParser(description="Server aplikasi untuk benchmark")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args(argv)
+
+    app.run(host=args.host, port=args.port, threaded=True, debug=False, use_reloader=False)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,183 @@
+"""
+Server HTTP tiruan Azure Computer Vision untuk benchmark.
+
+Menjawab POST /vision/v3.2/analyze dengan format yang sama seperti Azure
+(dipakai baik oleh SDK maupun jalur httpx async). Hasil deteksi ditentukan
+dari hash isi gambar sehingga gambar yang sama selalu menghasilkan brand
+yang sama. Latensi, jitter, dan rasio error bisa diatur agar perilaku
+retry, pemutus sirkuit, dan pool koneksi ikut teruji.
+"""
+
+import json
+import time
+import uuid
+import random
+import hashlib
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+DAFTAR_BRAND = ('Nike', 'Adidas', 'Coca-Cola', 'Pepsi', 'Apple', 'Samsung', 'Toyota', 'Starbucks')
+
+
+def hasil_brand_tiruan(data_gambar: bytes) -> List[Dict]:
+    """
+    Susun daftar brand tiruan yang deterministik untuk satu gambar.
+
+    Args:
+        data_gambar: Bytes gambar yang dikirim ke server tiruan
+
+    Returns:
+        List[Dict]: 0-3 brand dalam format response Azure
+    """
+    digest = hashlib.sha256(data_gambar).digest()
+    hasil = []
+    for i in range(digest[0] % 4):
+        hasil.append({
+            'name': DAFTAR_BRAND[digest[1 + i] % len(DAFTAR_BRAND)],
+            'confidence': round(0.5 + digest[5 + i] / 510, 3),
+            'rectangle': {
+                'x': digest[9 + i],
+                'y': digest[13 + i],
+                'w': 32 + digest[17 + i] % 128,
+                'h': 32 + digest[21 + i] % 128
+            }
+        })
+    return hasil
+
+
+class ServerVisionTiruan:
+    """
+    Server tiruan Azure Computer Vision yang berjalan di thread terpisah.
+
+    Attributes:
+        latensi: Rata-rata latensi response (detik)
+        jitter: Simpangan latensi maksimal ke atas/bawah (detik)
+        rasio_error: Peluang request dijawab error (0-1)
+        status_error: Kode HTTP untuk response error (429, 500, 503, ...)
+    """
+
+    def __init__(
+        self,
+        latensi: float = 0.3,
+        jitter: float = 0.1,
+        rasio_error: float = 0.0,
+        status_error: int = 503,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        seed: Optional[int] = None
+    ):
+        """
+        Inisialisasi server tiruan (belum menerima koneksi).
+
+        Args:
+            latensi: Rata-rata latensi response (detik)
+            jitter: Simpangan latensi maksimal (detik, distribusi uniform)
+            rasio_error: Peluang request dijawab error (0-1)
+            status_error: Kode HTTP untuk response error
+            host: Alamat bind
+            port: Port bind (0 = pilih port kosong)
+            seed: Seed random agar urutan latensi/error bisa diulang
+        """
+        self.latensi = latensi
+        self.jitter = jitter
+        self.rasio_error = rasio_error
+        self.status_error = status_error
+        self._random = random.Random(seed)
+        self._kunci = threading.Lock()
+        self._jumlah: Dict[str, int] = {'request': 0, 'error': 0}
+        self._server = ThreadingHTTPServer((host, port), self._buat_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """URL endpoint untuk COMPUTER_VISION_ENDPOINT."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def mulai(self) -> str:
+        """
+        Mulai menerima request di thread background.
+
+        Returns:
+            str: URL endpoint server
+        """
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name='vision-tiruan', daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Server Vision tiruan berjalan di {self.url}")
+        return self.url
+
+    def hentikan(self) -> None:
+        """Hentikan server dan tutup socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def statistik(self) -> Dict[str, int]:
+        """Jumlah request dan response error yang sudah dilayani."""
+        with self._kunci:
+            return dict(self._jumlah)
+
+    def _undi(self) -> tuple:
+        """Undi latensi dan apakah request dijawab error."""
+        with self._kunci:
+            latensi = self.latensi + self._random.uniform(-self.jitter, self.jitter)
+            error = self._random.random() < self.rasio_error
+            self._jumlah['request'] += 1
+            if error:
+                self._jumlah['error'] += 1
+        return max(0.0, latensi), error
+
+    def _buat_handler(self) -> type:
+        server_tiruan = self
+
+        class HandlerVision(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self) -> None:
+                panjang = int(self.headers.get('Content-Length') or 0)
+                data_gambar = self.rfile.read(panjang)
+
+                if not self.path.startswith('/vision/') or '/analyze' not in self.path:
+                    self._kirim(404, {'error': {'code': 'NotFound', 'message': 'Resource not found'}})
+                    return
+
+                latensi, error = server_tiruan._undi()
+                time.sleep(latensi)
+
+                if error:
+                    self._kirim(
+                        server_tiruan.status_error,
+                        {'error': {'code': 'ServiceUnavailable', 'message': 'Error tiruan benchmark'}},
+                        {'Retry-After': '0'}
+                    )
+                    return
+
+                self._kirim(200, {
+                    'brands': hasil_brand_tiruan(data_gambar),
+                    'requestId': str(uuid.uuid4()),
+                    'metadata': {'width': 0, 'height': 0, 'format': 'Jpeg'},
+                    'modelVersion': '2021-05-01'
+                })
+
+            def _kirim(self, status: int, isi: Dict, header: Optional[Dict[str, str]] = None) -> None:
+                body = json.dumps(isi).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                for nama, nilai in (header or {}).items():
+                    self.send_header(nama, nilai)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                # Log akses per request hanya menambah beban benchmark
+                pass
+
+        return HandlerVision
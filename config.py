@@ -23,11 +23,81 @@ class Config:
     # Folder upload
     UPLOAD_FOLDER: str = os.getenv('UPLOAD_FOLDER', 'uploads')
     ALLOWED_EXTENSIONS: Set[str] = set(os.getenv('ALLOWED_EXTENSIONS', 'png,jpg,jpeg,gif').split(','))
+    # Simpan salinan gambar ke UPLOAD_FOLDER (ditulis setelah response terkirim)
+    UPLOAD_SIMPAN_FILE: bool = os.getenv('UPLOAD_SIMPAN_FILE', 'true').lower() == 'true'
+    # Indeks jumlah referensi file upload; harus di disk lokal (SQLite WAL tidak
+    # aman di network mount, walaupun UPLOAD_FOLDER berada di sana)
+    PENYIMPANAN_PATH_INDEKS: str = os.getenv('PENYIMPANAN_PATH_INDEKS', 'cache/berkas.sqlite3')
+    # Penyapu file tanpa referensi riwayat (0 = hanya lewat: flask sapu-berkas)
+    PENYIMPANAN_INTERVAL_SAPU: float = float(os.getenv('PENYIMPANAN_INTERVAL_SAPU', 0))  # detik
+    PENYIMPANAN_MASA_TENGGANG: float = float(os.getenv('PENYIMPANAN_MASA_TENGGANG', 24 * 3600))  # detik
 
     # Konfigurasi Azure Computer Vision
     COMPUTER_VISION_ENDPOINT: str = os.getenv('COMPUTER_VISION_ENDPOINT', '')
     COMPUTER_VISION_KEY: str = os.getenv('COMPUTER_VISION_KEY', '')
 
+    # Ketahanan panggilan Azure: timeout, retry, pembatas laju, circuit breaker
+    AZURE_TIMEOUT: float = float(os.getenv('AZURE_TIMEOUT', 15))  # detik per panggilan
+    AZURE_MAKS_PERCOBAAN: int = int(os.getenv('AZURE_MAKS_PERCOBAAN', 3))
+    # Kuota tier Azure dibagi jumlah worker gunicorn (0 = tanpa pembatas)
+    AZURE_LAJU_PER_DETIK: float = float(os.getenv('AZURE_LAJU_PER_DETIK', 0))
+    AZURE_LAJU_BURST: float = float(os.getenv('AZURE_LAJU_BURST', 0))  # 0 = sama dengan laju
+    AZURE_SIRKUIT_AMBANG_GAGAL: int = int(os.getenv('AZURE_SIRKUIT_AMBANG_GAGAL', 5))
+    AZURE_SIRKUIT_WAKTU_PEMULIHAN: float = float(os.getenv('AZURE_SIRKUIT_WAKTU_PEMULIHAN', 30))  # detik
+    # Pakai detektor lokal saat Azure tidak tersedia (butuh logo referensi)
+    AZURE_CADANGAN_LOKAL: bool = os.getenv('AZURE_CADANGAN_LOKAL', 'false').lower() == 'true'
+
+    # Jalur async (asgi.py): panggilan Azure bersamaan dan thread untuk query database
+    ASYNC_MAKS_KONEKSI_AZURE: int = int(os.getenv('ASYNC_MAKS_KONEKSI_AZURE', 200))
+    ASYNC_THREAD_DATABASE: int = int(os.getenv('ASYNC_THREAD_DATABASE', 0))  # 0 = SQL_POOL_UKURAN
+
+    # Backend detektor brand: azure, lokal, atau lokal+azure (lokal dulu, Azure jika tidak ketemu)
+    DETEKTOR_BACKEND: str = os.getenv('DETEKTOR_BACKEND', 'azure')
+    DETEKTOR_LOKAL_FOLDER_LOGO: str = os.getenv('DETEKTOR_LOKAL_FOLDER_LOGO', 'logo_referensi')
+    DETEKTOR_LOKAL_AMBANG_CONFIDENCE: float = float(os.getenv('DETEKTOR_LOKAL_AMBANG_CONFIDENCE', 0.5))
+    # Folder indeks deskriptor logo (dibangun dengan: python -m services.indeks_logo bangun)
+    DETEKTOR_LOKAL_PATH_INDEKS: str = os.getenv('DETEKTOR_LOKAL_PATH_INDEKS', 'indeks_logo')
+
+    # Praproses gambar sebelum dikirim ke Azure (0 = kirim gambar asli)
+    PRAPROSES_SISI_MAKS: int = int(os.getenv('PRAPROSES_SISI_MAKS', 2048))  # piksel
+    PRAPROSES_KUALITAS_JPEG: int = int(os.getenv('PRAPROSES_KUALITAS_JPEG', 85))
+
+    # Deteksi per ubin untuk gambar besar (logo kecil di foto rak/billboard).
+    # Satu gambar = maksimal DETEKSI_UBIN_MAKS panggilan + 1 panggilan gambar penuh
+    DETEKSI_UBIN_AKTIF: bool = os.getenv('DETEKSI_UBIN_AKTIF', 'false').lower() == 'true'
+    DETEKSI_UBIN_UKURAN: int = int(os.getenv('DETEKSI_UBIN_UKURAN', 1024))  # piksel gambar asli
+    DETEKSI_UBIN_TUMPANG_TINDIH: float = float(os.getenv('DETEKSI_UBIN_TUMPANG_TINDIH', 0.2))
+    DETEKSI_UBIN_MAKS: int = int(os.getenv('DETEKSI_UBIN_MAKS', 8))  # ubin per gambar
+    DETEKSI_UBIN_KONKURENSI: int = int(os.getenv('DETEKSI_UBIN_KONKURENSI', 4))  # panggilan paralel per worker
+    DETEKSI_UBIN_AMBANG_IOU: float = float(os.getenv('DETEKSI_UBIN_AMBANG_IOU', 0.5))
+    DETEKSI_UBIN_GAMBAR_PENUH: bool = os.getenv('DETEKSI_UBIN_GAMBAR_PENUH', 'true').lower() == 'true'
+
+    # Deteksi video dan urutan frame (/api/deteksi/video). Frame yang hampir
+    # sama (jarak dHash <= VIDEO_AMBANG_HAMMING) tidak dikirim ke detektor
+    VIDEO_FPS_SAMPEL: float = float(os.getenv('VIDEO_FPS_SAMPEL', 2))  # frame per detik video
+    VIDEO_FPS_SUMBER: float = float(os.getenv('VIDEO_FPS_SUMBER', 25))  # laju frame folder/zip gambar
+    VIDEO_AMBANG_HAMMING: int = int(os.getenv('VIDEO_AMBANG_HAMMING', 6))  # bit dari 64
+    VIDEO_INTERVAL_PAKSA: float = float(os.getenv('VIDEO_INTERVAL_PAKSA', 10))  # detik, 0 = tidak pernah
+    VIDEO_TOLERANSI_JEDA: float = float(os.getenv('VIDEO_TOLERANSI_JEDA', 1))  # detik
+    VIDEO_KONKURENSI: int = int(os.getenv('VIDEO_KONKURENSI', 4))  # panggilan paralel per video
+    VIDEO_MAKS_FRAME: int = int(os.getenv('VIDEO_MAKS_FRAME', 3600))  # frame sampel per video
+    VIDEO_UKURAN_MAKS: int = int(os.getenv('VIDEO_UKURAN_MAKS', 256 * 1024 * 1024))  # 256 MB
+    VIDEO_EKSTENSI: Set[str] = set(os.getenv('VIDEO_EKSTENSI', 'mp4,avi,mov,mkv,webm,zip').split(','))
+
+    # Cache hasil deteksi berbasis hash gambar
+    CACHE_DETEKSI_AKTIF: bool = os.getenv('CACHE_DETEKSI_AKTIF', 'true').lower() == 'true'
+    CACHE_DETEKSI_UKURAN_MEMORI: int = int(os.getenv('CACHE_DETEKSI_UKURAN_MEMORI', 1024))
+    CACHE_DETEKSI_PATH_DISK: str = os.getenv('CACHE_DETEKSI_PATH_DISK', '')  # kosong = tanpa cache disk
+    CACHE_DETEKSI_TTL: float = float(os.getenv('CACHE_DETEKSI_TTL', 7 * 24 * 3600))  # detik
+    CACHE_DETEKSI_MAKS_ENTRI_DISK: int = int(os.getenv('CACHE_DETEKSI_MAKS_ENTRI_DISK', 100000))
+
+    # Pakai ulang hasil deteksi gambar yang hampir sama (hash perseptual).
+    # Opt-in: gambar mirip belum tentu memuat brand yang sama (false positive)
+    DUPLIKAT_AKTIF: bool = os.getenv('DUPLIKAT_AKTIF', 'false').lower() == 'true'
+    DUPLIKAT_AMBANG_HAMMING: int = int(os.getenv('DUPLIKAT_AMBANG_HAMMING', 6))  # dari 64 bit
+    DUPLIKAT_MAKS_ENTRI: int = int(os.getenv('DUPLIKAT_MAKS_ENTRI', 10000))
+    DUPLIKAT_LIMIT_KLUSTER: int = int(os.getenv('DUPLIKAT_LIMIT_KLUSTER', 2000))  # gambar per /api/duplikat
+
     # Konfigurasi Azure SQL Database
     SQL_SERVER: str = os.getenv('SQL_SERVER', '')
     SQL_DATABASE: str = os.getenv('SQL_DATABASE', '')
@@ -45,6 +115,68 @@ class Config:
         f"TrustServerCertificate=no;"
     )
 
+    # Pool koneksi database (per proses/worker gunicorn)
+    SQL_POOL_UKURAN: int = int(os.getenv('SQL_POOL_UKURAN', 5))
+    SQL_POOL_IDLE_MAKS: float = float(os.getenv('SQL_POOL_IDLE_MAKS', 300))  # detik
+    SQL_POOL_UMUR_MAKS: float = float(os.getenv('SQL_POOL_UMUR_MAKS', 1800))  # detik
+    SQL_POOL_TIMEOUT: float = float(os.getenv('SQL_POOL_TIMEOUT', 10))  # detik
+
+    # Antrian job deteksi background (mode=job)
+    ANTRIAN_JUMLAH_WORKER: int = int(os.getenv('ANTRIAN_JUMLAH_WORKER', 4))
+    ANTRIAN_UKURAN_MAKS: int = int(os.getenv('ANTRIAN_UKURAN_MAKS', 100))
+    # Default file SQLite bersama: dengan beberapa worker gunicorn, status job
+    # di memori hanya dikenal worker yang menerima job (polling worker lain 404)
+    ANTRIAN_PATH_DB: str = os.getenv('ANTRIAN_PATH_DB', 'cache/antrian.sqlite3')  # kosong = memori proses (1 worker)
+    ANTRIAN_RETENSI_JOB: float = float(os.getenv('ANTRIAN_RETENSI_JOB', 3600))  # detik
+    # Long-poll menahan satu worker gunicorn sync selama menunggu; jaga tetap pendek
+    ANTRIAN_LONG_POLL_MAKS: float = float(os.getenv('ANTRIAN_LONG_POLL_MAKS', 5))  # detik
+    # Job yang sewanya tidak diperpanjang (worker mati/di-recycle) ditandai gagal
+    ANTRIAN_SEWA_JOB: float = float(os.getenv('ANTRIAN_SEWA_JOB', 60))  # detik
+
+    # Spool write-behind: hasil deteksi ditulis ke SQLite lokal lalu di-flush ke SQL
+    SPOOL_PATH_DB: str = os.getenv('SPOOL_PATH_DB', 'cache/spool.sqlite3')  # kosong = tulis langsung ke database
+    SPOOL_UKURAN_BATCH: int = int(os.getenv('SPOOL_UKURAN_BATCH', 500))  # baris per flush
+    SPOOL_INTERVAL_FLUSH: float = float(os.getenv('SPOOL_INTERVAL_FLUSH', 1.0))  # detik
+    SPOOL_BACKOFF_MAKS: float = float(os.getenv('SPOOL_BACKOFF_MAKS', 60))  # detik
+    SPOOL_MAKS_PERCOBAAN: int = int(os.getenv('SPOOL_MAKS_PERCOBAAN', 10))
+    SPOOL_SEWA: float = float(os.getenv('SPOOL_SEWA', 120))  # detik
+
+    # Deteksi batch (/api/deteksi/batch)
+    BATCH_JUMLAH_MAKS: int = int(os.getenv('BATCH_JUMLAH_MAKS', 500))  # gambar per request
+    BATCH_KONKURENSI_MAKS: int = int(os.getenv('BATCH_KONKURENSI_MAKS', 8))  # panggilan Vision paralel
+    BATCH_UKURAN_INSERT: int = int(os.getenv('BATCH_UKURAN_INSERT', 200))  # baris per bulk insert
+    BATCH_UKURAN_REQUEST_MAKS: int = int(os.getenv('BATCH_UKURAN_REQUEST_MAKS', 512 * 1024 * 1024))  # 512 MB
+
+    # Ekspor riwayat (/api/riwayat/ekspor): dibaca per potongan dengan fetchmany
+    EKSPOR_UKURAN_POTONGAN: int = int(os.getenv('EKSPOR_UKURAN_POTONGAN', 1000))  # baris per fetchmany
+    EKSPOR_BARIS_PER_GRUP: int = int(os.getenv('EKSPOR_BARIS_PER_GRUP', 10000))  # baris per row group Parquet
+
+    # Cache baca untuk statistik dan riwayat (diinvalidasi setiap ada insert)
+    CACHE_BACA_AKTIF: bool = os.getenv('CACHE_BACA_AKTIF', 'true').lower() == 'true'
+    CACHE_BACA_TTL: float = float(os.getenv('CACHE_BACA_TTL', 10))  # detik
+    CACHE_BACA_UKURAN_MEMORI: int = int(os.getenv('CACHE_BACA_UKURAN_MEMORI', 256))
+    # Default file SQLite bersama agar invalidasi terlihat di semua worker gunicorn;
+    # kosong = cache per proses (worker lain bisa menyajikan data lama sampai TTL)
+    CACHE_BACA_PATH_DISK: str = os.getenv('CACHE_BACA_PATH_DISK', 'cache/baca.sqlite3')
+
+    # Endpoint /metrics (Prometheus). Untuk beberapa worker gunicorn, set juga
+    # PROMETHEUS_MULTIPROC_DIR ke folder kosong yang dibersihkan setiap start
+    METRIK_AKTIF: bool = os.getenv('METRIK_AKTIF', 'true').lower() == 'true'
+
+    # Logging: ditulis thread background lewat antrian (tidak menahan request)
+    LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_LEVEL_LOGGER: str = os.getenv('LOG_LEVEL_LOGGER', '')  # contoh: services.database=WARNING
+    LOG_FORMAT: str = os.getenv('LOG_FORMAT', 'json')  # json atau teks
+    LOG_FOLDER: str = os.getenv('LOG_FOLDER', 'logs')  # kosong = tanpa file log
+    # ukuran, harian, atau eksternal (logrotate). Default eksternal karena beberapa
+    # worker gunicorn menulis ke file yang sama; ukuran/harian hanya aman untuk 1 proses
+    LOG_ROTASI: str = os.getenv('LOG_ROTASI', 'eksternal')
+    LOG_UKURAN_MAKS: int = int(os.getenv('LOG_UKURAN_MAKS', 10 * 1024 * 1024))  # bytes per file
+    LOG_JUMLAH_CADANGAN: int = int(os.getenv('LOG_JUMLAH_CADANGAN', 10))
+    LOG_KONSOL: bool = os.getenv('LOG_KONSOL', 'true').lower() == 'true'
+    LOG_UKURAN_ANTRIAN: int = int(os.getenv('LOG_UKURAN_ANTRIAN', 10000))  # record; dibuang jika penuh
+    LOG_SAMPLING_DEBUG: float = float(os.getenv('LOG_SAMPLING_DEBUG', 0.1))  # bagian record DEBUG per baris kode
+
     # Informasi mahasiswa/pengembang
     INFO_PENGEMBANG = {
         'nama': 'Athallah Budiman Devia Putra',
@@ -89,9 +89,9 @@ echo "  Load average (1 min): $CPU_LOAD"
 
 # Check Application Logs
 print_info "Recent application logs (last 10 lines)..."
-if [ -f "logs/app_$(date +%Y%m%d).log" ]; then
+if [ -f "logs/app.log" ]; then
     echo "---"
-    tail -n 10 "logs/app_$(date +%Y%m%d).log"
+    tail -n 10 "logs/app.log"
     echo "---"
 else
     print_warning "Log file not found"
@@ -54,6 +54,30 @@ fi
 
 print_success "Project directory valid"
 
+# Setup rotasi log aplikasi oleh logrotate (3 worker menulis ke file yang sama)
+print_info "Konfigurasi logrotate..."
+
+sudo tee /etc/logrotate.d/branddetection > /dev/null <<EOF
+$PROJECT_DIR/logs/app.log {
+    daily
+    rotate 14
+    compress
+    delaycompress
+    missingok
+    notifempty
+}
+EOF
+
+if [ -f "$PROJECT_DIR/.env" ]; then
+    if grep -q '^LOG_ROTASI=' "$PROJECT_DIR/.env"; then
+        sed -i 's/^LOG_ROTASI=.*/LOG_ROTASI=eksternal/' "$PROJECT_DIR/.env"
+    else
+        echo "LOG_ROTASI=eksternal" >> "$PROJECT_DIR/.env"
+    fi
+fi
+
+print_success "Logrotate dikonfigurasi (LOG_ROTASI=eksternal)"
+
 # Setup Systemd Service
 print_info "Membuat systemd service file..."
 
@@ -132,6 +156,39 @@ server {
         send_timeout 300;
     }
 
+    # Deteksi batch: banyak gambar/arsip zip, hasil di-stream sebagai NDJSON
+    location /api/deteksi/batch {
+        client_max_body_size 512M;
+        proxy_pass http://127.0.0.1:5000;
+        proxy_set_header Host \$host;
+        proxy_set_header X-Real-IP \$remote_addr;
+        proxy_set_header X-Forwarded-For \$proxy_add_x_forwarded_for;
+        proxy_set_header X-Forwarded-Proto \$scheme;
+        proxy_buffering off;
+
+        proxy_connect_timeout 300;
+        proxy_send_timeout 300;
+        proxy_read_timeout 300;
+        send_timeout 300;
+    }
+
+    # Deteksi video: file sampai VIDEO_UKURAN_MAKS (256 MB) diteruskan ke
+    # Flask sambil diterima, hasil diambil lewat polling status job
+    location /api/deteksi/video {
+        client_max_body_size 256M;
+        proxy_pass http://127.0.0.1:5000;
+        proxy_set_header Host \$host;
+        proxy_set_header X-Real-IP \$remote_addr;
+        proxy_set_header X-Forwarded-For \$proxy_add_x_forwarded_for;
+        proxy_set_header X-Forwarded-Proto \$scheme;
+        proxy_request_buffering off;
+
+        proxy_connect_timeout 300;
+        proxy_send_timeout 900;
+        proxy_read_timeout 900;
+        send_timeout 900;
+    }
+
     # Static files
     location /static {
         alias $PROJECT_DIR/static;
@@ -2,7 +2,77 @@
 Paket services untuk aplikasi Brand Detection.
 """
 
+from .antrian_deteksi import (
+    AntrianDeteksi,
+    PenyimpananJobMemori,
+    PenyimpananJobSQLite,
+    STATUS_MENUNGGU,
+    STATUS_DIPROSES,
+    STATUS_SELESAI,
+    STATUS_GAGAL,
+    STATUS_AKHIR
+)
+from .cache_baca import CacheBaca
+from .cache_deteksi import CacheDeteksi, CacheLRU, CacheSQLite, hitung_hash_gambar
 from .computer_vision import ComputerVisionService
 from .database import DatabaseService
+from .detektor import DetektorAzure, DetektorBerantai, DetektorBrand, DetektorLokal
+from .deteksi_ubin import DeteksiUbin, gabungkan_deteksi, hitung_ubin
+from .deteksi_urutan import DeteksiUrutan, baca_frame, gabungkan_interval, susun_baris_interval
+from .hash_perseptual import (
+    IndeksHashPerseptual,
+    hash_informatif,
+    hitung_dhash,
+    jarak_hamming,
+    kelompokkan_duplikat
+)
+from .ketahanan import LayananTidakTersedia, PembatasLaju, PemutusSirkuit
+from .metrik import hasilkan_metrik, metrik_aktif, ukur_tahap
+from .penyimpanan_berkas import BackendBerkas, BackendBerkasLokal, PenyimpananBerkas
+from .pool_koneksi import PoolKoneksi
+from .spool_database import SpoolDatabase
 
-__all__ = ['ComputerVisionService', 'DatabaseService']
+__all__ = [
+    'AntrianDeteksi',
+    'PenyimpananJobMemori',
+    'PenyimpananJobSQLite',
+    'STATUS_MENUNGGU',
+    'STATUS_DIPROSES',
+    'STATUS_SELESAI',
+    'STATUS_GAGAL',
+    'STATUS_AKHIR',
+    'CacheBaca',
+    'CacheDeteksi',
+    'CacheLRU',
+    'CacheSQLite',
+    'hitung_hash_gambar',
+    'ComputerVisionService',
+    'DatabaseService',
+    'DetektorAzure',
+    'DetektorBerantai',
+    'DetektorBrand',
+    'DetektorLokal',
+    'DeteksiUbin',
+    'gabungkan_deteksi',
+    'hitung_ubin',
+    'DeteksiUrutan',
+    'baca_frame',
+    'gabungkan_interval',
+    'susun_baris_interval',
+    'IndeksHashPerseptual',
+    'hash_informatif',
+    'hitung_dhash',
+    'jarak_hamming',
+    'kelompokkan_duplikat',
+    'LayananTidakTersedia',
+    'PembatasLaju',
+    'PemutusSirkuit',
+    'hasilkan_metrik',
+    'metrik_aktif',
+    'ukur_tahap',
+    'BackendBerkas',
+    'BackendBerkasLokal',
+    'PenyimpananBerkas',
+    'PoolKoneksi',
+    'SpoolDatabase'
+]
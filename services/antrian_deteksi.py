@@ -0,0 +1,447 @@
+"""
+Antrian job deteksi brand yang diproses di background.
+
+Modul ini memungkinkan endpoint deteksi langsung mengembalikan job id,
+sementara pemanggilan Azure Computer Vision dan penyimpanan ke database
+dikerjakan oleh sekumpulan thread worker. Status job disimpan di memori
+proses atau di file SQLite bersama, sehingga worker gunicorn mana pun bisa
+menjawab polling status.
+
+Isi job (termasuk bytes gambar) hanya ada di antrian proses penerimanya.
+Setiap job karena itu punya sewa yang terus diperpanjang proses pemiliknya;
+jika proses itu mati atau di-recycle, sewanya habis dan job ditandai gagal
+(beserta file sementaranya dihapus) alih-alih menunggu selamanya.
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import logging
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+STATUS_MENUNGGU = 'menunggu'
+STATUS_DIPROSES = 'diproses'
+STATUS_SELESAI = 'selesai'
+STATUS_GAGAL = 'gagal'
+STATUS_AKHIR = (STATUS_SELESAI, STATUS_GAGAL)
+STATUS_BERJALAN = (STATUS_MENUNGGU, STATUS_DIPROSES)
+
+PESAN_SEWA_HABIS = 'Worker berhenti sebelum job selesai, silakan kirim ulang'
+
+
+class PenyimpananJobMemori:
+    """Penyimpanan status job di memori proses (cocok untuk satu proses/test)."""
+
+    def __init__(self):
+        self._job: Dict[str, Dict] = {}
+        self._kondisi = threading.Condition()
+
+    def buat(self, job_id: str, pemilik: str, sewa_sampai: float, berkas: Optional[str] = None) -> None:
+        """
+        Daftarkan job baru dengan status menunggu.
+
+        Args:
+            job_id: Id job
+            pemilik: Token proses yang memegang isi job
+            sewa_sampai: Waktu (epoch) sewa job habis jika tidak diperpanjang
+            berkas: File sementara milik job yang dihapus jika sewanya habis
+        """
+        with self._kondisi:
+            self._job[job_id] = {
+                'job_id': job_id,
+                'status': STATUS_MENUNGGU,
+                'hasil': None,
+                'error': None,
+                'pemilik': pemilik,
+                'sewa_sampai': sewa_sampai,
+                'berkas': berkas,
+                'dibuat_pada': time.time(),
+                'diperbarui_pada': time.time()
+            }
+
+    def perbarui(self, job_id: str, status: str, hasil: Optional[Dict] = None,
+                 error: Optional[str] = None) -> None:
+        """Perbarui status, hasil, dan error sebuah job."""
+        with self._kondisi:
+            job = self._job.get(job_id)
+            if job is None:
+                return
+            job.update({
+                'status': status,
+                'hasil': hasil,
+                'error': error,
+                'diperbarui_pada': time.time()
+            })
+            self._kondisi.notify_all()
+
+    def ambil(self, job_id: str) -> Optional[Dict]:
+        """Ambil salinan data job, atau None jika tidak ada."""
+        with self._kondisi:
+            job = self._job.get(job_id)
+            return dict(job) if job else None
+
+    def tunggu(self, job_id: str, timeout: float) -> Optional[Dict]:
+        """Tunggu sampai job selesai/gagal atau timeout, lalu kembalikan datanya."""
+        batas_waktu = time.monotonic() + timeout
+        with self._kondisi:
+            while True:
+                job = self._job.get(job_id)
+                if job is None or job['status'] in STATUS_AKHIR:
+                    return dict(job) if job else None
+                sisa_waktu = batas_waktu - time.monotonic()
+                if sisa_waktu <= 0:
+                    return dict(job)
+                self._kondisi.wait(sisa_waktu)
+
+    def perpanjang_sewa(self, pemilik: str, sewa_sampai: float) -> None:
+        """Perpanjang sewa semua job berjalan milik satu proses."""
+        with self._kondisi:
+            for job in self._job.values():
+                if job['pemilik'] == pemilik and job['status'] in STATUS_BERJALAN:
+                    job['sewa_sampai'] = sewa_sampai
+
+    def tandai_kadaluarsa(self) -> List[str]:
+        """
+        Tandai gagal job berjalan yang sewanya sudah habis.
+
+        Returns:
+            List[str]: File sementara milik job tersebut (untuk dihapus)
+        """
+        sekarang = time.time()
+        berkas: List[str] = []
+        with self._kondisi:
+            for job in self._job.values():
+                if job['status'] in STATUS_BERJALAN and job['sewa_sampai'] < sekarang:
+                    job.update({'status': STATUS_GAGAL, 'error': PESAN_SEWA_HABIS, 'diperbarui_pada': sekarang})
+                    if job['berkas']:
+                        berkas.append(job['berkas'])
+            self._kondisi.notify_all()
+        return berkas
+
+    def bersihkan(self, umur_maks: float) -> int:
+        """Hapus job selesai/gagal yang lebih tua dari umur_maks detik."""
+        batas = time.time() - umur_maks
+        with self._kondisi:
+            kadaluarsa = [
+                job_id for job_id, job in self._job.items()
+                if job['status'] in STATUS_AKHIR and job['diperbarui_pada'] < batas
+            ]
+            for job_id in kadaluarsa:
+                del self._job[job_id]
+            return len(kadaluarsa)
+
+
+class PenyimpananJobSQLite:
+    """Penyimpanan status job di file SQLite yang dipakai bersama antar worker."""
+
+    def __init__(self, path_db: str, interval_poll: float = 0.2):
+        """
+        Inisialisasi penyimpanan job SQLite.
+
+        Args:
+            path_db: Path file database SQLite
+            interval_poll: Jeda antar pengecekan saat long-poll (detik)
+        """
+        self.path_db = path_db
+        self.interval_poll = interval_poll
+        self._lokal = threading.local()
+
+        koneksi = self._koneksi()
+        koneksi.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_deteksi (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                hasil TEXT,
+                error TEXT,
+                pemilik TEXT,
+                sewa_sampai REAL,
+                berkas TEXT,
+                dibuat_pada REAL NOT NULL,
+                diperbarui_pada REAL NOT NULL
+            )
+            """
+        )
+        # File dari versi sebelumnya belum punya kolom sewa; job lamanya
+        # (sewa_sampai NULL) otomatis dianggap kadaluarsa
+        kolom = {row['name'] for row in koneksi.execute("PRAGMA table_info(job_deteksi)")}
+        for nama, tipe in (('pemilik', 'TEXT'), ('sewa_sampai', 'REAL'), ('berkas', 'TEXT')):
+            if nama not in kolom:
+                koneksi.execute(f"ALTER TABLE job_deteksi ADD COLUMN {nama} {tipe}")
+        koneksi.commit()
+
+    def _koneksi(self) -> sqlite3.Connection:
+        """Koneksi SQLite milik thread saat ini."""
+        koneksi = getattr(self._lokal, 'koneksi', None)
+        if koneksi is None:
+            koneksi = sqlite3.connect(self.path_db, timeout=5.0)
+            koneksi.row_factory = sqlite3.Row
+            koneksi.execute("PRAGMA journal_mode=WAL")
+            self._lokal.koneksi = koneksi
+        return koneksi
+
+    def buat(self, job_id: str, pemilik: str, sewa_sampai: float, berkas: Optional[str] = None) -> None:
+        """Daftarkan job baru dengan status menunggu (lihat PenyimpananJobMemori.buat)."""
+        sekarang = time.time()
+        koneksi = self._koneksi()
+        koneksi.execute(
+            "INSERT INTO job_deteksi "
+            "(job_id, status, pemilik, sewa_sampai, berkas, dibuat_pada, diperbarui_pada) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, STATUS_MENUNGGU, pemilik, sewa_sampai, berkas, sekarang, sekarang)
+        )
+        koneksi.commit()
+
+    def perbarui(self, job_id: str, status: str, hasil: Optional[Dict] = None,
+                 error: Optional[str] = None) -> None:
+        """Perbarui status, hasil, dan error sebuah job."""
+        koneksi = self._koneksi()
+        koneksi.execute(
+            "UPDATE job_deteksi SET status = ?, hasil = ?, error = ?, diperbarui_pada = ? "
+            "WHERE job_id = ?",
+            (status, json.dumps(hasil) if hasil is not None else None, error, time.time(), job_id)
+        )
+        koneksi.commit()
+
+    def ambil(self, job_id: str) -> Optional[Dict]:
+        """Ambil data job, atau None jika tidak ada."""
+        row = self._koneksi().execute(
+            "SELECT * FROM job_deteksi WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        job = dict(row)
+        job['hasil'] = json.loads(job['hasil']) if job['hasil'] else None
+        return job
+
+    def tunggu(self, job_id: str, timeout: float) -> Optional[Dict]:
+        """Tunggu sampai job selesai/gagal atau timeout, lalu kembalikan datanya."""
+        batas_waktu = time.monotonic() + timeout
+        while True:
+            job = self.ambil(job_id)
+            if job is None or job['status'] in STATUS_AKHIR or time.monotonic() >= batas_waktu:
+                return job
+            time.sleep(self.interval_poll)
+
+    def perpanjang_sewa(self, pemilik: str, sewa_sampai: float) -> None:
+        """Perpanjang sewa semua job berjalan milik satu proses."""
+        koneksi = self._koneksi()
+        koneksi.execute(
+            "UPDATE job_deteksi SET sewa_sampai = ? WHERE pemilik = ? AND status IN (?, ?)",
+            (sewa_sampai, pemilik, *STATUS_BERJALAN)
+        )
+        koneksi.commit()
+
+    def tandai_kadaluarsa(self) -> List[str]:
+        """
+        Tandai gagal job berjalan yang sewanya sudah habis.
+
+        Returns:
+            List[str]: File sementara milik job tersebut (untuk dihapus)
+        """
+        sekarang = time.time()
+        kondisi = "status IN (?, ?) AND COALESCE(sewa_sampai, 0) < ?"
+        koneksi = self._koneksi()
+        # BEGIN IMMEDIATE agar SELECT dan UPDATE melihat baris yang sama
+        koneksi.execute("BEGIN IMMEDIATE")
+        try:
+            berkas = [
+                row['berkas'] for row in koneksi.execute(
+                    f"SELECT berkas FROM job_deteksi WHERE {kondisi} AND berkas IS NOT NULL",
+                    (*STATUS_BERJALAN, sekarang)
+                )
+            ]
+            koneksi.execute(
+                f"UPDATE job_deteksi SET status = ?, error = ?, diperbarui_pada = ? WHERE {kondisi}",
+                (STATUS_GAGAL, PESAN_SEWA_HABIS, sekarang, *STATUS_BERJALAN, sekarang)
+            )
+            koneksi.commit()
+        except Exception:
+            koneksi.rollback()
+            raise
+        return berkas
+
+    def bersihkan(self, umur_maks: float) -> int:
+        """Hapus job selesai/gagal yang lebih tua dari umur_maks detik."""
+        koneksi = self._koneksi()
+        cursor = koneksi.execute(
+            "DELETE FROM job_deteksi WHERE status IN (?, ?) AND diperbarui_pada < ?",
+            (*STATUS_AKHIR, time.time() - umur_maks)
+        )
+        koneksi.commit()
+        return cursor.rowcount
+
+
+class AntrianDeteksi:
+    """
+    Antrian job in-process dengan sekumpulan thread worker.
+
+    Thread worker dibuat saat job pertama dikirim di setiap proses, sehingga
+    aman dipakai bersama gunicorn (termasuk mode --preload). Satu thread
+    denyut per proses memperpanjang sewa job milik proses itu dan menandai
+    gagal job yang ditinggalkan proses lain.
+    """
+
+    def __init__(
+        self,
+        proses: Callable[[Dict], Dict],
+        penyimpanan: Any,
+        jumlah_worker: int = 4,
+        ukuran_maks: int = 100,
+        retensi_job: float = 3600.0,
+        sewa_job: float = 60.0
+    ):
+        """
+        Inisialisasi antrian deteksi.
+
+        Args:
+            proses: Fungsi yang menerima payload job dan mengembalikan hasil (dict)
+            penyimpanan: PenyimpananJobMemori atau PenyimpananJobSQLite
+            jumlah_worker: Jumlah thread worker per proses
+            ukuran_maks: Jumlah maksimal job yang boleh mengantri per proses
+            retensi_job: Detik hasil job disimpan setelah selesai
+            sewa_job: Detik sebelum job dianggap ditinggalkan jika proses
+                      pemiliknya berhenti memperpanjang sewa
+        """
+        self.proses = proses
+        self.penyimpanan = penyimpanan
+        self.jumlah_worker = max(1, jumlah_worker)
+        self.retensi_job = retensi_job
+        self.sewa_job = sewa_job
+        self._antrian: 'queue.Queue[tuple]' = queue.Queue(maxsize=ukuran_maks)
+        self._lock = threading.Lock()
+        self._worker: List[threading.Thread] = []
+        self._pid: Optional[int] = None
+        self._pemilik = ''
+
+    def kirim(self, payload: Dict, berkas: Optional[str] = None) -> str:
+        """
+        Masukkan job baru ke antrian.
+
+        Args:
+            payload: Data yang diteruskan ke fungsi proses
+            berkas: File sementara milik job; dihapus jika job ditinggalkan
+                    (menghapusnya setelah job selesai adalah tugas fungsi proses)
+
+        Returns:
+            str: Job id untuk polling status
+
+        Raises:
+            queue.Full: Jika antrian sudah penuh
+        """
+        self._pastikan_worker()
+
+        job_id = uuid.uuid4().hex
+        self.penyimpanan.buat(job_id, self._pemilik, time.time() + self.sewa_job, berkas)
+        try:
+            self._antrian.put_nowait((job_id, payload))
+        except queue.Full:
+            self.penyimpanan.perbarui(job_id, STATUS_GAGAL, error='Antrian penuh')
+            raise
+
+        logger.info(f"Job deteksi {job_id} masuk antrian")
+        return job_id
+
+    def status(self, job_id: str, tunggu: float = 0) -> Optional[Dict]:
+        """
+        Ambil status job, opsional menunggu sampai selesai (long-poll).
+
+        Args:
+            job_id: Id job dari kirim()
+            tunggu: Detik maksimal menunggu job selesai (0 = langsung kembali)
+
+        Returns:
+            Dict data job, atau None jika job tidak ditemukan
+        """
+        job = self.penyimpanan.ambil(job_id)
+        if job is not None and job['status'] in STATUS_BERJALAN and \
+                (job['sewa_sampai'] or 0) < time.time():
+            # Proses pemilik job sudah berhenti memperpanjang sewa
+            self.bersihkan()
+            job = self.penyimpanan.ambil(job_id)
+
+        if job is None or job['status'] in STATUS_AKHIR or tunggu <= 0:
+            return job
+        return self.penyimpanan.tunggu(job_id, tunggu)
+
+    def bersihkan(self) -> None:
+        """Tandai gagal job yang sewanya habis lalu hapus job lama."""
+        for path_berkas in self.penyimpanan.tandai_kadaluarsa():
+            try:
+                os.remove(path_berkas)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Gagal menghapus file job yang ditinggalkan {path_berkas}: {str(e)}")
+        self.penyimpanan.bersihkan(self.retensi_job)
+
+    def jumlah_mengantri(self) -> int:
+        """Jumlah job yang sedang mengantri di proses ini."""
+        return self._antrian.qsize()
+
+    def _pastikan_worker(self) -> None:
+        """Jalankan thread worker jika belum berjalan di proses ini."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+
+        with self._lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                # Proses hasil fork: thread dan isi antrian induk tidak ikut
+                self._antrian = queue.Queue(maxsize=self._antrian.maxsize)
+            self._pemilik = uuid.uuid4().hex
+            self._worker = [
+                threading.Thread(target=self._loop_worker, name=f'worker-deteksi-{i}', daemon=True)
+                for i in range(self.jumlah_worker)
+            ]
+            self._worker.append(
+                threading.Thread(target=self._loop_denyut, args=(self._pemilik,), name='denyut-antrian', daemon=True)
+            )
+            for worker in self._worker:
+                worker.start()
+            self._pid = pid
+            logger.info(f"{self.jumlah_worker} worker antrian deteksi dijalankan")
+
+    def _loop_worker(self) -> None:
+        """Ambil job dari antrian dan proses satu per satu."""
+        while True:
+            job_id, payload = self._antrian.get()
+            try:
+                self.penyimpanan.perbarui(job_id, STATUS_DIPROSES)
+                hasil = self.proses(payload)
+                self.penyimpanan.perbarui(job_id, STATUS_SELESAI, hasil=hasil)
+                logger.info(f"Job deteksi {job_id} selesai")
+            except Exception as e:
+                logger.error(f"Job deteksi {job_id} gagal: {str(e)}")
+                try:
+                    self.penyimpanan.perbarui(job_id, STATUS_GAGAL, error=str(e))
+                except Exception as e_simpan:
+                    logger.error(f"Gagal menyimpan status job {job_id}: {str(e_simpan)}")
+            finally:
+                self._antrian.task_done()
+
+            try:
+                self.bersihkan()
+            except Exception as e:
+                logger.error(f"Gagal membersihkan job lama: {str(e)}")
+
+    def _loop_denyut(self, pemilik: str) -> None:
+        """Perpanjang sewa job milik proses ini dan bereskan job yang ditinggalkan."""
+        interval = max(self.sewa_job / 3, 0.1)
+        while self._pemilik == pemilik:
+            try:
+                self.penyimpanan.perpanjang_sewa(pemilik, time.time() + self.sewa_job)
+                self.bersihkan()
+            except Exception as e:
+                logger.error(f"Gagal memperpanjang sewa job: {str(e)}")
+            time.sleep(interval)
@@ -0,0 +1,171 @@
+"""
+Cache read-through untuk query baca DatabaseService.
+
+Modul ini menyimpan hasil query statistik dan riwayat selama TTL pendek.
+Setiap penulisan hasil deteksi menginvalidasi cache dengan mengganti
+"generasi" cache, dan permintaan bersamaan untuk kunci yang sama hanya
+memicu satu query (single-flight).
+"""
+
+import copy
+import uuid
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Union
+
+from .cache_deteksi import CacheLRU, CacheSQLite
+from .metrik import catat_cache
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+PENANDA_GENERASI = 'generasi_cache_baca'
+
+
+class CacheBaca:
+    """
+    Cache read-through dengan TTL, invalidasi saat tulis, dan single-flight.
+
+    Backend CacheSQLite dipakai bersama oleh semua worker gunicorn sehingga
+    hasil query dan invalidasi terlihat di semua worker. Backend CacheLRU
+    berlaku per proses: penulisan di satu worker tidak menginvalidasi worker
+    lain, jadi worker lain bisa menyajikan data lama sampai TTL habis.
+    Token generasi disimpan terpisah dari entri cache agar tidak ikut
+    terbuang saat cache penuh.
+    """
+
+    def __init__(
+        self,
+        backend: Union[CacheLRU, CacheSQLite],
+        ttl: float = 10.0,
+        timeout_tunggu: float = 30.0
+    ):
+        """
+        Inisialisasi cache baca.
+
+        Args:
+            backend: Penyimpanan cache (CacheLRU atau CacheSQLite)
+            ttl: Detik masa berlaku hasil query
+            timeout_tunggu: Detik maksimal menunggu query yang sedang berjalan
+                            di thread lain untuk kunci yang sama
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self.timeout_tunggu = timeout_tunggu
+        self._lock = threading.Lock()
+        self._penerbangan: Dict[str, Future] = {}
+        self._hit = 0
+        self._miss = 0
+        self._digabung = 0
+        self._generasi_lokal = uuid.uuid4().hex
+
+    def ambil_atau_hitung(self, kunci: str, hitung: Callable[[], Any]) -> Any:
+        """
+        Ambil nilai dari cache, atau jalankan hitung() sekali jika belum ada.
+
+        Exception dari hitung() tidak disimpan ke cache dan diteruskan ke
+        semua pemanggil yang sedang menunggu kunci yang sama.
+
+        Args:
+            kunci: Kunci cache (tanpa generasi)
+            hitung: Fungsi yang menjalankan query ke database
+
+        Returns:
+            Nilai dari cache atau hasil hitung()
+        """
+        kunci_penuh = f"{self._generasi()}:{kunci}"
+
+        nilai = self._ambil_backend(kunci_penuh)
+        if nilai is not None:
+            self._catat('_hit')
+            return nilai
+
+        with self._lock:
+            penerbangan = self._penerbangan.get(kunci_penuh)
+            pemimpin = penerbangan is None
+            if pemimpin:
+                penerbangan = Future()
+                self._penerbangan[kunci_penuh] = penerbangan
+        self._catat('_miss' if pemimpin else '_digabung')
+
+        if not pemimpin:
+            # Query yang sama sedang dijalankan thread lain, tunggu hasilnya
+            return copy.deepcopy(penerbangan.result(timeout=self.timeout_tunggu))
+
+        try:
+            nilai = hitung()
+            self._simpan_backend(kunci_penuh, nilai)
+            penerbangan.set_result(nilai)
+            return nilai
+        except BaseException as e:
+            penerbangan.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._penerbangan.pop(kunci_penuh, None)
+
+    def invalidasi(self) -> None:
+        """Buat semua entri cache lama tidak terpakai lagi (dipanggil setelah tulis)."""
+        generasi = uuid.uuid4().hex
+        self._generasi_lokal = generasi
+        if not isinstance(self.backend, CacheSQLite):
+            return
+        try:
+            self.backend.simpan_penanda(PENANDA_GENERASI, generasi)
+        except Exception as e:
+            logger.error(f"Gagal menginvalidasi cache baca: {str(e)}")
+
+    def statistik(self) -> Dict:
+        """
+        Ringkasan hit/miss cache baca sejak proses dimulai.
+
+        Returns:
+            Dict: Jumlah hit, miss (query ke database), permintaan yang
+                  digabung ke query yang sedang berjalan, dan rasio hit
+        """
+        with self._lock:
+            total = self._hit + self._miss
+            return {
+                'hit': self._hit,
+                'miss': self._miss,
+                'digabung': self._digabung,
+                'rasio_hit': round(self._hit / total, 4) if total else 0,
+                'backend': type(self.backend).__name__
+            }
+
+    def _generasi(self) -> str:
+        """Ambil token generasi saat ini (bersama antar worker untuk CacheSQLite)."""
+        if not isinstance(self.backend, CacheSQLite):
+            return self._generasi_lokal
+        try:
+            generasi = self.backend.ambil_penanda(PENANDA_GENERASI)
+            if generasi is None:
+                self.backend.simpan_penanda(PENANDA_GENERASI, self._generasi_lokal)
+                generasi = self.backend.ambil_penanda(PENANDA_GENERASI) or self._generasi_lokal
+            return generasi
+        except Exception as e:
+            # Generasi tidak bisa dibaca: pakai generasi acak agar tidak ada data lama
+            logger.error(f"Gagal membaca generasi cache baca: {str(e)}")
+            return uuid.uuid4().hex
+
+    def _ambil_backend(self, kunci: str) -> Any:
+        """Baca backend; error backend dianggap miss agar query tetap jalan."""
+        try:
+            return self.backend.ambil(kunci)
+        except Exception as e:
+            logger.error(f"Gagal membaca cache baca: {str(e)}")
+            return None
+
+    def _simpan_backend(self, kunci: str, nilai: Any) -> None:
+        """Tulis backend; error backend hanya dicatat di log."""
+        try:
+            self.backend.simpan(kunci, nilai, ttl=self.ttl)
+        except Exception as e:
+            logger.error(f"Gagal menulis cache baca: {str(e)}")
+
+    def _catat(self, nama_counter: str) -> None:
+        """Tambah satu pada counter secara thread-safe."""
+        with self._lock:
+            setattr(self, nama_counter, getattr(self, nama_counter) + 1)
+        catat_cache('baca', nama_counter.lstrip('_'))
@@ -0,0 +1,319 @@
+"""
+Cache hasil deteksi brand berbasis hash isi gambar.
+
+Modul ini menyimpan hasil deteksi berdasarkan hash SHA-256 dari byte gambar,
+sehingga gambar yang sama persis tidak perlu dikirim ulang ke Azure Computer
+Vision. Cache terdiri dari dua tingkat: LRU di memori proses dan (opsional)
+file SQLite di disk yang dipakai bersama oleh semua worker.
+"""
+
+import copy
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .metrik import catat_cache
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+def hitung_hash_gambar(data: bytes) -> str:
+    """
+    Hitung hash isi gambar yang dipakai sebagai kunci cache.
+
+    Args:
+        data: Byte gambar
+
+    Returns:
+        str: Hash SHA-256 dalam format heksadesimal
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+class CacheLRU:
+    """Cache LRU di memori dengan TTL, aman dipakai dari banyak thread."""
+
+    def __init__(self, ukuran_maks: int = 1024, ttl: float = 86400.0):
+        """
+        Inisialisasi cache LRU.
+
+        Args:
+            ukuran_maks: Jumlah maksimal entri sebelum entri terlama dibuang
+            ttl: Detik masa berlaku setiap entri
+        """
+        self.ukuran_maks = max(1, ukuran_maks)
+        self.ttl = ttl
+        self._data: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ambil(self, kunci: str) -> Optional[Any]:
+        """
+        Ambil nilai dari cache.
+
+        Args:
+            kunci: Kunci cache
+
+        Returns:
+            Salinan nilai, atau None jika tidak ada/kadaluarsa
+        """
+        with self._lock:
+            entri = self._data.get(kunci)
+            if entri is None:
+                return None
+            kadaluarsa_pada, nilai = entri
+            if kadaluarsa_pada < time.time():
+                del self._data[kunci]
+                return None
+            self._data.move_to_end(kunci)
+        return copy.deepcopy(nilai)
+
+    def simpan(self, kunci: str, nilai: Any, ttl: Optional[float] = None) -> None:
+        """
+        Simpan nilai ke cache.
+
+        Args:
+            kunci: Kunci cache
+            nilai: Nilai yang disimpan (disalin agar tidak ikut termutasi)
+            ttl: Masa berlaku khusus dalam detik (default: ttl cache)
+        """
+        kadaluarsa_pada = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[kunci] = (kadaluarsa_pada, copy.deepcopy(nilai))
+            self._data.move_to_end(kunci)
+            while len(self._data) > self.ukuran_maks:
+                self._data.popitem(last=False)
+
+    def hapus(self, kunci: str) -> None:
+        """Hapus satu entri dari cache."""
+        with self._lock:
+            self._data.pop(kunci, None)
+
+    def kosongkan(self) -> None:
+        """Hapus semua entri dari cache."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class CacheSQLite:
+    """
+    Cache persisten di file SQLite dengan TTL dan batas jumlah entri.
+
+    File yang sama bisa dipakai oleh beberapa proses (mode WAL). Nilai
+    disimpan sebagai JSON. Pembacaan tidak menulis ke file, jadi entri
+    dibuang berdasarkan waktu terakhir ditulis; entri yang sering dibaca
+    tetap cepat karena ditahan cache memori di depannya.
+    """
+
+    def __init__(self, path_db: str, ttl: float = 604800.0, maks_entri: int = 100000):
+        """
+        Inisialisasi cache SQLite.
+
+        Args:
+            path_db: Path file database SQLite
+            ttl: Detik masa berlaku setiap entri
+            maks_entri: Jumlah maksimal entri, entri yang paling lama tidak
+                        ditulis dibuang lebih dulu
+        """
+        self.path_db = path_db
+        self.ttl = ttl
+        self.maks_entri = max(1, maks_entri)
+        self._lokal = threading.local()
+
+        koneksi = self._koneksi()
+        koneksi.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                kunci TEXT PRIMARY KEY,
+                nilai TEXT NOT NULL,
+                kadaluarsa_pada REAL NOT NULL,
+                diakses_pada REAL NOT NULL
+            )
+            """
+        )
+        koneksi.execute("CREATE INDEX IF NOT EXISTS idx_cache_diakses ON cache (diakses_pada)")
+        # Penanda kecil (contoh: generasi cache baca) yang tidak ikut dibuang
+        # oleh TTL maupun batas maks_entri
+        koneksi.execute(
+            """
+            CREATE TABLE IF NOT EXISTS penanda (
+                nama TEXT PRIMARY KEY,
+                nilai TEXT NOT NULL
+            )
+            """
+        )
+        koneksi.commit()
+
+    def _koneksi(self) -> sqlite3.Connection:
+        """Koneksi SQLite milik thread saat ini."""
+        koneksi = getattr(self._lokal, 'koneksi', None)
+        if koneksi is None:
+            koneksi = sqlite3.connect(self.path_db, timeout=5.0)
+            koneksi.execute("PRAGMA journal_mode=WAL")
+            koneksi.execute("PRAGMA synchronous=NORMAL")
+            self._lokal.koneksi = koneksi
+        return koneksi
+
+    def ambil(self, kunci: str) -> Optional[Any]:
+        """
+        Ambil nilai dari cache.
+
+        Args:
+            kunci: Kunci cache
+
+        Returns:
+            Nilai hasil decode JSON, atau None jika tidak ada/kadaluarsa
+        """
+        row = self._koneksi().execute(
+            "SELECT nilai FROM cache WHERE kunci = ? AND kadaluarsa_pada > ?",
+            (kunci, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def simpan(self, kunci: str, nilai: Any, ttl: Optional[float] = None) -> None:
+        """
+        Simpan nilai ke cache lalu buang entri kadaluarsa dan entri berlebih.
+
+        Args:
+            kunci: Kunci cache
+            nilai: Nilai yang bisa di-serialisasi ke JSON
+            ttl: Masa berlaku khusus dalam detik (default: ttl cache)
+        """
+        sekarang = time.time()
+        koneksi = self._koneksi()
+        koneksi.execute(
+            "INSERT OR REPLACE INTO cache (kunci, nilai, kadaluarsa_pada, diakses_pada) "
+            "VALUES (?, ?, ?, ?)",
+            (kunci, json.dumps(nilai), sekarang + (self.ttl if ttl is None else ttl), sekarang)
+        )
+        koneksi.execute("DELETE FROM cache WHERE kadaluarsa_pada <= ?", (sekarang,))
+        koneksi.execute(
+            "DELETE FROM cache WHERE kunci IN ("
+            "SELECT kunci FROM cache ORDER BY diakses_pada DESC LIMIT -1 OFFSET ?)",
+            (self.maks_entri,)
+        )
+        koneksi.commit()
+
+    def ambil_penanda(self, nama: str) -> Optional[str]:
+        """Ambil nilai penanda, atau None jika belum ada."""
+        row = self._koneksi().execute("SELECT nilai FROM penanda WHERE nama = ?", (nama,)).fetchone()
+        return row[0] if row is not None else None
+
+    def simpan_penanda(self, nama: str, nilai: str) -> None:
+        """Simpan nilai penanda (tidak pernah kadaluarsa atau dibuang)."""
+        koneksi = self._koneksi()
+        koneksi.execute("INSERT OR REPLACE INTO penanda (nama, nilai) VALUES (?, ?)", (nama, nilai))
+        koneksi.commit()
+
+    def hapus(self, kunci: str) -> None:
+        """Hapus satu entri dari cache."""
+        koneksi = self._koneksi()
+        koneksi.execute("DELETE FROM cache WHERE kunci = ?", (kunci,))
+        koneksi.commit()
+
+    def kosongkan(self) -> None:
+        """Hapus semua entri dari cache."""
+        koneksi = self._koneksi()
+        koneksi.execute("DELETE FROM cache")
+        koneksi.commit()
+
+
+class CacheDeteksi:
+    """Cache dua tingkat untuk hasil ComputerVisionService.deteksi_brand."""
+
+    def __init__(self, cache_memori: CacheLRU, cache_disk: Optional[CacheSQLite] = None):
+        """
+        Inisialisasi cache deteksi.
+
+        Args:
+            cache_memori: Tingkat pertama (LRU di memori proses)
+            cache_disk: Tingkat kedua opsional (SQLite bersama antar worker)
+        """
+        self.cache_memori = cache_memori
+        self.cache_disk = cache_disk
+        self._lock = threading.Lock()
+        self._hit_memori = 0
+        self._hit_disk = 0
+        self._miss = 0
+
+    def ambil(self, kunci: str) -> Optional[List[Dict]]:
+        """
+        Cari hasil deteksi untuk hash gambar.
+
+        Args:
+            kunci: Hash gambar dari hitung_hash_gambar (boleh ditambah sidik
+                   konfigurasi detektor)
+
+        Returns:
+            List[Dict] hasil deteksi yang tersimpan, atau None jika miss
+        """
+        hasil = self.cache_memori.ambil(kunci)
+        if hasil is not None:
+            self._catat('_hit_memori')
+            return hasil
+
+        if self.cache_disk:
+            try:
+                hasil = self.cache_disk.ambil(kunci)
+            except Exception as e:
+                logger.error(f"Gagal membaca cache disk: {str(e)}")
+                hasil = None
+            if hasil is not None:
+                self.cache_memori.simpan(kunci, hasil)
+                self._catat('_hit_disk')
+                return hasil
+
+        self._catat('_miss')
+        return None
+
+    def simpan(self, kunci: str, brand_terdeteksi: List[Dict]) -> None:
+        """
+        Simpan hasil deteksi untuk hash gambar ke semua tingkat cache.
+
+        Args:
+            kunci: Hash gambar dari hitung_hash_gambar (boleh ditambah sidik
+                   konfigurasi detektor)
+            brand_terdeteksi: Hasil deteksi brand
+        """
+        self.cache_memori.simpan(kunci, brand_terdeteksi)
+        if self.cache_disk:
+            try:
+                self.cache_disk.simpan(kunci, brand_terdeteksi)
+            except Exception as e:
+                logger.error(f"Gagal menulis cache disk: {str(e)}")
+
+    def statistik(self) -> Dict:
+        """
+        Ringkasan hit/miss cache sejak proses dimulai.
+
+        Returns:
+            Dict: Jumlah hit per tingkat, miss, rasio hit, dan jumlah
+                  panggilan API yang dihemat
+        """
+        with self._lock:
+            total_hit = self._hit_memori + self._hit_disk
+            total = total_hit + self._miss
+            return {
+                'hit_memori': self._hit_memori,
+                'hit_disk': self._hit_disk,
+                'miss': self._miss,
+                'rasio_hit': round(total_hit / total, 4) if total else 0,
+                'panggilan_api_dihemat': total_hit,
+                'entri_memori': len(self.cache_memori),
+                'disk_aktif': self.cache_disk is not None
+            }
+
+    def _catat(self, nama_counter: str) -> None:
+        """Tambah satu pada counter secara thread-safe."""
+        with self._lock:
+            setattr(self, nama_counter, getattr(self, nama_counter) + 1)
+        catat_cache('deteksi', nama_counter.lstrip('_'))
@@ -5,43 +5,126 @@ Modul ini berisi fungsi-fungsi untuk berinteraksi dengan Azure Computer Vision A
 untuk mendeteksi brand/logo pada gambar yang diunggah.
 """
 
+import io
+import copy
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from azure.cognitiveservices.vision.computervision import ComputerVisionClient # type: ignore
 from msrest.authentication import CognitiveServicesCredentials # type: ignore
-from PIL import Image # type: ignore
+from PIL import Image, ImageOps # type: ignore
+
+from .cache_deteksi import CacheDeteksi, hitung_hash_gambar
+from .detektor import DetektorAzure, DetektorBerantai, DetektorBrand
+from .deteksi_ubin import DeteksiUbin
+from .hash_perseptual import IndeksHashPerseptual, hash_informatif, hitung_dhash
+from .ketahanan import LayananTidakTersedia, PembatasLaju, PemutusSirkuit
+from .metrik import catat_cache, ukur_tahap
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# Tag EXIF orientasi dan nilai yang menukar lebar dengan tinggi (rotasi 90/270)
+TAG_ORIENTASI = 0x0112
+ORIENTASI_TERTUKAR = (5, 6, 7, 8)
+
 
 class ComputerVisionService:
     """Service untuk berinteraksi dengan Azure Computer Vision API."""
 
-    def __init__(self, endpoint: str, key: str):
+    def __init__(
+        self,
+        endpoint: str,
+        key: str,
+        cache: Optional[CacheDeteksi] = None,
+        sisi_maks: int = 0,
+        kualitas_jpeg: int = 85,
+        backend: str = 'azure',
+        detektor_lokal: Optional[DetektorBrand] = None,
+        indeks_duplikat: Optional[IndeksHashPerseptual] = None,
+        timeout_azure: float = 0,
+        maks_percobaan: int = 3,
+        pembatas_laju: Optional[PembatasLaju] = None,
+        pemutus_sirkuit: Optional[PemutusSirkuit] = None,
+        detektor_cadangan: Optional[DetektorBrand] = None,
+        maks_koneksi_async: int = 200,
+        deteksi_ubin: Optional[DeteksiUbin] = None
+    ):
         """
         Inisialisasi Computer Vision Service.
 
         Args:
             endpoint: URL endpoint Azure Computer Vision
             key: Subscription key untuk autentikasi
+            cache: Cache hasil deteksi berbasis hash gambar (opsional)
+            sisi_maks: Panjang sisi terpanjang (piksel) gambar yang dikirim ke
+                       Azure; 0 berarti gambar dikirim apa adanya
+            kualitas_jpeg: Kualitas JPEG saat gambar di-encode ulang (1-95)
+            backend: 'azure', 'lokal', atau 'lokal+azure' (lokal dulu, Azure
+                     hanya jika detektor lokal tidak menemukan brand)
+            detektor_lokal: Detektor lokal untuk backend 'lokal'/'lokal+azure'
+            indeks_duplikat: Indeks hash perseptual untuk memakai ulang hasil
+                             deteksi gambar yang hampir sama (opsional)
+            timeout_azure: Timeout koneksi/baca satu panggilan Azure (detik);
+                           0 berarti memakai default SDK
+            maks_percobaan: Jumlah percobaan total untuk error sementara Azure
+            pembatas_laju: Token bucket bersama sesuai kuota tier Azure (opsional)
+            pemutus_sirkuit: Circuit breaker bersama untuk Azure (opsional)
+            detektor_cadangan: Detektor yang dipakai saat detektor utama tidak
+                               tersedia (sirkuit terbuka/kuota habis) (opsional)
+            maks_koneksi_async: Jumlah maksimal panggilan Azure bersamaan di
+                                jalur async (deteksi_brand_bytes_async)
+            deteksi_ubin: Deteksi per ubin untuk gambar besar agar logo kecil
+                          tetap terdeteksi (opsional)
         """
         self.endpoint = endpoint
         self.key = key
+        self.cache = cache
+        self.sisi_maks = sisi_maks
+        self.kualitas_jpeg = kualitas_jpeg
+        self.indeks_duplikat = indeks_duplikat
+        self.detektor_cadangan = detektor_cadangan
+        self.deteksi_ubin = deteksi_ubin
         self.client: Optional[ComputerVisionClient] = None
 
         if endpoint and key:
             try:
                 kredensial = CognitiveServicesCredentials(key)
                 self.client = ComputerVisionClient(endpoint, kredensial)
+                if timeout_azure > 0:
+                    self.client.config.connection.timeout = timeout_azure
+                # Retry ditangani DetektorAzure agar Retry-After dan circuit breaker dihormati
+                self.client.config.retry_policy.retries = 0
                 logger.info("Computer Vision Client berhasil diinisialisasi")
             except Exception as e:
                 logger.error(f"Gagal menginisialisasi Computer Vision Client: {str(e)}")
                 self.client = None
 
+        self.detektor_azure = DetektorAzure(
+            self.client,
+            pembatas=pembatas_laju,
+            pemutus=pemutus_sirkuit,
+            maks_percobaan=maks_percobaan,
+            endpoint=endpoint if self.client else '',
+            key=key if self.client else '',
+            timeout=timeout_azure or 15.0,
+            maks_koneksi_async=maks_koneksi_async
+        )
+        self.detektor: DetektorBrand
+        if backend == 'lokal' and detektor_lokal:
+            self.detektor = detektor_lokal
+        elif backend == 'lokal+azure' and detektor_lokal:
+            self.detektor = DetektorBerantai([detektor_lokal, self.detektor_azure])
+        else:
+            if backend != 'azure':
+                logger.warning(f"Backend detektor '{backend}' tidak bisa dipakai, memakai Azure")
+            self.detektor = self.detektor_azure
+        logger.info(f"Backend detektor brand: {self.detektor.nama}")
+
     def deteksi_brand(self, path_gambar: str) -> List[Dict]:
         """
-        Deteksi brand/logo dari gambar menggunakan Azure Computer Vision.
+        Deteksi brand/logo dari gambar menggunakan detektor yang dikonfigurasi.
 
         Args:
             path_gambar: Path lengkap ke file gambar yang akan dianalisis
@@ -53,58 +136,406 @@ class ComputerVisionService:
         Raises:
             Exception: Jika terjadi error saat memanggil API
         """
-        if not self.client:
-            logger.error("Computer Vision Client belum diinisialisasi")
+        try:
+            # Baca file gambar dalam mode binary
+            with open(path_gambar, 'rb') as file_gambar:
+                data_gambar = file_gambar.read()
+        except FileNotFoundError:
+            logger.error(f"File gambar tidak ditemukan: {path_gambar}")
+            raise Exception("File gambar tidak ditemukan")
+
+        return self.deteksi_brand_bytes(data_gambar, path_gambar)
+
+    def deteksi_brand_bytes(
+        self,
+        data_gambar: bytes,
+        nama_gambar: str = '<memori>',
+        info_gambar: Optional[Dict] = None
+    ) -> List[Dict]:
+        """
+        Deteksi brand/logo dari byte gambar yang sudah ada di memori.
+
+        Args:
+            data_gambar: Byte gambar yang akan dianalisis
+            nama_gambar: Nama/path gambar untuk keperluan log
+            info_gambar: Hasil dapatkan_info_gambar_bytes untuk gambar ini,
+                         agar hash perseptual tidak dihitung ulang (optional)
+
+        Returns:
+            List[Dict]: Daftar brand yang terdeteksi dengan informasi lengkap
+                       Setiap dict berisi: brand, confidence, rectangle
+
+        Raises:
+            LayananTidakTersedia: Jika detektor sedang tidak bisa dipanggil dan
+                                  tidak ada detektor cadangan
+            Exception: Jika terjadi error saat memanggil API
+        """
+        kunci_cache, info_gambar, hasil_tersimpan = self._cari_hasil_tersimpan(
+            data_gambar, nama_gambar, info_gambar
+        )
+        if hasil_tersimpan is not None:
+            return hasil_tersimpan
+
+        if not self.detektor.tersedia():
+            logger.error(f"Detektor {self.detektor.nama} belum siap dipakai")
             return []
 
-        brand_terdeteksi: List[Dict] = []
+        try:
+            logger.info(f"Memulai deteksi brand untuk gambar: {nama_gambar}")
+
+            try:
+                with ukur_tahap('detektor'):
+                    brand_terdeteksi = self._jalankan_detektor(self.detektor, data_gambar)
+                pakai_cadangan = False
+            except LayananTidakTersedia as e:
+                if not self._cadangan_tersedia(e):
+                    raise
+                brand_terdeteksi = self._jalankan_detektor(
+                    self.detektor_cadangan, data_gambar  # type: ignore[arg-type]
+                )
+                pakai_cadangan = True
+
+            self._catat_hasil(brand_terdeteksi)
+
+        except LayananTidakTersedia as e:
+            logger.error(f"Detektor brand tidak tersedia: {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Error saat deteksi brand: {str(e)}")
+            raise Exception(f"Gagal mendeteksi brand: {str(e)}")
+
+        if not pakai_cadangan:
+            self._simpan_hasil(kunci_cache, info_gambar, brand_terdeteksi)
+        return brand_terdeteksi
+
+    async def deteksi_brand_bytes_async(
+        self,
+        data_gambar: bytes,
+        nama_gambar: str = '<memori>',
+        info_gambar: Optional[Dict] = None
+    ) -> List[Dict]:
+        """
+        Versi asyncio dari deteksi_brand_bytes.
+
+        Panggilan ke Azure memakai HTTP client non-blocking (lihat
+        DetektorAzure.deteksi_async), sedangkan pekerjaan CPU seperti praproses
+        dan baca cache disk dijalankan di thread agar event loop tidak tertahan.
+
+        Args:
+            data_gambar: Byte gambar yang akan dianalisis
+            nama_gambar: Nama/path gambar untuk keperluan log
+            info_gambar: Hasil dapatkan_info_gambar_bytes untuk gambar ini (optional)
+
+        Returns:
+            List[Dict]: Daftar brand yang terdeteksi (format sama dengan versi sync)
+
+        Raises:
+            LayananTidakTersedia: Jika detektor sedang tidak bisa dipanggil dan
+                                  tidak ada detektor cadangan
+            Exception: Jika terjadi error saat memanggil API
+        """
+        kunci_cache, info_gambar, hasil_tersimpan = await asyncio.to_thread(
+            self._cari_hasil_tersimpan, data_gambar, nama_gambar, info_gambar
+        )
+        if hasil_tersimpan is not None:
+            return hasil_tersimpan
+
+        if not self.detektor.tersedia():
+            logger.error(f"Detektor {self.detektor.nama} belum siap dipakai")
+            return []
 
         try:
-            logger.info(f"Memulai deteksi brand untuk gambar: {path_gambar}")
+            logger.info(f"Memulai deteksi brand untuk gambar: {nama_gambar}")
 
-            # Buka file gambar dalam mode binary
-            with open(path_gambar, 'rb') as file_gambar:
-                # Panggil API untuk menganalisis gambar
-                fitur = ['brands']
-                hasil = self.client.analyze_image_in_stream(
-                    file_gambar,
-                    visual_features=fitur
+            try:
+                with ukur_tahap('detektor'):
+                    brand_terdeteksi = await self._jalankan_detektor_async(self.detektor, data_gambar)
+                pakai_cadangan = False
+            except LayananTidakTersedia as e:
+                if not self._cadangan_tersedia(e):
+                    raise
+                brand_terdeteksi = await self._jalankan_detektor_async(
+                    self.detektor_cadangan, data_gambar  # type: ignore[arg-type]
                 )
+                pakai_cadangan = True
 
-            # Proses hasil deteksi
-            # Type guard: pastikan hasil memiliki attribute brands
-            # type: ignore digunakan karena Azure SDK tidak memiliki type stubs lengkap
-            if hasil and hasattr(hasil, 'brands') and hasil.brands:  # type: ignore[attr-defined]
-                logger.info(f"Ditemukan {len(hasil.brands)} brand dalam gambar")  # type: ignore[attr-defined]
-
-                for brand in hasil.brands:  # type: ignore[attr-defined]
-                    info_brand = {
-                        'brand': brand.name,
-                        'confidence': brand.confidence,
-                        'rectangle': {
-                            'x': brand.rectangle.x,
-                            'y': brand.rectangle.y,
-                            'w': brand.rectangle.w,
-                            'h': brand.rectangle.h
-                        }
-                    }
-                    brand_terdeteksi.append(info_brand)
-                    logger.info(
-                        f"Brand terdeteksi: {brand.name} "
-                        f"(confidence: {brand.confidence:.2%})"
-                    )
-            else:
-                logger.info("Tidak ada brand yang terdeteksi dalam gambar")
+            self._catat_hasil(brand_terdeteksi)
 
-        except FileNotFoundError:
-            logger.error(f"File gambar tidak ditemukan: {path_gambar}")
-            raise Exception("File gambar tidak ditemukan")
+        except LayananTidakTersedia as e:
+            logger.error(f"Detektor brand tidak tersedia: {str(e)}")
+            raise
         except Exception as e:
             logger.error(f"Error saat deteksi brand: {str(e)}")
             raise Exception(f"Gagal mendeteksi brand: {str(e)}")
 
+        if not pakai_cadangan:
+            await asyncio.to_thread(self._simpan_hasil, kunci_cache, info_gambar, brand_terdeteksi)
+        return brand_terdeteksi
+
+    @ukur_tahap('cari_cache')
+    def _cari_hasil_tersimpan(
+        self,
+        data_gambar: bytes,
+        nama_gambar: str,
+        info_gambar: Optional[Dict]
+    ) -> Tuple[str, Optional[Dict], Optional[List[Dict]]]:
+        """
+        Cari hasil deteksi gambar ini di cache dan indeks gambar hampir sama.
+
+        Returns:
+            Tuple (kunci cache, info gambar, hasil tersimpan atau None)
+        """
+        # Gambar yang identik tidak perlu dikirim ulang ke Azure (selama
+        # konfigurasi detektor dan praprosesnya sama)
+        kunci_cache = f"{hitung_hash_gambar(data_gambar)}:{self.sidik_konfigurasi()}" if self.cache else ''
+        if self.cache:
+            hasil_cache = self.cache.ambil(kunci_cache)
+            if hasil_cache is not None:
+                logger.info(f"Hasil deteksi diambil dari cache untuk gambar: {nama_gambar}")
+                return kunci_cache, info_gambar, hasil_cache
+
+        # Gambar yang hampir sama (resize/kompresi ulang) memakai hasil sebelumnya
+        if self.indeks_duplikat is not None:
+            if info_gambar is None or 'hash_perseptual' not in info_gambar:
+                info_gambar = self.dapatkan_info_gambar_bytes(data_gambar)
+            hasil_duplikat = self._ambil_hasil_duplikat(info_gambar, nama_gambar)
+            if hasil_duplikat is not None:
+                if self.cache:
+                    self.cache.simpan(kunci_cache, hasil_duplikat)
+                return kunci_cache, info_gambar, hasil_duplikat
+
+        return kunci_cache, info_gambar, None
+
+    def sidik_konfigurasi(self) -> str:
+        """
+        Sidik konfigurasi yang memengaruhi hasil deteksi, bagian dari kunci cache.
+
+        Mencakup backend detektor beserta parameternya, deteksi per ubin, dan
+        praproses (sisi_maks, kualitas_jpeg), sehingga hasil tersimpan tidak
+        dipakai ulang setelah salah satunya diubah.
+
+        Returns:
+            str: 16 karakter heksadesimal
+        """
+        bagian = [
+            self.detektor.sidik(),
+            self.deteksi_ubin.sidik() if self.deteksi_ubin is not None else 'ubin:-',
+            f"praproses:{self.sisi_maks}:{self.kualitas_jpeg}"
+        ]
+        return hashlib.sha256('|'.join(bagian).encode('utf-8')).hexdigest()[:16]
+
+    def _cadangan_tersedia(self, error: LayananTidakTersedia) -> bool:
+        """Cek detektor cadangan bisa dipakai saat detektor utama tidak tersedia."""
+        if not self.detektor_cadangan or not self.detektor_cadangan.tersedia():
+            return False
+        logger.warning(
+            f"Detektor {self.detektor.nama} tidak tersedia ({str(error)}), "
+            f"memakai detektor cadangan {self.detektor_cadangan.nama}"
+        )
+        return True
+
+    def _jalankan_detektor(self, detektor: DetektorBrand, data_gambar: bytes) -> List[Dict]:
+        """
+        Deteksi brand dengan satu detektor, per ubin jika gambar cukup besar.
+
+        Returns:
+            List[Dict]: Hasil deteksi dalam koordinat gambar asli
+        """
+        def deteksi_penuh(data: bytes) -> List[Dict]:
+            # Perkecil dan encode ulang gambar sebelum dikirim
+            data_kirim, skala_x, skala_y = self.praproses_gambar(data)
+            return self._skalakan_hasil(detektor.deteksi(data_kirim), skala_x, skala_y)
+
+        if self.deteksi_ubin is not None:
+            hasil_ubin = self.deteksi_ubin.deteksi(detektor, data_gambar, deteksi_penuh)
+            if hasil_ubin is not None:
+                return hasil_ubin
+        return deteksi_penuh(data_gambar)
+
+    async def _jalankan_detektor_async(self, detektor: DetektorBrand, data_gambar: bytes) -> List[Dict]:
+        """Versi asyncio dari _jalankan_detektor."""
+        async def deteksi_penuh(data: bytes) -> List[Dict]:
+            data_kirim, skala_x, skala_y = await asyncio.to_thread(self.praproses_gambar, data)
+            return self._skalakan_hasil(await detektor.deteksi_async(data_kirim), skala_x, skala_y)
+
+        if self.deteksi_ubin is not None:
+            hasil_ubin = await self.deteksi_ubin.deteksi_async(detektor, data_gambar, deteksi_penuh)
+            if hasil_ubin is not None:
+                return hasil_ubin
+        return await deteksi_penuh(data_gambar)
+
+    @staticmethod
+    def _skalakan_hasil(hasil_deteksi: List[Dict], skala_x: float, skala_y: float) -> List[Dict]:
+        """Kembalikan koordinat hasil detektor ke resolusi gambar asli."""
+        brand_terdeteksi: List[Dict] = []
+        for brand in hasil_deteksi:
+            rectangle = brand['rectangle']
+            brand['rectangle'] = {
+                'x': round(rectangle['x'] * skala_x),
+                'y': round(rectangle['y'] * skala_y),
+                'w': round(rectangle['w'] * skala_x),
+                'h': round(rectangle['h'] * skala_y)
+            }
+            brand_terdeteksi.append(brand)
+        return brand_terdeteksi
+
+    @staticmethod
+    def _catat_hasil(brand_terdeteksi: List[Dict]) -> None:
+        """Catat ringkasan hasil deteksi ke log."""
+        for brand in brand_terdeteksi:
+            logger.debug(
+                f"Brand terdeteksi: {brand['brand']} "
+                f"(confidence: {brand['confidence']:.2%})"
+            )
+
+        if brand_terdeteksi:
+            logger.info(f"Ditemukan {len(brand_terdeteksi)} brand dalam gambar")
+        else:
+            logger.info("Tidak ada brand yang terdeteksi dalam gambar")
+
+    def _simpan_hasil(self, kunci_cache: str, info_gambar: Optional[Dict],
+                      brand_terdeteksi: List[Dict]) -> None:
+        """
+        Simpan hasil detektor utama ke cache dan indeks gambar hampir sama.
+
+        Hasil detektor cadangan tidak melewati fungsi ini agar gambar yang sama
+        dianalisis ulang oleh detektor utama setelah layanan pulih.
+        """
+        if self.cache:
+            self.cache.simpan(kunci_cache, brand_terdeteksi)
+
+        if self.indeks_duplikat is not None and info_gambar \
+                and info_gambar.get('hash_perseptual') and hash_informatif(info_gambar['hash_perseptual']):
+            self.indeks_duplikat.tambah(info_gambar['hash_perseptual'], {
+                'width': info_gambar['width'],
+                'height': info_gambar['height'],
+                'brand': copy.deepcopy(brand_terdeteksi)
+            })
+
+    def _ambil_hasil_duplikat(self, info_gambar: Dict, nama_gambar: str) -> Optional[List[Dict]]:
+        """
+        Ambil hasil deteksi gambar yang hampir sama dari indeks duplikat.
+
+        Koordinat rectangle diskalakan ke resolusi gambar saat ini.
+
+        Args:
+            info_gambar: Info gambar berisi hash_perseptual, width, height
+            nama_gambar: Nama/path gambar untuk keperluan log
+
+        Returns:
+            List[Dict] hasil deteksi, atau None jika tidak ada duplikat
+        """
+        hash_gambar = info_gambar.get('hash_perseptual')
+        if not hash_gambar or self.indeks_duplikat is None or not hash_informatif(hash_gambar):
+            return None
+
+        cocok = self.indeks_duplikat.cari(hash_gambar)
+        catat_cache('duplikat', 'miss' if cocok is None else 'hit')
+        if cocok is None:
+            return None
+
+        _, hasil_lama, jarak = cocok
+        skala_x = info_gambar['width'] / hasil_lama['width'] if hasil_lama['width'] else 1.0
+        skala_y = info_gambar['height'] / hasil_lama['height'] if hasil_lama['height'] else 1.0
+
+        brand_terdeteksi = []
+        for brand in copy.deepcopy(hasil_lama['brand']):
+            rectangle = brand['rectangle']
+            brand['rectangle'] = {
+                'x': round(rectangle['x'] * skala_x),
+                'y': round(rectangle['y'] * skala_y),
+                'w': round(rectangle['w'] * skala_x),
+                'h': round(rectangle['h'] * skala_y)
+            }
+            brand_terdeteksi.append(brand)
+
+        logger.info(
+            f"Hasil deteksi dipakai ulang dari gambar hampir sama "
+            f"(jarak hash {jarak}) untuk gambar: {nama_gambar}"
+        )
         return brand_terdeteksi
 
+    @ukur_tahap('praproses')
+    def praproses_gambar(self, data_gambar: bytes) -> Tuple[bytes, float, float]:
+        """
+        Perkecil gambar ke sisi_maks, encode ulang ke JPEG, dan buang metadata.
+
+        Piksel diputar sesuai orientasi EXIF sebelum metadata dibuang. Gambar
+        yang tidak perlu diperkecil dibandingkan dengan encode ulang lossless
+        tanpa metadata (JPEG dengan tabel kuantisasi asli, PNG/GIF sebagai PNG)
+        dan dipilih yang lebih kecil; byte asli beserta metadatanya tidak
+        pernah dikirim.
+
+        Args:
+            data_gambar: Byte gambar asli
+
+        Returns:
+            Tuple berisi byte yang dikirim ke Azure serta faktor skala x dan y
+            untuk mengembalikan koordinat ke resolusi asli
+        """
+        if self.sisi_maks <= 0:
+            return data_gambar, 1.0, 1.0
+
+        try:
+            data_lossless = None
+            with Image.open(io.BytesIO(data_gambar)) as img:
+                format_asli = img.format
+                orientasi = img.getexif().get(TAG_ORIENTASI, 1)
+                lebar_asli, tinggi_asli = img.size
+                if orientasi in ORIENTASI_TERTUKAR:
+                    lebar_asli, tinggi_asli = tinggi_asli, lebar_asli
+                diperkecil = max(lebar_asli, tinggi_asli) > self.sisi_maks
+
+                if diperkecil:
+                    # Decoder JPEG bisa langsung men-decode pada resolusi lebih kecil
+                    img.draft('RGB', (self.sisi_maks, self.sisi_maks))
+                elif format_asli == 'JPEG' and orientasi == 1:
+                    # Encode ulang tanpa metadata dengan kuantisasi asli (tanpa
+                    # penurunan kualitas) sebagai pembanding encode JPEG baru
+                    buffer = io.BytesIO()
+                    img.save(buffer, format='JPEG', quality='keep', optimize=True)
+                    data_lossless = buffer.getvalue()
+
+                # Tag orientasi ikut dibuang, jadi pikselnya yang diputar
+                img_tegak = ImageOps.exif_transpose(img)
+
+            if img_tegak.mode not in ('RGB', 'L'):
+                # Transparansi diratakan di atas latar putih
+                img_rgba = img_tegak.convert('RGBA')
+                img_rgb = Image.new('RGB', img_rgba.size, (255, 255, 255))
+                img_rgb.paste(img_rgba, mask=img_rgba.getchannel('A'))
+            else:
+                img_rgb = img_tegak
+
+            img_rgb.thumbnail((self.sisi_maks, self.sisi_maks), Image.Resampling.LANCZOS)
+
+            # Simpan tanpa exif/icc agar metadata tidak ikut terkirim
+            buffer = io.BytesIO()
+            img_rgb.save(buffer, format='JPEG', quality=self.kualitas_jpeg, optimize=True)
+            data_baru = buffer.getvalue()
+
+            if not diperkecil and format_asli in ('PNG', 'GIF'):
+                buffer = io.BytesIO()
+                img_rgb.save(buffer, format='PNG')
+                data_lossless = buffer.getvalue()
+
+            if data_lossless is not None and len(data_lossless) < len(data_baru):
+                data_baru = data_lossless
+
+            logger.info(
+                f"Gambar dipraproses: {lebar_asli}x{tinggi_asli} -> "
+                f"{img_rgb.width}x{img_rgb.height}, "
+                f"{len(data_gambar)} -> {len(data_baru)} bytes"
+            )
+            return (
+                data_baru,
+                lebar_asli / img_rgb.width,
+                tinggi_asli / img_rgb.height
+            )
+        except Exception as e:
+            logger.warning(f"Praproses gambar gagal, mengirim gambar asli: {str(e)}")
+            return data_gambar, 1.0, 1.0
+
     def dapatkan_info_gambar(self, path_gambar: str) -> Dict:
         """
         Dapatkan informasi tambahan tentang gambar (resolusi, format, ukuran).
@@ -113,18 +544,42 @@ class ComputerVisionService:
             path_gambar: Path lengkap ke file gambar
 
         Returns:
-            Dict: Informasi gambar (width, height, format, size)
+            Dict: Informasi gambar (width, height, format, size, hash_perseptual)
+        """
+        return self._baca_info_gambar(path_gambar)
+
+    @ukur_tahap('info_gambar')
+    def dapatkan_info_gambar_bytes(self, data_gambar: bytes) -> Dict:
+        """
+        Dapatkan informasi gambar dari byte yang sudah ada di memori.
+
+        Piksel hanya di-decode pada resolusi kecil untuk hash perseptual.
+
+        Args:
+            data_gambar: Byte gambar
+
+        Returns:
+            Dict: Informasi gambar (width, height, format, size, hash_perseptual,
+                  hash_isi)
         """
+        info = self._baca_info_gambar(io.BytesIO(data_gambar))
+        info['size'] = len(data_gambar)
+        info['hash_isi'] = hitung_hash_gambar(data_gambar)
+        return info
+
+    def _baca_info_gambar(self, sumber) -> Dict:
+        """Baca info gambar dari path atau objek file."""
         try:
-            with Image.open(path_gambar) as img:
+            with Image.open(sumber) as img:
                 info = {
                     'width': img.width,
                     'height': img.height,
                     'format': img.format,
                     'mode': img.mode,
-                    'resolusi': f"{img.width}x{img.height}"
+                    'resolusi': f"{img.width}x{img.height}",
+                    'hash_perseptual': self._hitung_hash_perseptual(img)
                 }
-                logger.info(f"Info gambar: {info}")
+                logger.debug(f"Info gambar: {info}")
                 return info
         except Exception as e:
             logger.error(f"Error mendapatkan info gambar: {str(e)}")
@@ -133,5 +588,15 @@ class ComputerVisionService:
                 'height': 0,
                 'format': 'unknown',
                 'mode': 'unknown',
-                'resolusi': 'unknown'
+                'resolusi': 'unknown',
+                'hash_perseptual': None
             }
+
+    @staticmethod
+    def _hitung_hash_perseptual(img: Image.Image) -> Optional[str]:
+        """Hitung dHash gambar; None jika piksel gambar tidak bisa di-decode."""
+        try:
+            return hitung_dhash(img)
+        except Exception as e:
+            logger.warning(f"Gagal menghitung hash perseptual: {str(e)}")
+            return None
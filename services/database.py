@@ -5,33 +5,430 @@ Modul ini berisi fungsi-fungsi untuk berinteraksi dengan Azure SQL Database
 untuk menyimpan dan mengambil hasil deteksi brand.
 """
 
+import re
+import ast
+import uuid
 import logging
-from typing import List, Dict, Optional
-from datetime import datetime
+from typing import Any, Callable, Iterator, List, Dict, Optional, Set, Tuple, TypeVar
+from datetime import date, datetime
 import pyodbc # type: ignore
 
+from .cache_baca import CacheBaca
+from .metrik import ukur_query
+from .pool_koneksi import PoolKoneksi
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
+T = TypeVar('T')
+
+# Akhiran notes skema lama yang menyimpan posisi logo sebagai teks
+_POLA_POSISI_LAMA = re.compile(r"\s*-\s*posisi:\s*(\{.*\})\s*$")
+
+
+def _parse_resolusi(resolusi: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """Parse resolusi 'LEBARxTINGGI' menjadi (lebar, tinggi); (None, None) jika tidak valid."""
+    lebar, _, tinggi = (resolusi or '').partition('x')
+    if lebar.isdigit() and tinggi.isdigit():
+        return int(lebar), int(tinggi)
+    return None, None
+
+
+def _pisahkan_posisi(notes: Optional[str]) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    Pisahkan posisi logo dari notes skema lama.
+
+    Args:
+        notes: Notes lama, contoh "Deteksi otomatis - posisi: {'x': 1, ...}"
+
+    Returns:
+        Tuple: Rectangle (atau None) dan sisa notes (None jika hanya berisi
+               catatan bawaan "Deteksi otomatis")
+    """
+    if not notes:
+        return None, notes
+    cocok = _POLA_POSISI_LAMA.search(notes)
+    if not cocok:
+        return None, notes
+    try:
+        rectangle = ast.literal_eval(cocok.group(1))
+    except (ValueError, SyntaxError):
+        return None, notes
+    if not isinstance(rectangle, dict):
+        return None, notes
+
+    sisa = notes[:cocok.start()].strip()
+    rectangle = {kunci: rectangle.get(kunci) for kunci in ('x', 'y', 'w', 'h')}
+    return rectangle, (None if sisa in ('', 'Deteksi otomatis') else sisa)
+
+
+def _kelompokkan_baris_lama(rows: List[Any]) -> List[List[Any]]:
+    """
+    Kelompokkan baris BrandDetection berurutan yang berasal dari satu gambar.
+
+    Satu unggahan dulu disimpan sebagai beberapa baris berurutan dengan info
+    gambar yang sama dan waktu upload yang sama (per detik).
+    """
+    kelompok: List[List[Any]] = []
+    identitas_terakhir = None
+    for row in rows:
+        waktu = row.upload_timestamp.replace(microsecond=0) if row.upload_timestamp else None
+        identitas = (
+            row.image_name, row.image_path, row.resolution,
+            row.perceptual_hash, row.position_type, waktu
+        )
+        if kelompok and identitas == identitas_terakhir:
+            kelompok[-1].append(row)
+        else:
+            kelompok.append([row])
+        identitas_terakhir = identitas
+    return kelompok
+
+
+def _hapus_tabel_lama(koneksi: Any) -> None:
+    """Hapus tabel lama BrandDetection setelah migrasi selesai."""
+    cursor = koneksi.cursor()
+    cursor.execute("DROP TABLE BrandDetection")
+    koneksi.commit()
+    cursor.close()
+
 
 class DatabaseService:
     """Service untuk berinteraksi dengan Azure SQL Database."""
 
-    def __init__(self, connection_string: str, password: str):
+    # Skema ternormalisasi: satu baris Images per gambar yang diunggah, satu
+    # baris Detections per brand (brand_id NULL = tidak ada brand terdeteksi),
+    # dan tabel dimensi Brands. Posisi logo disimpan sebagai kolom integer.
+    QUERY_TABEL = [
+        """
+        IF OBJECT_ID('Brands', 'U') IS NULL
+        CREATE TABLE Brands (
+            id INT IDENTITY(1,1) PRIMARY KEY,
+            brand_name NVARCHAR(100) NOT NULL CONSTRAINT UQ_Brands_brand_name UNIQUE
+        )
+        """,
+        """
+        IF OBJECT_ID('Images', 'U') IS NULL
+        CREATE TABLE Images (
+            id BIGINT IDENTITY(1,1) PRIMARY KEY,
+            upload_key CHAR(32) NULL,
+            image_name NVARCHAR(255) NOT NULL,
+            image_path NVARCHAR(500) NULL,
+            content_hash CHAR(64) NULL,
+            size_bytes BIGINT NULL,
+            width INT NULL,
+            height INT NULL,
+            perceptual_hash CHAR(16) NULL,
+            position_type NVARCHAR(50) NULL,
+            upload_timestamp DATETIME NOT NULL DEFAULT GETDATE()
+        )
+        """,
+        """
+        IF OBJECT_ID('Detections', 'U') IS NULL
+        CREATE TABLE Detections (
+            id BIGINT IDENTITY(1,1) PRIMARY KEY,
+            image_id BIGINT NOT NULL CONSTRAINT FK_Detections_Images REFERENCES Images (id),
+            brand_id INT NULL CONSTRAINT FK_Detections_Brands REFERENCES Brands (id),
+            confidence_score REAL NULL,
+            x INT NULL,
+            y INT NULL,
+            w INT NULL,
+            h INT NULL,
+            notes NVARCHAR(MAX) NULL
+        )
+        """
+    ]
+
+    # Indeks pendukung paginasi keyset, filter riwayat, dan query posisi
+    QUERY_INDEKS = [
+        """
+        IF NOT EXISTS (SELECT * FROM sys.indexes
+                       WHERE name = 'UX_Images_upload_key' AND object_id = OBJECT_ID('Images'))
+        CREATE UNIQUE INDEX UX_Images_upload_key
+            ON Images (upload_key)
+            WHERE upload_key IS NOT NULL
+        """,
+        """
+        IF NOT EXISTS (SELECT * FROM sys.indexes
+                       WHERE name = 'IX_Images_upload_timestamp' AND object_id = OBJECT_ID('Images'))
+        CREATE INDEX IX_Images_upload_timestamp
+            ON Images (upload_timestamp DESC, id DESC)
+        """,
+        """
+        IF NOT EXISTS (SELECT * FROM sys.indexes
+                       WHERE name = 'IX_Images_perceptual_hash' AND object_id = OBJECT_ID('Images'))
+        CREATE INDEX IX_Images_perceptual_hash
+            ON Images (id DESC)
+            INCLUDE (perceptual_hash, image_name, image_path, upload_timestamp)
+            WHERE perceptual_hash IS NOT NULL
+        """,
+        """
+        IF NOT EXISTS (SELECT * FROM sys.indexes
+                       WHERE name = 'IX_Images_content_hash' AND object_id = OBJECT_ID('Images'))
+        CREATE INDEX IX_Images_content_hash
+            ON Images (content_hash)
+            WHERE content_hash IS NOT NULL
+        """,
+        """
+        IF NOT EXISTS (SELECT * FROM sys.indexes
+                       WHERE name = 'IX_Images_image_path' AND object_id = OBJECT_ID('Images'))
+        CREATE INDEX IX_Images_image_path
+            ON Images (image_path)
+            WHERE image_path IS NOT NULL
+        """,
+        """
+        IF NOT EXISTS (SELECT * FROM sys.indexes
+                       WHERE name = 'IX_Detections_image_id' AND object_id = OBJECT_ID('Detections'))
+        CREATE INDEX IX_Detections_image_id
+            ON Detections (image_id)
+        """,
+        """
+        IF NOT EXISTS (SELECT * FROM sys.indexes
+                       WHERE name = 'IX_Detections_brand_id' AND object_id = OBJECT_ID('Detections'))
+        CREATE INDEX IX_Detections_brand_id
+            ON Detections (brand_id, id DESC)
+            INCLUDE (image_id, confidence_score)
+        """,
+        """
+        IF NOT EXISTS (SELECT * FROM sys.indexes
+                       WHERE name = 'IX_Detections_brand_posisi' AND object_id = OBJECT_ID('Detections'))
+        CREATE INDEX IX_Detections_brand_posisi
+            ON Detections (brand_id, x, y)
+            INCLUDE (w, h, confidence_score, image_id)
+            WHERE brand_id IS NOT NULL
+        """
+    ]
+
+    # Tabel lama (satu baris per brand dengan info gambar berulang) yang
+    # dipindahkan ke skema ternormalisasi oleh migrasi_skema
+    QUERY_KOLOM_TAMBAHAN_LAMA = [
+        """
+        IF OBJECT_ID('BrandDetection', 'U') IS NOT NULL
+           AND COL_LENGTH('BrandDetection', 'perceptual_hash') IS NULL
+        ALTER TABLE BrandDetection ADD perceptual_hash CHAR(16) NULL
+        """,
+        # Id Detections hasil migrasi; NULL = baris lama belum dipindahkan
+        """
+        IF OBJECT_ID('BrandDetection', 'U') IS NOT NULL
+           AND COL_LENGTH('BrandDetection', 'migrasi_id') IS NULL
+        ALTER TABLE BrandDetection ADD migrasi_id INT NULL
+        """
+    ]
+
+    QUERY_INSERT_GAMBAR = """
+    INSERT INTO Images
+    (upload_key, image_name, image_path, content_hash, size_bytes, width, height,
+     perceptual_hash, position_type, upload_timestamp)
+    OUTPUT INSERTED.id, INSERTED.upload_key
+    VALUES {nilai}
+    """
+    NILAI_INSERT_GAMBAR = "(?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, GETDATE()))"
+
+    # Batas parameter satu statement SQL Server adalah 2100
+    GAMBAR_PER_INSERT = 100
+
+    QUERY_INSERT_DETEKSI = """
+    INSERT INTO Detections (image_id, brand_id, confidence_score, x, y, w, h, notes)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    QUERY_INSERT_DETEKSI_ID_BARU = """
+    INSERT INTO Detections (image_id, brand_id, confidence_score, x, y, w, h, notes)
+    OUTPUT INSERTED.id
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    QUERY_MERGE_BRAND = """
+    MERGE Brands WITH (HOLDLOCK) AS t
+    USING (SELECT ? AS brand_name) AS s
+    ON t.brand_name = s.brand_name
+    WHEN NOT MATCHED THEN INSERT (brand_name) VALUES (s.brand_name);
+    """
+
+    # Kolom dan join riwayat (satu baris per deteksi, termasuk gambar tanpa brand)
+    QUERY_SELECT_RIWAYAT = """
+    SELECT {top}
+        d.id, i.image_name, b.brand_name, d.confidence_score,
+        i.upload_timestamp, i.image_path, i.width, i.height, i.position_type,
+        d.notes, d.x, d.y, d.w, d.h
+    FROM Detections d
+    JOIN Images i ON i.id = d.image_id
+    LEFT JOIN Brands b ON b.id = d.brand_id
+    {where}
+    ORDER BY d.id {urutan}
+    """
+
+    # Batas keras jumlah record per halaman riwayat
+    LIMIT_RIWAYAT_MAKS = 500
+
+    # Tabel ringkasan statistik yang diperbarui di transaksi yang sama dengan insert
+    QUERY_TABEL_STATISTIK = [
+        """
+        IF OBJECT_ID('BrandDetectionStatistikBrand', 'U') IS NULL
+        CREATE TABLE BrandDetectionStatistikBrand (
+            brand_name NVARCHAR(100) NOT NULL PRIMARY KEY,
+            jumlah BIGINT NOT NULL,
+            jumlah_confidence FLOAT NOT NULL,
+            jumlah_terisi BIGINT NOT NULL
+        )
+        """,
+        """
+        IF OBJECT_ID('BrandDetectionStatistikHarian', 'U') IS NULL
+        CREATE TABLE BrandDetectionStatistikHarian (
+            tanggal DATE NOT NULL,
+            brand_name NVARCHAR(100) NOT NULL,
+            jumlah BIGINT NOT NULL,
+            jumlah_confidence FLOAT NOT NULL,
+            jumlah_terisi BIGINT NOT NULL,
+            PRIMARY KEY (tanggal, brand_name)
+        )
+        """
+    ]
+
+    QUERY_MERGE_STATISTIK_BRAND = """
+    MERGE BrandDetectionStatistikBrand WITH (HOLDLOCK) AS t
+    USING (SELECT ? AS brand_name, ? AS jumlah, ? AS jumlah_confidence, ? AS jumlah_terisi) AS s
+    ON t.brand_name = s.brand_name
+    WHEN MATCHED THEN UPDATE SET
+        jumlah = t.jumlah + s.jumlah,
+        jumlah_confidence = t.jumlah_confidence + s.jumlah_confidence,
+        jumlah_terisi = t.jumlah_terisi + s.jumlah_terisi
+    WHEN NOT MATCHED THEN
+        INSERT (brand_name, jumlah, jumlah_confidence, jumlah_terisi)
+        VALUES (s.brand_name, s.jumlah, s.jumlah_confidence, s.jumlah_terisi);
+    """
+
+    QUERY_MERGE_STATISTIK_HARIAN = """
+    MERGE BrandDetectionStatistikHarian WITH (HOLDLOCK) AS t
+    USING (SELECT CAST(COALESCE(?, GETDATE()) AS DATE) AS tanggal, ? AS brand_name, ? AS jumlah,
+                  ? AS jumlah_confidence, ? AS jumlah_terisi) AS s
+    ON t.tanggal = s.tanggal AND t.brand_name = s.brand_name
+    WHEN MATCHED THEN UPDATE SET
+        jumlah = t.jumlah + s.jumlah,
+        jumlah_confidence = t.jumlah_confidence + s.jumlah_confidence,
+        jumlah_terisi = t.jumlah_terisi + s.jumlah_terisi
+    WHEN NOT MATCHED THEN
+        INSERT (tanggal, brand_name, jumlah, jumlah_confidence, jumlah_terisi)
+        VALUES (s.tanggal, s.brand_name, s.jumlah, s.jumlah_confidence, s.jumlah_terisi);
+    """
+
+    def __init__(
+        self,
+        connection_string: str,
+        password: str,
+        ukuran_pool: int = 5,
+        idle_maks: float = 300.0,
+        umur_maks: float = 1800.0,
+        timeout_pool: float = 10.0,
+        cache_baca: Optional[CacheBaca] = None
+    ):
         """
         Inisialisasi Database Service.
 
         Args:
             connection_string: String koneksi ke Azure SQL Database (dengan placeholder password)
             password: Password untuk database
+            ukuran_pool: Jumlah maksimal koneksi di pool per proses
+            idle_maks: Detik maksimal koneksi menganggur di pool
+            umur_maks: Detik maksimal umur sebuah koneksi
+            timeout_pool: Detik maksimal menunggu koneksi saat pool penuh
+            cache_baca: Cache read-through untuk statistik dan riwayat (opsional)
         """
         # Ganti placeholder password dengan password sebenarnya
         self.connection_string = connection_string.replace('{password}', password)
+        self.pool = PoolKoneksi(
+            self._buat_koneksi,
+            ukuran_maks=ukuran_pool,
+            idle_maks=idle_maks,
+            umur_maks=umur_maks,
+            timeout_ambil=timeout_pool
+        )
+        self.cache_baca = cache_baca
+        # Id per nama brand; hanya diisi setelah transaksi insert ter-commit
+        self._id_brand_dikenal: Dict[str, int] = {}
         logger.info("Database Service berhasil diinisialisasi")
 
+    def _buat_koneksi(self) -> pyodbc.Connection:
+        """
+        Buat koneksi fisik baru untuk pool.
+
+        Returns:
+            pyodbc.Connection
+
+        Raises:
+            pyodbc.Error: Jika koneksi gagal dibuat
+        """
+        koneksi = pyodbc.connect(self.connection_string)
+        logger.debug("Koneksi database berhasil dibuat")
+        return koneksi
+
+    @staticmethod
+    def _error_koneksi(error: Exception) -> bool:
+        """Cek apakah error disebabkan koneksi terputus (SQLSTATE kelas 08)."""
+        return (
+            isinstance(error, pyodbc.Error)
+            and bool(error.args)
+            and str(error.args[0]).startswith('08')
+        )
+
+    def _jalankan(self, operasi: Callable[[Any], T]) -> T:
+        """
+        Jalankan operasi dengan koneksi dari pool.
+
+        Jika koneksi ternyata terputus, koneksi dibuang dan operasi diulang
+        sekali dengan koneksi baru.
+
+        Args:
+            operasi: Fungsi yang menerima koneksi dan mengembalikan hasil
+
+        Returns:
+            Hasil dari operasi
+        """
+        nama_operasi = self._nama_operasi(operasi)
+        try:
+            with self.pool.koneksi() as koneksi, ukur_query(nama_operasi):
+                return operasi(koneksi)
+        except Exception as e:
+            if not self._error_koneksi(e):
+                raise
+            logger.warning(f"Koneksi database terputus, mencoba ulang: {str(e)}")
+
+        with self.pool.koneksi() as koneksi, ukur_query(nama_operasi):
+            return operasi(koneksi)
+
+    @staticmethod
+    def _nama_operasi(operasi: Callable[[Any], T]) -> str:
+        """Nama method pemilik fungsi operasi (label metrik query)."""
+        # Contoh: 'DatabaseService.dapatkan_riwayat.<locals>.operasi' -> 'dapatkan_riwayat'
+        return operasi.__qualname__.split('.<locals>')[0].rsplit('.', 1)[-1]
+
+    def _baca(self, kunci_cache: str, operasi: Callable[[Any], T]) -> T:
+        """
+        Jalankan query baca lewat cache_baca jika aktif.
+
+        Args:
+            kunci_cache: Kunci cache yang mewakili query dan parameternya
+            operasi: Fungsi query yang menerima koneksi
+
+        Returns:
+            Hasil query (dari cache atau database)
+        """
+        if not self.cache_baca:
+            return self._jalankan(operasi)
+        return self.cache_baca.ambil_atau_hitung(kunci_cache, lambda: self._jalankan(operasi))
+
+    def _invalidasi_cache(self) -> None:
+        """Invalidasi cache baca setelah data berubah."""
+        if self.cache_baca:
+            self.cache_baca.invalidasi()
+
+    def tutup(self) -> None:
+        """Tutup semua koneksi idle di pool."""
+        self.pool.tutup_semua()
+
     def dapatkan_koneksi(self) -> Optional[pyodbc.Connection]:
         """
-        Buat koneksi baru ke database.
+        Buat koneksi baru ke database di luar pool.
 
         Returns:
             pyodbc.Connection atau None jika gagal
@@ -46,40 +443,116 @@ class DatabaseService:
 
     def inisialisasi_database(self) -> bool:
         """
-        Buat tabel BrandDetection jika belum ada.
+        Buat tabel skema ternormalisasi beserta indeksnya jika belum ada.
+
+        Jika tabel lama BrandDetection masih ada saat Detections pertama kali
+        dibuat, identity Detections dimulai dari id terbesar BrandDetection + 1
+        (tabel yang belum pernah berisi memakai nilai reseed itu sendiri untuk
+        baris pertamanya) agar migrasi_skema bisa memindahkan baris lama dengan
+        id yang sama
+        (cursor riwayat dan rentang ekspor yang sudah dipegang klien tetap
+        berlaku).
 
         Returns:
             bool: True jika berhasil, False jika gagal
         """
-        query_create_table = """
-        IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='BrandDetection' AND xtype='U')
-        CREATE TABLE BrandDetection (
-            id INT IDENTITY(1,1) PRIMARY KEY,
-            image_name NVARCHAR(255) NOT NULL,
-            brand_name NVARCHAR(100),
-            confidence_score FLOAT,
-            upload_timestamp DATETIME DEFAULT GETDATE(),
-            image_path NVARCHAR(500),
-            resolution NVARCHAR(50),
-            position_type NVARCHAR(50),
-            notes NVARCHAR(MAX)
-        );
-        """
-
-        koneksi = self.dapatkan_koneksi()
-        if not koneksi:
-            return False
+        def operasi(koneksi: pyodbc.Connection) -> bool:
+            cursor = koneksi.cursor()
+            cursor.execute("SELECT OBJECT_ID('Detections', 'U'), OBJECT_ID('BrandDetection', 'U')")
+            id_detections, id_tabel_lama = cursor.fetchone()
+
+            for query_tabel in self.QUERY_TABEL:
+                cursor.execute(query_tabel)
+            for query_indeks in self.QUERY_INDEKS:
+                cursor.execute(query_indeks)
+            for query_kolom in self.QUERY_KOLOM_TAMBAHAN_LAMA:
+                cursor.execute(query_kolom)
+
+            if id_detections is None and id_tabel_lama is not None:
+                cursor.execute("SELECT MAX(id) FROM BrandDetection")
+                id_terakhir_lama = cursor.fetchone()[0]
+                if id_terakhir_lama:
+                    cursor.execute(f"DBCC CHECKIDENT ('Detections', RESEED, {int(id_terakhir_lama) + 1})")
+                    logger.warning(
+                        "Tabel lama BrandDetection ditemukan, jalankan 'flask migrasi-skema' "
+                        "untuk memindahkan datanya ke skema baru"
+                    )
+
+            cursor.execute("SELECT OBJECT_ID('BrandDetectionStatistikBrand', 'U')")
+            tabel_statistik_baru = cursor.fetchone()[0] is None
+            for query_tabel in self.QUERY_TABEL_STATISTIK:
+                cursor.execute(query_tabel)
+            koneksi.commit()
+            cursor.close()
+            return tabel_statistik_baru
 
         try:
+            tabel_statistik_baru = self._jalankan(operasi)
+            logger.info("Tabel Images, Detections, dan Brands berhasil diinisialisasi")
+        except Exception as e:
+            logger.error(f"Gagal membuat tabel: {str(e)}")
+            return False
+
+        # Data lama perlu diringkas sekali saat tabel statistik baru dibuat
+        if tabel_statistik_baru:
+            return self.bangun_ulang_statistik()
+        return True
+
+    def bangun_ulang_statistik(self) -> bool:
+        """
+        Hitung ulang tabel ringkasan statistik dari seluruh isi Detections.
+
+        Dipakai untuk backfill data lama atau memperbaiki ringkasan. Selama
+        proses berjalan, insert baru menunggu sampai transaksi ini selesai
+        agar tidak ada baris yang terhitung ganda.
+
+        Returns:
+            bool: True jika berhasil, False jika gagal
+        """
+        def operasi(koneksi: pyodbc.Connection) -> None:
             cursor = koneksi.cursor()
-            cursor.execute(query_create_table)
+
+            # Kunci tabel dengan urutan yang sama dengan insert (Images lalu Detections)
+            cursor.execute("SELECT COUNT(*) FROM Images WITH (TABLOCK, HOLDLOCK)")
+            cursor.fetchone()
+            cursor.execute("SELECT COUNT(*) FROM Detections WITH (TABLOCK, HOLDLOCK)")
+            cursor.fetchone()
+
+            cursor.execute("DELETE FROM BrandDetectionStatistikBrand")
+            cursor.execute("DELETE FROM BrandDetectionStatistikHarian")
+            cursor.execute(
+                """
+                INSERT INTO BrandDetectionStatistikBrand
+                    (brand_name, jumlah, jumlah_confidence, jumlah_terisi)
+                SELECT b.brand_name, COUNT(*), COALESCE(SUM(d.confidence_score), 0),
+                       COUNT(d.confidence_score)
+                FROM Detections d
+                JOIN Brands b ON b.id = d.brand_id
+                GROUP BY b.brand_name
+                """
+            )
+            cursor.execute(
+                """
+                INSERT INTO BrandDetectionStatistikHarian
+                    (tanggal, brand_name, jumlah, jumlah_confidence, jumlah_terisi)
+                SELECT CAST(i.upload_timestamp AS DATE), b.brand_name, COUNT(*),
+                       COALESCE(SUM(d.confidence_score), 0), COUNT(d.confidence_score)
+                FROM Detections d
+                JOIN Brands b ON b.id = d.brand_id
+                JOIN Images i ON i.id = d.image_id
+                GROUP BY CAST(i.upload_timestamp AS DATE), b.brand_name
+                """
+            )
             koneksi.commit()
             cursor.close()
-            koneksi.close()
-            logger.info("Tabel BrandDetection berhasil diinisialisasi")
+
+        try:
+            self._jalankan(operasi)
+            self._invalidasi_cache()
+            logger.info("Tabel ringkasan statistik berhasil dibangun ulang")
             return True
         except Exception as e:
-            logger.error(f"Gagal membuat tabel: {str(e)}")
+            logger.error(f"Gagal membangun ulang statistik: {str(e)}")
             return False
 
     def simpan_hasil_deteksi(self, data: Dict) -> bool:
@@ -91,125 +564,777 @@ class DatabaseService:
                   - image_name: Nama file gambar
                   - brand_name: Nama brand yang terdeteksi (optional)
                   - confidence_score: Skor confidence (optional)
+                  - rectangle: Posisi logo {x, y, w, h} (optional)
                   - image_path: Path file gambar (optional)
-                  - resolution: Resolusi gambar (optional)
+                  - resolution: Resolusi gambar 'LEBARxTINGGI' (optional)
+                  - size_bytes: Ukuran file gambar (optional)
+                  - content_hash: Hash SHA-256 isi gambar (optional)
                   - position_type: Tipe posisi untuk eksperimen (optional)
                   - notes: Catatan tambahan (optional)
+                  - perceptual_hash: Hash perseptual gambar (optional)
+                  - upload_key: Kunci unik satu gambar yang diunggah; baris
+                    dengan upload_key sama disimpan sebagai satu gambar
+                    (optional)
 
         Returns:
             bool: True jika berhasil, False jika gagal
         """
-        query = """
-        INSERT INTO BrandDetection
-        (image_name, brand_name, confidence_score, image_path, resolution, position_type, notes)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
+        return self.simpan_hasil_deteksi_batch([data])
+
+    def simpan_hasil_deteksi_batch(self, daftar_data: List[Dict], lempar_error_koneksi: bool = False) -> bool:
         """
+        Simpan banyak hasil deteksi sekaligus dalam satu transaksi.
 
-        koneksi = self.dapatkan_koneksi()
-        if not koneksi:
-            return False
+        Baris dikelompokkan per gambar: info gambar ditulis sekali ke Images
+        (multi-row insert per GAMBAR_PER_INSERT gambar), lalu semua baris
+        Detections dikirim dengan satu executemany (fast_executemany) dan
+        di-commit sekali.
+
+        Args:
+            daftar_data: List dictionary dengan keys yang sama seperti
+                         simpan_hasil_deteksi
+            lempar_error_koneksi: True untuk melempar error koneksi (SQLSTATE
+                                  kelas 08) alih-alih mengembalikan False, agar
+                                  pemanggil bisa membedakan database mati dari
+                                  batch yang ditolak
+
+        Returns:
+            bool: True jika semua baris tersimpan, False jika gagal (tidak ada
+                  baris yang tersimpan)
+
+        Raises:
+            pyodbc.Error: Jika lempar_error_koneksi dan koneksi database gagal
+        """
+        if not daftar_data:
+            return True
+
+        daftar_gambar = self._kelompokkan_per_gambar(daftar_data)
+        nama_brand = {data['brand_name'] for data in daftar_data if data.get('brand_name')}
+
+        def operasi(koneksi: pyodbc.Connection) -> Dict[str, int]:
+            cursor = koneksi.cursor()
+            id_brand = self._id_brand(cursor, nama_brand)
+            id_gambar = self._insert_gambar(cursor, [gambar for gambar, _ in daftar_gambar])
+
+            daftar_baris = [
+                self._baris_deteksi(id_gambar[gambar['upload_key']], id_brand, data)
+                for gambar, daftar_deteksi in daftar_gambar
+                for data in daftar_deteksi
+            ]
+            cursor.fast_executemany = True
+            cursor.executemany(self.QUERY_INSERT_DETEKSI, daftar_baris)
+            self._perbarui_statistik(cursor, [
+                (data.get('brand_name'), data.get('confidence_score'), gambar['upload_timestamp'])
+                for gambar, daftar_deteksi in daftar_gambar
+                for data in daftar_deteksi
+            ])
+            koneksi.commit()
+            cursor.close()
+            return id_brand
 
         try:
+            id_brand = self._jalankan(operasi)
+            # Id brand baru hanya diingat setelah transaksinya ter-commit
+            self._id_brand_dikenal.update(id_brand)
+            self._invalidasi_cache()
+            logger.info(
+                f"{len(daftar_data)} hasil deteksi dari {len(daftar_gambar)} gambar "
+                f"berhasil disimpan dalam satu batch"
+            )
+            return True
+        except Exception as e:
+            if lempar_error_koneksi and self._error_koneksi(e):
+                raise
+            logger.error(f"Gagal menyimpan batch hasil deteksi: {str(e)}")
+            return False
+
+    @staticmethod
+    def lengkapi_upload_key(daftar_data: List[Dict]) -> List[Dict]:
+        """
+        Beri upload_key pada baris hasil deteksi yang belum memilikinya.
+
+        Baris tanpa upload_key memakai kunci baris sebelumnya jika info
+        gambarnya sama persis, selain itu diberi kunci baru. upload_key
+        adalah kunci idempoten penyimpanan: gambar dengan kunci yang sudah
+        ada di tabel Images tidak akan tersimpan dua kali.
+
+        Args:
+            daftar_data: Baris hasil deteksi (tidak diubah)
+
+        Returns:
+            List[Dict]: Salinan baris yang semuanya memiliki upload_key
+        """
+        hasil: List[Dict] = []
+        identitas_terakhir: Optional[tuple] = None
+        for data in daftar_data:
+            identitas = (
+                data.get('image_name', ''), data.get('image_path'), data.get('resolution'),
+                data.get('perceptual_hash'), data.get('position_type')
+            )
+            kunci = data.get('upload_key')
+            if kunci is None:
+                if identitas == identitas_terakhir and hasil:
+                    kunci = hasil[-1]['upload_key']
+                else:
+                    kunci = uuid.uuid4().hex
+            identitas_terakhir = identitas
+            hasil.append({**data, 'upload_key': kunci})
+        return hasil
+
+    @classmethod
+    def _kelompokkan_per_gambar(cls, daftar_data: List[Dict]) -> List[Tuple[Dict, List[Dict]]]:
+        """
+        Kelompokkan baris hasil deteksi per gambar (per upload_key).
+
+        Returns:
+            List pasangan (info gambar untuk Images, baris deteksinya)
+        """
+        hasil: List[Tuple[Dict, List[Dict]]] = []
+        per_kunci: Dict[str, List[Dict]] = {}
+
+        for data in cls.lengkapi_upload_key(daftar_data):
+            kunci = data['upload_key']
+            if kunci in per_kunci:
+                per_kunci[kunci].append(data)
+                continue
+
+            lebar, tinggi = _parse_resolusi(data.get('resolution'))
+            gambar = {
+                'upload_key': kunci,
+                'image_name': data.get('image_name', ''),
+                'image_path': data.get('image_path'),
+                'content_hash': data.get('content_hash'),
+                'size_bytes': data.get('size_bytes'),
+                'width': lebar,
+                'height': tinggi,
+                'perceptual_hash': data.get('perceptual_hash'),
+                'position_type': data.get('position_type'),
+                'upload_timestamp': data.get('upload_timestamp')
+            }
+            per_kunci[kunci] = [data]
+            hasil.append((gambar, per_kunci[kunci]))
+        return hasil
+
+    def _id_brand(self, cursor: pyodbc.Cursor, nama_brand: Set[str]) -> Dict[str, int]:
+        """
+        Ambil id brand dari tabel Brands, tambahkan brand yang belum ada.
+
+        Args:
+            cursor: Cursor transaksi insert yang sedang berjalan
+            nama_brand: Nama brand yang dibutuhkan
+
+        Returns:
+            Dict[str, int]: Id per nama brand
+        """
+        id_brand = {nama: self._id_brand_dikenal[nama] for nama in nama_brand if nama in self._id_brand_dikenal}
+        belum_dikenal = sorted(nama_brand - id_brand.keys())
+        if not belum_dikenal:
+            return id_brand
+
+        for nama in belum_dikenal:
+            cursor.execute(self.QUERY_MERGE_BRAND, nama)
+        tanda_tanya = ', '.join('?' for _ in belum_dikenal)
+        cursor.execute(f"SELECT id, brand_name FROM Brands WHERE brand_name IN ({tanda_tanya})", belum_dikenal)
+        for row in cursor.fetchall():
+            id_brand[row.brand_name] = row.id
+        return id_brand
+
+    def _insert_gambar(self, cursor: pyodbc.Cursor, daftar_gambar: List[Dict]) -> Dict[str, int]:
+        """
+        Insert baris Images per kelompok GAMBAR_PER_INSERT gambar.
+
+        Returns:
+            Dict[str, int]: Id Images per upload_key
+        """
+        id_gambar: Dict[str, int] = {}
+        for awal in range(0, len(daftar_gambar), self.GAMBAR_PER_INSERT):
+            kelompok = daftar_gambar[awal:awal + self.GAMBAR_PER_INSERT]
+            query = self.QUERY_INSERT_GAMBAR.format(
+                nilai=', '.join(self.NILAI_INSERT_GAMBAR for _ in kelompok)
+            )
+            parameter = [
+                nilai
+                for gambar in kelompok
+                for nilai in (
+                    gambar['upload_key'], gambar['image_name'], gambar['image_path'],
+                    gambar['content_hash'], gambar['size_bytes'], gambar['width'],
+                    gambar['height'], gambar['perceptual_hash'], gambar['position_type'],
+                    gambar['upload_timestamp']
+                )
+            ]
+            cursor.execute(query, parameter)
+            for row in cursor.fetchall():
+                id_gambar[row.upload_key] = row.id
+        return id_gambar
+
+    @staticmethod
+    def _baris_deteksi(id_gambar: int, id_brand: Dict[str, int], data: Dict) -> tuple:
+        """Ubah dictionary hasil deteksi menjadi tuple parameter QUERY_INSERT_DETEKSI."""
+        rectangle = data.get('rectangle') or {}
+        return (
+            id_gambar,
+            id_brand.get(data.get('brand_name')),
+            data.get('confidence_score'),
+            rectangle.get('x'),
+            rectangle.get('y'),
+            rectangle.get('w'),
+            rectangle.get('h'),
+            data.get('notes')
+        )
+
+    def _perbarui_statistik(
+        self,
+        cursor: pyodbc.Cursor,
+        daftar_brand: List[Tuple[Optional[str], Any, Optional[datetime]]]
+    ) -> None:
+        """
+        Tambahkan baris yang baru di-insert ke tabel ringkasan statistik.
+
+        Dipanggil di dalam transaksi insert sehingga ringkasan selalu
+        konsisten dengan isi Detections. Ringkasan harian memakai tanggal
+        upload_timestamp gambar (bukan waktu tulis), sama seperti
+        bangun_ulang_statistik, sehingga baris dari spool yang ditulis
+        belakangan tetap masuk ke hari uploadnya.
+
+        Args:
+            cursor: Cursor dari transaksi insert yang sedang berjalan
+            daftar_brand: Tuple (nama brand, confidence, upload_timestamp) baris
+                          yang baru di-insert; upload_timestamp None berarti
+                          GETDATE() seperti default kolomnya
+        """
+        per_brand: Dict[str, List] = {}
+        per_hari: Dict[Tuple[Optional[date], str], List] = {}
+        for brand_name, confidence, upload_timestamp in daftar_brand:
+            if brand_name is None:
+                continue
+            tanggal = upload_timestamp.date() if upload_timestamp is not None else None
+            for akumulasi in (
+                per_brand.setdefault(brand_name, [brand_name, 0, 0.0, 0]),
+                per_hari.setdefault((tanggal, brand_name), [tanggal, brand_name, 0, 0.0, 0])
+            ):
+                akumulasi[-3] += 1
+                if confidence is not None:
+                    akumulasi[-2] += confidence
+                    akumulasi[-1] += 1
+
+        if not per_brand:
+            return
+
+        cursor.executemany(self.QUERY_MERGE_STATISTIK_BRAND, [tuple(a) for a in per_brand.values()])
+        cursor.executemany(self.QUERY_MERGE_STATISTIK_HARIAN, [tuple(a) for a in per_hari.values()])
+
+    def dapatkan_upload_key_tersimpan(self, daftar_kunci: List[str]) -> Set[str]:
+        """
+        Cari upload_key yang gambarnya sudah ada di tabel Images.
+
+        Dipakai sebelum menulis ulang hasil yang mungkin sudah tersimpan
+        (misalnya flush spool yang terputus setelah commit). Tidak memakai
+        cache baca.
+
+        Args:
+            daftar_kunci: upload_key yang akan diperiksa
+
+        Returns:
+            Set[str]: upload_key yang sudah tersimpan
+
+        Raises:
+            Exception: Jika query gagal
+        """
+        daftar_kunci = list(dict.fromkeys(daftar_kunci))
+
+        def operasi(koneksi: pyodbc.Connection) -> Set[str]:
+            cursor = koneksi.cursor()
+            tersimpan: Set[str] = set()
+            # Batas parameter per query SQL Server adalah 2100
+            for awal in range(0, len(daftar_kunci), 1000):
+                kelompok = daftar_kunci[awal:awal + 1000]
+                tanda_tanya = ', '.join('?' for _ in kelompok)
+                cursor.execute(f"SELECT upload_key FROM Images WHERE upload_key IN ({tanda_tanya})", kelompok)
+                tersimpan.update(row.upload_key for row in cursor.fetchall())
+            cursor.close()
+            return tersimpan
+
+        if not daftar_kunci:
+            return set()
+        return self._jalankan(operasi)
+
+    def migrasi_skema(self, ukuran_batch: int = 5000, hapus_tabel_lama: bool = False) -> Optional[Dict[str, int]]:
+        """
+        Pindahkan isi tabel lama BrandDetection ke Images/Detections/Brands.
+
+        Baris dipindahkan per batch dalam transaksi terpisah dengan id yang
+        sama, sehingga migrasi bisa dihentikan dan dijalankan ulang kapan pun
+        sementara aplikasi tetap menulis ke skema baru. Kemajuan dicatat di
+        kolom BrandDetection.migrasi_id (id Detections hasil migrasi), bukan
+        ditebak dari id Detections. Baris lama yang id-nya sudah dipakai
+        deteksi baru mendapat id baru. Baris berurutan dengan info gambar dan waktu upload (per
+        detik) yang sama dianggap satu gambar. Posisi logo diambil dari teks
+        notes lama ("... posisi: {...}") ke kolom x/y/w/h.
+
+        Args:
+            ukuran_batch: Jumlah baris lama per transaksi
+            hapus_tabel_lama: Hapus BrandDetection setelah semua baris pindah
+
+        Returns:
+            Dict: Jumlah baris, gambar, dan sisa baris yang belum pindah,
+                  atau None jika gagal
+        """
+        query_batch = """
+        SELECT TOP (?)
+            id, image_name, brand_name, confidence_score, upload_timestamp,
+            image_path, resolution, position_type, notes, perceptual_hash
+        FROM BrandDetection l
+        WHERE id > ? AND migrasi_id IS NULL
+        ORDER BY id
+        """
+        # Baris yang dipindahkan versi sebelumnya (tanpa kolom migrasi_id):
+        # id sama dan gambar yang sama di Images
+        query_tandai_lama = """
+        UPDATE l SET migrasi_id = l.id
+        FROM BrandDetection l
+        WHERE l.migrasi_id IS NULL AND EXISTS (
+            SELECT 1 FROM Detections d JOIN Images i ON i.id = d.image_id
+            WHERE d.id = l.id AND i.image_name = l.image_name
+              AND ABS(DATEDIFF(SECOND, i.upload_timestamp, l.upload_timestamp)) <= 1
+        )
+        """
+
+        def awal(koneksi: pyodbc.Connection) -> Optional[int]:
             cursor = koneksi.cursor()
+            cursor.execute("SELECT OBJECT_ID('BrandDetection', 'U')")
+            if cursor.fetchone()[0] is None:
+                cursor.close()
+                return None
+            cursor.execute(query_tandai_lama)
+            koneksi.commit()
+            # Mulai tepat sebelum baris lama terkecil yang belum pindah
+            cursor.execute("SELECT COALESCE(MIN(id) - 1, 0) FROM BrandDetection WHERE migrasi_id IS NULL")
+            id_terakhir = cursor.fetchone()[0]
+            cursor.close()
+            return id_terakhir
+
+        def pindahkan_batch(koneksi: pyodbc.Connection, id_setelah: int) -> Tuple[int, int, int]:
+            cursor = koneksi.cursor()
+            cursor.execute(query_batch, [ukuran_batch, id_setelah])
+            rows = cursor.fetchall()
+            if not rows:
+                cursor.close()
+                return 0, 0, id_setelah
+
+            kelompok = _kelompokkan_baris_lama(rows)
+            # Gambar terakhir di batch penuh mungkin berlanjut di batch berikutnya
+            if len(rows) == ukuran_batch and len(kelompok) > 1:
+                kelompok.pop()
+
+            daftar_data: List[Dict] = []
+            for baris_gambar in kelompok:
+                kunci = uuid.uuid4().hex
+                for row in baris_gambar:
+                    rectangle, notes = _pisahkan_posisi(row.notes)
+                    daftar_data.append({
+                        'id': row.id,
+                        'upload_key': kunci,
+                        'image_name': row.image_name,
+                        'brand_name': row.brand_name,
+                        'confidence_score': row.confidence_score,
+                        'rectangle': rectangle,
+                        'image_path': row.image_path,
+                        'resolution': row.resolution,
+                        'position_type': row.position_type,
+                        'notes': notes,
+                        'perceptual_hash': row.perceptual_hash,
+                        'upload_timestamp': row.upload_timestamp
+                    })
+
+            daftar_gambar = self._kelompokkan_per_gambar(daftar_data)
+            id_brand = self._id_brand(
+                cursor, {data['brand_name'] for data in daftar_data if data['brand_name']}
+            )
+            id_gambar = self._insert_gambar(cursor, [gambar for gambar, _ in daftar_gambar])
+            daftar_baris = [
+                (data['id'], *self._baris_deteksi(id_gambar[gambar['upload_key']], id_brand, data))
+                for gambar, daftar_deteksi in daftar_gambar
+                for data in daftar_deteksi
+            ]
+
+            # Id yang sudah dipakai deteksi baru (hanya terjadi jika identity
+            # Detections pernah di-reseed tanpa jarak) tidak bisa dipertahankan
             cursor.execute(
-                query,
-                (
-                    data.get('image_name', ''),
-                    data.get('brand_name'),
-                    data.get('confidence_score'),
-                    data.get('image_path'),
-                    data.get('resolution'),
-                    data.get('position_type'),
-                    data.get('notes')
-                )
+                "SELECT id FROM Detections WHERE id BETWEEN ? AND ?",
+                [daftar_baris[0][0], daftar_baris[-1][0]]
             )
+            id_terpakai = {row.id for row in cursor.fetchall()}
+            id_migrasi: List[Tuple[int, int]] = []
+            for baris in daftar_baris:
+                if baris[0] in id_terpakai:
+                    cursor.execute(self.QUERY_INSERT_DETEKSI_ID_BARU, list(baris[1:]))
+                    id_migrasi.append((cursor.fetchone()[0], baris[0]))
+            baris_id_sama = [baris for baris in daftar_baris if baris[0] not in id_terpakai]
+
+            if baris_id_sama:
+                cursor.execute("SET IDENTITY_INSERT Detections ON")
+                try:
+                    cursor.fast_executemany = True
+                    cursor.executemany(
+                        "INSERT INTO Detections (id, image_id, brand_id, confidence_score, x, y, w, h, notes) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        baris_id_sama
+                    )
+                finally:
+                    cursor.execute("SET IDENTITY_INSERT Detections OFF")
+            id_migrasi.extend((baris[0], baris[0]) for baris in baris_id_sama)
+
+            cursor.fast_executemany = True
+            cursor.executemany("UPDATE BrandDetection SET migrasi_id = ? WHERE id = ?", id_migrasi)
             koneksi.commit()
             cursor.close()
-            koneksi.close()
-            logger.info(f"Hasil deteksi berhasil disimpan untuk: {data.get('image_name')}")
-            return True
+            return len(daftar_baris), len(daftar_gambar), daftar_baris[-1][0]
+
+        def sisa(koneksi: pyodbc.Connection) -> int:
+            cursor = koneksi.cursor()
+            cursor.execute("SELECT COUNT(*) FROM BrandDetection WHERE migrasi_id IS NULL")
+            jumlah = cursor.fetchone()[0]
+            cursor.close()
+            return jumlah
+
+        statistik = {'baris': 0, 'gambar': 0, 'sisa': 0}
+        try:
+            id_terakhir = self._jalankan(awal)
+            if id_terakhir is None:
+                logger.info("Tabel lama BrandDetection tidak ada, tidak ada yang perlu dimigrasi")
+                return statistik
+
+            while True:
+                jumlah_baris, jumlah_gambar, id_terakhir = self._jalankan(
+                    lambda koneksi: pindahkan_batch(koneksi, id_terakhir)
+                )
+                if jumlah_baris == 0:
+                    break
+                statistik['baris'] += jumlah_baris
+                statistik['gambar'] += jumlah_gambar
+                logger.info(f"Migrasi skema: {statistik['baris']} baris dipindahkan (id terakhir {id_terakhir})")
+
+            statistik['sisa'] = self._jalankan(sisa)
+            if statistik['baris']:
+                self.bangun_ulang_statistik()
+            if hapus_tabel_lama and statistik['sisa'] == 0:
+                self._jalankan(_hapus_tabel_lama)
+                logger.info("Tabel lama BrandDetection dihapus")
         except Exception as e:
-            logger.error(f"Gagal menyimpan hasil deteksi: {str(e)}")
-            return False
+            logger.error(f"Gagal migrasi skema: {str(e)}")
+            return None
+
+        self._invalidasi_cache()
+        logger.info(
+            f"Migrasi skema selesai: {statistik['baris']} baris, {statistik['gambar']} gambar, "
+            f"{statistik['sisa']} baris belum pindah"
+        )
+        return statistik
 
-    def dapatkan_riwayat(self, limit: int = 100) -> List[Dict]:
+    def dapatkan_riwayat(
+        self,
+        limit: int = 100,
+        before_id: Optional[int] = None,
+        after_timestamp: Optional[datetime] = None,
+        brand: Optional[str] = None,
+        tanggal_mulai: Optional[datetime] = None,
+        tanggal_selesai: Optional[datetime] = None
+    ) -> List[Dict]:
         """
-        Ambil riwayat deteksi dari database.
+        Ambil riwayat deteksi dari database dengan paginasi keyset.
+
+        Record diurutkan dari yang terbaru (id menurun). Halaman berikutnya
+        diambil dengan before_id = id record terakhir di halaman sebelumnya,
+        sehingga query tetap memakai indeks berapa pun jumlah datanya.
 
         Args:
-            limit: Jumlah maksimal record yang diambil (default 100)
+            limit: Jumlah maksimal record yang diambil (default 100,
+                   maksimal LIMIT_RIWAYAT_MAKS)
+            before_id: Hanya ambil record dengan id lebih kecil (halaman berikutnya)
+            after_timestamp: Hanya ambil record yang diupload setelah waktu ini
+            brand: Filter nama brand (exact match)
+            tanggal_mulai: Batas awal upload_timestamp (inklusif)
+            tanggal_selesai: Batas akhir upload_timestamp (eksklusif)
 
         Returns:
             List[Dict]: Daftar hasil deteksi
         """
-        query = f"""
-        SELECT TOP {limit}
-            id, image_name, brand_name, confidence_score,
-            upload_timestamp, image_path, resolution, position_type, notes
-        FROM BrandDetection
-        ORDER BY upload_timestamp DESC
-        """
+        limit = max(1, min(limit, self.LIMIT_RIWAYAT_MAKS))
 
-        koneksi = self.dapatkan_koneksi()
-        if not koneksi:
-            return []
+        kondisi: List[Tuple[str, Any]] = [
+            ("d.id < ?", before_id),
+            ("i.upload_timestamp > ?", after_timestamp)
+        ]
+        klausa_where, parameter = self._filter_riwayat(kondisi, brand, tanggal_mulai, tanggal_selesai)
+        query = self.QUERY_SELECT_RIWAYAT.format(top='TOP (?)', where=klausa_where, urutan='DESC')
+
+        def operasi(koneksi: pyodbc.Connection) -> List[Dict]:
+            cursor = koneksi.cursor()
+            cursor.execute(query, [limit, *parameter])
+            rows = cursor.fetchall()
+            cursor.close()
+            return [self._dict_riwayat(row) for row in rows]
+
+        kunci_cache = (
+            f"riwayat:{limit}:{before_id}:{after_timestamp}:{brand}:"
+            f"{tanggal_mulai}:{tanggal_selesai}"
+        )
 
         try:
+            hasil = self._baca(kunci_cache, operasi)
+            logger.info(f"Berhasil mengambil {len(hasil)} record riwayat")
+            return hasil
+        except Exception as e:
+            logger.error(f"Gagal mengambil riwayat: {str(e)}")
+            return []
+
+    @staticmethod
+    def _filter_riwayat(
+        kondisi: List[Tuple[str, Any]],
+        brand: Optional[str],
+        tanggal_mulai: Optional[datetime],
+        tanggal_selesai: Optional[datetime]
+    ) -> Tuple[str, List[Any]]:
+        """
+        Susun klausa WHERE query riwayat dari filter yang terisi.
+
+        Args:
+            kondisi: Pasangan (kondisi SQL, nilai) tambahan; dilewati jika nilai None
+            brand: Filter nama brand (exact match)
+            tanggal_mulai: Batas awal upload_timestamp (inklusif)
+            tanggal_selesai: Batas akhir upload_timestamp (eksklusif)
+
+        Returns:
+            Tuple: Klausa WHERE (kosong jika tanpa filter) dan parameternya
+        """
+        kondisi = list(kondisi)
+        if brand:
+            # Lewat brand_id agar memakai indeks IX_Detections_brand_id
+            kondisi.append(("d.brand_id = (SELECT id FROM Brands WHERE brand_name = ?)", brand))
+        kondisi.append(("i.upload_timestamp >= ?", tanggal_mulai))
+        kondisi.append(("i.upload_timestamp < ?", tanggal_selesai))
+
+        terisi = [(sql, nilai) for sql, nilai in kondisi if nilai is not None]
+        if not terisi:
+            return '', []
+        return f"WHERE {' AND '.join(sql for sql, _ in terisi)}", [nilai for _, nilai in terisi]
+
+    @staticmethod
+    def _dict_riwayat(row: Any) -> Dict:
+        """Ubah satu baris query riwayat menjadi dictionary response."""
+        return {
+            'id': row.id,
+            'image_name': row.image_name,
+            'brand_name': row.brand_name,
+            'confidence': row.confidence_score,
+            'timestamp': row.upload_timestamp.isoformat() if row.upload_timestamp else None,
+            'image_path': row.image_path,
+            'resolution': f"{row.width}x{row.height}" if row.width else 'unknown',
+            'position_type': row.position_type,
+            'notes': row.notes,
+            'rectangle': (
+                {'x': row.x, 'y': row.y, 'w': row.w, 'h': row.h} if row.x is not None else None
+            )
+        }
+
+    def dapatkan_id_terakhir(self) -> Optional[int]:
+        """
+        Ambil id record riwayat terbaru.
+
+        Dipakai sebagai batas atas ekspor agar record yang masuk selama
+        ekspor berjalan tidak ikut, sehingga rentang ekspor tetap sama saat
+        dilanjutkan. Tidak memakai cache baca.
+
+        Returns:
+            int: Id terbesar, atau None jika tabel kosong
+
+        Raises:
+            Exception: Jika query gagal
+        """
+        def operasi(koneksi: pyodbc.Connection) -> Optional[int]:
             cursor = koneksi.cursor()
-            cursor.execute(query)
+            cursor.execute("SELECT MAX(id) AS id_terakhir FROM Detections")
+            row = cursor.fetchone()
+            cursor.close()
+            return row.id_terakhir if row else None
+
+        return self._jalankan(operasi)
+
+    def ekspor_riwayat(
+        self,
+        setelah_id: Optional[int] = None,
+        sampai_id: Optional[int] = None,
+        brand: Optional[str] = None,
+        tanggal_mulai: Optional[datetime] = None,
+        tanggal_selesai: Optional[datetime] = None,
+        ukuran_potongan: int = 1000
+    ) -> Iterator[List[Dict]]:
+        """
+        Baca seluruh riwayat yang cocok dengan filter, per potongan.
+
+        Satu query dijalankan lalu hasilnya dibaca dengan fetchmany, sehingga
+        hanya satu potongan yang berada di memori berapa pun jumlah barisnya.
+        Record diurutkan id naik: ekspor yang terputus dilanjutkan dengan
+        setelah_id = id terakhir yang sudah diterima. Koneksi dipinjam dari
+        pool selama iterasi berjalan dan dikembalikan saat generator selesai
+        atau ditutup. Tidak memakai cache baca.
+
+        Args:
+            setelah_id: Hanya record dengan id lebih besar (melanjutkan ekspor)
+            sampai_id: Hanya record dengan id lebih kecil atau sama
+            brand: Filter nama brand (exact match)
+            tanggal_mulai: Batas awal upload_timestamp (inklusif)
+            tanggal_selesai: Batas akhir upload_timestamp (eksklusif)
+            ukuran_potongan: Jumlah baris per fetchmany
+
+        Yields:
+            List[Dict]: Potongan record dengan format yang sama seperti
+                        dapatkan_riwayat
+
+        Raises:
+            Exception: Jika query gagal
+        """
+        kondisi: List[Tuple[str, Any]] = [
+            ("d.id > ?", setelah_id),
+            ("d.id <= ?", sampai_id)
+        ]
+        klausa_where, parameter = self._filter_riwayat(kondisi, brand, tanggal_mulai, tanggal_selesai)
+        query = self.QUERY_SELECT_RIWAYAT.format(top='', where=klausa_where, urutan='ASC')
+
+        jumlah = 0
+        with self.pool.koneksi() as koneksi:
+            cursor = koneksi.cursor()
+            try:
+                with ukur_query('ekspor_riwayat'):
+                    cursor.execute(query, parameter)
+                while True:
+                    rows = cursor.fetchmany(ukuran_potongan)
+                    if not rows:
+                        break
+                    jumlah += len(rows)
+                    yield [self._dict_riwayat(row) for row in rows]
+            finally:
+                cursor.close()
+        logger.info(f"Ekspor riwayat selesai: {jumlah} record")
+
+    def dapatkan_hash_gambar(self, limit: int = 1000) -> List[Dict]:
+        """
+        Ambil gambar terbaru beserta hash perseptualnya.
+
+        Args:
+            limit: Jumlah maksimal gambar yang diambil
+
+        Returns:
+            List[Dict]: Setiap dict berisi id, image_name, image_path,
+                        perceptual_hash, timestamp, dan brand
+        """
+        query = """
+        SELECT TOP (?)
+            i.id, i.image_name, i.image_path, i.perceptual_hash, i.upload_timestamp,
+            (
+                SELECT MAX(b.brand_name)
+                FROM Detections d
+                JOIN Brands b ON b.id = d.brand_id
+                WHERE d.image_id = i.id
+            ) AS brand_name
+        FROM Images i
+        WHERE i.perceptual_hash IS NOT NULL
+        ORDER BY i.id DESC
+        """
+
+        def operasi(koneksi: pyodbc.Connection) -> List[Dict]:
+            cursor = koneksi.cursor()
+            cursor.execute(query, [limit])
             rows = cursor.fetchall()
+            cursor.close()
 
-            hasil: List[Dict] = []
-            for row in rows:
-                hasil.append({
+            return [
+                {
                     'id': row.id,
                     'image_name': row.image_name,
-                    'brand_name': row.brand_name,
-                    'confidence': row.confidence_score,
-                    'timestamp': row.upload_timestamp.isoformat() if row.upload_timestamp else None,
                     'image_path': row.image_path,
-                    'resolution': row.resolution,
-                    'position_type': row.position_type,
-                    'notes': row.notes
-                })
+                    'perceptual_hash': row.perceptual_hash,
+                    'timestamp': row.upload_timestamp.isoformat() if row.upload_timestamp else None,
+                    'brand': row.brand_name
+                }
+                for row in rows
+            ]
 
-            cursor.close()
-            koneksi.close()
-            logger.info(f"Berhasil mengambil {len(hasil)} record riwayat")
+        try:
+            hasil = self._baca(f"hash_gambar:{limit}", operasi)
+            logger.info(f"Berhasil mengambil hash {len(hasil)} gambar")
             return hasil
         except Exception as e:
-            logger.error(f"Gagal mengambil riwayat: {str(e)}")
+            logger.error(f"Gagal mengambil hash gambar: {str(e)}")
             return []
 
+    def dapatkan_referensi_gambar(self) -> Optional[Dict[str, int]]:
+        """
+        Hitung jumlah gambar yang merujuk setiap file gambar.
+
+        Dipakai penyapu penyimpanan berkas, jadi tidak memakai cache baca.
+
+        Returns:
+            Dict[str, int]: Jumlah gambar per image_path, atau None jika gagal
+                            (agar tidak ada file yang dihapus karena error)
+        """
+        query = """
+        SELECT image_path, COUNT(*) AS jumlah
+        FROM Images
+        WHERE image_path IS NOT NULL
+        GROUP BY image_path
+        """
+
+        def operasi(koneksi: pyodbc.Connection) -> Dict[str, int]:
+            cursor = koneksi.cursor()
+            cursor.execute(query)
+            referensi = {row.image_path: row.jumlah for row in cursor.fetchall()}
+            cursor.close()
+            return referensi
+
+        try:
+            referensi = self._jalankan(operasi)
+            logger.info(f"Berhasil mengambil referensi {len(referensi)} file gambar")
+            return referensi
+        except Exception as e:
+            logger.error(f"Gagal mengambil referensi file gambar: {str(e)}")
+            return None
+
     def dapatkan_statistik(self) -> Dict:
         """
-        Dapatkan statistik deteksi dari database.
+        Dapatkan statistik deteksi dari tabel ringkasan.
+
+        Hanya membaca BrandDetectionStatistikBrand/Harian (satu baris per
+        brand dan per hari), sehingga waktunya tidak bertambah seiring
+        bertambahnya isi Detections.
 
         Returns:
-            Dict: Statistik seperti total deteksi, brand populer, rata-rata confidence
+            Dict: Statistik seperti total deteksi, brand populer, rata-rata
+                  confidence, dan jumlah deteksi harian 30 hari terakhir
         """
         query = """
         SELECT
-            COUNT(*) as total_deteksi,
-            COUNT(DISTINCT brand_name) as jumlah_brand_unik,
-            AVG(confidence_score) as rata_confidence
-        FROM BrandDetection
-        WHERE brand_name IS NOT NULL
+            COALESCE(SUM(jumlah), 0) as total_deteksi,
+            COUNT(*) as jumlah_brand_unik,
+            SUM(jumlah_confidence) / NULLIF(SUM(jumlah_terisi), 0) as rata_confidence
+        FROM BrandDetectionStatistikBrand
+        WHERE jumlah > 0
         """
 
         query_brand_populer = """
-        SELECT TOP 5 brand_name, COUNT(*) as jumlah
-        FROM BrandDetection
-        WHERE brand_name IS NOT NULL
-        GROUP BY brand_name
+        SELECT TOP 5 brand_name, jumlah
+        FROM BrandDetectionStatistikBrand
         ORDER BY jumlah DESC
         """
 
-        koneksi = self.dapatkan_koneksi()
-        if not koneksi:
-            return {}
+        query_harian = """
+        SELECT TOP 30 tanggal, SUM(jumlah) as jumlah
+        FROM BrandDetectionStatistikHarian
+        GROUP BY tanggal
+        ORDER BY tanggal DESC
+        """
 
-        try:
+        def operasi(koneksi: pyodbc.Connection) -> Dict:
             cursor = koneksi.cursor()
 
             # Ambil statistik umum
@@ -231,8 +1356,18 @@ class DatabaseService:
             ]
             statistik['brand_populer'] = brand_populer
 
+            # Ambil jumlah deteksi per hari
+            cursor.execute(query_harian)
+            statistik['deteksi_harian'] = [
+                {'tanggal': row.tanggal.isoformat(), 'jumlah': row.jumlah}
+                for row in cursor.fetchall()
+            ]
+
             cursor.close()
-            koneksi.close()
+            return statistik
+
+        try:
+            statistik = self._baca('statistik', operasi)
             logger.info("Berhasil mengambil statistik")
             return statistik
         except Exception as e:
@@ -0,0 +1,353 @@
+"""
+Deteksi brand per ubin (tile) untuk gambar beresolusi tinggi.
+
+Logo kecil di foto rak atau billboard beresolusi tinggi sering tidak
+terdeteksi jika seluruh gambar dikirim sekaligus, apalagi setelah gambar
+diperkecil oleh praproses. DeteksiUbin memotong gambar asli menjadi ubin
+yang saling tumpang tindih, mengirim setiap ubin ke detektor secara paralel
+dengan jumlah thread terbatas, menerjemahkan rectangle setiap ubin ke
+koordinat gambar utuh, lalu menggabungkan deteksi ganda dengan
+non-maximum suppression (NMS).
+
+Jumlah ubin per gambar dibatasi maks_ubin: jika grid dengan ukuran_ubin
+melebihi batas, ukuran ubin diperbesar sampai grid muat, sehingga jumlah
+panggilan detektor (dan latensinya) bisa diperkirakan.
+"""
+
+import io
+import math
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from PIL import Image  # type: ignore
+
+from .detektor import DetektorBrand
+from .metrik import ukur_tahap
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Deteksi yang sebagian besar luasnya berada di dalam deteksi lain dengan
+# brand sama dianggap potongan logo yang sama (logo terpotong batas ubin)
+AMBANG_TERCAKUP = 0.9
+
+# (x, y, lebar, tinggi) dalam piksel gambar asli
+Kotak = Tuple[int, int, int, int]
+
+# Deteksi gambar utuh oleh ComputerVisionService (praproses + detektor),
+# hasilnya sudah dalam koordinat gambar asli
+FungsiDeteksiPenuh = Callable[[bytes], List[Dict]]
+FungsiDeteksiPenuhAsync = Callable[[bytes], Awaitable[List[Dict]]]
+
+
+def _jumlah_langkah(panjang: int, ukuran: int, tumpang_tindih: float) -> int:
+    """Jumlah ubin di satu sumbu agar tumpang tindih minimal terpenuhi."""
+    if panjang <= ukuran:
+        return 1
+    langkah = max(1, int(ukuran * (1 - tumpang_tindih)))
+    return math.ceil((panjang - ukuran) / langkah) + 1
+
+
+def hitung_ubin(
+    lebar: int,
+    tinggi: int,
+    ukuran_ubin: int,
+    tumpang_tindih: float,
+    maks_ubin: int
+) -> List[Kotak]:
+    """
+    Hitung posisi ubin yang menutup seluruh gambar.
+
+    Ubin disebar merata sehingga tumpang tindih antar ubin minimal
+    tumpang_tindih x ukuran ubin. Jika jumlahnya melebihi maks_ubin, ukuran
+    ubin diperbesar bertahap sampai muat.
+
+    Args:
+        lebar: Lebar gambar (piksel)
+        tinggi: Tinggi gambar (piksel)
+        ukuran_ubin: Sisi ubin yang diinginkan (piksel)
+        tumpang_tindih: Bagian sisi ubin yang tumpang tindih dengan tetangganya (0-0.9)
+        maks_ubin: Jumlah maksimal ubin
+
+    Returns:
+        List[Kotak]: Daftar (x, y, lebar, tinggi) ubin
+    """
+    tumpang_tindih = min(max(tumpang_tindih, 0.0), 0.9)
+    ukuran = max(1, ukuran_ubin)
+    while True:
+        kolom = _jumlah_langkah(lebar, ukuran, tumpang_tindih)
+        baris = _jumlah_langkah(tinggi, ukuran, tumpang_tindih)
+        if kolom * baris <= max(1, maks_ubin):
+            break
+        ukuran = math.ceil(ukuran * 1.1)
+
+    lebar_ubin = min(ukuran, lebar)
+    tinggi_ubin = min(ukuran, tinggi)
+
+    def posisi(jumlah: int, panjang: int, sisi: int) -> List[int]:
+        if jumlah == 1:
+            return [0]
+        return [round(i * (panjang - sisi) / (jumlah - 1)) for i in range(jumlah)]
+
+    return [
+        (x, y, lebar_ubin, tinggi_ubin)
+        for y in posisi(baris, tinggi, tinggi_ubin)
+        for x in posisi(kolom, lebar, lebar_ubin)
+    ]
+
+
+def _luas_irisan(a: Dict, b: Dict) -> int:
+    lebar = min(a['x'] + a['w'], b['x'] + b['w']) - max(a['x'], b['x'])
+    tinggi = min(a['y'] + a['h'], b['y'] + b['h']) - max(a['y'], b['y'])
+    return max(0, lebar) * max(0, tinggi)
+
+
+def gabungkan_deteksi(hasil: List[Dict], ambang_iou: float = 0.5) -> List[Dict]:
+    """
+    Gabungkan deteksi ganda dengan non-maximum suppression per brand.
+
+    Deteksi diurutkan dari confidence tertinggi; deteksi dengan brand sama
+    dibuang jika IoU-nya dengan deteksi yang sudah dipilih melebihi
+    ambang_iou, atau jika luasnya hampir seluruhnya tercakup deteksi
+    tersebut (potongan logo di batas ubin).
+
+    Args:
+        hasil: Deteksi dalam koordinat gambar utuh (brand, confidence, rectangle)
+        ambang_iou: Batas IoU untuk dianggap deteksi yang sama
+
+    Returns:
+        List[Dict]: Deteksi setelah digabung, urut confidence menurun
+    """
+    terpilih: List[Dict] = []
+    for kandidat in sorted(hasil, key=lambda item: item['confidence'], reverse=True):
+        kotak = kandidat['rectangle']
+        luas = kotak['w'] * kotak['h']
+        ganda = False
+        for pilihan in terpilih:
+            if pilihan['brand'] != kandidat['brand']:
+                continue
+            kotak_pilihan = pilihan['rectangle']
+            irisan = _luas_irisan(kotak, kotak_pilihan)
+            gabungan = luas + kotak_pilihan['w'] * kotak_pilihan['h'] - irisan
+            if (gabungan > 0 and irisan / gabungan > ambang_iou) or \
+                    (luas > 0 and irisan / luas >= AMBANG_TERCAKUP):
+                ganda = True
+                break
+        if not ganda:
+            terpilih.append(kandidat)
+    return terpilih
+
+
+class DeteksiUbin:
+    """Deteksi brand per ubin dengan thread pool terbatas bersama."""
+
+    def __init__(
+        self,
+        ukuran_ubin: int = 1024,
+        tumpang_tindih: float = 0.2,
+        maks_ubin: int = 8,
+        konkurensi: int = 4,
+        ambang_iou: float = 0.5,
+        sertakan_gambar_penuh: bool = True,
+        sisi_maks_ubin: int = 0,
+        kualitas_jpeg: int = 85
+    ):
+        """
+        Inisialisasi deteksi per ubin.
+
+        Args:
+            ukuran_ubin: Sisi ubin (piksel gambar asli); gambar yang muat
+                         dalam satu ubin tidak dipotong
+            tumpang_tindih: Bagian sisi ubin yang tumpang tindih (0-0.9)
+            maks_ubin: Jumlah maksimal ubin per gambar (di luar panggilan
+                       gambar penuh)
+            konkurensi: Jumlah panggilan detektor paralel per proses
+            ambang_iou: Batas IoU NMS saat menggabungkan deteksi
+            sertakan_gambar_penuh: Deteksi juga gambar utuh (setelah
+                                   praproses) agar logo besar yang terpotong
+                                   ubin tetap terdeteksi
+            sisi_maks_ubin: Ubin yang lebih besar dari ini diperkecil sebelum
+                            dikirim (terjadi jika ubin diperbesar karena
+                            maks_ubin); 0 = tanpa batas
+            kualitas_jpeg: Kualitas JPEG ubin yang dikirim
+        """
+        self.ukuran_ubin = ukuran_ubin
+        self.tumpang_tindih = tumpang_tindih
+        self.maks_ubin = maks_ubin
+        self.konkurensi = max(1, konkurensi)
+        self.ambang_iou = ambang_iou
+        self.sertakan_gambar_penuh = sertakan_gambar_penuh
+        self.sisi_maks_ubin = sisi_maks_ubin
+        self.kualitas_jpeg = kualitas_jpeg
+        self._executor = ThreadPoolExecutor(max_workers=self.konkurensi, thread_name_prefix='deteksi-ubin')
+
+    def sidik(self) -> str:
+        """Identitas parameter ubin untuk kunci cache hasil deteksi."""
+        return (
+            f"ubin:{self.ukuran_ubin}:{self.tumpang_tindih}:{self.maks_ubin}:{self.ambang_iou}:"
+            f"{self.sertakan_gambar_penuh}:{self.sisi_maks_ubin}:{self.kualitas_jpeg}"
+        )
+
+    @ukur_tahap('potong_ubin')
+    def potong(self, data_gambar: bytes) -> Optional[List[Tuple[Kotak, bytes, float]]]:
+        """
+        Potong gambar asli menjadi ubin JPEG.
+
+        Args:
+            data_gambar: Byte gambar asli
+
+        Returns:
+            List berisi (kotak ubin, byte JPEG ubin, skala ubin ke piksel
+            asli), atau None jika gambar muat dalam satu ubin atau tidak
+            bisa dibaca
+        """
+        try:
+            with Image.open(io.BytesIO(data_gambar)) as img:
+                lebar, tinggi = img.size
+                daftar_ubin = hitung_ubin(lebar, tinggi, self.ukuran_ubin, self.tumpang_tindih, self.maks_ubin)
+                if len(daftar_ubin) <= 1:
+                    return None
+
+                if img.mode not in ('RGB', 'L'):
+                    img_rgba = img.convert('RGBA')
+                    img_rgb = Image.new('RGB', img_rgba.size, (255, 255, 255))
+                    img_rgb.paste(img_rgba, mask=img_rgba.getchannel('A'))
+                else:
+                    img.load()
+                    img_rgb = img
+
+                hasil = []
+                for x, y, w, h in daftar_ubin:
+                    ubin = img_rgb.crop((x, y, x + w, y + h))
+                    skala = 1.0
+                    if self.sisi_maks_ubin > 0 and max(w, h) > self.sisi_maks_ubin:
+                        ubin.thumbnail((self.sisi_maks_ubin, self.sisi_maks_ubin), Image.Resampling.LANCZOS)
+                        skala = w / ubin.width
+                    buffer = io.BytesIO()
+                    ubin.save(buffer, format='JPEG', quality=self.kualitas_jpeg)
+                    hasil.append(((x, y, w, h), buffer.getvalue(), skala))
+        except Exception as e:
+            logger.warning(f"Gagal memotong gambar menjadi ubin, memakai gambar utuh: {str(e)}")
+            return None
+
+        logger.info(f"Gambar {lebar}x{tinggi} dipotong menjadi {len(hasil)} ubin")
+        return hasil
+
+    def deteksi(
+        self,
+        detektor: DetektorBrand,
+        data_gambar: bytes,
+        deteksi_penuh: FungsiDeteksiPenuh
+    ) -> Optional[List[Dict]]:
+        """
+        Deteksi brand per ubin (dan gambar penuh) secara paralel.
+
+        Args:
+            detektor: Detektor yang dipanggil untuk setiap ubin
+            data_gambar: Byte gambar asli
+            deteksi_penuh: Fungsi deteksi gambar utuh (dipanggil jika
+                           sertakan_gambar_penuh aktif)
+
+        Returns:
+            List[Dict]: Deteksi dalam koordinat gambar asli setelah NMS, atau
+                        None jika gambar tidak perlu dipotong
+
+        Raises:
+            Exception: Error pertama dari panggilan detektor
+        """
+        daftar_ubin = self.potong(data_gambar)
+        if daftar_ubin is None:
+            return None
+
+        future_ubin = [
+            (kotak, skala, self._executor.submit(detektor.deteksi, data_ubin))
+            for kotak, data_ubin, skala in daftar_ubin
+        ]
+        future_penuh = None
+        if self.sertakan_gambar_penuh:
+            future_penuh = self._executor.submit(deteksi_penuh, data_gambar)
+
+        try:
+            semua_hasil: List[Dict] = []
+            for kotak, skala, future in future_ubin:
+                semua_hasil.extend(self._terjemahkan(future.result(), kotak, skala))
+            if future_penuh is not None:
+                semua_hasil.extend(future_penuh.result())
+        except BaseException:
+            # Ubin yang belum mulai tidak perlu dipanggil lagi
+            for _, _, future in future_ubin:
+                future.cancel()
+            if future_penuh is not None:
+                future_penuh.cancel()
+            raise
+
+        return self._gabungkan(semua_hasil)
+
+    async def deteksi_async(
+        self,
+        detektor: DetektorBrand,
+        data_gambar: bytes,
+        deteksi_penuh: FungsiDeteksiPenuhAsync
+    ) -> Optional[List[Dict]]:
+        """
+        Versi asyncio dari deteksi; panggilan bersamaan dibatasi konkurensi.
+
+        Returns:
+            List[Dict]: Deteksi setelah NMS, atau None jika gambar tidak perlu dipotong
+        """
+        daftar_ubin = await asyncio.to_thread(self.potong, data_gambar)
+        if daftar_ubin is None:
+            return None
+
+        semafor = asyncio.Semaphore(self.konkurensi)
+
+        async def deteksi_ubin(kotak: Kotak, data_ubin: bytes, skala: float) -> List[Dict]:
+            async with semafor:
+                return self._terjemahkan(await detektor.deteksi_async(data_ubin), kotak, skala)
+
+        async def deteksi_gambar_penuh() -> List[Dict]:
+            async with semafor:
+                return await deteksi_penuh(data_gambar)
+
+        tugas = [
+            asyncio.ensure_future(deteksi_ubin(kotak, data_ubin, skala))
+            for kotak, data_ubin, skala in daftar_ubin
+        ]
+        if self.sertakan_gambar_penuh:
+            tugas.append(asyncio.ensure_future(deteksi_gambar_penuh()))
+
+        try:
+            semua_hasil = [deteksi for hasil in await asyncio.gather(*tugas) for deteksi in hasil]
+        except BaseException:
+            for task in tugas:
+                task.cancel()
+            raise
+        return self._gabungkan(semua_hasil)
+
+    def tutup(self) -> None:
+        """Hentikan thread pool."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _gabungkan(self, semua_hasil: List[Dict]) -> List[Dict]:
+        hasil = gabungkan_deteksi(semua_hasil, self.ambang_iou)
+        logger.debug(f"NMS ubin: {len(semua_hasil)} deteksi -> {len(hasil)}")
+        return hasil
+
+    @staticmethod
+    def _terjemahkan(hasil: List[Dict], kotak: Kotak, skala: float) -> List[Dict]:
+        """Pindahkan rectangle dari koordinat ubin ke koordinat gambar asli."""
+        x_ubin, y_ubin = kotak[0], kotak[1]
+        return [
+            {
+                **deteksi,
+                'rectangle': {
+                    'x': x_ubin + round(deteksi['rectangle']['x'] * skala),
+                    'y': y_ubin + round(deteksi['rectangle']['y'] * skala),
+                    'w': round(deteksi['rectangle']['w'] * skala),
+                    'h': round(deteksi['rectangle']['h'] * skala)
+                }
+            }
+            for deteksi in hasil
+        ]
@@ -0,0 +1,487 @@
+"""
+Deteksi brand pada video dan urutan frame (dump kamera).
+
+Satu menit video berisi ribuan frame, padahal isi frame berurutan hampir
+selalu sama. DeteksiUrutan mengambil sampel frame dengan laju fps_sampel,
+menghitung dHash setiap frame, dan hanya mengirim frame yang berbeda cukup
+jauh (jarak Hamming) dari frame terakhir yang dianalisis ke detektor. Frame
+yang dilewati mewarisi hasil frame yang dianalisis sebelumnya. Hasil per
+frame lalu digabung menjadi interval waktu per brand.
+
+Sumber frame bisa berupa file video (butuh opencv-python-headless), folder
+berisi file gambar, atau arsip zip berisi file gambar. Urutan frame dari
+folder/zip mengikuti urutan nama file, dengan waktu indeks / fps_sumber.
+Entri zip dibatasi seperti gambar dari upload zip: entri yang terlalu besar
+atau isinya bukan gambar valid dilewati.
+"""
+
+import io
+import os
+import uuid
+import zipfile
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from PIL import Image  # type: ignore
+
+from utils.unggahan import UKURAN_KEPALA, deteksi_ekstensi_gambar, gambar_valid
+
+from .hash_perseptual import hitung_dhash, jarak_hamming
+from .ketahanan import LayananTidakTersedia
+from .metrik import ukur_tahap
+
+try:
+    import cv2  # type: ignore
+except ImportError:  # pragma: no cover - opencv opsional
+    cv2 = None
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+EKSTENSI_FRAME = ('png', 'jpg', 'jpeg', 'bmp', 'gif', 'webp')
+
+# Ukuran maksimal satu entri gambar dalam arsip zip (default sama dengan MAX_FILE_SIZE)
+UKURAN_FRAME_MAKS = 16 * 1024 * 1024
+
+# (detik, frame)
+Frame = Tuple[float, Image.Image]
+
+
+def _nama_frame_diizinkan(nama: str) -> bool:
+    """Cek nama file termasuk gambar yang bisa dipakai sebagai frame."""
+    return '.' in nama and nama.rsplit('.', 1)[1].lower() in EKSTENSI_FRAME
+
+
+def baca_frame_video(path_video: str, fps_sampel: float) -> Iterator[Frame]:
+    """
+    Ambil sampel frame dari file video.
+
+    Frame di antara sampel hanya di-grab (tanpa decode piksel), sehingga
+    biaya baca sebanding dengan jumlah sampel, bukan jumlah frame video.
+
+    Args:
+        path_video: Path file video
+        fps_sampel: Jumlah frame yang diambil per detik video
+
+    Yields:
+        Frame: (detik, frame RGB)
+
+    Raises:
+        ImportError: Jika opencv tidak terpasang
+        ValueError: Jika file video tidak bisa dibuka
+    """
+    if cv2 is None:
+        raise ImportError("Deteksi video membutuhkan opencv-python-headless dan numpy")
+
+    video = cv2.VideoCapture(path_video)
+    if not video.isOpened():
+        raise ValueError(f"Video tidak bisa dibuka: {os.path.basename(path_video)}")
+
+    try:
+        fps_video = video.get(cv2.CAP_PROP_FPS) or 0
+        if fps_video <= 0:
+            fps_video = 25.0
+            logger.warning(f"FPS video tidak diketahui, dianggap {fps_video}")
+        langkah = max(1, round(fps_video / fps_sampel)) if fps_sampel > 0 else 1
+
+        indeks = 0
+        while video.grab():
+            if indeks % langkah == 0:
+                berhasil, frame_bgr = video.retrieve()
+                if not berhasil:
+                    break
+                frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+                yield indeks / fps_video, Image.fromarray(frame_rgb)
+            indeks += 1
+    finally:
+        video.release()
+
+
+def baca_frame_gambar(
+    path_sumber: str,
+    fps_sumber: float,
+    fps_sampel: float,
+    ukuran_maks: int = UKURAN_FRAME_MAKS
+) -> Iterator[Frame]:
+    """
+    Ambil sampel frame dari folder atau arsip zip berisi file gambar.
+
+    Entri zip yang lebih besar dari ukuran_maks dilewati; ukuran dicek dari
+    header zip sebelum entri dibaca dan sekali lagi dari isi yang dibaca.
+    Isi entri dicek dengan magic bytes dan PIL sebelum didecode.
+
+    Args:
+        path_sumber: Path folder atau file zip
+        fps_sumber: Laju frame saat gambar direkam (frame per detik)
+        fps_sampel: Jumlah frame yang diambil per detik
+        ukuran_maks: Ukuran maksimal setiap entri gambar zip dalam bytes
+
+    Yields:
+        Frame: (detik, frame RGB)
+
+    Raises:
+        zipfile.BadZipFile: Jika path_sumber bukan folder dan bukan zip yang valid
+    """
+    langkah = max(1, round(fps_sumber / fps_sampel)) if fps_sampel > 0 else 1
+
+    if os.path.isdir(path_sumber):
+        daftar_nama = sorted(
+            nama for nama in os.listdir(path_sumber)
+            if _nama_frame_diizinkan(nama) and os.path.isfile(os.path.join(path_sumber, nama))
+        )
+        for indeks in range(0, len(daftar_nama), langkah):
+            with Image.open(os.path.join(path_sumber, daftar_nama[indeks])) as img:
+                yield indeks / fps_sumber, img.convert('RGB')
+        return
+
+    with zipfile.ZipFile(path_sumber) as arsip:
+        daftar_entri = sorted(
+            (entri for entri in arsip.infolist()
+             if not entri.is_dir() and _nama_frame_diizinkan(os.path.basename(entri.filename))),
+            key=lambda entri: entri.filename
+        )
+        for indeks in range(0, len(daftar_entri), langkah):
+            entri = daftar_entri[indeks]
+            if entri.file_size > ukuran_maks:
+                logger.warning(f"Frame dalam arsip terlalu besar, dilewati: {entri.filename}")
+                continue
+
+            with arsip.open(entri) as sumber:
+                data = sumber.read(ukuran_maks + 1)
+            if len(data) > ukuran_maks:
+                logger.warning(f"Frame dalam arsip terlalu besar, dilewati: {entri.filename}")
+                continue
+            if not deteksi_ekstensi_gambar(data[:UKURAN_KEPALA]) & set(EKSTENSI_FRAME) or \
+                    not gambar_valid(data):
+                logger.warning(f"Isi frame dalam arsip bukan gambar yang valid, dilewati: {entri.filename}")
+                continue
+
+            with Image.open(io.BytesIO(data)) as img:
+                yield indeks / fps_sumber, img.convert('RGB')
+
+
+def baca_frame(
+    path_sumber: str,
+    fps_sampel: float,
+    fps_sumber: float = 25.0,
+    ukuran_maks_frame: int = UKURAN_FRAME_MAKS
+) -> Iterator[Frame]:
+    """
+    Ambil sampel frame dari video, folder gambar, atau arsip zip gambar.
+
+    Args:
+        path_sumber: Path file video, folder, atau file zip
+        fps_sampel: Jumlah frame yang diambil per detik
+        fps_sumber: Laju frame folder/zip gambar (video memakai fps filenya)
+        ukuran_maks_frame: Ukuran maksimal setiap entri gambar zip dalam bytes
+
+    Yields:
+        Frame: (detik, frame RGB)
+    """
+    if os.path.isdir(path_sumber) or zipfile.is_zipfile(path_sumber):
+        return baca_frame_gambar(path_sumber, fps_sumber, fps_sampel, ukuran_maks_frame)
+    return baca_frame_video(path_sumber, fps_sampel)
+
+
+def gabungkan_interval(
+    hasil_frame: List[Tuple[float, List[Dict]]],
+    durasi_frame: float,
+    toleransi_jeda: float
+) -> List[Dict]:
+    """
+    Gabungkan hasil deteksi per frame menjadi interval waktu per brand.
+
+    Kemunculan brand yang sama dianggap satu interval selama jeda antar
+    kemunculannya tidak lebih dari toleransi_jeda, agar satu frame yang
+    terlewat oleh detektor tidak memecah interval.
+
+    Args:
+        hasil_frame: Pasangan (detik, hasil deteksi) urut waktu
+        durasi_frame: Jarak antar frame sampel (detik)
+        toleransi_jeda: Jeda maksimal (detik) yang masih digabung
+
+    Returns:
+        List[Dict]: Interval berisi brand, mulai, selesai, jumlah_frame,
+                    confidence_maks, confidence_rata, dan rectangle dari
+                    frame dengan confidence tertinggi; urut waktu mulai
+    """
+    terbuka: Dict[str, Dict] = {}
+    selesai: List[Dict] = []
+
+    for detik, brand_terdeteksi in hasil_frame:
+        # Satu brand bisa muncul beberapa kali di frame yang sama
+        terbaik: Dict[str, Dict] = {}
+        for brand in brand_terdeteksi:
+            lama = terbaik.get(brand['brand'])
+            if lama is None or brand['confidence'] > lama['confidence']:
+                terbaik[brand['brand']] = brand
+
+        for nama, brand in terbaik.items():
+            interval = terbuka.get(nama)
+            if interval is not None and detik - interval['_terakhir'] > durasi_frame + toleransi_jeda:
+                selesai.append(interval)
+                interval = None
+            if interval is None:
+                interval = {
+                    'brand': nama,
+                    'mulai': detik,
+                    'jumlah_frame': 0,
+                    'confidence_maks': 0.0,
+                    '_total_confidence': 0.0
+                }
+                terbuka[nama] = interval
+            interval['_terakhir'] = detik
+            interval['jumlah_frame'] += 1
+            interval['_total_confidence'] += brand['confidence']
+            if brand['confidence'] >= interval['confidence_maks']:
+                interval['confidence_maks'] = brand['confidence']
+                interval['rectangle'] = brand['rectangle']
+
+    selesai.extend(terbuka.values())
+    hasil = []
+    for interval in sorted(selesai, key=lambda i: (i['mulai'], i['brand'])):
+        hasil.append({
+            'brand': interval['brand'],
+            'mulai': round(interval['mulai'], 3),
+            'selesai': round(interval['_terakhir'] + durasi_frame, 3),
+            'jumlah_frame': interval['jumlah_frame'],
+            'confidence_maks': round(interval['confidence_maks'], 4),
+            'confidence_rata': round(interval['_total_confidence'] / interval['jumlah_frame'], 4),
+            'rectangle': interval['rectangle']
+        })
+    return hasil
+
+
+def susun_baris_interval(hasil: Dict, path_file: Optional[str] = None) -> List[Dict]:
+    """
+    Susun baris simpan_hasil_deteksi_batch dari hasil DeteksiUrutan.deteksi.
+
+    Satu baris per interval brand; interval waktu ditulis di kolom notes.
+
+    Args:
+        hasil: Hasil DeteksiUrutan.deteksi
+        path_file: Lokasi file sumber di penyimpanan (optional)
+
+    Returns:
+        List[Dict]: Baris yang siap disimpan
+    """
+    dasar = {
+        'upload_key': uuid.uuid4().hex,
+        'image_name': hasil['nama'],
+        'image_path': path_file,
+        'resolution': hasil['resolusi'],
+        'position_type': 'video'
+    }
+    if not hasil['interval']:
+        return [{
+            **dasar,
+            'notes': f"Deteksi video - tidak ada brand terdeteksi dalam {hasil['durasi']:.2f} detik"
+        }]
+
+    return [
+        {
+            **dasar,
+            'brand_name': interval['brand'],
+            'confidence_score': interval['confidence_maks'],
+            'rectangle': interval['rectangle'],
+            'notes': (
+                f"Deteksi video - interval {interval['mulai']:.2f}-{interval['selesai']:.2f} detik "
+                f"({interval['jumlah_frame']} frame)"
+            )
+        }
+        for interval in hasil['interval']
+    ]
+
+
+class DeteksiUrutan:
+    """Deteksi brand pada urutan frame dengan melewati frame yang hampir sama."""
+
+    def __init__(
+        self,
+        vision_service,
+        fps_sampel: float = 2.0,
+        ambang_hamming: int = 6,
+        interval_paksa: float = 10.0,
+        toleransi_jeda: float = 1.0,
+        konkurensi: int = 4,
+        maks_frame: int = 0,
+        kualitas_jpeg: int = 90,
+        ukuran_maks_frame: int = UKURAN_FRAME_MAKS
+    ):
+        """
+        Inisialisasi deteksi urutan frame.
+
+        Args:
+            vision_service: ComputerVisionService untuk deteksi per frame
+            fps_sampel: Jumlah frame yang diambil per detik
+            ambang_hamming: Jarak dHash maksimal (bit) dari frame terakhir yang
+                            dianalisis agar frame dianggap sama dan dilewati
+            interval_paksa: Frame tetap dianalisis ulang setelah sekian detik
+                            meskipun mirip (0 = tidak pernah dipaksa)
+            toleransi_jeda: Jeda (detik) antar kemunculan brand yang masih
+                            digabung menjadi satu interval
+            konkurensi: Jumlah panggilan detektor paralel per urutan
+            maks_frame: Jumlah maksimal frame sampel yang dibaca (0 = tanpa batas)
+            kualitas_jpeg: Kualitas JPEG frame yang dikirim ke detektor
+            ukuran_maks_frame: Ukuran maksimal setiap entri gambar dalam arsip zip
+        """
+        self.vision_service = vision_service
+        self.fps_sampel = fps_sampel
+        self.ambang_hamming = ambang_hamming
+        self.interval_paksa = interval_paksa
+        self.toleransi_jeda = toleransi_jeda
+        self.konkurensi = max(1, konkurensi)
+        self.maks_frame = maks_frame
+        self.kualitas_jpeg = kualitas_jpeg
+        self.ukuran_maks_frame = ukuran_maks_frame
+        self._executor = ThreadPoolExecutor(max_workers=self.konkurensi, thread_name_prefix='deteksi-frame')
+
+    def deteksi_sumber(self, path_sumber: str, nama: Optional[str] = None, fps_sumber: float = 25.0) -> Dict:
+        """
+        Deteksi brand dari file video, folder gambar, atau arsip zip gambar.
+
+        Args:
+            path_sumber: Path sumber frame
+            nama: Nama sumber untuk log dan hasil (default nama file)
+            fps_sumber: Laju frame folder/zip gambar
+
+        Returns:
+            Dict: Hasil seperti deteksi()
+        """
+        return self.deteksi(
+            baca_frame(path_sumber, self.fps_sampel, fps_sumber, self.ukuran_maks_frame),
+            nama or os.path.basename(os.path.normpath(path_sumber))
+        )
+
+    def deteksi(self, daftar_frame: Iterator[Frame], nama: str = '<urutan>') -> Dict:
+        """
+        Deteksi brand pada urutan frame dan gabungkan menjadi interval.
+
+        Frame dibaca satu per satu; hanya frame yang sedang menunggu detektor
+        yang ditahan di memori (maksimal 2 x konkurensi).
+
+        Args:
+            daftar_frame: Iterator (detik, frame) urut waktu
+            nama: Nama sumber untuk log dan hasil
+
+        Returns:
+            Dict: nama, durasi, resolusi, jumlah_frame, frame_dianalisis,
+                  frame_dilewati, frame_gagal, dan interval (lihat
+                  gabungkan_interval)
+
+        Raises:
+            LayananTidakTersedia: Jika detektor sedang tidak bisa dipanggil
+            ValueError: Jika tidak ada frame yang bisa dibaca
+        """
+        # Setiap frame sampel menunjuk hasil frame wakil yang dianalisis
+        frame_wakil: List[Tuple[float, int]] = []
+        hasil_wakil: List[Optional[List[Dict]]] = []
+        tertunda: Dict[int, Future] = {}
+        hash_terakhir: Optional[str] = None
+        detik_terakhir = 0.0
+        resolusi = 'unknown'
+        durasi_frame = 1 / self.fps_sampel if self.fps_sampel > 0 else 0.0
+
+        try:
+            for detik, frame in daftar_frame:
+                if self.maks_frame and len(frame_wakil) >= self.maks_frame:
+                    logger.warning(f"Urutan {nama} melebihi {self.maks_frame} frame, sisanya dilewati")
+                    break
+                if not frame_wakil:
+                    resolusi = f"{frame.width}x{frame.height}"
+                elif len(frame_wakil) == 1:
+                    # Langkah sampel sebenarnya mengikuti pembulatan fps sumber
+                    durasi_frame = detik - frame_wakil[0][0]
+
+                with ukur_tahap('hash_frame'):
+                    hash_frame = hitung_dhash(frame)
+
+                mirip = hash_terakhir is not None and \
+                    jarak_hamming(hash_frame, hash_terakhir) <= self.ambang_hamming
+                dipaksa = self.interval_paksa > 0 and detik - detik_terakhir >= self.interval_paksa
+                if mirip and not dipaksa:
+                    frame_wakil.append((detik, len(hasil_wakil) - 1))
+                    continue
+
+                hash_terakhir, detik_terakhir = hash_frame, detik
+                indeks = len(hasil_wakil)
+                hasil_wakil.append(None)
+                frame_wakil.append((detik, indeks))
+                tertunda[indeks] = self._executor.submit(
+                    self._deteksi_frame, frame, hash_frame, f"{nama}@{detik:.2f}s"
+                )
+                if len(tertunda) >= self.konkurensi * 2:
+                    self._ambil_hasil(tertunda, hasil_wakil, tunggu_semua=False)
+
+            self._ambil_hasil(tertunda, hasil_wakil, tunggu_semua=True)
+        finally:
+            for future in tertunda.values():
+                future.cancel()
+
+        if not frame_wakil:
+            raise ValueError(f"Tidak ada frame yang bisa dibaca dari {nama}")
+
+        hasil_frame = [
+            (detik, hasil_wakil[indeks]) for detik, indeks in frame_wakil
+            if hasil_wakil[indeks] is not None
+        ]
+        frame_gagal = len(frame_wakil) - len(hasil_frame)
+        interval = gabungkan_interval(hasil_frame, durasi_frame, self.toleransi_jeda)  # type: ignore[arg-type]
+
+        logger.info(
+            f"Deteksi urutan {nama}: {len(frame_wakil)} frame, {len(hasil_wakil)} dianalisis, "
+            f"{frame_gagal} gagal, {len(interval)} interval brand"
+        )
+        return {
+            'nama': nama,
+            'durasi': round(frame_wakil[-1][0] + durasi_frame, 3),
+            'resolusi': resolusi,
+            'jumlah_frame': len(frame_wakil),
+            'frame_dianalisis': len(hasil_wakil),
+            'frame_dilewati': len(frame_wakil) - len(hasil_wakil),
+            'frame_gagal': frame_gagal,
+            'interval': interval
+        }
+
+    def tutup(self) -> None:
+        """Hentikan thread pool deteksi frame."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _deteksi_frame(self, frame: Image.Image, hash_frame: str, nama_frame: str) -> List[Dict]:
+        """Encode frame ke JPEG lalu deteksi brand lewat vision service."""
+        buffer = io.BytesIO()
+        frame.save(buffer, format='JPEG', quality=self.kualitas_jpeg)
+        info_frame = {
+            'width': frame.width,
+            'height': frame.height,
+            'format': 'JPEG',
+            'mode': frame.mode,
+            'resolusi': f"{frame.width}x{frame.height}",
+            'hash_perseptual': hash_frame
+        }
+        return self.vision_service.deteksi_brand_bytes(buffer.getvalue(), nama_frame, info_frame)
+
+    @staticmethod
+    def _ambil_hasil(
+        tertunda: Dict[int, Future],
+        hasil_wakil: List[Optional[List[Dict]]],
+        tunggu_semua: bool
+    ) -> None:
+        """
+        Pindahkan hasil frame yang sudah selesai dari tertunda ke hasil_wakil.
+
+        Frame yang gagal dibiarkan None (tidak ikut digabung ke interval);
+        LayananTidakTersedia dilempar ulang agar seluruh urutan dihentikan.
+        """
+        # Tanpa tunggu_semua, cukup tunggu frame tertua agar antrian berkurang
+        daftar_indeks = sorted(tertunda) if tunggu_semua else [min(tertunda)]
+        daftar_indeks += [i for i in tertunda if i not in daftar_indeks and tertunda[i].done()]
+        for indeks in daftar_indeks:
+            future = tertunda.pop(indeks)
+            try:
+                hasil_wakil[indeks] = future.result()
+            except LayananTidakTersedia:
+                raise
+            except Exception as e:
+                logger.error(f"Deteksi frame gagal: {str(e)}")
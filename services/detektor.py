@@ -0,0 +1,540 @@
+"""
+Backend detektor brand untuk ComputerVisionService.
+
+Modul ini mendefinisikan antarmuka DetektorBrand beserta implementasinya:
+Azure Computer Vision, detektor lokal berbasis pencocokan fitur ORB terhadap
+indeks logo referensi, dan detektor berantai yang memakai detektor lokal
+lebih dulu lalu Azure hanya jika tidak ada brand yang ditemukan.
+"""
+
+import io
+import os
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import cv2  # type: ignore
+    import numpy as np  # type: ignore
+except ImportError:  # pragma: no cover - dependensi opsional
+    cv2 = None
+    np = None
+
+try:
+    import httpx  # type: ignore
+except ImportError:  # pragma: no cover - dependensi opsional (jalur async)
+    httpx = None
+
+from .indeks_logo import IndeksLogo
+from .metrik import ukur_panggilan_vision
+from .ketahanan import (
+    PembatasLaju,
+    PemutusSirkuit,
+    jalankan_dengan_retry,
+    jalankan_dengan_retry_async
+)
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+class DetektorBrand(ABC):
+    """Antarmuka backend deteksi brand."""
+
+    nama: str = 'detektor'
+
+    @abstractmethod
+    def deteksi(self, data_gambar: bytes) -> List[Dict]:
+        """
+        Deteksi brand pada gambar.
+
+        Args:
+            data_gambar: Byte gambar (sudah dipraproses)
+
+        Returns:
+            List[Dict]: Setiap dict berisi brand, confidence, dan rectangle
+                        (x, y, w, h) dalam koordinat gambar yang diberikan
+
+        Raises:
+            Exception: Jika deteksi gagal
+        """
+
+    async def deteksi_async(self, data_gambar: bytes) -> List[Dict]:
+        """
+        Versi asyncio dari deteksi().
+
+        Implementasi default menjalankan deteksi() di thread agar pekerjaan
+        CPU tidak menahan event loop; backend berbasis jaringan sebaiknya
+        meng-override dengan I/O non-blocking.
+        """
+        return await asyncio.to_thread(self.deteksi, data_gambar)
+
+    def tersedia(self) -> bool:
+        """Cek apakah backend siap dipakai."""
+        return True
+
+    def sidik(self) -> str:
+        """
+        Identitas konfigurasi detektor untuk kunci cache hasil deteksi.
+
+        Backend yang hasilnya bergantung pada parameter sebaiknya
+        menyertakan parameter tersebut agar hasil lama tidak dipakai ulang
+        setelah konfigurasi berubah.
+        """
+        return self.nama
+
+
+class DetektorAzure(DetektorBrand):
+    """
+    Deteksi brand dengan Azure Computer Vision (fitur 'brands').
+
+    Panggilan dibatasi token bucket dan circuit breaker yang dipakai bersama
+    semua thread, dan error sementara (429, 5xx, koneksi) diulang dengan
+    backoff yang menghormati header Retry-After.
+    """
+
+    nama = 'azure'
+
+    # Status HTTP yang menandakan gangguan sementara di sisi layanan
+    STATUS_SEMENTARA = (408, 429, 500, 502, 503, 504)
+
+    def __init__(
+        self,
+        client: Any,
+        pembatas: Optional[PembatasLaju] = None,
+        pemutus: Optional[PemutusSirkuit] = None,
+        maks_percobaan: int = 3,
+        backoff_dasar: float = 0.5,
+        backoff_maks: float = 8.0,
+        endpoint: str = '',
+        key: str = '',
+        timeout: float = 15.0,
+        maks_koneksi_async: int = 200
+    ):
+        """
+        Inisialisasi detektor Azure.
+
+        Args:
+            client: ComputerVisionClient yang sudah diautentikasi
+            pembatas: Pembatas laju panggilan sesuai tier Azure (optional)
+            pemutus: Circuit breaker untuk gagal cepat saat Azure down (optional)
+            maks_percobaan: Jumlah percobaan total untuk error sementara
+            backoff_dasar: Jeda dasar backoff eksponensial (detik)
+            backoff_maks: Jeda maksimal antar percobaan; Retry-After yang
+                          lebih lama langsung dikembalikan ke pemanggil
+            endpoint: URL endpoint Azure untuk panggilan REST async
+            key: Subscription key untuk panggilan REST async
+            timeout: Timeout satu panggilan REST async (detik)
+            maks_koneksi_async: Jumlah maksimal koneksi HTTP async bersamaan
+        """
+        self.client = client
+        self.pembatas = pembatas
+        self.pemutus = pemutus
+        self.maks_percobaan = maks_percobaan
+        self.backoff_dasar = backoff_dasar
+        self.backoff_maks = backoff_maks
+        self.endpoint = endpoint.rstrip('/')
+        self.key = key
+        self.timeout = timeout
+        self.maks_koneksi_async = maks_koneksi_async
+        self._klien_async: Any = None
+        self._loop_klien_async: Optional[asyncio.AbstractEventLoop] = None
+
+    def tersedia(self) -> bool:
+        return self.client is not None
+
+    @classmethod
+    def _klasifikasi_error(cls, error: Exception) -> Tuple[bool, Optional[float]]:
+        """
+        Tentukan apakah error Azure boleh diulang dan berapa Retry-After-nya.
+
+        Args:
+            error: Exception dari Azure SDK
+
+        Returns:
+            Tuple (boleh diulang, detik Retry-After atau None)
+        """
+        if httpx is not None and isinstance(error, httpx.TransportError):
+            # Error jaringan/timeout di jalur async
+            return True, None
+
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None)
+        if status is None:
+            # Error jaringan/timeout (msrest ClientRequestError) tanpa response
+            return type(error).__name__ == 'ClientRequestError', None
+
+        if status not in cls.STATUS_SEMENTARA:
+            return False, None
+
+        retry_after = None
+        header = getattr(response, 'headers', None) or {}
+        nilai_header = header.get('Retry-After')
+        if nilai_header:
+            try:
+                retry_after = float(nilai_header)
+            except ValueError:
+                retry_after = None
+        return True, retry_after
+
+    def deteksi(self, data_gambar: bytes) -> List[Dict]:
+        # Panggil API untuk menganalisis gambar
+        fitur = ['brands']
+
+        def panggil() -> Any:
+            with ukur_panggilan_vision(self.nama):
+                return self.client.analyze_image_in_stream(
+                    io.BytesIO(data_gambar),
+                    visual_features=fitur
+                )
+
+        hasil = jalankan_dengan_retry(
+            panggil,
+            self._klasifikasi_error,
+            maks_percobaan=self.maks_percobaan,
+            backoff_dasar=self.backoff_dasar,
+            backoff_maks=self.backoff_maks,
+            pembatas=self.pembatas,
+            pemutus=self.pemutus
+        )
+
+        brand_terdeteksi: List[Dict] = []
+
+        # Type guard: pastikan hasil memiliki attribute brands
+        # type: ignore digunakan karena Azure SDK tidak memiliki type stubs lengkap
+        if hasil and hasattr(hasil, 'brands') and hasil.brands:  # type: ignore[attr-defined]
+            for brand in hasil.brands:  # type: ignore[attr-defined]
+                brand_terdeteksi.append({
+                    'brand': brand.name,
+                    'confidence': brand.confidence,
+                    'rectangle': {
+                        'x': brand.rectangle.x,
+                        'y': brand.rectangle.y,
+                        'w': brand.rectangle.w,
+                        'h': brand.rectangle.h
+                    }
+                })
+
+        return brand_terdeteksi
+
+    async def deteksi_async(self, data_gambar: bytes) -> List[Dict]:
+        """
+        Deteksi brand lewat REST API Azure dengan HTTP client non-blocking.
+
+        Format hasil, retry, pembatas laju, dan circuit breaker sama dengan
+        deteksi(). Jika httpx tidak terpasang atau endpoint/key tidak diisi,
+        deteksi() dijalankan di thread.
+        """
+        if httpx is None or not self.endpoint or not self.key:
+            return await super().deteksi_async(data_gambar)
+
+        klien = self._dapatkan_klien_async()
+
+        async def panggil() -> Dict:
+            with ukur_panggilan_vision(self.nama):
+                response = await klien.post(
+                    f"{self.endpoint}/vision/v3.2/analyze",
+                    params={'visualFeatures': 'Brands'},
+                    headers={
+                        'Ocp-Apim-Subscription-Key': self.key,
+                        'Content-Type': 'application/octet-stream'
+                    },
+                    content=data_gambar
+                )
+                response.raise_for_status()
+                return response.json()
+
+        hasil = await jalankan_dengan_retry_async(
+            panggil,
+            self._klasifikasi_error,
+            maks_percobaan=self.maks_percobaan,
+            backoff_dasar=self.backoff_dasar,
+            backoff_maks=self.backoff_maks,
+            pembatas=self.pembatas,
+            pemutus=self.pemutus
+        )
+
+        return [
+            {
+                'brand': brand['name'],
+                'confidence': brand['confidence'],
+                'rectangle': {
+                    'x': brand['rectangle']['x'],
+                    'y': brand['rectangle']['y'],
+                    'w': brand['rectangle']['w'],
+                    'h': brand['rectangle']['h']
+                }
+            }
+            for brand in hasil.get('brands') or []
+        ]
+
+    def _dapatkan_klien_async(self) -> Any:
+        """HTTP client async untuk event loop saat ini (koneksi dipakai ulang)."""
+        loop = asyncio.get_running_loop()
+        if self._klien_async is None or self._loop_klien_async is not loop:
+            self._klien_async = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.maks_koneksi_async,
+                    max_keepalive_connections=self.maks_koneksi_async
+                )
+            )
+            self._loop_klien_async = loop
+        return self._klien_async
+
+    async def tutup_async(self) -> None:
+        """Tutup HTTP client async (dipanggil saat aplikasi ASGI berhenti)."""
+        if self._klien_async is not None:
+            await self._klien_async.aclose()
+            self._klien_async = None
+            self._loop_klien_async = None
+
+
+class DetektorLokal(DetektorBrand):
+    """
+    Deteksi brand lokal dengan pencocokan fitur ORB terhadap logo referensi.
+
+    Deskriptor semua logo referensi disimpan dalam satu IndeksLogo. Jika
+    folder_indeks berisi indeks yang sudah dibangun, indeks itu di-memory-map
+    dan dipakai bersama oleh semua worker; jika belum, indeks dibangun dari
+    folder_logo saat inisialisasi. Versi indeks baru yang disimpan proses lain
+    (mis. lewat CLI services.indeks_logo) dimuat ulang otomatis. Struktur
+    folder logo: <folder>/<brand>/<file gambar> atau <folder>/<brand>.<ekstensi>.
+    """
+
+    nama = 'lokal'
+
+    def __init__(
+        self,
+        folder_logo: str,
+        jumlah_fitur: int = 1000,
+        rasio_lowe: float = 0.75,
+        min_inlier: int = 10,
+        ambang_confidence: float = 0.5,
+        folder_indeks: Optional[str] = None,
+        jarak_maks: int = 64
+    ):
+        """
+        Inisialisasi detektor lokal.
+
+        Args:
+            folder_logo: Folder pustaka logo referensi
+            jumlah_fitur: Jumlah maksimal keypoint ORB per gambar
+            rasio_lowe: Ambang ratio test Lowe untuk pencocokan deskriptor
+            min_inlier: Jumlah minimal inlier homografi agar logo dianggap ada
+            ambang_confidence: Confidence minimal hasil yang dikembalikan
+            folder_indeks: Folder indeks logo prebuilt (None = bangun di memori)
+            jarak_maks: Jarak Hamming maksimal pasangan deskriptor
+        """
+        self.folder_logo = folder_logo
+        self.jumlah_fitur = jumlah_fitur
+        self.rasio_lowe = rasio_lowe
+        self.min_inlier = min_inlier
+        self.ambang_confidence = ambang_confidence
+        self.jarak_maks = jarak_maks
+        self.indeks: Optional[IndeksLogo] = None
+        # cv2.ORB menyimpan state saat detectAndCompute, jadi satu instance per thread
+        self._lokal = threading.local()
+        self._lock_indeks = threading.Lock()
+
+        if cv2 is None:
+            logger.error("Detektor lokal membutuhkan opencv-python-headless dan numpy")
+            return
+
+        self._muat_indeks(folder_indeks)
+
+    def tersedia(self) -> bool:
+        indeks = self._indeks_terkini()
+        return indeks is not None and bool(indeks.logo_aktif())
+
+    def sidik(self) -> str:
+        indeks = self._indeks_terkini()
+        return (
+            f"{self.nama}:{self.jumlah_fitur}:{self.rasio_lowe}:{self.min_inlier}:"
+            f"{self.ambang_confidence}:{self.jarak_maks}:{indeks.versi if indeks else '-'}"
+        )
+
+    def _indeks_terkini(self) -> Optional[IndeksLogo]:
+        """
+        Indeks logo yang sedang dipakai, dimuat ulang jika versi baru disimpan.
+
+        Indeks baru dimuat sebagai objek terpisah lalu menggantikan yang lama,
+        sehingga deteksi yang sedang berjalan tetap memakai satu versi utuh.
+        """
+        indeks = self.indeks
+        if indeks is None or not indeks.berubah():
+            return indeks
+
+        with self._lock_indeks:
+            if self.indeks is indeks:
+                try:
+                    self.indeks = IndeksLogo(indeks.folder_indeks, jumlah_fitur=self.jumlah_fitur)
+                except Exception as e:
+                    logger.error(f"Gagal memuat ulang indeks logo, memakai versi {indeks.versi}: {str(e)}")
+            return self.indeks
+
+    def _orb(self) -> Any:
+        """Extractor ORB milik thread saat ini."""
+        orb = getattr(self._lokal, 'orb', None)
+        if orb is None:
+            orb = cv2.ORB_create(nfeatures=self.jumlah_fitur)
+            self._lokal.orb = orb
+        return orb
+
+    def _muat_indeks(self, folder_indeks: Optional[str]) -> None:
+        """Muat indeks prebuilt, atau bangun dari folder logo jika belum ada."""
+        indeks = IndeksLogo(folder_indeks, jumlah_fitur=self.jumlah_fitur)
+        if indeks.logo:
+            self.indeks = indeks
+            return
+
+        if not os.path.isdir(self.folder_logo):
+            logger.warning(f"Folder logo referensi tidak ditemukan: {self.folder_logo}")
+            return
+
+        indeks.bangun(self.folder_logo)
+        indeks.simpan()
+        self.indeks = indeks
+        logger.info(f"{len(indeks.logo_aktif())} logo referensi diindeks dari {self.folder_logo}")
+
+    def deteksi(self, data_gambar: bytes) -> List[Dict]:
+        indeks = self._indeks_terkini()
+        if indeks is None or not indeks.logo_aktif():
+            return []
+
+        gambar = cv2.imdecode(np.frombuffer(data_gambar, np.uint8), cv2.IMREAD_GRAYSCALE)
+        if gambar is None:
+            raise Exception("Gambar tidak bisa di-decode")
+
+        keypoint, deskriptor = self._orb().detectAndCompute(gambar, None)
+        if deskriptor is None or len(keypoint) < self.min_inlier:
+            return []
+        titik_gambar = np.float32([kp.pt for kp in keypoint])
+
+        # Satu pencarian tervektorisasi ke seluruh indeks, lalu kelompokkan per logo
+        idx_query, idx_indeks = indeks.cari(deskriptor, self.jarak_maks, self.rasio_lowe)
+        id_cocok = np.asarray(indeks.id_logo)[idx_indeks]
+        titik_logo = np.asarray(indeks.titik)[idx_indeks]
+        logo_per_id = indeks.logo_per_id()
+
+        # Simpan hasil terbaik per brand
+        terbaik: Dict[str, Dict] = {}
+        id_unik, jumlah = np.unique(id_cocok, return_counts=True)
+        for id_logo in id_unik[jumlah >= self.min_inlier]:
+            logo = logo_per_id.get(int(id_logo))
+            if logo is None:
+                continue
+
+            pilih = id_cocok == id_logo
+            hasil = buat_hasil_homografi(
+                logo['brand'], (logo['lebar'], logo['tinggi']),
+                titik_logo[pilih], titik_gambar[idx_query[pilih]], gambar.shape,
+                self.min_inlier, self.ambang_confidence
+            )
+            if hasil and hasil['confidence'] > terbaik.get(hasil['brand'], {}).get('confidence', 0):
+                terbaik[hasil['brand']] = hasil
+
+        return sorted(terbaik.values(), key=lambda hasil: hasil['confidence'], reverse=True)
+
+
+class DetektorBerantai(DetektorBrand):
+    """Jalankan beberapa detektor berurutan sampai ada yang menemukan brand."""
+
+    nama = 'berantai'
+
+    def __init__(self, daftar_detektor: List[DetektorBrand]):
+        """
+        Inisialisasi detektor berantai.
+
+        Args:
+            daftar_detektor: Detektor dalam urutan prioritas (tercepat dulu)
+        """
+        self.daftar_detektor = daftar_detektor
+
+    def tersedia(self) -> bool:
+        return any(detektor.tersedia() for detektor in self.daftar_detektor)
+
+    def sidik(self) -> str:
+        return f"{self.nama}({','.join(detektor.sidik() for detektor in self.daftar_detektor)})"
+
+    def deteksi(self, data_gambar: bytes) -> List[Dict]:
+        for detektor in self.daftar_detektor:
+            if not detektor.tersedia():
+                continue
+            hasil = detektor.deteksi(data_gambar)
+            if hasil:
+                logger.info(f"Brand ditemukan oleh detektor {detektor.nama}")
+                return hasil
+        return []
+
+    async def deteksi_async(self, data_gambar: bytes) -> List[Dict]:
+        for detektor in self.daftar_detektor:
+            if not detektor.tersedia():
+                continue
+            hasil = await detektor.deteksi_async(data_gambar)
+            if hasil:
+                logger.info(f"Brand ditemukan oleh detektor {detektor.nama}")
+                return hasil
+        return []
+
+
+def buat_hasil_homografi(
+    brand: str,
+    ukuran_template: tuple,
+    sumber: Any,
+    tujuan: Any,
+    ukuran_gambar: tuple,
+    min_inlier: int,
+    ambang_confidence: float
+) -> Optional[Dict]:
+    """
+    Verifikasi pasangan titik dengan homografi RANSAC dan buat dict hasil.
+
+    Args:
+        brand: Nama brand logo referensi
+        ukuran_template: (lebar, tinggi) logo referensi
+        sumber: Titik pada logo referensi (N x 2)
+        tujuan: Titik pasangannya pada gambar (N x 2)
+        ukuran_gambar: (tinggi, lebar) gambar yang dianalisis
+        min_inlier: Jumlah minimal inlier
+        ambang_confidence: Confidence minimal
+
+    Returns:
+        Dict berisi brand, confidence, rectangle, atau None jika tidak valid
+    """
+    matriks, mask = cv2.findHomography(
+        sumber.reshape(-1, 1, 2), tujuan.reshape(-1, 1, 2), cv2.RANSAC, 5.0
+    )
+    if matriks is None:
+        return None
+
+    jumlah_inlier = int(mask.sum())
+    if jumlah_inlier < min_inlier:
+        return None
+
+    confidence = round(jumlah_inlier / len(sumber), 4)
+    if confidence < ambang_confidence:
+        return None
+
+    lebar, tinggi = ukuran_template
+    sudut = np.float32([[0, 0], [lebar, 0], [lebar, tinggi], [0, tinggi]]).reshape(-1, 1, 2)
+    sudut_gambar = cv2.perspectiveTransform(sudut, matriks).reshape(-1, 2)
+
+    tinggi_gambar, lebar_gambar = ukuran_gambar[:2]
+    x1, y1 = np.clip(sudut_gambar.min(axis=0), 0, [lebar_gambar, tinggi_gambar])
+    x2, y2 = np.clip(sudut_gambar.max(axis=0), 0, [lebar_gambar, tinggi_gambar])
+    if x2 - x1 < 1 or y2 - y1 < 1:
+        return None
+
+    return {
+        'brand': brand,
+        'confidence': confidence,
+        'rectangle': {
+            'x': int(x1),
+            'y': int(y1),
+            'w': int(x2 - x1),
+            'h': int(y2 - y1)
+        }
+    }
@@ -0,0 +1,240 @@
+"""
+Hash perseptual untuk mendeteksi gambar yang hampir sama.
+
+Modul ini menghitung dHash 64-bit dari gambar (tahan terhadap resize,
+kompresi ulang, dan perubahan metadata) serta menyediakan indeks
+multi-segmen untuk mencari hash dalam jarak Hamming tertentu. Indeks
+dipakai ComputerVisionService untuk memakai ulang hasil deteksi gambar
+yang hampir sama, dan untuk mengelompokkan duplikat di riwayat.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+from PIL import Image # type: ignore
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+JUMLAH_BIT = 64
+
+# Gambar hampir polos menghasilkan hash dengan sangat sedikit (atau banyak) bit 1
+MIN_BIT_INFORMATIF = 4
+
+
+def hitung_dhash(img: Image.Image) -> str:
+    """
+    Hitung difference hash (dHash) 64-bit sebuah gambar.
+
+    Gambar diperkecil ke 9x8 grayscale, lalu setiap bit menyatakan apakah
+    piksel lebih terang dari tetangga kanannya.
+
+    Args:
+        img: Gambar PIL yang sudah dibuka
+
+    Returns:
+        str: Hash 16 digit heksadesimal
+    """
+    # Decoder JPEG bisa langsung men-decode pada resolusi kecil
+    img.draft('L', (64, 64))
+    kecil = img.convert('L').resize((9, 8), Image.Resampling.LANCZOS)
+    piksel = list(kecil.getdata())
+
+    nilai = 0
+    for baris in range(8):
+        for kolom in range(8):
+            kiri = piksel[baris * 9 + kolom]
+            kanan = piksel[baris * 9 + kolom + 1]
+            nilai = (nilai << 1) | (1 if kiri > kanan else 0)
+    return f"{nilai:016x}"
+
+
+def jarak_hamming(hash_a: str, hash_b: str) -> int:
+    """Jumlah bit berbeda antara dua hash heksadesimal."""
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count('1')
+
+
+def hash_informatif(hash_gambar: str) -> bool:
+    """
+    Cek apakah hash cukup informatif untuk dipakai mencocokkan gambar.
+
+    Gambar polos atau gradasi halus selalu menghasilkan hash yang hampir
+    semua bitnya sama, sehingga gambar berbeda bisa dianggap duplikat.
+
+    Args:
+        hash_gambar: Hash heksadesimal dari hitung_dhash
+
+    Returns:
+        bool: True jika jumlah bit 1 tidak ekstrem
+    """
+    jumlah_bit = bin(int(hash_gambar, 16)).count('1')
+    return MIN_BIT_INFORMATIF <= jumlah_bit <= JUMLAH_BIT - MIN_BIT_INFORMATIF
+
+
+class IndeksHashPerseptual:
+    """
+    Indeks multi-segmen untuk pencarian hash dalam jarak Hamming.
+
+    Hash 64-bit dipecah menjadi (ambang + 1) segmen. Dua hash dengan jarak
+    paling banyak `ambang` pasti memiliki minimal satu segmen yang identik,
+    sehingga kandidat cukup diambil dari bucket segmen yang sama lalu
+    diverifikasi dengan jarak penuh. Jumlah entri dibatasi (LRU).
+    """
+
+    def __init__(self, ambang: int = 6, maks_entri: int = 10000):
+        """
+        Inisialisasi indeks.
+
+        Args:
+            ambang: Jarak Hamming maksimal agar dua gambar dianggap sama
+            maks_entri: Jumlah maksimal hash yang disimpan
+        """
+        self.ambang = max(0, min(ambang, JUMLAH_BIT - 1))
+        self.maks_entri = maks_entri
+        self._segmen = self._bagi_segmen(self.ambang + 1)
+        self._bucket: List[Dict[int, Set[int]]] = [{} for _ in self._segmen]
+        self._entri: 'OrderedDict[int, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bagi_segmen(jumlah: int) -> List[Tuple[int, int]]:
+        """Bagi 64 bit menjadi (geser, mask) untuk setiap segmen."""
+        segmen = []
+        awal = 0
+        for i in range(jumlah):
+            lebar = JUMLAH_BIT // jumlah + (1 if i < JUMLAH_BIT % jumlah else 0)
+            segmen.append((awal, (1 << lebar) - 1))
+            awal += lebar
+        return segmen
+
+    def tambah(self, hash_gambar: str, nilai: Any) -> None:
+        """
+        Simpan nilai untuk sebuah hash (menimpa nilai lama hash yang sama).
+
+        Args:
+            hash_gambar: Hash heksadesimal dari hitung_dhash
+            nilai: Data yang dikembalikan saat hash ini ditemukan
+        """
+        kunci = int(hash_gambar, 16)
+        with self._lock:
+            if kunci not in self._entri:
+                for (geser, mask), bucket in zip(self._segmen, self._bucket):
+                    bucket.setdefault((kunci >> geser) & mask, set()).add(kunci)
+            self._entri[kunci] = nilai
+            self._entri.move_to_end(kunci)
+
+            while len(self._entri) > self.maks_entri:
+                kunci_lama, _ = self._entri.popitem(last=False)
+                self._hapus_dari_bucket(kunci_lama)
+
+    def cari(self, hash_gambar: str) -> Optional[Tuple[str, Any, int]]:
+        """
+        Cari hash terdekat dalam jarak ambang.
+
+        Args:
+            hash_gambar: Hash heksadesimal yang dicari
+
+        Returns:
+            Tuple (hash, nilai, jarak) hash terdekat, atau None jika tidak ada
+        """
+        semua = self.cari_semua(hash_gambar)
+        if not semua:
+            return None
+
+        terdekat = semua[0]
+        with self._lock:
+            kunci = int(terdekat[0], 16)
+            if kunci in self._entri:
+                self._entri.move_to_end(kunci)
+        return terdekat
+
+    def cari_semua(self, hash_gambar: str) -> List[Tuple[str, Any, int]]:
+        """
+        Cari semua hash dalam jarak ambang.
+
+        Args:
+            hash_gambar: Hash heksadesimal yang dicari
+
+        Returns:
+            List tuple (hash, nilai, jarak), terdekat lebih dulu
+        """
+        kunci = int(hash_gambar, 16)
+        with self._lock:
+            kandidat: Set[int] = set()
+            for (geser, mask), bucket in zip(self._segmen, self._bucket):
+                kandidat |= bucket.get((kunci >> geser) & mask, set())
+
+            hasil = []
+            for kunci_kandidat in kandidat:
+                jarak = bin(kunci ^ kunci_kandidat).count('1')
+                if jarak <= self.ambang:
+                    hasil.append((f"{kunci_kandidat:016x}", self._entri[kunci_kandidat], jarak))
+
+        return sorted(hasil, key=lambda item: item[2])
+
+    def hapus(self, hash_gambar: str) -> None:
+        """Hapus sebuah hash dari indeks."""
+        kunci = int(hash_gambar, 16)
+        with self._lock:
+            if self._entri.pop(kunci, None) is not None:
+                self._hapus_dari_bucket(kunci)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entri)
+
+    def _hapus_dari_bucket(self, kunci: int) -> None:
+        """Buang kunci dari semua bucket segmen (lock sudah dipegang)."""
+        for (geser, mask), bucket in zip(self._segmen, self._bucket):
+            nilai_segmen = (kunci >> geser) & mask
+            isi = bucket.get(nilai_segmen)
+            if isi is not None:
+                isi.discard(kunci)
+                if not isi:
+                    del bucket[nilai_segmen]
+
+
+def kelompokkan_duplikat(
+    daftar: List[Tuple[Hashable, str]],
+    ambang: int = 6
+) -> List[List[Hashable]]:
+    """
+    Kelompokkan item yang hash-nya saling berdekatan (union-find).
+
+    Args:
+        daftar: Pasangan (id item, hash heksadesimal)
+        ambang: Jarak Hamming maksimal dalam satu kelompok
+
+    Returns:
+        List kelompok berisi minimal dua id item, terbesar lebih dulu
+    """
+    induk: Dict[Hashable, Hashable] = {}
+
+    def akar(item: Hashable) -> Hashable:
+        while induk[item] != item:
+            induk[item] = induk[induk[item]]
+            item = induk[item]
+        return item
+
+    indeks = IndeksHashPerseptual(ambang=ambang, maks_entri=len(daftar) + 1)
+
+    for id_item, hash_gambar in daftar:
+        induk[id_item] = id_item
+        cocok = indeks.cari_semua(hash_gambar)
+        for _, id_lain, _ in cocok:
+            induk[akar(id_item)] = akar(id_lain)
+
+        # Hash yang identik disimpan sekali; id pertamanya mewakili semua
+        if not cocok or cocok[0][2] > 0:
+            indeks.tambah(hash_gambar, id_item)
+
+    kelompok: Dict[Hashable, List[Hashable]] = {}
+    for id_item, _ in daftar:
+        kelompok.setdefault(akar(id_item), []).append(id_item)
+
+    return sorted(
+        (anggota for anggota in kelompok.values() if len(anggota) > 1),
+        key=len,
+        reverse=True
+    )
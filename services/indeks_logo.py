@@ -0,0 +1,446 @@
+"""
+Indeks deskriptor logo referensi yang disimpan di disk.
+
+Modul ini membangun indeks deskriptor ORB dari folder logo referensi sekali
+saja, menyimpannya sebagai file .npy yang di-memory-map oleh setiap worker,
+dan mencari tetangga terdekat secara tervektorisasi dengan NumPy. Logo bisa
+ditambah atau dihapus tanpa menghitung ulang deskriptor logo lain.
+
+Setiap simpan() menulis seluruh indeks ke subfolder versi baru lalu
+mengganti file penunjuk AKTIF secara atomik, sehingga pembaca tidak pernah
+memasangkan array baru dengan metadata lama. Worker yang sedang berjalan
+memuat ulang indeks saat mtime file penunjuk berubah (lihat berubah()).
+
+Penggunaan CLI:
+    python -m services.indeks_logo bangun --folder-logo logo_referensi --indeks indeks_logo
+    python -m services.indeks_logo tambah --indeks indeks_logo --brand Nike logo/nike2.png
+    python -m services.indeks_logo hapus --indeks indeks_logo --brand Nike
+    python -m services.indeks_logo padatkan --indeks indeks_logo
+    python -m services.indeks_logo info --indeks indeks_logo
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import logging
+import argparse
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import cv2  # type: ignore
+    import numpy as np  # type: ignore
+except ImportError:  # pragma: no cover - dependensi opsional
+    cv2 = None
+    np = None
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+EKSTENSI_LOGO = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')
+FILE_METADATA = 'logo.json'
+FILE_DESKRIPTOR = 'deskriptor.npy'
+FILE_TITIK = 'titik.npy'
+FILE_ID_LOGO = 'id_logo.npy'
+FILE_PENUNJUK = 'AKTIF'
+AWALAN_VERSI = 'versi-'
+
+# Jumlah deskriptor indeks yang dibandingkan per blok (membatasi memori)
+UKURAN_BLOK = 16384
+
+
+def daftar_logo_referensi(folder_logo: str) -> List[Tuple[str, str]]:
+    """
+    Daftar pasangan (brand, path file) dari folder logo referensi.
+
+    Struktur folder: <folder>/<brand>/<file gambar> atau <folder>/<brand>.<ekstensi>.
+
+    Args:
+        folder_logo: Folder pustaka logo referensi
+
+    Returns:
+        List[Tuple[str, str]]: Pasangan (nama brand, path file logo)
+    """
+    hasil = []
+    for nama in sorted(os.listdir(folder_logo)):
+        path = os.path.join(folder_logo, nama)
+        if os.path.isdir(path):
+            for nama_file in sorted(os.listdir(path)):
+                if nama_file.lower().endswith(EKSTENSI_LOGO):
+                    hasil.append((nama, os.path.join(path, nama_file)))
+        elif nama.lower().endswith(EKSTENSI_LOGO):
+            hasil.append((os.path.splitext(nama)[0], path))
+    return hasil
+
+
+class IndeksLogo:
+    """
+    Indeks deskriptor ORB semua logo referensi.
+
+    Isi folder indeks:
+        - AKTIF: Nama subfolder versi yang sedang dipakai
+        - versi-<waktu>-<acak>/: Satu versi indeks lengkap, berisi
+            - deskriptor.npy: Deskriptor ORB (N x 32, uint8), di-memory-map
+            - titik.npy: Koordinat keypoint pada logo (N x 2, float32)
+            - id_logo.npy: Id logo pemilik setiap deskriptor (N, int32)
+            - logo.json: Metadata logo (brand, path, ukuran, status aktif)
+
+    Indeks format lama (file langsung di folder indeks, tanpa AKTIF) tetap
+    bisa dimuat dan ditulis ulang ke format versi pada simpan() berikutnya.
+    """
+
+    def __init__(self, folder_indeks: Optional[str] = None, jumlah_fitur: int = 1000):
+        """
+        Inisialisasi indeks kosong atau muat dari folder_indeks jika ada.
+
+        Args:
+            folder_indeks: Folder penyimpanan indeks (None = hanya di memori)
+            jumlah_fitur: Jumlah maksimal keypoint ORB per logo
+        """
+        if cv2 is None:
+            raise ImportError("Indeks logo membutuhkan opencv-python-headless dan numpy")
+
+        self.folder_indeks = folder_indeks
+        self.jumlah_fitur = jumlah_fitur
+        self.logo: List[Dict] = []
+        self.deskriptor = np.zeros((0, 32), np.uint8)
+        self.titik = np.zeros((0, 2), np.float32)
+        self.id_logo = np.zeros(0, np.int32)
+        self._baris_aktif: Optional[Any] = None
+        self._lock = threading.Lock()
+        # Versi yang dimuat ('' = format lama atau hanya di memori) dan mtime
+        # file penunjuk saat terakhir diperiksa
+        self.versi = ''
+        self._mtime_penunjuk = 0
+
+        if folder_indeks and (
+            os.path.exists(os.path.join(folder_indeks, FILE_PENUNJUK))
+            or os.path.exists(os.path.join(folder_indeks, FILE_METADATA))
+        ):
+            self.muat()
+
+    def _baca_penunjuk(self) -> Tuple[str, int]:
+        """Baca nama versi aktif dan mtime file penunjuk ('' dan 0 jika belum ada)."""
+        path = os.path.join(self.folder_indeks or '', FILE_PENUNJUK)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            with open(path, encoding='utf-8') as file_penunjuk:
+                return file_penunjuk.read().strip(), mtime
+        except FileNotFoundError:
+            return '', 0
+
+    def berubah(self) -> bool:
+        """
+        Cek apakah proses lain sudah menyimpan versi indeks baru.
+
+        Hanya membaca mtime file penunjuk; setiap perubahan dilaporkan sekali.
+
+        Returns:
+            bool: True jika file penunjuk berubah sejak indeks ini dimuat
+        """
+        if not self.folder_indeks:
+            return False
+        try:
+            mtime = os.stat(os.path.join(self.folder_indeks, FILE_PENUNJUK)).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime_penunjuk:
+            return False
+        self._mtime_penunjuk = mtime
+        return True
+
+    def muat(self) -> None:
+        """Muat indeks dari disk; deskriptor di-memory-map, tidak disalin ke memori."""
+        versi, mtime = self._baca_penunjuk()
+        folder = os.path.join(self.folder_indeks or '', versi)
+        with open(os.path.join(folder, FILE_METADATA), encoding='utf-8') as file_meta:
+            metadata = json.load(file_meta)
+
+        self.jumlah_fitur = metadata.get('jumlah_fitur', self.jumlah_fitur)
+        self.logo = metadata['logo']
+        self.deskriptor = np.load(os.path.join(folder, FILE_DESKRIPTOR), mmap_mode='r')
+        self.titik = np.load(os.path.join(folder, FILE_TITIK), mmap_mode='r')
+        self.id_logo = np.load(os.path.join(folder, FILE_ID_LOGO), mmap_mode='r')
+        self._perbarui_baris_aktif()
+        self.versi = versi
+        self._mtime_penunjuk = mtime
+        logger.info(
+            f"Indeks logo dimuat (versi {versi or 'lama'}): "
+            f"{len(self.logo_aktif())} logo, {len(self.deskriptor)} deskriptor"
+        )
+
+    def simpan(self) -> None:
+        """
+        Tulis seluruh indeks ke subfolder versi baru lalu ganti file penunjuk.
+
+        Versi sebelumnya disisakan karena worker lain mungkin sedang
+        memuatnya; versi yang lebih tua dihapus.
+        """
+        if not self.folder_indeks:
+            return
+
+        versi = f"{AWALAN_VERSI}{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        folder_versi = os.path.join(self.folder_indeks, versi)
+        os.makedirs(folder_versi)
+        for nama_file, array in (
+            (FILE_DESKRIPTOR, self.deskriptor),
+            (FILE_TITIK, self.titik),
+            (FILE_ID_LOGO, self.id_logo)
+        ):
+            with open(os.path.join(folder_versi, nama_file), 'wb') as file_array:
+                np.save(file_array, np.ascontiguousarray(array))
+        with open(os.path.join(folder_versi, FILE_METADATA), 'w', encoding='utf-8') as file_meta:
+            json.dump({'jumlah_fitur': self.jumlah_fitur, 'logo': self.logo}, file_meta, indent=2)
+
+        # Satu penggantian atomik memindahkan pembaca ke versi baru
+        versi_lama, _ = self._baca_penunjuk()
+        path_penunjuk = os.path.join(self.folder_indeks, FILE_PENUNJUK)
+        with open(path_penunjuk + '.tmp', 'w', encoding='utf-8') as file_penunjuk:
+            file_penunjuk.write(versi)
+        os.replace(path_penunjuk + '.tmp', path_penunjuk)
+        self.versi = versi
+        self._mtime_penunjuk = os.stat(path_penunjuk).st_mtime_ns
+
+        for nama in os.listdir(self.folder_indeks):
+            if nama.startswith(AWALAN_VERSI) and nama not in (versi, versi_lama):
+                shutil.rmtree(os.path.join(self.folder_indeks, nama), ignore_errors=True)
+        logger.info(f"Indeks logo disimpan sebagai versi {versi}")
+
+    def bangun(self, folder_logo: str) -> int:
+        """
+        Bangun ulang indeks dari seluruh isi folder logo referensi.
+
+        Args:
+            folder_logo: Folder pustaka logo referensi
+
+        Returns:
+            int: Jumlah logo yang berhasil diindeks
+        """
+        self.logo = []
+        self.deskriptor = np.zeros((0, 32), np.uint8)
+        self.titik = np.zeros((0, 2), np.float32)
+        self.id_logo = np.zeros(0, np.int32)
+        return self.tambah(daftar_logo_referensi(folder_logo))
+
+    def tambah(self, daftar_logo: List[Tuple[str, str]]) -> int:
+        """
+        Tambahkan logo ke indeks tanpa menghitung ulang logo yang sudah ada.
+
+        Args:
+            daftar_logo: Pasangan (nama brand, path file logo)
+
+        Returns:
+            int: Jumlah logo yang berhasil ditambahkan
+        """
+        orb = cv2.ORB_create(nfeatures=self.jumlah_fitur)
+        id_berikutnya = max((logo['id'] for logo in self.logo), default=-1) + 1
+        daftar_deskriptor, daftar_titik, daftar_id = [], [], []
+
+        for brand, path_logo in daftar_logo:
+            gambar = cv2.imread(path_logo, cv2.IMREAD_GRAYSCALE)
+            if gambar is None:
+                logger.warning(f"Logo referensi tidak bisa dibaca: {path_logo}")
+                continue
+
+            keypoint, deskriptor = orb.detectAndCompute(gambar, None)
+            if deskriptor is None or len(keypoint) < 10:
+                logger.warning(f"Logo referensi terlalu sedikit fitur: {path_logo}")
+                continue
+
+            self.logo.append({
+                'id': id_berikutnya,
+                'brand': brand,
+                'path': path_logo,
+                'lebar': int(gambar.shape[1]),
+                'tinggi': int(gambar.shape[0]),
+                'aktif': True
+            })
+            daftar_deskriptor.append(deskriptor)
+            daftar_titik.append(np.float32([kp.pt for kp in keypoint]))
+            daftar_id.append(np.full(len(keypoint), id_berikutnya, np.int32))
+            id_berikutnya += 1
+
+        if daftar_deskriptor:
+            with self._lock:
+                self.deskriptor = np.concatenate([self.deskriptor, *daftar_deskriptor])
+                self.titik = np.concatenate([self.titik, *daftar_titik])
+                self.id_logo = np.concatenate([self.id_logo, *daftar_id])
+                self._perbarui_baris_aktif()
+
+        logger.info(f"{len(daftar_deskriptor)} logo ditambahkan ke indeks")
+        return len(daftar_deskriptor)
+
+    def hapus(self, brand: Optional[str] = None, path_logo: Optional[str] = None) -> int:
+        """
+        Nonaktifkan logo berdasarkan brand atau path. Deskriptornya tetap di
+        file sampai padatkan() dipanggil, tetapi tidak ikut dicari lagi.
+
+        Args:
+            brand: Nama brand yang dihapus
+            path_logo: Path file logo yang dihapus
+
+        Returns:
+            int: Jumlah logo yang dinonaktifkan
+        """
+        jumlah = 0
+        for logo in self.logo:
+            if logo['aktif'] and (logo['brand'] == brand or logo['path'] == path_logo):
+                logo['aktif'] = False
+                jumlah += 1
+
+        with self._lock:
+            self._perbarui_baris_aktif()
+        return jumlah
+
+    def padatkan(self) -> None:
+        """Buang deskriptor milik logo yang sudah dinonaktifkan dari array."""
+        with self._lock:
+            baris = self._baris_aktif
+            if baris is not None:
+                self.deskriptor = np.asarray(self.deskriptor)[baris]
+                self.titik = np.asarray(self.titik)[baris]
+                self.id_logo = np.asarray(self.id_logo)[baris]
+            self.logo = [logo for logo in self.logo if logo['aktif']]
+            self._perbarui_baris_aktif()
+
+    def logo_aktif(self) -> List[Dict]:
+        """Daftar metadata logo yang aktif."""
+        return [logo for logo in self.logo if logo['aktif']]
+
+    def cari(self, deskriptor_query: Any, jarak_maks: int = 64,
+             rasio_lowe: float = 0.8) -> Tuple[Any, Any]:
+        """
+        Cari deskriptor indeks terdekat untuk setiap deskriptor query.
+
+        Jarak Hamming dihitung untuk semua pasangan sekaligus per blok:
+        bit deskriptor di-unpack lalu jarak = popcount(q) + popcount(d) - 2 q.d,
+        sehingga perkalian matriks dikerjakan oleh BLAS.
+
+        Args:
+            deskriptor_query: Deskriptor ORB gambar (M x 32, uint8)
+            jarak_maks: Jarak Hamming maksimal pasangan yang diterima
+            rasio_lowe: Ambang ratio test terhadap tetangga kedua
+
+        Returns:
+            Tuple (indeks_query, indeks_baris) pasangan yang lolos filter
+        """
+        with self._lock:
+            deskriptor = self.deskriptor
+            baris_aktif = self._baris_aktif
+
+        jumlah_indeks = len(deskriptor) if baris_aktif is None else len(baris_aktif)
+        if jumlah_indeks == 0 or len(deskriptor_query) == 0:
+            return np.zeros(0, np.int64), np.zeros(0, np.int64)
+
+        bit_query = np.unpackbits(deskriptor_query, axis=1).astype(np.float32)
+        pop_query = bit_query.sum(axis=1)
+
+        jumlah_query = len(deskriptor_query)
+        jarak_1 = np.full(jumlah_query, np.inf, np.float32)
+        jarak_2 = np.full(jumlah_query, np.inf, np.float32)
+        terdekat = np.zeros(jumlah_query, np.int64)
+        baris_query = np.arange(jumlah_query)
+
+        for awal in range(0, jumlah_indeks, UKURAN_BLOK):
+            if baris_aktif is None:
+                baris_blok = np.arange(awal, min(awal + UKURAN_BLOK, jumlah_indeks))
+                blok = np.asarray(deskriptor[awal:awal + UKURAN_BLOK])
+            else:
+                baris_blok = baris_aktif[awal:awal + UKURAN_BLOK]
+                blok = np.asarray(deskriptor[baris_blok])
+
+            bit_blok = np.unpackbits(blok, axis=1).astype(np.float32)
+            jarak = pop_query[:, None] + bit_blok.sum(axis=1)[None, :] - 2 * (bit_query @ bit_blok.T)
+
+            # Dua tetangga terdekat di blok ini
+            idx_1 = jarak.argmin(axis=1)
+            blok_1 = jarak[baris_query, idx_1]
+            jarak[baris_query, idx_1] = np.inf
+            blok_2 = jarak.min(axis=1) if jarak.shape[1] > 1 else np.full(jumlah_query, np.inf, np.float32)
+
+            # Gabungkan dengan dua tetangga terdekat dari blok sebelumnya
+            lebih_dekat = blok_1 < jarak_1
+            jarak_2 = np.where(lebih_dekat, np.minimum(jarak_1, blok_2), np.minimum(jarak_2, blok_1))
+            jarak_1 = np.where(lebih_dekat, blok_1, jarak_1)
+            terdekat = np.where(lebih_dekat, baris_blok[idx_1], terdekat)
+
+        lolos = (jarak_1 <= jarak_maks) & (jarak_1 < rasio_lowe * jarak_2)
+        return np.flatnonzero(lolos), terdekat[lolos]
+
+    def logo_per_id(self) -> Dict[int, Dict]:
+        """Peta id logo ke metadata logo aktif."""
+        return {logo['id']: logo for logo in self.logo if logo['aktif']}
+
+    def _perbarui_baris_aktif(self) -> None:
+        """Hitung baris deskriptor milik logo aktif (None jika semua aktif)."""
+        id_nonaktif = [logo['id'] for logo in self.logo if not logo['aktif']]
+        if not id_nonaktif:
+            self._baris_aktif = None
+            return
+        self._baris_aktif = np.flatnonzero(~np.isin(np.asarray(self.id_logo), id_nonaktif))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point CLI pengelolaan indeks logo."""
+    parser = argparse.ArgumentParser(description="Kelola indeks deskriptor logo referensi")
+    sub = parser.add_subparsers(dest='perintah', required=True)
+
+    p_bangun = sub.add_parser('bangun', help="Bangun ulang indeks dari folder logo")
+    p_bangun.add_argument('--folder-logo', required=True)
+    p_bangun.add_argument('--indeks', required=True)
+    p_bangun.add_argument('--jumlah-fitur', type=int, default=1000)
+
+    p_tambah = sub.add_parser('tambah', help="Tambah file logo ke indeks")
+    p_tambah.add_argument('--indeks', required=True)
+    p_tambah.add_argument('--brand', required=True)
+    p_tambah.add_argument('path_logo', nargs='+')
+
+    p_hapus = sub.add_parser('hapus', help="Hapus logo berdasarkan brand atau path")
+    p_hapus.add_argument('--indeks', required=True)
+    p_hapus.add_argument('--brand')
+    p_hapus.add_argument('--path')
+
+    p_padatkan = sub.add_parser('padatkan', help="Buang deskriptor logo yang sudah dihapus")
+    p_padatkan.add_argument('--indeks', required=True)
+
+    p_info = sub.add_parser('info', help="Tampilkan ringkasan indeks")
+    p_info.add_argument('--indeks', required=True)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+
+    if args.perintah == 'bangun':
+        indeks = IndeksLogo(jumlah_fitur=args.jumlah_fitur)
+        indeks.folder_indeks = args.indeks
+        jumlah = indeks.bangun(args.folder_logo)
+        indeks.simpan()
+        print(f"Indeks dibangun: {jumlah} logo, {len(indeks.deskriptor)} deskriptor")
+        return 0
+
+    indeks = IndeksLogo(args.indeks)
+    if args.perintah == 'tambah':
+        jumlah = indeks.tambah([(args.brand, path) for path in args.path_logo])
+        indeks.simpan()
+        print(f"{jumlah} logo ditambahkan")
+    elif args.perintah == 'hapus':
+        if not args.brand and not args.path:
+            parser.error("isi --brand atau --path")
+        jumlah = indeks.hapus(brand=args.brand, path_logo=args.path)
+        indeks.simpan()
+        print(f"{jumlah} logo dihapus")
+    elif args.perintah == 'padatkan':
+        indeks.padatkan()
+        indeks.simpan()
+        print(f"Indeks dipadatkan: {len(indeks.deskriptor)} deskriptor")
+    else:
+        brand = sorted({logo['brand'] for logo in indeks.logo_aktif()})
+        print(f"Versi: {indeks.versi or 'lama'}")
+        print(f"Logo aktif: {len(indeks.logo_aktif())}, deskriptor: {len(indeks.deskriptor)}")
+        print(f"Brand: {', '.join(brand)}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,367 @@
+"""
+Komponen ketahanan untuk pemanggilan layanan eksternal.
+
+Modul ini berisi pembatas laju token bucket, circuit breaker, dan fungsi
+retry dengan backoff eksponensial + jitter yang menghormati Retry-After.
+Semua komponen thread-safe dan dipakai bersama oleh semua thread (dan
+event loop asyncio) di satu proses.
+"""
+
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, Optional, Tuple, TypeVar
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+SIRKUIT_TERTUTUP = 'tertutup'
+SIRKUIT_TERBUKA = 'terbuka'
+SIRKUIT_SETENGAH_TERBUKA = 'setengah_terbuka'
+
+
+class LayananTidakTersedia(Exception):
+    """
+    Layanan eksternal sedang tidak bisa dipanggil (sirkuit terbuka, kuota
+    habis, atau retry sudah habis untuk error sementara).
+
+    Attributes:
+        coba_lagi_setelah: Detik yang disarankan sebelum mencoba lagi
+    """
+
+    def __init__(self, pesan: str, coba_lagi_setelah: float = 0):
+        super().__init__(pesan)
+        self.coba_lagi_setelah = coba_lagi_setelah
+
+
+class PembatasLaju:
+    """Token bucket: rata-rata `laju` panggilan per detik dengan burst `kapasitas`."""
+
+    def __init__(self, laju: float, kapasitas: Optional[float] = None):
+        """
+        Inisialisasi pembatas laju.
+
+        Args:
+            laju: Jumlah token yang diisi ulang per detik
+            kapasitas: Jumlah token maksimal (default sama dengan laju, minimal 1)
+        """
+        self.laju = laju
+        self.kapasitas = max(1.0, kapasitas if kapasitas is not None else laju)
+        self._token = self.kapasitas
+        self._waktu_isi = time.monotonic()
+        self._lock = threading.Lock()
+
+    def ambil(self, timeout: float = 0) -> None:
+        """
+        Ambil satu token, menunggu paling lama `timeout` detik.
+
+        Args:
+            timeout: Detik maksimal menunggu token tersedia
+
+        Raises:
+            LayananTidakTersedia: Jika token tidak tersedia sampai timeout
+        """
+        batas_waktu = time.monotonic() + timeout
+        while True:
+            tunggu = self._coba_ambil(batas_waktu)
+            if tunggu <= 0:
+                return
+            time.sleep(tunggu)
+
+    async def ambil_async(self, timeout: float = 0) -> None:
+        """
+        Versi asyncio dari ambil(); menunggu tanpa menahan event loop.
+
+        Raises:
+            LayananTidakTersedia: Jika token tidak tersedia sampai timeout
+        """
+        batas_waktu = time.monotonic() + timeout
+        while True:
+            tunggu = self._coba_ambil(batas_waktu)
+            if tunggu <= 0:
+                return
+            await asyncio.sleep(tunggu)
+
+    def _coba_ambil(self, batas_waktu: float) -> float:
+        """
+        Isi ulang token lalu coba ambil satu.
+
+        Returns:
+            float: 0 jika token berhasil diambil, atau detik yang perlu ditunggu
+
+        Raises:
+            LayananTidakTersedia: Jika token baru tersedia setelah batas_waktu
+        """
+        with self._lock:
+            sekarang = time.monotonic()
+            self._token = min(
+                self.kapasitas,
+                self._token + (sekarang - self._waktu_isi) * self.laju
+            )
+            self._waktu_isi = sekarang
+            if self._token >= 1:
+                self._token -= 1
+                return 0
+            tunggu = (1 - self._token) / self.laju
+
+        if sekarang + tunggu > batas_waktu:
+            raise LayananTidakTersedia("Batas laju panggilan tercapai", coba_lagi_setelah=tunggu)
+        return tunggu
+
+
+class PemutusSirkuit:
+    """
+    Circuit breaker sederhana.
+
+    Setelah `ambang_gagal` kegagalan berturut-turut sirkuit terbuka dan
+    semua panggilan langsung ditolak selama `waktu_pemulihan` detik. Setelah
+    itu satu panggilan percobaan diizinkan (setengah terbuka); jika berhasil
+    sirkuit tertutup lagi, jika gagal sirkuit kembali terbuka.
+    """
+
+    def __init__(self, ambang_gagal: int = 5, waktu_pemulihan: float = 30.0):
+        """
+        Inisialisasi circuit breaker.
+
+        Args:
+            ambang_gagal: Jumlah kegagalan berturut-turut sebelum sirkuit terbuka
+            waktu_pemulihan: Detik sirkuit terbuka sebelum panggilan percobaan
+        """
+        self.ambang_gagal = ambang_gagal
+        self.waktu_pemulihan = waktu_pemulihan
+        self._status = SIRKUIT_TERTUTUP
+        self._jumlah_gagal = 0
+        self._dibuka_pada = 0.0
+        self._percobaan_berjalan = False
+        self._lock = threading.Lock()
+
+    @property
+    def status(self) -> str:
+        """Status sirkuit saat ini."""
+        with self._lock:
+            return self._status
+
+    def izinkan(self) -> bool:
+        """
+        Cek apakah panggilan boleh dilakukan.
+
+        Returns:
+            bool: True jika panggilan ini adalah percobaan setengah terbuka;
+                  pemanggil wajib memanggil lepas_percobaan() setelah selesai
+
+        Raises:
+            LayananTidakTersedia: Jika sirkuit sedang terbuka
+        """
+        with self._lock:
+            if self._status == SIRKUIT_TERTUTUP:
+                return False
+
+            sisa = self._dibuka_pada + self.waktu_pemulihan - time.monotonic()
+            if self._status == SIRKUIT_TERBUKA and sisa <= 0:
+                self._status = SIRKUIT_SETENGAH_TERBUKA
+                self._percobaan_berjalan = False
+
+            if self._status == SIRKUIT_SETENGAH_TERBUKA and not self._percobaan_berjalan:
+                self._percobaan_berjalan = True
+                return True
+
+            raise LayananTidakTersedia(
+                "Layanan sedang tidak tersedia (circuit breaker terbuka)",
+                coba_lagi_setelah=max(sisa, 1.0)
+            )
+
+    def lepas_percobaan(self) -> None:
+        """
+        Lepaskan slot percobaan setengah terbuka.
+
+        Aman dipanggil setelah catat_berhasil()/catat_gagal(); berguna jika
+        percobaan berakhir tanpa hasil (mis. dibatalkan) agar sirkuit tidak
+        tertahan setengah terbuka selamanya.
+        """
+        with self._lock:
+            self._percobaan_berjalan = False
+
+    def catat_berhasil(self) -> None:
+        """Catat panggilan berhasil; sirkuit kembali tertutup."""
+        with self._lock:
+            if self._status != SIRKUIT_TERTUTUP:
+                logger.info("Circuit breaker tertutup kembali")
+            self._status = SIRKUIT_TERTUTUP
+            self._jumlah_gagal = 0
+            self._percobaan_berjalan = False
+
+    def catat_gagal(self) -> None:
+        """Catat panggilan gagal; buka sirkuit jika ambang tercapai."""
+        with self._lock:
+            self._jumlah_gagal += 1
+            self._percobaan_berjalan = False
+            if self._status == SIRKUIT_SETENGAH_TERBUKA or self._jumlah_gagal >= self.ambang_gagal:
+                if self._status != SIRKUIT_TERBUKA:
+                    logger.warning(
+                        f"Circuit breaker terbuka setelah {self._jumlah_gagal} kegagalan, "
+                        f"panggilan ditolak selama {self.waktu_pemulihan:.0f} detik"
+                    )
+                self._status = SIRKUIT_TERBUKA
+                self._dibuka_pada = time.monotonic()
+
+
+def jalankan_dengan_retry(
+    fungsi: Callable[[], T],
+    klasifikasi_error: Callable[[Exception], Tuple[bool, Optional[float]]],
+    maks_percobaan: int = 3,
+    backoff_dasar: float = 0.5,
+    backoff_maks: float = 8.0,
+    pembatas: Optional[PembatasLaju] = None,
+    pemutus: Optional[PemutusSirkuit] = None,
+    timeout_token: float = 5.0
+) -> T:
+    """
+    Panggil fungsi dengan retry, pembatas laju, dan circuit breaker.
+
+    Jeda antar percobaan memakai full jitter (acak antara 0 dan
+    backoff_dasar * 2^percobaan, dibatasi backoff_maks), kecuali server
+    memberi Retry-After yang lebih lama.
+
+    Args:
+        fungsi: Panggilan yang dijalankan
+        klasifikasi_error: Fungsi yang menerima exception dan mengembalikan
+                           (boleh diulang, detik Retry-After atau None)
+        maks_percobaan: Jumlah percobaan total
+        backoff_dasar: Jeda dasar backoff (detik)
+        backoff_maks: Jeda maksimal antar percobaan (detik)
+        pembatas: Pembatas laju bersama (optional)
+        pemutus: Circuit breaker bersama (optional)
+        timeout_token: Detik maksimal menunggu token pembatas laju
+
+    Returns:
+        Hasil fungsi
+
+    Raises:
+        LayananTidakTersedia: Jika sirkuit terbuka, token tidak tersedia, atau
+                              error sementara masih terjadi setelah retry habis
+        Exception: Error yang tidak boleh diulang diteruskan apa adanya
+    """
+    for percobaan in range(maks_percobaan):
+        # Token diambil sebelum izin sirkuit agar timeout pembatas laju tidak
+        # menahan slot percobaan setengah terbuka
+        if pembatas:
+            pembatas.ambil(timeout_token)
+        slot_percobaan = pemutus.izinkan() if pemutus else False
+
+        try:
+            hasil = fungsi()
+        except Exception as e:
+            jeda = _jeda_percobaan_ulang(
+                e, percobaan, klasifikasi_error, maks_percobaan, backoff_dasar, backoff_maks, pemutus
+            )
+        else:
+            if pemutus:
+                pemutus.catat_berhasil()
+            return hasil
+        finally:
+            if slot_percobaan:
+                pemutus.lepas_percobaan()
+
+        time.sleep(jeda)
+
+    raise LayananTidakTersedia("Jumlah percobaan tidak valid")
+
+
+async def jalankan_dengan_retry_async(
+    fungsi: Callable[[], Awaitable[T]],
+    klasifikasi_error: Callable[[Exception], Tuple[bool, Optional[float]]],
+    maks_percobaan: int = 3,
+    backoff_dasar: float = 0.5,
+    backoff_maks: float = 8.0,
+    pembatas: Optional[PembatasLaju] = None,
+    pemutus: Optional[PemutusSirkuit] = None,
+    timeout_token: float = 5.0
+) -> T:
+    """
+    Versi asyncio dari jalankan_dengan_retry dengan aturan yang sama.
+
+    Args:
+        fungsi: Fungsi tanpa argumen yang mengembalikan coroutine panggilan
+        (argumen lain sama dengan jalankan_dengan_retry)
+
+    Returns:
+        Hasil coroutine
+
+    Raises:
+        LayananTidakTersedia: Lihat jalankan_dengan_retry
+        Exception: Error yang tidak boleh diulang diteruskan apa adanya
+    """
+    for percobaan in range(maks_percobaan):
+        if pembatas:
+            await pembatas.ambil_async(timeout_token)
+        slot_percobaan = pemutus.izinkan() if pemutus else False
+
+        # finally juga menangkap CancelledError (bukan turunan Exception)
+        try:
+            hasil = await fungsi()
+        except Exception as e:
+            jeda = _jeda_percobaan_ulang(
+                e, percobaan, klasifikasi_error, maks_percobaan, backoff_dasar, backoff_maks, pemutus
+            )
+        else:
+            if pemutus:
+                pemutus.catat_berhasil()
+            return hasil
+        finally:
+            if slot_percobaan:
+                pemutus.lepas_percobaan()
+
+        await asyncio.sleep(jeda)
+
+    raise LayananTidakTersedia("Jumlah percobaan tidak valid")
+
+
+def _jeda_percobaan_ulang(
+    error: Exception,
+    percobaan: int,
+    klasifikasi_error: Callable[[Exception], Tuple[bool, Optional[float]]],
+    maks_percobaan: int,
+    backoff_dasar: float,
+    backoff_maks: float,
+    pemutus: Optional[PemutusSirkuit]
+) -> float:
+    """
+    Tentukan jeda sebelum percobaan berikutnya, atau lempar error jika tidak
+    boleh/tidak perlu diulang lagi. Dipanggil dari dalam blok except.
+
+    Returns:
+        float: Detik jeda sebelum percobaan berikutnya
+
+    Raises:
+        Exception: Error asli jika tidak boleh diulang
+        LayananTidakTersedia: Jika percobaan habis atau Retry-After terlalu lama
+    """
+    boleh_ulang, retry_after = klasifikasi_error(error)
+    if not boleh_ulang:
+        # Error permintaan (mis. gambar tidak valid) bukan tanda layanan bermasalah
+        if pemutus:
+            pemutus.catat_berhasil()
+        raise error
+
+    if pemutus:
+        pemutus.catat_gagal()
+
+    jeda = random.uniform(0, min(backoff_maks, backoff_dasar * (2 ** percobaan)))
+    if retry_after is not None:
+        jeda = max(jeda, retry_after)
+
+    if percobaan + 1 >= maks_percobaan or jeda > backoff_maks:
+        raise LayananTidakTersedia(
+            f"Layanan gagal setelah {percobaan + 1} percobaan: {str(error)}",
+            coba_lagi_setelah=max(jeda, 1.0)
+        ) from error
+
+    logger.warning(
+        f"Panggilan gagal (percobaan {percobaan + 1}/{maks_percobaan}), "
+        f"mencoba lagi dalam {jeda:.2f} detik: {str(error)}"
+    )
+    return jeda
@@ -0,0 +1,169 @@
+"""
+Metrik latensi dan cache dalam format Prometheus.
+
+Modul ini mencatat durasi setiap tahap deteksi, latensi dan status panggilan
+layanan Vision, waktu tunggu pool dan durasi query database, serta hit/miss
+cache. Jika environment PROMETHEUS_MULTIPROC_DIR diset sebelum aplikasi
+dimulai, setiap worker gunicorn menulis nilainya ke file di folder tersebut
+dan /metrics menggabungkan semuanya, sehingga angka yang dilaporkan benar
+untuk seluruh worker. Jika prometheus_client tidak terpasang, semua fungsi
+pencatat tidak melakukan apa-apa.
+"""
+
+import os
+import time
+import logging
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+# Folder multiprocess harus ada sebelum metrik pertama dibuat
+_FOLDER_MULTIPROSES = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+if _FOLDER_MULTIPROSES:
+    os.makedirs(_FOLDER_MULTIPROSES, exist_ok=True)
+
+try:
+    import prometheus_client  # type: ignore
+    from prometheus_client import multiprocess  # type: ignore
+except ImportError:  # pragma: no cover - dependensi opsional
+    prometheus_client = None
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+EMBER_LATENSI = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+if prometheus_client is not None:
+    DURASI_TAHAP = prometheus_client.Histogram(
+        'branddetection_tahap_durasi_detik',
+        'Durasi setiap tahap pemrosesan deteksi',
+        ['tahap'],
+        buckets=EMBER_LATENSI
+    )
+    DURASI_VISION = prometheus_client.Histogram(
+        'branddetection_vision_durasi_detik',
+        'Durasi satu panggilan layanan Vision (per percobaan)',
+        ['backend'],
+        buckets=EMBER_LATENSI
+    )
+    PANGGILAN_VISION = prometheus_client.Counter(
+        'branddetection_vision_panggilan',
+        'Jumlah panggilan layanan Vision per status (sukses, kode HTTP, atau jenis error)',
+        ['backend', 'status']
+    )
+    TUNGGU_POOL = prometheus_client.Histogram(
+        'branddetection_db_pool_tunggu_detik',
+        'Waktu menunggu koneksi dari pool database',
+        buckets=EMBER_LATENSI
+    )
+    DURASI_QUERY = prometheus_client.Histogram(
+        'branddetection_db_query_durasi_detik',
+        'Durasi operasi database (tanpa waktu tunggu pool)',
+        ['operasi'],
+        buckets=EMBER_LATENSI
+    )
+    AKSES_CACHE = prometheus_client.Counter(
+        'branddetection_cache_akses',
+        'Jumlah akses cache per hasil (hit/miss)',
+        ['cache', 'hasil']
+    )
+
+
+def metrik_aktif() -> bool:
+    """Cek apakah prometheus_client terpasang."""
+    return prometheus_client is not None
+
+
+@contextmanager
+def ukur_tahap(tahap: str) -> Iterator[None]:
+    """
+    Ukur durasi satu tahap pemrosesan (bisa dipakai sebagai decorator).
+
+    Args:
+        tahap: Nama tahap (contoh: 'info_gambar', 'simpan_database')
+    """
+    mulai = time.perf_counter()
+    try:
+        yield
+    finally:
+        if prometheus_client is not None:
+            DURASI_TAHAP.labels(tahap).observe(time.perf_counter() - mulai)
+
+
+@contextmanager
+def ukur_panggilan_vision(backend: str) -> Iterator[None]:
+    """
+    Ukur satu panggilan layanan Vision beserta statusnya.
+
+    Status adalah 'sukses', kode HTTP dari response error, atau nama kelas
+    error (misalnya timeout jaringan). Exception diteruskan apa adanya.
+
+    Args:
+        backend: Nama backend detektor (contoh: 'azure')
+    """
+    mulai = time.perf_counter()
+    status = 'sukses'
+    try:
+        yield
+    except Exception as e:
+        kode = getattr(getattr(e, 'response', None), 'status_code', None)
+        status = str(kode) if kode is not None else type(e).__name__
+        raise
+    finally:
+        if prometheus_client is not None:
+            DURASI_VISION.labels(backend).observe(time.perf_counter() - mulai)
+            PANGGILAN_VISION.labels(backend, status).inc()
+
+
+def catat_tunggu_pool(durasi: float) -> None:
+    """Catat waktu menunggu koneksi dari pool database (detik)."""
+    if prometheus_client is not None:
+        TUNGGU_POOL.observe(durasi)
+
+
+@contextmanager
+def ukur_query(operasi: str) -> Iterator[None]:
+    """
+    Ukur durasi satu operasi database.
+
+    Args:
+        operasi: Nama operasi (nama method DatabaseService)
+    """
+    mulai = time.perf_counter()
+    try:
+        yield
+    finally:
+        if prometheus_client is not None:
+            DURASI_QUERY.labels(operasi).observe(time.perf_counter() - mulai)
+
+
+def catat_cache(cache: str, hasil: str) -> None:
+    """
+    Catat satu akses cache.
+
+    Args:
+        cache: Nama cache ('deteksi', 'duplikat', 'baca')
+        hasil: Hasil akses (contoh: 'hit_memori', 'hit_disk', 'hit', 'miss')
+    """
+    if prometheus_client is not None:
+        AKSES_CACHE.labels(cache, hasil).inc()
+
+
+def hasilkan_metrik() -> Optional[Tuple[bytes, str]]:
+    """
+    Susun semua metrik dalam format teks Prometheus.
+
+    Dalam mode multiprocess, nilai dari semua worker digabung.
+
+    Returns:
+        Tuple (isi response, content type), atau None jika prometheus_client
+        tidak terpasang
+    """
+    if prometheus_client is None:
+        return None
+
+    if _FOLDER_MULTIPROSES:
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
@@ -0,0 +1,393 @@
+"""
+Penyimpanan file upload berbasis hash isi (content-addressed).
+
+File dinamai dengan hash SHA-256 isinya dan disebar ke subfolder bertingkat
+(contoh: uploads/3f/a2/3fa2...), sehingga upload dengan nama sama tidak
+saling menimpa, isi yang identik hanya disimpan sekali, dan tidak ada satu
+folder yang tumbuh tanpa batas. Jumlah referensi setiap file dicatat di
+indeks SQLite, dan penyapu (GC) menghapus file yang sudah tidak dirujuk
+gambar (tabel Images) mana pun.
+
+Backend penyimpanan bisa diganti: BackendBerkasLokal untuk filesystem lokal,
+dan antarmuka BackendBerkas untuk implementasi blob storage.
+"""
+
+import os
+import re
+import time
+import hashlib
+import logging
+import sqlite3
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+POLA_KUNCI = re.compile(r'^[0-9a-f]{64}$')
+UKURAN_CHUNK = 1024 * 1024
+
+
+def hitung_kunci_file(path_file: str) -> str:
+    """Hitung hash SHA-256 isi file dengan membaca per potongan."""
+    sha = hashlib.sha256()
+    with open(path_file, 'rb') as file:
+        for potongan in iter(lambda: file.read(UKURAN_CHUNK), b''):
+            sha.update(potongan)
+    return sha.hexdigest()
+
+
+class BackendBerkas(ABC):
+    """Antarmuka backend penyimpanan file berdasarkan kunci hash."""
+
+    nama: str = 'backend'
+
+    @abstractmethod
+    def lokasi(self, kunci: str) -> str:
+        """Lokasi file (path atau URL) yang disimpan di kolom image_path."""
+
+    @abstractmethod
+    def kunci_dari_lokasi(self, lokasi: str) -> Optional[str]:
+        """Kebalikan lokasi(); None jika lokasi bukan milik backend ini."""
+
+    @abstractmethod
+    def ada(self, kunci: str) -> bool:
+        """Cek apakah file dengan kunci ini sudah tersimpan."""
+
+    @abstractmethod
+    def tulis(self, kunci: str, data: bytes) -> None:
+        """Tulis isi file secara atomik."""
+
+    def tulis_dari_file(self, kunci: str, path_lokal: str) -> None:
+        """
+        Simpan file lokal sementara lalu hapus file sumbernya.
+
+        Implementasi default membaca file ke memori; backend lokal cukup
+        memindahkan file.
+        """
+        with open(path_lokal, 'rb') as file:
+            self.tulis(kunci, file.read())
+        os.remove(path_lokal)
+
+    @abstractmethod
+    def baca(self, kunci: str) -> bytes:
+        """Baca isi file."""
+
+    @abstractmethod
+    def hapus(self, kunci: str) -> None:
+        """Hapus file (tidak error jika sudah tidak ada)."""
+
+    @abstractmethod
+    def daftar(self) -> Iterator[Tuple[str, float, int]]:
+        """Iterasi semua file tersimpan sebagai (kunci, waktu ubah, ukuran)."""
+
+
+class BackendBerkasLokal(BackendBerkas):
+    """Backend filesystem lokal dengan subfolder bertingkat dari awalan hash."""
+
+    nama = 'lokal'
+
+    def __init__(self, folder_root: str, kedalaman: int = 2, lebar: int = 2):
+        """
+        Inisialisasi backend lokal.
+
+        Args:
+            folder_root: Folder utama penyimpanan (biasanya UPLOAD_FOLDER)
+            kedalaman: Jumlah tingkat subfolder
+            lebar: Jumlah karakter hash per tingkat subfolder
+        """
+        self.folder_root = folder_root
+        self.kedalaman = kedalaman
+        self.lebar = lebar
+        os.makedirs(folder_root, exist_ok=True)
+
+    def lokasi(self, kunci: str) -> str:
+        bagian = [kunci[i * self.lebar:(i + 1) * self.lebar] for i in range(self.kedalaman)]
+        return os.path.join(self.folder_root, *bagian, kunci)
+
+    def kunci_dari_lokasi(self, lokasi: str) -> Optional[str]:
+        kunci = os.path.basename(lokasi)
+        if POLA_KUNCI.match(kunci) and os.path.normpath(lokasi) == os.path.normpath(self.lokasi(kunci)):
+            return kunci
+        return None
+
+    def ada(self, kunci: str) -> bool:
+        return os.path.exists(self.lokasi(kunci))
+
+    def tulis(self, kunci: str, data: bytes) -> None:
+        path_tujuan = self.lokasi(kunci)
+        folder = os.path.dirname(path_tujuan)
+        os.makedirs(folder, exist_ok=True)
+
+        deskriptor, path_sementara = tempfile.mkstemp(dir=folder, prefix='.tulis-')
+        try:
+            with os.fdopen(deskriptor, 'wb') as file:
+                file.write(data)
+            os.replace(path_sementara, path_tujuan)
+        except BaseException:
+            if os.path.exists(path_sementara):
+                os.remove(path_sementara)
+            raise
+
+    def tulis_dari_file(self, kunci: str, path_lokal: str) -> None:
+        path_tujuan = self.lokasi(kunci)
+        os.makedirs(os.path.dirname(path_tujuan), exist_ok=True)
+        os.replace(path_lokal, path_tujuan)
+
+    def baca(self, kunci: str) -> bytes:
+        with open(self.lokasi(kunci), 'rb') as file:
+            return file.read()
+
+    def hapus(self, kunci: str) -> None:
+        try:
+            os.remove(self.lokasi(kunci))
+        except FileNotFoundError:
+            pass
+
+    def daftar(self) -> Iterator[Tuple[str, float, int]]:
+        def telusuri(folder: str, tingkat: int) -> Iterator[Tuple[str, float, int]]:
+            try:
+                entri_folder = list(os.scandir(folder))
+            except FileNotFoundError:
+                return
+            for entri in entri_folder:
+                if tingkat < self.kedalaman:
+                    # Hanya subfolder shard; file lama di luar shard tidak disentuh
+                    if entri.is_dir() and len(entri.name) == self.lebar:
+                        yield from telusuri(entri.path, tingkat + 1)
+                elif entri.is_file() and POLA_KUNCI.match(entri.name):
+                    info = entri.stat()
+                    yield entri.name, info.st_mtime, info.st_size
+
+        yield from telusuri(self.folder_root, 0)
+
+
+class PenyimpananBerkas:
+    """
+    Penyimpanan file upload dengan deduplikasi dan penghitung referensi.
+
+    Setiap penyimpanan menambah jumlah referensi file; isi yang sudah ada
+    tidak ditulis ulang. Penyapu menyelaraskan jumlah referensi dengan
+    gambar di tabel Images dan menghapus file tanpa referensi yang lebih tua
+    dari masa tenggang (agar upload yang barisnya belum tersimpan aman).
+    """
+
+    def __init__(self, backend: BackendBerkas, path_indeks: str):
+        """
+        Inisialisasi penyimpanan.
+
+        Args:
+            backend: Backend tempat file disimpan
+            path_indeks: Path file SQLite indeks jumlah referensi
+        """
+        self.backend = backend
+        self.path_indeks = path_indeks
+        self._lokal = threading.local()
+        self._thread_penyapu: Optional[threading.Thread] = None
+        self._berhenti = threading.Event()
+
+        os.makedirs(os.path.dirname(path_indeks) or '.', exist_ok=True)
+        koneksi = self._koneksi()
+        koneksi.execute(
+            """
+            CREATE TABLE IF NOT EXISTS berkas (
+                kunci TEXT PRIMARY KEY,
+                ukuran INTEGER NOT NULL,
+                jumlah_referensi INTEGER NOT NULL,
+                dibuat_pada REAL NOT NULL,
+                terakhir_dipakai REAL NOT NULL
+            )
+            """
+        )
+        koneksi.commit()
+
+    def _koneksi(self) -> sqlite3.Connection:
+        """Koneksi SQLite milik thread saat ini."""
+        koneksi = getattr(self._lokal, 'koneksi', None)
+        if koneksi is None:
+            koneksi = sqlite3.connect(self.path_indeks, timeout=5.0)
+            koneksi.row_factory = sqlite3.Row
+            koneksi.execute("PRAGMA journal_mode=WAL")
+            self._lokal.koneksi = koneksi
+        return koneksi
+
+    def lokasi_untuk(self, data: bytes) -> str:
+        """Lokasi yang akan dipakai file dengan isi ini (tanpa menyimpannya)."""
+        return self.backend.lokasi(hashlib.sha256(data).hexdigest())
+
+    def simpan_bytes(self, data: bytes) -> str:
+        """
+        Simpan isi file (hanya ditulis jika belum ada).
+
+        Args:
+            data: Isi file
+
+        Returns:
+            str: Lokasi file untuk kolom image_path
+        """
+        kunci = hashlib.sha256(data).hexdigest()
+        if self._catat_referensi(kunci, len(data)):
+            self.backend.tulis(kunci, data)
+        return self.backend.lokasi(kunci)
+
+    def simpan_file(self, path_lokal: str, kunci: Optional[str] = None) -> str:
+        """
+        Simpan file lokal sementara; file sumber dipindahkan atau dihapus.
+
+        Args:
+            path_lokal: Path file sementara
+            kunci: Hash SHA-256 isi file jika sudah dihitung saat upload
+
+        Returns:
+            str: Lokasi file untuk kolom image_path
+        """
+        kunci = kunci or hitung_kunci_file(path_lokal)
+        if self._catat_referensi(kunci, os.path.getsize(path_lokal)):
+            self.backend.tulis_dari_file(kunci, path_lokal)
+        else:
+            os.remove(path_lokal)
+        return self.backend.lokasi(kunci)
+
+    def baca(self, lokasi: str) -> bytes:
+        """
+        Baca isi file dari lokasinya.
+
+        Lokasi lama (path di luar penyimpanan ini) dibaca langsung dari disk.
+        """
+        kunci = self.backend.kunci_dari_lokasi(lokasi)
+        if kunci is None:
+            with open(lokasi, 'rb') as file:
+                return file.read()
+        return self.backend.baca(kunci)
+
+    def jumlah_referensi(self, lokasi: str) -> int:
+        """Jumlah referensi file yang tercatat di indeks."""
+        kunci = self.backend.kunci_dari_lokasi(lokasi)
+        row = self._koneksi().execute(
+            "SELECT jumlah_referensi FROM berkas WHERE kunci = ?", (kunci,)
+        ).fetchone()
+        return row['jumlah_referensi'] if row else 0
+
+    def _catat_referensi(self, kunci: str, ukuran: int) -> bool:
+        """
+        Tambah jumlah referensi file.
+
+        Returns:
+            bool: True jika isi file perlu ditulis (baru, atau hilang dari backend)
+        """
+        sekarang = time.time()
+        koneksi = self._koneksi()
+        koneksi.execute(
+            """
+            INSERT INTO berkas (kunci, ukuran, jumlah_referensi, dibuat_pada, terakhir_dipakai)
+            VALUES (?, ?, 1, ?, ?)
+            ON CONFLICT(kunci) DO UPDATE SET
+                jumlah_referensi = jumlah_referensi + 1,
+                terakhir_dipakai = excluded.terakhir_dipakai
+            """,
+            (kunci, ukuran, sekarang, sekarang)
+        )
+        row = koneksi.execute(
+            "SELECT jumlah_referensi FROM berkas WHERE kunci = ?", (kunci,)
+        ).fetchone()
+        koneksi.commit()
+        return row['jumlah_referensi'] == 1 or not self.backend.ada(kunci)
+
+    def sapu(self, referensi: Dict[str, int], masa_tenggang: float) -> Dict[str, int]:
+        """
+        Selaraskan jumlah referensi dan hapus file yang tidak dirujuk.
+
+        Args:
+            referensi: Jumlah gambar di tabel Images per image_path
+            masa_tenggang: Umur minimal (detik) file tanpa referensi sebelum dihapus
+
+        Returns:
+            Dict: Jumlah file diperiksa, dihapus, dan byte yang dibebaskan
+        """
+        batas_waktu = time.time() - masa_tenggang
+        koneksi = self._koneksi()
+        statistik = {'diperiksa': 0, 'dihapus': 0, 'byte_dibebaskan': 0}
+
+        for kunci, waktu_ubah, ukuran in self.backend.daftar():
+            statistik['diperiksa'] += 1
+            jumlah = referensi.get(self.backend.lokasi(kunci), 0)
+
+            if jumlah > 0 or waktu_ubah > batas_waktu:
+                koneksi.execute(
+                    """
+                    INSERT INTO berkas (kunci, ukuran, jumlah_referensi, dibuat_pada, terakhir_dipakai)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(kunci) DO UPDATE SET jumlah_referensi = excluded.jumlah_referensi
+                    """,
+                    (kunci, ukuran, jumlah, waktu_ubah, waktu_ubah)
+                )
+                koneksi.commit()
+                continue
+
+            # Upload baru dengan isi yang sama memperbarui terakhir_dipakai,
+            # jadi baris indeks hanya terhapus jika file benar-benar tidak dipakai
+            cursor = koneksi.execute(
+                "DELETE FROM berkas WHERE kunci = ? AND terakhir_dipakai < ?",
+                (kunci, batas_waktu)
+            )
+            dipakai_lagi = cursor.rowcount == 0 and koneksi.execute(
+                "SELECT 1 FROM berkas WHERE kunci = ?", (kunci,)
+            ).fetchone() is not None
+
+            if not dipakai_lagi:
+                # File dihapus sebelum commit: upload isi yang sama menunggu lock
+                # indeks, lalu melihat kunci sebagai baru dan menulis ulang filenya
+                self.backend.hapus(kunci)
+                statistik['dihapus'] += 1
+                statistik['byte_dibebaskan'] += ukuran
+            koneksi.commit()
+
+        # Baris indeks yang filenya sudah tidak ada di backend
+        for row in koneksi.execute("SELECT kunci FROM berkas WHERE terakhir_dipakai < ?", (batas_waktu,)).fetchall():
+            if not self.backend.ada(row['kunci']):
+                koneksi.execute("DELETE FROM berkas WHERE kunci = ?", (row['kunci'],))
+        koneksi.commit()
+
+        logger.info(
+            f"Penyapuan berkas selesai: {statistik['diperiksa']} diperiksa, "
+            f"{statistik['dihapus']} dihapus ({statistik['byte_dibebaskan']} byte)"
+        )
+        return statistik
+
+    def mulai_penyapu(
+        self,
+        sumber_referensi: Callable[[], Optional[Dict[str, int]]],
+        interval: float,
+        masa_tenggang: float
+    ) -> None:
+        """
+        Jalankan penyapuan berkala di thread background.
+
+        Args:
+            sumber_referensi: Fungsi yang mengembalikan jumlah referensi per
+                              image_path, atau None jika gagal (penyapuan dilewati)
+            interval: Jeda antar penyapuan (detik)
+            masa_tenggang: Lihat sapu()
+        """
+        def jalankan() -> None:
+            while not self._berhenti.wait(interval):
+                referensi = sumber_referensi()
+                if referensi is None:
+                    logger.warning("Penyapuan berkas dilewati: referensi database tidak tersedia")
+                    continue
+                try:
+                    self.sapu(referensi, masa_tenggang)
+                except Exception as e:
+                    logger.error(f"Gagal menyapu berkas: {str(e)}")
+
+        self._thread_penyapu = threading.Thread(target=jalankan, name='penyapu-berkas', daemon=True)
+        self._thread_penyapu.start()
+
+    def hentikan_penyapu(self) -> None:
+        """Hentikan thread penyapu (jika berjalan)."""
+        self._berhenti.set()
+        if self._thread_penyapu is not None:
+            self._thread_penyapu.join(timeout=5)
+            self._thread_penyapu = None
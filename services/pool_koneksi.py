@@ -0,0 +1,243 @@
+"""
+Pool koneksi database yang thread-safe.
+
+Modul ini menyediakan pool koneksi berukuran tetap yang dipakai ulang oleh
+DatabaseService, sehingga setiap query tidak perlu membuka koneksi (dan
+handshake TLS) baru ke Azure SQL Database.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Iterator, Optional
+
+from .metrik import catat_tunggu_pool
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+class _EntriKoneksi:
+    """Pembungkus koneksi beserta waktu pembuatan dan pemakaian terakhir."""
+
+    __slots__ = ('koneksi', 'dibuat_pada', 'terakhir_dipakai')
+
+    def __init__(self, koneksi: Any):
+        sekarang = time.monotonic()
+        self.koneksi = koneksi
+        self.dibuat_pada = sekarang
+        self.terakhir_dipakai = sekarang
+
+
+class PoolKoneksi:
+    """
+    Pool koneksi terbatas dengan cek kesehatan, batas idle, dan batas umur.
+
+    Pool aman dipakai dari banyak thread dalam satu proses. Jika proses
+    di-fork (misalnya gunicorn dengan --preload), koneksi milik proses induk
+    tidak akan dipakai ulang oleh proses anak.
+    """
+
+    def __init__(
+        self,
+        pembuat_koneksi: Callable[[], Any],
+        ukuran_maks: int = 5,
+        idle_maks: float = 300.0,
+        umur_maks: float = 1800.0,
+        timeout_ambil: float = 10.0,
+        interval_cek: float = 30.0,
+        query_cek: str = 'SELECT 1'
+    ):
+        """
+        Inisialisasi pool koneksi.
+
+        Args:
+            pembuat_koneksi: Fungsi tanpa argumen yang membuat koneksi baru
+            ukuran_maks: Jumlah maksimal koneksi (idle + dipinjam)
+            idle_maks: Detik maksimal koneksi boleh menganggur sebelum ditutup
+            umur_maks: Detik maksimal umur koneksi sebelum diganti
+            timeout_ambil: Detik maksimal menunggu koneksi saat pool penuh
+            interval_cek: Koneksi yang menganggur lebih lama dari ini dicek
+                          dengan query_cek sebelum dipinjamkan
+            query_cek: Query ringan untuk cek kesehatan koneksi
+        """
+        self.pembuat_koneksi = pembuat_koneksi
+        self.ukuran_maks = max(1, ukuran_maks)
+        self.idle_maks = idle_maks
+        self.umur_maks = umur_maks
+        self.timeout_ambil = timeout_ambil
+        self.interval_cek = interval_cek
+        self.query_cek = query_cek
+
+        self._kondisi = threading.Condition()
+        self._idle: Deque[_EntriKoneksi] = deque()
+        self._jumlah_koneksi = 0
+        self._pid = os.getpid()
+
+    @contextmanager
+    def koneksi(self) -> Iterator[Any]:
+        """
+        Pinjam koneksi dari pool dan kembalikan otomatis setelah selesai.
+
+        Jika terjadi exception di dalam blok, transaksi di-rollback. Koneksi
+        yang gagal di-rollback dianggap rusak dan dibuang dari pool.
+
+        Yields:
+            Koneksi database yang siap dipakai
+
+        Raises:
+            TimeoutError: Jika pool penuh dan tidak ada koneksi yang kembali
+        """
+        mulai = time.perf_counter()
+        entri = self._ambil()
+        catat_tunggu_pool(time.perf_counter() - mulai)
+        try:
+            yield entri.koneksi
+        except BaseException:
+            self._kembalikan(entri, rusak=not self._rollback(entri))
+            raise
+        else:
+            self._kembalikan(entri)
+
+    def tutup_semua(self) -> None:
+        """Tutup semua koneksi idle di pool."""
+        with self._kondisi:
+            while self._idle:
+                self._buang(self._idle.pop())
+
+    def statistik(self) -> dict:
+        """
+        Ringkasan kondisi pool saat ini.
+
+        Returns:
+            dict: Jumlah koneksi total, idle, dan dipinjam
+        """
+        with self._kondisi:
+            return {
+                'ukuran_maks': self.ukuran_maks,
+                'total': self._jumlah_koneksi,
+                'idle': len(self._idle),
+                'dipinjam': self._jumlah_koneksi - len(self._idle)
+            }
+
+    def _ambil(self) -> _EntriKoneksi:
+        """Ambil koneksi sehat dari pool, buat baru jika perlu."""
+        batas_waktu = time.monotonic() + self.timeout_ambil
+
+        while True:
+            entri: Optional[_EntriKoneksi] = None
+            buat_baru = False
+
+            with self._kondisi:
+                self._cek_fork()
+                while True:
+                    # LIFO: koneksi yang baru dipakai paling mungkin masih hidup
+                    while self._idle:
+                        kandidat = self._idle.pop()
+                        if self._kadaluarsa(kandidat):
+                            self._buang(kandidat)
+                            continue
+                        entri = kandidat
+                        break
+
+                    if entri:
+                        break
+
+                    if self._jumlah_koneksi < self.ukuran_maks:
+                        self._jumlah_koneksi += 1
+                        buat_baru = True
+                        break
+
+                    sisa_waktu = batas_waktu - time.monotonic()
+                    if sisa_waktu <= 0:
+                        raise TimeoutError(
+                            f"Pool koneksi penuh ({self.ukuran_maks}) "
+                            f"setelah menunggu {self.timeout_ambil} detik"
+                        )
+                    self._kondisi.wait(sisa_waktu)
+
+            if buat_baru:
+                try:
+                    return _EntriKoneksi(self.pembuat_koneksi())
+                except BaseException:
+                    with self._kondisi:
+                        self._jumlah_koneksi -= 1
+                        self._kondisi.notify()
+                    raise
+
+            assert entri is not None
+            if self._sehat(entri):
+                return entri
+
+            # Koneksi mati: buang lalu ulangi, slot yang kosong dipakai untuk koneksi baru
+            logger.warning("Koneksi database di pool terputus, membuat koneksi ulang")
+            with self._kondisi:
+                self._buang(entri)
+
+    def _kembalikan(self, entri: _EntriKoneksi, rusak: bool = False) -> None:
+        """Kembalikan koneksi ke pool atau buang jika rusak/kadaluarsa."""
+        with self._kondisi:
+            if os.getpid() != self._pid:
+                # Koneksi dipinjam sebelum fork, jangan dimasukkan ke pool anak
+                return
+            entri.terakhir_dipakai = time.monotonic()
+            if rusak or self._kadaluarsa(entri):
+                self._buang(entri)
+            else:
+                self._idle.append(entri)
+                self._kondisi.notify()
+
+    def _buang(self, entri: _EntriKoneksi) -> None:
+        """Tutup koneksi dan kosongkan slotnya. Harus dipanggil dengan lock."""
+        self._jumlah_koneksi -= 1
+        self._kondisi.notify()
+        try:
+            entri.koneksi.close()
+        except Exception as e:
+            logger.debug(f"Gagal menutup koneksi: {str(e)}")
+
+    def _kadaluarsa(self, entri: _EntriKoneksi) -> bool:
+        """Cek apakah koneksi melewati batas umur atau batas idle."""
+        sekarang = time.monotonic()
+        return (
+            sekarang - entri.dibuat_pada > self.umur_maks
+            or sekarang - entri.terakhir_dipakai > self.idle_maks
+        )
+
+    def _sehat(self, entri: _EntriKoneksi) -> bool:
+        """Cek kesehatan koneksi yang sudah lama menganggur."""
+        if time.monotonic() - entri.terakhir_dipakai < self.interval_cek:
+            return True
+
+        try:
+            cursor = entri.koneksi.cursor()
+            cursor.execute(self.query_cek)
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception as e:
+            logger.debug(f"Cek kesehatan koneksi gagal: {str(e)}")
+            return False
+
+    def _rollback(self, entri: _EntriKoneksi) -> bool:
+        """Rollback transaksi yang gagal, False jika koneksi sudah rusak."""
+        try:
+            entri.koneksi.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _cek_fork(self) -> None:
+        """Reset pool jika proses ini hasil fork. Harus dipanggil dengan lock."""
+        pid = os.getpid()
+        if pid == self._pid:
+            return
+
+        # Socket milik proses induk tidak boleh dipakai atau ditutup dari anak
+        logger.info("Proses hasil fork terdeteksi, pool koneksi direset")
+        self._idle.clear()
+        self._jumlah_koneksi = 0
+        self._pid = pid
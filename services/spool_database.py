@@ -0,0 +1,384 @@
+"""
+Penyimpanan hasil deteksi secara write-behind lewat spool lokal.
+
+Endpoint deteksi cukup menulis hasilnya ke file SQLite lokal (WAL,
+fsync setiap commit) lalu langsung menjawab. Thread flusher di belakang
+mengirim isi spool ke Azure SQL per batch. Jika database lambat atau mati,
+hasil tetap aman di spool dan dikirim ulang dengan jeda yang makin panjang.
+Setiap gambar membawa upload_key, jadi pengiriman ulang setelah commit yang
+tidak sempat dicatat tidak menghasilkan baris ganda. File spool boleh
+dipakai bersama beberapa worker gunicorn: setiap flusher menyewa entri
+sebelum mengirimnya.
+"""
+
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+def _waktu_utc() -> datetime:
+    """Waktu sekarang dalam UTC tanpa zona (GETDATE() di Azure SQL selalu UTC)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class SpoolDatabase:
+    """Spool SQLite hasil deteksi dengan flusher background ke DatabaseService."""
+
+    def __init__(
+        self,
+        path_db: str,
+        db_service: Any,
+        ukuran_batch: int = 500,
+        interval_flush: float = 1.0,
+        backoff_maks: float = 60.0,
+        maks_percobaan: int = 10,
+        sewa: float = 120.0
+    ):
+        """
+        Inisialisasi spool.
+
+        Args:
+            path_db: Path file SQLite spool
+            db_service: DatabaseService tujuan flush
+            ukuran_batch: Jumlah baris maksimal per flush (satu transaksi SQL)
+            interval_flush: Jeda flush saat spool kosong (detik)
+            backoff_maks: Jeda maksimal antar percobaan saat database gagal (detik)
+            maks_percobaan: Percobaan maksimal sebuah entri yang selalu ditolak
+                            database sebelum ditandai gagal (tetap disimpan)
+            sewa: Detik entri dikunci satu flusher sebelum boleh diambil
+                  flusher lain (jika proses pemegangnya mati)
+        """
+        self.path_db = path_db
+        self.db_service = db_service
+        self.ukuran_batch = max(1, ukuran_batch)
+        self.interval_flush = interval_flush
+        self.backoff_maks = backoff_maks
+        self.maks_percobaan = max(1, maks_percobaan)
+        self.sewa = sewa
+        self._lokal = threading.local()
+        self._lock = threading.Lock()
+        self._sinyal = threading.Event()
+        self._berhenti = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._jeda = interval_flush
+        self._fork_terdaftar = False
+
+        koneksi = self._koneksi()
+        koneksi.execute(
+            """
+            CREATE TABLE IF NOT EXISTS spool_deteksi (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                data TEXT NOT NULL,
+                jumlah_baris INTEGER NOT NULL,
+                dibuat_pada REAL NOT NULL,
+                percobaan INTEGER NOT NULL DEFAULT 0,
+                coba_lagi_pada REAL NOT NULL DEFAULT 0,
+                disewa_sampai REAL NOT NULL DEFAULT 0,
+                gagal INTEGER NOT NULL DEFAULT 0,
+                error TEXT
+            )
+            """
+        )
+        koneksi.execute(
+            "CREATE INDEX IF NOT EXISTS idx_spool_siap ON spool_deteksi (gagal, coba_lagi_pada, id)"
+        )
+
+    def _koneksi(self) -> sqlite3.Connection:
+        """Koneksi SQLite milik thread saat ini (autocommit, transaksi eksplisit)."""
+        koneksi = getattr(self._lokal, 'koneksi', None)
+        if koneksi is None:
+            koneksi = sqlite3.connect(self.path_db, timeout=10.0, isolation_level=None)
+            koneksi.execute("PRAGMA journal_mode=WAL")
+            # Commit baru dianggap selesai setelah WAL di-fsync
+            koneksi.execute("PRAGMA synchronous=FULL")
+            self._lokal.koneksi = koneksi
+        return koneksi
+
+    def simpan(self, daftar_data: List[Dict]) -> bool:
+        """
+        Tulis baris hasil deteksi ke spool untuk dikirim ke database nanti.
+
+        Args:
+            daftar_data: Baris dengan format simpan_hasil_deteksi_batch
+
+        Returns:
+            bool: True jika sudah tersimpan di spool, False jika gagal
+                  (pemanggil sebaiknya menulis langsung ke database)
+        """
+        if not daftar_data:
+            return True
+
+        waktu = _waktu_utc()
+        # Waktu upload dicatat sekarang, bukan saat flush setelah gangguan
+        daftar_baris = [
+            {**data, 'upload_timestamp': data.get('upload_timestamp') or waktu}
+            for data in self.db_service.lengkapi_upload_key(daftar_data)
+        ]
+        try:
+            self._koneksi().execute(
+                "INSERT INTO spool_deteksi (data, jumlah_baris, dibuat_pada) VALUES (?, ?, ?)",
+                (json.dumps(daftar_baris, default=_json_default), len(daftar_baris), time.time())
+            )
+        except Exception as e:
+            logger.error(f"Gagal menulis hasil deteksi ke spool: {str(e)}")
+            return False
+
+        self._pastikan_flusher()
+        self._sinyal.set()
+        return True
+
+    def mulai(self) -> None:
+        """
+        Jalankan flusher di proses ini agar sisa spool dari proses sebelumnya
+        langsung dikirim, dan di setiap proses hasil fork (worker gunicorn).
+        """
+        if not self._fork_terdaftar:
+            os.register_at_fork(after_in_child=self._setelah_fork)
+            self._fork_terdaftar = True
+        self._pastikan_flusher()
+
+    def hentikan(self, timeout: float = 5.0) -> None:
+        """Hentikan flusher; entri yang belum terkirim tetap di spool."""
+        self._berhenti.set()
+        self._sinyal.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout)
+
+    def _setelah_fork(self) -> None:
+        # Thread flusher dan koneksi SQLite induk tidak boleh dipakai di proses anak
+        self._lokal = threading.local()
+        self._lock = threading.Lock()
+        self._sinyal = threading.Event()
+        self._pid = None
+        if self._flusher is not None and not self._berhenti.is_set():
+            self._pastikan_flusher()
+
+    def _pastikan_flusher(self) -> None:
+        """Jalankan thread flusher jika belum berjalan di proses ini."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._berhenti.clear()
+            self._flusher = threading.Thread(target=self._loop_flusher, name='flusher-spool', daemon=True)
+            self._flusher.start()
+            self._pid = pid
+            logger.info("Flusher spool database dijalankan")
+
+    def _loop_flusher(self) -> None:
+        """Kirim isi spool ke database terus-menerus sampai dihentikan."""
+        while not self._berhenti.is_set():
+            try:
+                jumlah_baris = self.flush()
+            except Exception as e:
+                logger.error(f"Flush spool database gagal: {str(e)}")
+                jumlah_baris = 0
+
+            # Batch penuh berarti masih ada antrian: langsung lanjut
+            if jumlah_baris >= self.ukuran_batch and self._jeda == self.interval_flush:
+                continue
+            self._sinyal.wait(self._jeda)
+            self._sinyal.clear()
+
+    def flush(self) -> int:
+        """
+        Kirim satu batch entri spool ke database.
+
+        Returns:
+            int: Jumlah baris yang diambil dari spool (0 jika kosong atau
+                 database sedang tidak bisa dihubungi)
+        """
+        daftar_entri = self._sewa_entri()
+        if not daftar_entri:
+            return 0
+
+        daftar_baris = [baris for _, daftar in daftar_entri for baris in daftar]
+        try:
+            tersimpan = self.db_service.dapatkan_upload_key_tersimpan(
+                [baris['upload_key'] for baris in daftar_baris]
+            )
+
+            belum_tersimpan = [baris for baris in daftar_baris if baris['upload_key'] not in tersimpan]
+            if not belum_tersimpan or self.db_service.simpan_hasil_deteksi_batch(
+                    belum_tersimpan, lempar_error_koneksi=True):
+                self._hapus([id_entri for id_entri, _ in daftar_entri])
+                self._jeda = self.interval_flush
+                logger.info(f"{len(daftar_baris)} baris dari spool tersimpan ke database")
+                return len(daftar_baris)
+
+            # Database bisa dihubungi tetapi batch ditolak: cari entri penyebabnya
+            for id_entri, daftar in daftar_entri:
+                sisa = [baris for baris in daftar if baris['upload_key'] not in tersimpan]
+                if len(daftar_entri) > 1 and self.db_service.simpan_hasil_deteksi_batch(
+                        sisa, lempar_error_koneksi=True):
+                    self._hapus([id_entri])
+                else:
+                    self._tunda(id_entri, "Ditolak database, cek log services.database")
+            self._jeda = self.interval_flush
+        except Exception as e:
+            # Database tidak bisa dihubungi: bukan kesalahan entri, jadi
+            # percobaannya tidak dihitung dan semua entri dicoba lagi nanti
+            # (entri yang sudah dihapus/ditunda tidak terpengaruh)
+            self._lepas_sewa([id_entri for id_entri, _ in daftar_entri])
+            self._jeda = min(self.backoff_maks, self._jeda * 2)
+            logger.warning(
+                f"Database tidak tersedia, {len(daftar_baris)} baris tetap di spool "
+                f"(coba lagi dalam {self._jeda:.0f} detik): {str(e)}"
+            )
+            return 0
+        return len(daftar_baris)
+
+    def _sewa_entri(self) -> List[Tuple[int, List[Dict]]]:
+        """Ambil entri siap kirim sampai ukuran_batch baris dan kunci untuk flusher ini."""
+        sekarang = time.time()
+        koneksi = self._koneksi()
+        koneksi.execute("BEGIN IMMEDIATE")
+        try:
+            rows = koneksi.execute(
+                "SELECT id, data, jumlah_baris FROM spool_deteksi "
+                "WHERE gagal = 0 AND coba_lagi_pada <= ? AND disewa_sampai <= ? "
+                "ORDER BY id LIMIT ?",
+                (sekarang, sekarang, self.ukuran_batch)
+            ).fetchall()
+
+            daftar_entri: List[Tuple[int, List[Dict]]] = []
+            jumlah_baris = 0
+            for id_entri, data, jumlah in rows:
+                if daftar_entri and jumlah_baris + jumlah > self.ukuran_batch:
+                    break
+                daftar_entri.append((id_entri, _muat_baris(data)))
+                jumlah_baris += jumlah
+
+            if daftar_entri:
+                tanda_tanya = ', '.join('?' for _ in daftar_entri)
+                koneksi.execute(
+                    f"UPDATE spool_deteksi SET disewa_sampai = ? WHERE id IN ({tanda_tanya})",
+                    (sekarang + self.sewa, *(id_entri for id_entri, _ in daftar_entri))
+                )
+            koneksi.execute("COMMIT")
+            return daftar_entri
+        except BaseException:
+            koneksi.execute("ROLLBACK")
+            raise
+
+    def _hapus(self, daftar_id: List[int]) -> None:
+        """Hapus entri yang sudah tersimpan di database."""
+        tanda_tanya = ', '.join('?' for _ in daftar_id)
+        self._koneksi().execute(f"DELETE FROM spool_deteksi WHERE id IN ({tanda_tanya})", daftar_id)
+
+    def _lepas_sewa(self, daftar_id: List[int]) -> None:
+        """Lepas sewa entri agar dicoba lagi pada flush berikutnya."""
+        tanda_tanya = ', '.join('?' for _ in daftar_id)
+        self._koneksi().execute(
+            f"UPDATE spool_deteksi SET disewa_sampai = 0 WHERE id IN ({tanda_tanya})", daftar_id
+        )
+
+    def _tunda(self, id_entri: int, error: str) -> None:
+        """Tunda entri yang ditolak database; tandai gagal setelah maks_percobaan."""
+        koneksi = self._koneksi()
+        row = koneksi.execute("SELECT percobaan FROM spool_deteksi WHERE id = ?", (id_entri,)).fetchone()
+        percobaan = (row[0] if row else 0) + 1
+        gagal = percobaan >= self.maks_percobaan
+        koneksi.execute(
+            "UPDATE spool_deteksi SET percobaan = ?, coba_lagi_pada = ?, disewa_sampai = 0, "
+            "gagal = ?, error = ? WHERE id = ?",
+            (
+                percobaan,
+                time.time() + min(self.backoff_maks, self.interval_flush * 2 ** percobaan),
+                int(gagal),
+                error,
+                id_entri
+            )
+        )
+        if gagal:
+            logger.error(
+                f"Entri spool {id_entri} ditolak database {percobaan} kali dan ditandai gagal; "
+                f"jalankan 'flask spool-database --ulang-gagal' setelah penyebabnya diperbaiki"
+            )
+        else:
+            logger.warning(f"Entri spool {id_entri} ditolak database (percobaan {percobaan})")
+
+    def ulang_gagal(self) -> int:
+        """
+        Kembalikan entri yang ditandai gagal ke antrian flush.
+
+        Returns:
+            int: Jumlah entri yang dikembalikan
+        """
+        cursor = self._koneksi().execute(
+            "UPDATE spool_deteksi SET gagal = 0, percobaan = 0, coba_lagi_pada = 0, disewa_sampai = 0 "
+            "WHERE gagal = 1"
+        )
+        self._sinyal.set()
+        return cursor.rowcount
+
+    def statistik(self) -> Dict:
+        """
+        Ringkasan isi spool.
+
+        Returns:
+            Dict: Jumlah entri dan baris yang menunggu, jumlah entri gagal,
+                  dan umur entri tertua (detik)
+        """
+        row = self._koneksi().execute(
+            "SELECT "
+            "COALESCE(SUM(CASE WHEN gagal = 0 THEN 1 ELSE 0 END), 0), "
+            "COALESCE(SUM(CASE WHEN gagal = 0 THEN jumlah_baris ELSE 0 END), 0), "
+            "COALESCE(SUM(gagal), 0), "
+            "MIN(dibuat_pada) "
+            "FROM spool_deteksi"
+        ).fetchone()
+        return {
+            'entri_menunggu': row[0],
+            'baris_menunggu': row[1],
+            'entri_gagal': row[2],
+            'umur_tertua': round(time.time() - row[3], 1) if row[3] else 0.0
+        }
+
+    def referensi_gambar(self) -> Dict[str, int]:
+        """
+        Hitung gambar di spool yang merujuk setiap file upload.
+
+        Digabung dengan referensi dari database oleh penyapu berkas agar file
+        hasil deteksi yang belum ter-flush tidak ikut terhapus.
+
+        Returns:
+            Dict[str, int]: Jumlah gambar per image_path
+        """
+        referensi: Dict[str, int] = {}
+        for (data,) in self._koneksi().execute("SELECT data FROM spool_deteksi"):
+            per_gambar = {
+                baris['upload_key']: baris.get('image_path') for baris in json.loads(data)
+            }
+            for path in per_gambar.values():
+                if path:
+                    referensi[path] = referensi.get(path, 0) + 1
+        return referensi
+
+
+def _json_default(nilai: Any) -> Any:
+    """Serialisasi nilai non-JSON di baris hasil deteksi."""
+    if isinstance(nilai, datetime):
+        return nilai.isoformat()
+    raise TypeError(f"Tipe {type(nilai).__name__} tidak bisa disimpan di spool")
+
+
+def _muat_baris(data: str) -> List[Dict]:
+    """Baca ulang baris spool, termasuk upload_timestamp sebagai datetime."""
+    daftar_baris = json.loads(data)
+    for baris in daftar_baris:
+        if isinstance(baris.get('upload_timestamp'), str):
+            baris['upload_timestamp'] = datetime.fromisoformat(baris['upload_timestamp'])
+    return daftar_baris
@@ -0,0 +1,133 @@
+"""
+Test antrian job deteksi di services/antrian_deteksi.py.
+
+Jalankan dari root proyek: python -m unittest discover -s tests
+"""
+
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from services.antrian_deteksi import (
+    STATUS_GAGAL,
+    STATUS_MENUNGGU,
+    STATUS_SELESAI,
+    AntrianDeteksi,
+    PenyimpananJobMemori,
+    PenyimpananJobSQLite,
+)
+
+
+class _UjiAntrian:
+    """Skenario yang sama untuk setiap backend penyimpanan."""
+
+    def buat_penyimpanan(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder, True)
+        self.penyimpanan = self.buat_penyimpanan()
+
+    def test_job_selesai_bisa_ditunggu(self):
+        antrian = AntrianDeteksi(lambda payload: {'nilai': payload['nilai'] * 2}, self.penyimpanan)
+
+        job_id = antrian.kirim({'nilai': 21})
+        job = antrian.status(job_id, tunggu=5)
+
+        self.assertEqual(job['status'], STATUS_SELESAI)
+        self.assertEqual(job['hasil'], {'nilai': 42})
+
+    def test_job_gagal_menyimpan_error(self):
+        def proses(payload):
+            raise ValueError('gambar rusak')
+
+        antrian = AntrianDeteksi(proses, self.penyimpanan)
+
+        job = antrian.status(antrian.kirim({}), tunggu=5)
+
+        self.assertEqual(job['status'], STATUS_GAGAL)
+        self.assertIn('gambar rusak', job['error'])
+
+    def test_antrian_penuh(self):
+        lepas = threading.Event()
+        self.addCleanup(lepas.set)
+        antrian = AntrianDeteksi(lambda payload: lepas.wait(5) and {}, self.penyimpanan,
+                                 jumlah_worker=1, ukuran_maks=1)
+        antrian.kirim({})
+        # Tunggu job pertama diambil worker sehingga antrian kosong lagi
+        batas_waktu = time.monotonic() + 5
+        while antrian.jumlah_mengantri() and time.monotonic() < batas_waktu:
+            time.sleep(0.01)
+        antrian.kirim({})
+
+        with self.assertRaises(queue.Full):
+            antrian.kirim({})
+
+    def test_job_ditinggalkan_ditandai_gagal_dan_berkas_dihapus(self):
+        path_berkas = os.path.join(self.folder, 'video-uji.mp4')
+        with open(path_berkas, 'wb') as berkas:
+            berkas.write(b'isi')
+        # Job milik proses lain yang sudah mati: sewanya habis dan tidak diperpanjang
+        self.penyimpanan.buat('job-yatim', 'proses-mati', time.time() - 1, path_berkas)
+        antrian = AntrianDeteksi(lambda payload: {}, self.penyimpanan)
+
+        job = antrian.status('job-yatim')
+
+        self.assertEqual(job['status'], STATUS_GAGAL)
+        self.assertFalse(os.path.exists(path_berkas))
+
+    def test_sewa_job_berjalan_diperpanjang(self):
+        lepas = threading.Event()
+        self.addCleanup(lepas.set)
+        antrian = AntrianDeteksi(lambda payload: lepas.wait(5) and {}, self.penyimpanan,
+                                 jumlah_worker=1, sewa_job=0.3)
+
+        job_id = antrian.kirim({})
+        time.sleep(0.6)
+
+        self.assertNotEqual(antrian.status(job_id)['status'], STATUS_GAGAL)
+        lepas.set()
+        self.assertEqual(antrian.status(job_id, tunggu=5)['status'], STATUS_SELESAI)
+
+    def test_job_tidak_dikenal(self):
+        antrian = AntrianDeteksi(lambda payload: {}, self.penyimpanan)
+        self.assertIsNone(antrian.status('tidak-ada'))
+
+
+class TestAntrianMemori(_UjiAntrian, unittest.TestCase):
+
+    def buat_penyimpanan(self):
+        return PenyimpananJobMemori()
+
+
+class TestAntrianSQLite(_UjiAntrian, unittest.TestCase):
+
+    def buat_penyimpanan(self):
+        return PenyimpananJobSQLite(os.path.join(self.folder, 'antrian.sqlite3'), interval_poll=0.01)
+
+    def test_file_lama_tanpa_kolom_sewa(self):
+        path_db = os.path.join(self.folder, 'lama.sqlite3')
+        penyimpanan = PenyimpananJobSQLite(path_db)
+        koneksi = penyimpanan._koneksi()
+        koneksi.execute("DROP TABLE job_deteksi")
+        koneksi.execute(
+            "CREATE TABLE job_deteksi (job_id TEXT PRIMARY KEY, status TEXT NOT NULL, hasil TEXT, "
+            "error TEXT, dibuat_pada REAL NOT NULL, diperbarui_pada REAL NOT NULL)"
+        )
+        koneksi.execute(
+            "INSERT INTO job_deteksi VALUES ('job-lama', ?, NULL, NULL, 0, 0)", (STATUS_MENUNGGU,)
+        )
+        koneksi.commit()
+
+        antrian = AntrianDeteksi(lambda payload: {}, PenyimpananJobSQLite(path_db))
+
+        self.assertEqual(antrian.status('job-lama')['status'], STATUS_GAGAL)
+
+
+if __name__ == '__main__':
+    unittest.main()
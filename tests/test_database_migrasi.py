@@ -0,0 +1,245 @@
+"""
+Test migrasi tabel lama BrandDetection ke skema Images/Detections/Brands.
+
+Koneksi pyodbc diganti SQL Server tiruan di memori yang hanya mengenali
+query yang dipakai DatabaseService, termasuk perilaku identity setelah
+DBCC CHECKIDENT pada tabel yang belum pernah berisi.
+
+Jalankan dari root proyek: python -m unittest discover -s tests
+"""
+
+import re
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import mock
+
+from services.database import DatabaseService
+
+
+class ServerTiruan:
+    """Isi database tiruan yang dipakai bersama semua koneksi."""
+
+    def __init__(self, baris_lama):
+        self.lama = {baris['id']: dict(baris, migrasi_id=None) for baris in baris_lama}
+        self.lama_dihapus = False
+        self.detections = {}
+        self.images = {}
+        self.brands = {}
+        self.detections_ada = False
+        self.reseed(1)
+
+    def reseed(self, nilai):
+        self.identitas = nilai
+        self.pernah_diisi = False
+
+    def id_deteksi_baru(self):
+        # Tabel yang belum pernah berisi memakai nilai reseed apa adanya
+        if self.pernah_diisi:
+            self.identitas += 1
+        self.pernah_diisi = True
+        return self.identitas
+
+    def insert_deteksi(self, id_deteksi, nilai):
+        if id_deteksi in self.detections:
+            raise RuntimeError(f"Violation of PRIMARY KEY constraint: id {id_deteksi}")
+        self.detections[id_deteksi] = nilai
+        self.pernah_diisi = True
+        self.identitas = max(self.identitas, id_deteksi)
+
+
+class CursorTiruan:
+    fast_executemany = False
+
+    def __init__(self, server):
+        self.server = server
+        self.hasil = []
+
+    def execute(self, query, *parameter):
+        if len(parameter) == 1 and isinstance(parameter[0], (list, tuple)):
+            parameter = tuple(parameter[0])
+        q = ' '.join(query.split())
+        s = self.server
+        self.hasil = []
+
+        if q.startswith("SELECT OBJECT_ID('Detections', 'U')"):
+            self.hasil = [(1 if s.detections_ada else None, None if s.lama_dihapus else 1)]
+        elif q.startswith("SELECT OBJECT_ID('BrandDetection', 'U')"):
+            self.hasil = [(None if s.lama_dihapus else 1,)]
+        elif q.startswith("SELECT OBJECT_ID"):
+            self.hasil = [(1,)]
+        elif 'CREATE TABLE Detections' in q:
+            s.detections_ada = True
+        elif q == "SELECT MAX(id) FROM BrandDetection":
+            self.hasil = [(max(s.lama, default=None),)]
+        elif q.startswith('DBCC CHECKIDENT'):
+            s.reseed(int(re.search(r'RESEED, (\d+)', q).group(1)))
+        elif q.startswith('MERGE Brands'):
+            s.brands.setdefault(parameter[0], len(s.brands) + 1)
+        elif q.startswith('SELECT id, brand_name FROM Brands'):
+            self.hasil = [SimpleNamespace(id=s.brands[nama], brand_name=nama) for nama in parameter]
+        elif q.startswith('INSERT INTO Images'):
+            for awal in range(0, len(parameter), 10):
+                id_gambar = len(s.images) + 1
+                s.images[id_gambar] = {
+                    'upload_key': parameter[awal],
+                    'image_name': parameter[awal + 1],
+                    'upload_timestamp': parameter[awal + 9] or datetime.now()
+                }
+                self.hasil.append(SimpleNamespace(id=id_gambar, upload_key=parameter[awal]))
+        elif q.startswith('INSERT INTO Detections (image_id') and 'OUTPUT' in q:
+            id_deteksi = s.id_deteksi_baru()
+            s.insert_deteksi(id_deteksi, parameter)
+            self.hasil = [(id_deteksi,)]
+        elif q.startswith('UPDATE l SET migrasi_id'):
+            for baris in s.lama.values():
+                deteksi = s.detections.get(baris['id'])
+                if baris['migrasi_id'] is None and deteksi is not None and \
+                        s.images[deteksi[0]]['image_name'] == baris['image_name']:
+                    baris['migrasi_id'] = baris['id']
+        elif q.startswith('SELECT COALESCE(MIN(id) - 1, 0) FROM BrandDetection'):
+            belum = [i for i, baris in s.lama.items() if baris['migrasi_id'] is None]
+            self.hasil = [(min(belum) - 1 if belum else 0,)]
+        elif q.startswith('SELECT TOP'):
+            jumlah, id_setelah = parameter
+            self.hasil = [
+                SimpleNamespace(**baris) for i, baris in sorted(s.lama.items())
+                if i > id_setelah and baris['migrasi_id'] is None
+            ][:jumlah]
+        elif q.startswith('SELECT id FROM Detections WHERE id BETWEEN'):
+            self.hasil = [SimpleNamespace(id=i) for i in s.detections if parameter[0] <= i <= parameter[1]]
+        elif q.startswith('SELECT COUNT(*) FROM BrandDetection WHERE migrasi_id IS NULL'):
+            self.hasil = [(sum(1 for baris in s.lama.values() if baris['migrasi_id'] is None),)]
+        elif q.startswith('SELECT COUNT(*)'):
+            self.hasil = [(0,)]
+        elif q == 'DROP TABLE BrandDetection':
+            s.lama_dihapus = True
+        return self
+
+    def executemany(self, query, daftar_parameter):
+        q = ' '.join(query.split())
+        s = self.server
+        for parameter in daftar_parameter:
+            if q.startswith('INSERT INTO Detections (id,'):
+                s.insert_deteksi(parameter[0], tuple(parameter[1:]))
+            elif q.startswith('INSERT INTO Detections (image_id'):
+                s.insert_deteksi(s.id_deteksi_baru(), tuple(parameter))
+            elif q.startswith('UPDATE BrandDetection SET migrasi_id'):
+                s.lama[parameter[1]]['migrasi_id'] = parameter[0]
+
+    def fetchone(self):
+        return self.hasil[0] if self.hasil else None
+
+    def fetchall(self):
+        return list(self.hasil)
+
+    def close(self):
+        pass
+
+
+class KoneksiTiruan:
+    def __init__(self, server):
+        self.server = server
+
+    def cursor(self):
+        return CursorTiruan(self.server)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _baris_lama(id_baris, nama_gambar, brand_name, detik):
+    return {
+        'id': id_baris,
+        'image_name': nama_gambar,
+        'brand_name': brand_name,
+        'confidence_score': 0.8,
+        'upload_timestamp': datetime(2024, 1, 1, 10, 0, detik),
+        'image_path': None,
+        'resolution': '640x480',
+        'position_type': None,
+        'notes': None,
+        'perceptual_hash': None
+    }
+
+
+BARIS_LAMA = [
+    _baris_lama(1, 'a.jpg', 'Nike', 1),
+    _baris_lama(2, 'a.jpg', 'Adidas', 1),
+    _baris_lama(3, 'b.jpg', 'Nike', 2),
+    _baris_lama(4, 'c.jpg', 'Puma', 3),
+    _baris_lama(5, 'c.jpg', 'Nike', 3),
+]
+
+
+class TestMigrasiSkema(unittest.TestCase):
+    """Urutan terdokumentasi: aplikasi jalan dan menulis, lalu migrasi-skema."""
+
+    def setUp(self):
+        self.server = ServerTiruan(BARIS_LAMA)
+        patcher = mock.patch(
+            'services.database.pyodbc.connect',
+            side_effect=lambda *args, **kwargs: KoneksiTiruan(self.server)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.db = DatabaseService('DRIVER=tiruan;PWD={password}', 'rahasia')
+
+    def _simpan_deteksi_baru(self):
+        self.assertTrue(self.db.simpan_hasil_deteksi({
+            'image_name': 'baru.jpg',
+            'brand_name': 'Nike',
+            'confidence_score': 0.9
+        }))
+
+    def test_aplikasi_menulis_sebelum_migrasi(self):
+        self.assertTrue(self.db.inisialisasi_database())
+        self._simpan_deteksi_baru()
+
+        # Deteksi pertama setelah reseed tidak boleh memakai id baris lama
+        self.assertEqual(list(self.server.detections), [6])
+
+        statistik = self.db.migrasi_skema(ukuran_batch=2, hapus_tabel_lama=True)
+
+        self.assertEqual(statistik['baris'], 5)
+        self.assertEqual(statistik['sisa'], 0)
+        self.assertEqual(sorted(self.server.detections), [1, 2, 3, 4, 5, 6])
+        self.assertTrue(self.server.lama_dihapus)
+
+    def test_migrasi_dilanjutkan_setelah_berhenti(self):
+        self.assertTrue(self.db.inisialisasi_database())
+        with mock.patch.object(self.server, 'lama', dict(list(self.server.lama.items())[:3])):
+            self.db.migrasi_skema(ukuran_batch=2)
+        self._simpan_deteksi_baru()
+
+        statistik = self.db.migrasi_skema(ukuran_batch=2)
+
+        self.assertEqual(statistik['sisa'], 0)
+        self.assertEqual(sorted(self.server.detections)[:5], [1, 2, 3, 4, 5])
+        self.assertEqual(len(self.server.detections), 6)
+
+    def test_reseed_lama_tanpa_jarak_tidak_menahan_migrasi(self):
+        # Database yang diinisialisasi versi sebelumnya: identity di-reseed ke
+        # id terbesar lama sehingga deteksi baru pertama memakai id 5
+        self.server.detections_ada = True
+        self.server.reseed(5)
+        self._simpan_deteksi_baru()
+        self.assertEqual(list(self.server.detections), [5])
+
+        statistik = self.db.migrasi_skema(ukuran_batch=2, hapus_tabel_lama=True)
+
+        self.assertEqual(statistik['baris'], 5)
+        self.assertEqual(statistik['sisa'], 0)
+        self.assertEqual(len(self.server.detections), 6)
+        self.assertEqual(self.server.lama[5]['migrasi_id'], 6)
+        self.assertTrue(self.server.lama_dihapus)
+
+
+if __name__ == '__main__':
+    unittest.main()
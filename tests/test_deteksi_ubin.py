@@ -0,0 +1,96 @@
+"""
+Test pembagian ubin dan penggabungan deteksi di services/deteksi_ubin.py.
+
+Jalankan dari root proyek: python -m unittest discover -s tests
+"""
+
+import unittest
+
+from services.deteksi_ubin import gabungkan_deteksi, hitung_ubin
+
+
+def _deteksi(brand, confidence, x, y, w, h):
+    return {'brand': brand, 'confidence': confidence, 'rectangle': {'x': x, 'y': y, 'w': w, 'h': h}}
+
+
+class TestHitungUbin(unittest.TestCase):
+
+    def _cek_menutup(self, daftar_ubin, lebar, tinggi):
+        for x, y, w, h in daftar_ubin:
+            self.assertGreaterEqual(x, 0)
+            self.assertGreaterEqual(y, 0)
+            self.assertLessEqual(x + w, lebar)
+            self.assertLessEqual(y + h, tinggi)
+        self.assertEqual(min(x for x, _, _, _ in daftar_ubin), 0)
+        self.assertEqual(min(y for _, y, _, _ in daftar_ubin), 0)
+        self.assertEqual(max(x + w for x, _, w, _ in daftar_ubin), lebar)
+        self.assertEqual(max(y + h for _, y, _, h in daftar_ubin), tinggi)
+
+    def test_gambar_kecil_satu_ubin(self):
+        self.assertEqual(hitung_ubin(800, 600, 1024, 0.2, 8), [(0, 0, 800, 600)])
+
+    def test_ubin_menutup_gambar_dengan_tumpang_tindih(self):
+        daftar_ubin = hitung_ubin(3000, 2000, 1024, 0.2, 16)
+
+        self._cek_menutup(daftar_ubin, 3000, 2000)
+        xs = sorted({x for x, _, _, _ in daftar_ubin})
+        self.assertEqual(len(daftar_ubin), len(xs) * len({y for _, y, _, _ in daftar_ubin}))
+        for kiri, kanan in zip(xs, xs[1:]):
+            self.assertGreaterEqual(kiri + 1024 - kanan, 0.2 * 1024)
+
+    def test_ukuran_ubin_diperbesar_sampai_muat_maks_ubin(self):
+        daftar_ubin = hitung_ubin(8000, 6000, 1024, 0.2, 4)
+
+        self.assertLessEqual(len(daftar_ubin), 4)
+        self.assertGreater(daftar_ubin[0][2], 1024)
+        self._cek_menutup(daftar_ubin, 8000, 6000)
+
+    def test_tumpang_tindih_dibatasi(self):
+        daftar_ubin = hitung_ubin(2000, 1000, 1000, 5.0, 100)
+
+        # Tumpang tindih > 0.9 diperlakukan sebagai 0.9
+        self.assertEqual(daftar_ubin, hitung_ubin(2000, 1000, 1000, 0.9, 100))
+        self.assertLessEqual(len(daftar_ubin), 12)
+        self._cek_menutup(daftar_ubin, 2000, 1000)
+
+
+class TestGabungkanDeteksi(unittest.TestCase):
+
+    def test_deteksi_ganda_brand_sama_digabung(self):
+        hasil = gabungkan_deteksi([
+            _deteksi('Nike', 0.7, 100, 100, 50, 50),
+            _deteksi('Nike', 0.9, 105, 102, 50, 50),
+        ])
+
+        self.assertEqual(len(hasil), 1)
+        self.assertEqual(hasil[0]['confidence'], 0.9)
+
+    def test_brand_berbeda_tidak_digabung(self):
+        hasil = gabungkan_deteksi([
+            _deteksi('Nike', 0.9, 100, 100, 50, 50),
+            _deteksi('Adidas', 0.8, 100, 100, 50, 50),
+        ])
+
+        self.assertEqual([item['brand'] for item in hasil], ['Nike', 'Adidas'])
+
+    def test_potongan_logo_di_batas_ubin_dibuang(self):
+        # IoU kecil, tetapi potongan hampir seluruhnya di dalam deteksi utuh
+        hasil = gabungkan_deteksi([
+            _deteksi('Nike', 0.9, 0, 0, 200, 100),
+            _deteksi('Nike', 0.6, 150, 10, 45, 80),
+        ])
+
+        self.assertEqual(len(hasil), 1)
+        self.assertEqual(hasil[0]['rectangle']['w'], 200)
+
+    def test_deteksi_berjauhan_tetap_terpisah(self):
+        hasil = gabungkan_deteksi([
+            _deteksi('Nike', 0.6, 0, 0, 50, 50),
+            _deteksi('Nike', 0.8, 500, 500, 50, 50),
+        ], ambang_iou=0.5)
+
+        self.assertEqual([item['confidence'] for item in hasil], [0.8, 0.6])
+
+
+if __name__ == '__main__':
+    unittest.main()
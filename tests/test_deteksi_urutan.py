@@ -0,0 +1,82 @@
+"""
+Test penggabungan hasil per frame menjadi interval di services/deteksi_urutan.py.
+
+Jalankan dari root proyek: python -m unittest discover -s tests
+"""
+
+import unittest
+
+from services.deteksi_urutan import gabungkan_interval
+
+
+def _brand(nama, confidence, x=0):
+    return {'brand': nama, 'confidence': confidence, 'rectangle': {'x': x, 'y': 0, 'w': 10, 'h': 10}}
+
+
+class TestGabungkanInterval(unittest.TestCase):
+
+    def test_frame_berurutan_menjadi_satu_interval(self):
+        hasil = gabungkan_interval([
+            (0.0, [_brand('Nike', 0.6)]),
+            (0.5, [_brand('Nike', 0.9, x=5)]),
+            (1.0, [_brand('Nike', 0.7)]),
+        ], durasi_frame=0.5, toleransi_jeda=0.0)
+
+        self.assertEqual(hasil, [{
+            'brand': 'Nike',
+            'mulai': 0.0,
+            'selesai': 1.5,
+            'jumlah_frame': 3,
+            'confidence_maks': 0.9,
+            'confidence_rata': round((0.6 + 0.9 + 0.7) / 3, 4),
+            'rectangle': {'x': 5, 'y': 0, 'w': 10, 'h': 10}
+        }])
+
+    def test_jeda_dalam_toleransi_tetap_digabung(self):
+        hasil = gabungkan_interval([
+            (0.0, [_brand('Nike', 0.8)]),
+            (0.5, []),
+            (1.0, [_brand('Nike', 0.8)]),
+        ], durasi_frame=0.5, toleransi_jeda=0.5)
+
+        self.assertEqual([(item['mulai'], item['selesai']) for item in hasil], [(0.0, 1.5)])
+
+    def test_jeda_melebihi_toleransi_memecah_interval(self):
+        hasil = gabungkan_interval([
+            (0.0, [_brand('Nike', 0.8)]),
+            (0.5, []),
+            (1.0, []),
+            (1.5, [_brand('Nike', 0.8)]),
+        ], durasi_frame=0.5, toleransi_jeda=0.5)
+
+        self.assertEqual([(item['mulai'], item['selesai']) for item in hasil], [(0.0, 0.5), (1.5, 2.0)])
+
+    def test_brand_ganda_dalam_satu_frame_dihitung_sekali(self):
+        hasil = gabungkan_interval([
+            (0.0, [_brand('Nike', 0.5), _brand('Nike', 0.9, x=50), _brand('Adidas', 0.7)]),
+        ], durasi_frame=1.0, toleransi_jeda=0.0)
+
+        self.assertEqual([item['brand'] for item in hasil], ['Adidas', 'Nike'])
+        nike = hasil[1]
+        self.assertEqual(nike['jumlah_frame'], 1)
+        self.assertEqual(nike['confidence_rata'], 0.9)
+        self.assertEqual(nike['rectangle']['x'], 50)
+
+    def test_interval_urut_waktu_mulai(self):
+        hasil = gabungkan_interval([
+            (0.0, [_brand('Puma', 0.8)]),
+            (2.0, [_brand('Adidas', 0.8), _brand('Puma', 0.8)]),
+            (3.0, [_brand('Nike', 0.8)]),
+        ], durasi_frame=1.0, toleransi_jeda=0.0)
+
+        self.assertEqual(
+            [(item['brand'], item['mulai']) for item in hasil],
+            [('Puma', 0.0), ('Adidas', 2.0), ('Puma', 2.0), ('Nike', 3.0)]
+        )
+
+    def test_tanpa_frame(self):
+        self.assertEqual(gabungkan_interval([], durasi_frame=0.5, toleransi_jeda=1.0), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+Test indeks hash perseptual dan pengelompokan duplikat di services/hash_perseptual.py.
+
+Jalankan dari root proyek: python -m unittest discover -s tests
+"""
+
+import random
+import unittest
+
+from services.hash_perseptual import IndeksHashPerseptual, jarak_hamming, kelompokkan_duplikat
+
+
+def _balik_bit(hash_gambar: str, *posisi: int) -> str:
+    nilai = int(hash_gambar, 16)
+    for bit in posisi:
+        nilai ^= 1 << bit
+    return f"{nilai:016x}"
+
+
+HASH_A = '9f3c5a1e7d2b4c68'
+HASH_B = '0123456789abcdef'
+
+
+class TestIndeksHashPerseptual(unittest.TestCase):
+
+    def test_cari_dalam_ambang(self):
+        indeks = IndeksHashPerseptual(ambang=6)
+        indeks.tambah(HASH_A, 'a')
+        indeks.tambah(HASH_B, 'b')
+
+        hasil = indeks.cari(_balik_bit(HASH_A, 0, 17, 40, 63))
+
+        self.assertEqual(hasil, (HASH_A, 'a', 4))
+
+    def test_di_luar_ambang_tidak_ditemukan(self):
+        indeks = IndeksHashPerseptual(ambang=3)
+        indeks.tambah(HASH_A, 'a')
+
+        self.assertIsNone(indeks.cari(_balik_bit(HASH_A, 1, 2, 3, 4)))
+
+    def test_sama_dengan_pencarian_linear(self):
+        acak = random.Random(7)
+        daftar_hash = [f"{acak.getrandbits(64):016x}" for _ in range(300)]
+        # Tambahkan tetangga dekat agar ada hasil di dalam ambang
+        daftar_hash += [_balik_bit(h, *acak.sample(range(64), acak.randint(1, 8))) for h in daftar_hash[:100]]
+        indeks = IndeksHashPerseptual(ambang=6)
+        for nomor, hash_gambar in enumerate(daftar_hash):
+            indeks.tambah(hash_gambar, nomor)
+
+        for hash_query in daftar_hash[:150]:
+            harapan = sorted(
+                (jarak_hamming(hash_query, h), h) for h in set(daftar_hash)
+                if jarak_hamming(hash_query, h) <= 6
+            )
+            hasil = sorted((jarak, h) for h, _, jarak in indeks.cari_semua(hash_query))
+            self.assertEqual(hasil, harapan)
+
+    def test_entri_terlama_dibuang_saat_penuh(self):
+        indeks = IndeksHashPerseptual(ambang=2, maks_entri=2)
+        indeks.tambah(HASH_A, 'a')
+        indeks.tambah(HASH_B, 'b')
+        # cari() menandai entri baru dipakai sehingga yang dibuang HASH_B
+        indeks.cari(HASH_A)
+        indeks.tambah('fedcba9876543210', 'c')
+
+        self.assertEqual(len(indeks), 2)
+        self.assertIsNotNone(indeks.cari(HASH_A))
+        self.assertIsNone(indeks.cari(HASH_B))
+
+    def test_hapus(self):
+        indeks = IndeksHashPerseptual(ambang=2)
+        indeks.tambah(HASH_A, 'a')
+        indeks.hapus(HASH_A)
+
+        self.assertEqual(len(indeks), 0)
+        self.assertEqual(indeks.cari_semua(HASH_A), [])
+
+
+class TestKelompokkanDuplikat(unittest.TestCase):
+
+    def test_kelompok_transitif(self):
+        # c dekat b dan b dekat a, walaupun c jauh dari a
+        hash_b = _balik_bit(HASH_A, 0, 1, 2, 3, 4)
+        hash_c = _balik_bit(hash_b, 10, 11, 12, 13, 14)
+
+        kelompok = kelompokkan_duplikat([('a', HASH_A), ('b', hash_b), ('c', hash_c), ('x', HASH_B)], ambang=6)
+
+        self.assertEqual(kelompok, [['a', 'b', 'c']])
+
+    def test_hash_identik_dan_urutan_ukuran(self):
+        kelompok = kelompokkan_duplikat([
+            (1, HASH_A), (2, HASH_B), (3, HASH_A), (4, _balik_bit(HASH_B, 5)), (5, HASH_A)
+        ], ambang=2)
+
+        self.assertEqual(kelompok, [[1, 3, 5], [2, 4]])
+
+    def test_tanpa_duplikat(self):
+        self.assertEqual(kelompokkan_duplikat([(1, HASH_A), (2, HASH_B)]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
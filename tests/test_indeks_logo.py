@@ -0,0 +1,127 @@
+"""
+Test pencarian dan penyimpanan indeks logo di services/indeks_logo.py.
+
+Jalankan dari root proyek: python -m unittest discover -s tests
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from services import indeks_logo
+from services.indeks_logo import IndeksLogo, np
+
+
+def _cari_linear(deskriptor_query, deskriptor_indeks, baris_dipakai, jarak_maks, rasio_lowe):
+    """Pencarian pembanding: jarak Hamming ke setiap baris indeks satu per satu."""
+    hasil_query, hasil_baris = [], []
+    for nomor, query in enumerate(deskriptor_query):
+        jarak = sorted(
+            (int(np.unpackbits(query ^ deskriptor_indeks[baris]).sum()), baris) for baris in baris_dipakai
+        )
+        jarak_1, baris_1 = jarak[0]
+        jarak_2 = jarak[1][0] if len(jarak) > 1 else float('inf')
+        if jarak_1 <= jarak_maks and jarak_1 < rasio_lowe * jarak_2:
+            hasil_query.append(nomor)
+            hasil_baris.append(baris_1)
+    return hasil_query, hasil_baris
+
+
+@unittest.skipIf(np is None, "membutuhkan opencv-python-headless dan numpy")
+class TestCariIndeksLogo(unittest.TestCase):
+
+    def setUp(self):
+        acak = np.random.RandomState(3)
+        self.indeks = IndeksLogo()
+        self.indeks.logo = [
+            {'id': id_logo, 'brand': f"Brand{id_logo}", 'path': '', 'lebar': 1, 'tinggi': 1, 'aktif': True}
+            for id_logo in range(3)
+        ]
+        self.indeks.deskriptor = acak.randint(0, 256, (60, 32)).astype(np.uint8)
+        self.indeks.titik = np.zeros((60, 2), np.float32)
+        self.indeks.id_logo = np.repeat(np.arange(3, dtype=np.int32), 20)
+        self.indeks._perbarui_baris_aktif()
+
+        # Query: salinan beberapa deskriptor indeks dengan sedikit bit dibalik, plus deskriptor acak
+        query = self.indeks.deskriptor[[0, 7, 25, 41, 59]].copy()
+        query[:, 0] ^= 0b00000111
+        self.query = np.concatenate([query, acak.randint(0, 256, (5, 32)).astype(np.uint8)])
+
+    def _cek_sama_dengan_linear(self, baris_dipakai, jarak_maks=64, rasio_lowe=0.8):
+        idx_query, idx_baris = self.indeks.cari(self.query, jarak_maks, rasio_lowe)
+        harapan = _cari_linear(self.query, self.indeks.deskriptor, baris_dipakai, jarak_maks, rasio_lowe)
+        self.assertEqual((list(idx_query), list(idx_baris)), harapan)
+        return list(idx_query), list(idx_baris)
+
+    def test_sama_dengan_pencarian_linear(self):
+        idx_query, idx_baris = self._cek_sama_dengan_linear(range(60))
+
+        self.assertEqual(idx_query, [0, 1, 2, 3, 4])
+        self.assertEqual(idx_baris, [0, 7, 25, 41, 59])
+
+    def test_hasil_sama_walaupun_dibagi_banyak_blok(self):
+        with mock.patch.object(indeks_logo, 'UKURAN_BLOK', 7):
+            self._cek_sama_dengan_linear(range(60))
+
+    def test_logo_nonaktif_tidak_dicari(self):
+        self.indeks.hapus(brand='Brand1')
+
+        with mock.patch.object(indeks_logo, 'UKURAN_BLOK', 7):
+            _, idx_baris = self._cek_sama_dengan_linear([*range(20), *range(40, 60)])
+
+        self.assertNotIn(25, idx_baris)
+
+    def test_jarak_maks_dan_rasio_lowe(self):
+        self._cek_sama_dengan_linear(range(60), jarak_maks=2)
+        self._cek_sama_dengan_linear(range(60), rasio_lowe=0.05)
+
+    def test_indeks_kosong(self):
+        idx_query, idx_baris = IndeksLogo().cari(self.query)
+
+        self.assertEqual(len(idx_query), 0)
+        self.assertEqual(len(idx_baris), 0)
+
+
+@unittest.skipIf(np is None, "membutuhkan opencv-python-headless dan numpy")
+class TestSimpanIndeksLogo(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder, True)
+
+    def _indeks(self, jumlah_deskriptor):
+        indeks = IndeksLogo(self.folder)
+        indeks.logo = [{'id': 0, 'brand': 'Nike', 'path': '', 'lebar': 1, 'tinggi': 1, 'aktif': True}]
+        indeks.deskriptor = np.zeros((jumlah_deskriptor, 32), np.uint8)
+        indeks.titik = np.zeros((jumlah_deskriptor, 2), np.float32)
+        indeks.id_logo = np.zeros(jumlah_deskriptor, np.int32)
+        return indeks
+
+    def test_versi_baru_terlihat_oleh_pembaca_lain(self):
+        self._indeks(10).simpan()
+        pembaca = IndeksLogo(self.folder)
+        self.assertFalse(pembaca.berubah())
+
+        penulis = self._indeks(20)
+        penulis.simpan()
+
+        self.assertTrue(pembaca.berubah())
+        self.assertFalse(pembaca.berubah())
+        baru = IndeksLogo(self.folder)
+        self.assertEqual(baru.versi, penulis.versi)
+        self.assertEqual(len(baru.deskriptor), 20)
+
+    def test_hanya_dua_versi_terakhir_disimpan(self):
+        for jumlah in (1, 2, 3):
+            indeks = self._indeks(jumlah)
+            indeks.simpan()
+
+        versi = sorted(nama for nama in os.listdir(self.folder) if nama.startswith(indeks_logo.AWALAN_VERSI))
+        self.assertEqual(len(versi), 2)
+        self.assertIn(indeks.versi, versi)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Test circuit breaker dan retry di services/ketahanan.py.
+
+Jalankan dari root proyek: python -m unittest discover -s tests
+"""
+
+import time
+import asyncio
+import unittest
+
+from services.ketahanan import (
+    LayananTidakTersedia,
+    PembatasLaju,
+    PemutusSirkuit,
+    SIRKUIT_SETENGAH_TERBUKA,
+    SIRKUIT_TERTUTUP,
+    jalankan_dengan_retry,
+    jalankan_dengan_retry_async,
+)
+
+
+def _klasifikasi_ulang(error):
+    return True, None
+
+
+def _pemutus_setengah_terbuka() -> PemutusSirkuit:
+    """Buat pemutus yang baru saja terbuka dan langsung boleh dicoba lagi."""
+    pemutus = PemutusSirkuit(ambang_gagal=1, waktu_pemulihan=0.0)
+    pemutus.catat_gagal()
+    return pemutus
+
+
+def _pembatas_habis() -> PembatasLaju:
+    """Buat pembatas laju yang tokennya sudah habis."""
+    pembatas = PembatasLaju(laju=0.01, kapasitas=1)
+    pembatas.ambil()
+    return pembatas
+
+
+class TestPemutusSirkuitSetengahTerbuka(unittest.TestCase):
+    """Slot percobaan setengah terbuka harus selalu dilepas."""
+
+    def test_timeout_pembatas_tidak_menahan_slot(self):
+        pemutus = _pemutus_setengah_terbuka()
+        pembatas = _pembatas_habis()
+
+        with self.assertRaises(LayananTidakTersedia):
+            jalankan_dengan_retry(
+                lambda: 'ok', _klasifikasi_ulang,
+                pembatas=pembatas, pemutus=pemutus, timeout_token=0
+            )
+
+        hasil = jalankan_dengan_retry(lambda: 'ok', _klasifikasi_ulang, pemutus=pemutus)
+        self.assertEqual(hasil, 'ok')
+        self.assertEqual(pemutus.status, SIRKUIT_TERTUTUP)
+
+    def test_timeout_pembatas_async_tidak_menahan_slot(self):
+        pemutus = _pemutus_setengah_terbuka()
+        pembatas = _pembatas_habis()
+
+        async def panggil():
+            return 'ok'
+
+        with self.assertRaises(LayananTidakTersedia):
+            asyncio.run(jalankan_dengan_retry_async(
+                panggil, _klasifikasi_ulang,
+                pembatas=pembatas, pemutus=pemutus, timeout_token=0
+            ))
+
+        hasil = asyncio.run(jalankan_dengan_retry_async(panggil, _klasifikasi_ulang, pemutus=pemutus))
+        self.assertEqual(hasil, 'ok')
+        self.assertEqual(pemutus.status, SIRKUIT_TERTUTUP)
+
+    def test_pembatalan_async_melepas_slot(self):
+        pemutus = _pemutus_setengah_terbuka()
+
+        async def lambat():
+            await asyncio.sleep(10)
+
+        async def batalkan():
+            tugas = asyncio.create_task(
+                jalankan_dengan_retry_async(lambat, _klasifikasi_ulang, pemutus=pemutus)
+            )
+            await asyncio.sleep(0.01)
+            tugas.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await tugas
+
+        asyncio.run(batalkan())
+
+        self.assertEqual(pemutus.status, SIRKUIT_SETENGAH_TERBUKA)
+        self.assertTrue(pemutus.izinkan())
+
+    def test_percobaan_kedua_ditolak_selama_slot_dipakai(self):
+        pemutus = _pemutus_setengah_terbuka()
+        time.sleep(0.001)
+
+        self.assertTrue(pemutus.izinkan())
+        with self.assertRaises(LayananTidakTersedia):
+            pemutus.izinkan()
+
+        pemutus.lepas_percobaan()
+        self.assertTrue(pemutus.izinkan())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+Test flush spool hasil deteksi di services/spool_database.py.
+
+DatabaseService diganti tiruan di memori yang bisa diatur untuk menolak
+batch tertentu atau gagal terhubung.
+
+Jalankan dari root proyek: python -m unittest discover -s tests
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from services.database import DatabaseService, pyodbc
+from services.spool_database import SpoolDatabase
+
+
+class DatabaseTiruan:
+    """Tiruan bagian DatabaseService yang dipakai SpoolDatabase."""
+
+    lengkapi_upload_key = staticmethod(DatabaseService.lengkapi_upload_key)
+
+    def __init__(self):
+        self.tersimpan = {}
+        self.ditolak = set()
+        self.putus_saat = None
+        self.panggilan_simpan = 0
+
+    def _cek_koneksi(self, tahap):
+        if self.putus_saat == tahap:
+            raise pyodbc.Error('08S01', 'Communication link failure')
+
+    def dapatkan_upload_key_tersimpan(self, daftar_kunci):
+        self._cek_koneksi('baca')
+        return {kunci for kunci in daftar_kunci if kunci in self.tersimpan}
+
+    def simpan_hasil_deteksi_batch(self, daftar_data, lempar_error_koneksi=False):
+        self.panggilan_simpan += 1
+        self._cek_koneksi('simpan')
+        if any(data['image_name'] in self.ditolak for data in daftar_data):
+            return False
+        for data in daftar_data:
+            self.tersimpan.setdefault(data['upload_key'], []).append(data)
+        return True
+
+
+class TestFlushSpool(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder, True)
+        self.db = DatabaseTiruan()
+        self.spool = SpoolDatabase(
+            os.path.join(self.folder, 'spool.sqlite3'), self.db,
+            interval_flush=1.0, backoff_maks=8.0, maks_percobaan=2
+        )
+        # Flush dipanggil langsung oleh test, bukan oleh thread flusher
+        self.spool._pastikan_flusher = lambda: None
+
+    def _simpan(self, *daftar_nama):
+        for nama in daftar_nama:
+            self.assertTrue(self.spool.simpan([
+                {'image_name': nama, 'brand_name': 'Nike', 'confidence_score': 0.9},
+                {'image_name': nama, 'brand_name': 'Adidas', 'confidence_score': 0.8}
+            ]))
+
+    def _entri(self):
+        return self.spool._koneksi().execute(
+            "SELECT percobaan, disewa_sampai, gagal FROM spool_deteksi ORDER BY id"
+        ).fetchall()
+
+    def _siapkan_ulang(self):
+        # Lewati jeda coba lagi agar entri yang ditunda bisa diambil lagi
+        self.spool._koneksi().execute("UPDATE spool_deteksi SET coba_lagi_pada = 0")
+
+    def test_flush_berhasil_mengosongkan_spool(self):
+        self._simpan('a.jpg', 'b.jpg')
+
+        self.assertEqual(self.spool.flush(), 4)
+
+        self.assertEqual(self._entri(), [])
+        self.assertEqual(len(self.db.tersimpan), 2)
+        self.assertEqual(self.spool.flush(), 0)
+
+    def test_baris_yang_sudah_tersimpan_tidak_dikirim_ulang(self):
+        self._simpan('a.jpg', 'b.jpg')
+        # Commit sebelumnya sampai ke database tetapi spool tidak sempat dihapus
+        self.db.tersimpan[self.spool._sewa_entri()[0][1][0]['upload_key']] = []
+        self.spool._koneksi().execute("UPDATE spool_deteksi SET disewa_sampai = 0")
+
+        self.spool.flush()
+
+        self.assertEqual(self._entri(), [])
+        self.assertEqual(sum(len(daftar) for daftar in self.db.tersimpan.values()), 2)
+
+    def test_entri_yang_ditolak_dipisahkan_lalu_ditandai_gagal(self):
+        self._simpan('a.jpg', 'rusak.jpg', 'c.jpg')
+        self.db.ditolak.add('rusak.jpg')
+
+        self.spool.flush()
+
+        self.assertEqual(self._entri(), [(1, 0, 0)])
+        self.assertEqual(len(self.db.tersimpan), 2)
+
+        self._siapkan_ulang()
+        self.spool.flush()
+        self.assertEqual(self._entri(), [(2, 0, 1)])
+
+        self.assertEqual(self.spool.ulang_gagal(), 1)
+        self.db.ditolak.clear()
+        self.spool.flush()
+        self.assertEqual(self._entri(), [])
+
+    def test_database_mati_saat_baca_tidak_menambah_percobaan(self):
+        self._simpan('a.jpg')
+        self.db.putus_saat = 'baca'
+
+        self.assertEqual(self.spool.flush(), 0)
+
+        self.assertEqual(self._entri(), [(0, 0, 0)])
+        self.assertEqual(self.spool._jeda, 2.0)
+
+    def test_koneksi_putus_saat_simpan_tidak_menambah_percobaan(self):
+        self._simpan('a.jpg', 'b.jpg')
+        self.db.putus_saat = 'simpan'
+
+        for _ in range(3):
+            self.assertEqual(self.spool.flush(), 0)
+
+        # Sewa dilepas, percobaan tidak dihitung, dan jeda bertambah sampai batas
+        self.assertEqual(self._entri(), [(0, 0, 0), (0, 0, 0)])
+        self.assertEqual(self.spool._jeda, 8.0)
+        self.assertEqual(self.db.panggilan_simpan, 3)
+
+        self.db.putus_saat = None
+        self.assertEqual(self.spool.flush(), 4)
+        self.assertEqual(self.spool._jeda, 1.0)
+        self.assertEqual(self._entri(), [])
+
+    def test_entri_yang_disewa_tidak_diambil_flusher_lain(self):
+        self._simpan('a.jpg')
+        self.assertEqual(len(self.spool._sewa_entri()), 1)
+
+        flusher_lain = SpoolDatabase(self.spool.path_db, self.db)
+        flusher_lain._pastikan_flusher = lambda: None
+
+        self.assertEqual(flusher_lain.flush(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,15 +5,51 @@ Paket utils untuk aplikasi Brand Detection.
 from .helpers import (
     file_diizinkan,
     simpan_file_upload,
+    tentukan_path_upload,
+    simpan_bytes_upload,
+    ekstrak_gambar_zip,
+    parse_tanggal,
     format_confidence,
     format_ukuran_file,
     validasi_ukuran_file
 )
+from .unggahan import (
+    PenampungUnggahan,
+    UnggahanDitolak,
+    deteksi_ekstensi_gambar,
+    gambar_valid
+)
+from .pencatatan import (
+    FormatterJSON,
+    parse_level_logger,
+    siapkan_logging
+)
+from .ekspor import (
+    FORMAT_EKSPOR,
+    KOLOM_EKSPOR,
+    hasilkan_ekspor,
+    parquet_tersedia
+)
 
 __all__ = [
     'file_diizinkan',
     'simpan_file_upload',
+    'tentukan_path_upload',
+    'simpan_bytes_upload',
+    'ekstrak_gambar_zip',
+    'parse_tanggal',
     'format_confidence',
     'format_ukuran_file',
-    'validasi_ukuran_file'
+    'validasi_ukuran_file',
+    'PenampungUnggahan',
+    'UnggahanDitolak',
+    'deteksi_ekstensi_gambar',
+    'gambar_valid',
+    'FormatterJSON',
+    'parse_level_logger',
+    'siapkan_logging',
+    'FORMAT_EKSPOR',
+    'KOLOM_EKSPOR',
+    'hasilkan_ekspor',
+    'parquet_tersedia'
 ]
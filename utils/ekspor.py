@@ -0,0 +1,215 @@
+"""
+Serialisasi ekspor riwayat deteksi secara streaming.
+
+Setiap fungsi menerima iterator potongan record (List[Dict]) dari
+DatabaseService.ekspor_riwayat dan menghasilkan isi response sedikit demi
+sedikit, sehingga memori tetap datar berapa pun jumlah record yang diekspor.
+Format Parquet membutuhkan pyarrow (opsional).
+"""
+
+import io
+import csv
+import json
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Union
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:  # pragma: no cover - pyarrow opsional
+    pa = None
+    pq = None
+
+# Urutan kolom file ekspor
+KOLOM_EKSPOR = (
+    'id', 'image_name', 'brand_name', 'confidence', 'timestamp',
+    'image_path', 'resolution', 'position_type', 'notes', 'x', 'y', 'w', 'h'
+)
+
+# Kolom posisi logo yang diratakan dari 'rectangle'
+KOLOM_POSISI = ('x', 'y', 'w', 'h')
+
+# Format ekspor: (mimetype, ekstensi file)
+FORMAT_EKSPOR = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet')
+}
+
+
+def parquet_tersedia() -> bool:
+    """Cek pyarrow terpasang sehingga ekspor Parquet bisa dipakai."""
+    return pq is not None
+
+
+def _baris_ekspor(record: Dict) -> tuple:
+    """Nilai kolom ekspor satu record, dengan 'rectangle' diratakan ke x/y/w/h."""
+    rectangle = record.get('rectangle') or {}
+    return tuple(
+        rectangle.get(kolom) if kolom in KOLOM_POSISI else record.get(kolom)
+        for kolom in KOLOM_EKSPOR
+    )
+
+
+def ekspor_csv(potongan: Iterable[List[Dict]]) -> Iterator[str]:
+    """
+    Ubah potongan record menjadi CSV (baris header lalu satu baris per record).
+
+    Args:
+        potongan: Iterator potongan record
+
+    Yields:
+        str: Teks CSV per potongan
+    """
+    buffer = io.StringIO()
+    penulis = csv.writer(buffer)
+    penulis.writerow(KOLOM_EKSPOR)
+    yield buffer.getvalue()
+
+    for daftar_record in potongan:
+        buffer.seek(0)
+        buffer.truncate()
+        penulis.writerows(_baris_ekspor(record) for record in daftar_record)
+        yield buffer.getvalue()
+
+
+def ekspor_ndjson(potongan: Iterable[List[Dict]]) -> Iterator[str]:
+    """
+    Ubah potongan record menjadi NDJSON (satu objek JSON per baris).
+
+    Args:
+        potongan: Iterator potongan record
+
+    Yields:
+        str: Baris-baris NDJSON per potongan
+    """
+    for daftar_record in potongan:
+        yield ''.join(
+            json.dumps(dict(zip(KOLOM_EKSPOR, _baris_ekspor(record))), ensure_ascii=False) + '\n'
+            for record in daftar_record
+        )
+
+
+class _PenampungParquet:
+    """Objek file tujuan ParquetWriter yang isinya diambil setelah setiap row group."""
+
+    def __init__(self) -> None:
+        self._potongan: List[bytes] = []
+        self._posisi = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._potongan.append(data)
+        self._posisi += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._posisi
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def ambil(self) -> bytes:
+        data = b''.join(self._potongan)
+        self._potongan = []
+        return data
+
+
+def _skema_parquet():
+    """Skema kolom Parquet riwayat deteksi."""
+    return pa.schema([
+        ('id', pa.int64()),
+        ('image_name', pa.string()),
+        ('brand_name', pa.string()),
+        ('confidence', pa.float64()),
+        ('timestamp', pa.timestamp('us')),
+        ('image_path', pa.string()),
+        ('resolution', pa.string()),
+        ('position_type', pa.string()),
+        ('notes', pa.string()),
+        ('x', pa.int32()),
+        ('y', pa.int32()),
+        ('w', pa.int32()),
+        ('h', pa.int32())
+    ])
+
+
+def ekspor_parquet(potongan: Iterable[List[Dict]], baris_per_grup: int = 10000) -> Iterator[bytes]:
+    """
+    Ubah potongan record menjadi file Parquet, satu row group per baris_per_grup.
+
+    Record ditampung sampai baris_per_grup sebelum ditulis, jadi memori
+    maksimal kira-kira satu row group.
+
+    Args:
+        potongan: Iterator potongan record
+        baris_per_grup: Jumlah baris per row group
+
+    Yields:
+        bytes: Isi file Parquet per row group (footer di potongan terakhir)
+
+    Raises:
+        ImportError: Jika pyarrow tidak terpasang
+    """
+    if pq is None:
+        raise ImportError("Ekspor Parquet membutuhkan pyarrow")
+
+    skema = _skema_parquet()
+    penampung = _PenampungParquet()
+    penulis = pq.ParquetWriter(penampung, skema, compression='snappy')
+    tertunda: List[Dict] = []
+
+    def tulis_grup() -> bytes:
+        kolom: Dict[str, list] = {nama: [] for nama in KOLOM_EKSPOR}
+        for record in tertunda:
+            for nama, nilai in zip(KOLOM_EKSPOR, _baris_ekspor(record)):
+                kolom[nama].append(nilai)
+        kolom['timestamp'] = [
+            datetime.fromisoformat(nilai) if nilai else None for nilai in kolom['timestamp']
+        ]
+        penulis.write_table(pa.Table.from_pydict(kolom, schema=skema))
+        tertunda.clear()
+        return penampung.ambil()
+
+    try:
+        for daftar_record in potongan:
+            tertunda.extend(daftar_record)
+            if len(tertunda) >= baris_per_grup:
+                yield tulis_grup()
+        if tertunda:
+            yield tulis_grup()
+    finally:
+        penulis.close()
+    yield penampung.ambil()
+
+
+def hasilkan_ekspor(
+    format_ekspor: str,
+    potongan: Iterable[List[Dict]],
+    baris_per_grup: int = 10000
+) -> Iterator[Union[str, bytes]]:
+    """
+    Pilih serializer sesuai format ekspor.
+
+    Args:
+        format_ekspor: Salah satu kunci FORMAT_EKSPOR
+        potongan: Iterator potongan record
+        baris_per_grup: Jumlah baris per row group (khusus Parquet)
+
+    Returns:
+        Iterator isi response
+
+    Raises:
+        ValueError: Jika format tidak dikenal
+    """
+    if format_ekspor == 'csv':
+        return ekspor_csv(potongan)
+    if format_ekspor == 'ndjson':
+        return ekspor_ndjson(potongan)
+    if format_ekspor == 'parquet':
+        return ekspor_parquet(potongan, baris_per_grup)
+    raise ValueError(f"Format ekspor tidak dikenal: {format_ekspor}")
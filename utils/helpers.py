@@ -6,10 +6,14 @@ Modul ini berisi fungsi-fungsi helper yang digunakan di berbagai bagian aplikasi
 
 import os
 import logging
-from typing import Optional
+import zipfile
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
 from werkzeug.utils import secure_filename
 from werkzeug.datastructures import FileStorage
 
+from .unggahan import UKURAN_KEPALA, PenampungUnggahan, deteksi_ekstensi_gambar, gambar_valid
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
@@ -41,17 +45,16 @@ def simpan_file_upload(file: FileStorage, folder_upload: str) -> Optional[str]:
         str: Path lengkap file yang disimpan, atau None jika gagal
     """
     try:
-        # Buat nama file yang aman
-        nama_file_aman = secure_filename(file.filename or 'unknown.jpg')
+        # Path lengkap untuk menyimpan file
+        path_file = tentukan_path_upload(file.filename or 'unknown.jpg', folder_upload)
 
         # Pastikan folder upload ada
         os.makedirs(folder_upload, exist_ok=True)
 
-        # Path lengkap untuk menyimpan file
-        path_file = os.path.join(folder_upload, nama_file_aman)
-
-        # Simpan file
-        file.save(path_file)
+        # File yang sudah ditampung di folder upload cukup dipindahkan
+        stream = file.stream
+        if not (isinstance(stream, PenampungUnggahan) and stream.pindahkan(path_file)):
+            file.save(path_file)
         logger.info(f"File berhasil disimpan: {path_file}")
 
         return path_file
@@ -60,6 +63,133 @@ def simpan_file_upload(file: FileStorage, folder_upload: str) -> Optional[str]:
         return None
 
 
+def tentukan_path_upload(nama_file: str, folder_upload: str) -> str:
+    """
+    Tentukan path penyimpanan file upload dengan nama yang aman.
+
+    Args:
+        nama_file: Nama file asli dari upload
+        folder_upload: Path folder tempat menyimpan file
+
+    Returns:
+        str: Path lengkap file di folder upload
+    """
+    nama_file_aman = secure_filename(nama_file) or 'unknown.jpg'
+    return os.path.join(folder_upload, nama_file_aman)
+
+
+def simpan_bytes_upload(data: bytes, path_file: str) -> bool:
+    """
+    Tulis byte upload yang sudah dibaca ke path tujuan.
+
+    Args:
+        data: Isi file
+        path_file: Path tujuan (biasanya dari tentukan_path_upload)
+
+    Returns:
+        bool: True jika berhasil, False jika gagal
+    """
+    try:
+        os.makedirs(os.path.dirname(path_file) or '.', exist_ok=True)
+        with open(path_file, 'wb') as tujuan:
+            tujuan.write(data)
+        logger.info(f"File berhasil disimpan: {path_file}")
+        return True
+    except Exception as e:
+        logger.error(f"Gagal menyimpan file: {str(e)}")
+        return False
+
+
+def ekstrak_gambar_zip(
+    file: FileStorage,
+    folder_upload: str,
+    ekstensi_diizinkan: set,
+    ukuran_maks: int,
+    jumlah_maks: int,
+    simpan_berkas: Optional[Callable[[bytes], Optional[str]]] = None
+) -> List[Tuple[str, str]]:
+    """
+    Ekstrak file gambar dari arsip zip yang diupload ke folder upload.
+
+    Entri yang bukan gambar yang diizinkan atau lebih besar dari ukuran_maks
+    dilewati. Ukuran dicek dari header zip sebelum entri dibaca dan sekali
+    lagi dari isi yang dibaca; isi dicek dengan magic bytes dan PIL seperti
+    upload biasa.
+
+    Args:
+        file: Arsip zip yang diupload dari request
+        folder_upload: Path folder tempat menyimpan file
+        ekstensi_diizinkan: Set ekstensi yang diizinkan
+        ukuran_maks: Ukuran maksimal setiap gambar dalam bytes
+        jumlah_maks: Jumlah maksimal gambar yang diekstrak
+        simpan_berkas: Fungsi penyimpan isi gambar yang mengembalikan lokasi
+                       file (atau None jika gagal); default ditulis ke
+                       folder_upload dengan nama file asli
+
+    Returns:
+        List[Tuple[str, str]]: Pasangan (nama file asli, path file tersimpan)
+
+    Raises:
+        zipfile.BadZipFile: Jika file bukan arsip zip yang valid
+    """
+    hasil: List[Tuple[str, str]] = []
+    os.makedirs(folder_upload, exist_ok=True)
+
+    with zipfile.ZipFile(file.stream) as arsip:
+        for entri in arsip.infolist():
+            if len(hasil) >= jumlah_maks:
+                logger.warning(f"Arsip berisi lebih dari {jumlah_maks} gambar, sisanya dilewati")
+                break
+
+            nama_asli = os.path.basename(entri.filename)
+            if entri.is_dir() or not file_diizinkan(nama_asli, ekstensi_diizinkan):
+                continue
+            if entri.file_size > ukuran_maks:
+                logger.warning(f"Gambar dalam arsip terlalu besar, dilewati: {nama_asli}")
+                continue
+
+            with arsip.open(entri) as sumber:
+                data = sumber.read(ukuran_maks + 1)
+            if len(data) > ukuran_maks:
+                logger.warning(f"Gambar dalam arsip terlalu besar, dilewati: {nama_asli}")
+                continue
+            if not deteksi_ekstensi_gambar(data[:UKURAN_KEPALA]) & ekstensi_diizinkan or \
+                    not gambar_valid(data):
+                logger.warning(f"Isi file dalam arsip bukan gambar yang valid, dilewati: {nama_asli}")
+                continue
+
+            if simpan_berkas is not None:
+                path_file = simpan_berkas(data)
+                if path_file is None:
+                    continue
+            else:
+                path_file = tentukan_path_upload(nama_asli, folder_upload)
+                with open(path_file, 'wb') as tujuan:
+                    tujuan.write(data)
+            hasil.append((nama_asli, path_file))
+
+    logger.info(f"{len(hasil)} gambar diekstrak dari arsip {file.filename}")
+    return hasil
+
+
+def parse_tanggal(teks: Optional[str]) -> Optional[datetime]:
+    """
+    Parse tanggal/waktu format ISO 8601 dari query parameter.
+
+    Args:
+        teks: String tanggal (contoh: "2024-01-31" atau "2024-01-31T10:00:00")
+
+    Returns:
+        datetime atau None jika teks kosong
+
+    Raises:
+        ValueError: Jika format tanggal tidak valid
+    """
+    if not teks:
+        return None
+    return datetime.fromisoformat(teks)
+
+
 def format_confidence(confidence: Optional[float]) -> str:
     """
     Format confidence score menjadi persentase string.
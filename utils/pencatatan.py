@@ -0,0 +1,277 @@
+"""
+Pipeline logging non-blocking untuk aplikasi.
+
+Thread request hanya memasukkan record ke antrian (QueueHandler); format
+JSON, penulisan file, dan rotasi dikerjakan satu thread QueueListener di
+belakang. Jika antrian penuh (disk lambat), record dibuang dan dihitung
+alih-alih menahan request. Record DEBUG yang sangat sering bisa disampling
+per baris kode, dan level bisa diatur per logger.
+"""
+
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+# Atribut bawaan LogRecord; atribut lain (dari extra=...) ikut ditulis ke JSON
+_ATRIBUT_RECORD = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+FORMAT_TEKS = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class FormatterJSON(logging.Formatter):
+    """Format record sebagai satu baris JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'waktu': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'pesan': record.getMessage(),
+            'proses': record.process,
+            'thread': record.threadName,
+            'lokasi': f"{record.module}:{record.lineno}"
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+
+        for nama, nilai in vars(record).items():
+            if nama not in _ATRIBUT_RECORD and not nama.startswith('_'):
+                data[nama] = nilai
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class FilterSampling(logging.Filter):
+    """
+    Loloskan hanya sebagian record bervolume tinggi.
+
+    Record dengan level <= level_maks dihitung per baris kode (path dan
+    nomor baris), lalu hanya satu dari setiap 1/rasio record yang
+    diloloskan. Record pertama dari setiap baris selalu diloloskan.
+    """
+
+    def __init__(self, rasio: float, level_maks: int = logging.DEBUG):
+        """
+        Args:
+            rasio: Bagian record yang diloloskan (0-1, 1 = tanpa sampling)
+            level_maks: Level tertinggi yang disampling
+        """
+        super().__init__()
+        self.interval = max(1, round(1 / rasio)) if rasio > 0 else 0
+        self.level_maks = level_maks
+        self._hitungan: Dict[Tuple[str, int], int] = {}
+        self._kunci = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.level_maks:
+            return True
+        if self.interval == 0:
+            return False
+
+        kunci = (record.pathname, record.lineno)
+        with self._kunci:
+            hitungan = self._hitungan.get(kunci, 0)
+            self._hitungan[kunci] = hitungan + 1
+        return hitungan % self.interval == 0
+
+
+class QueueHandlerNonBlocking(logging.handlers.QueueHandler):
+    """QueueHandler yang membuang record saat antrian penuh."""
+
+    def __init__(self, antrian: queue.Queue):
+        super().__init__(antrian)
+        self.jumlah_dibuang = 0
+        self._belum_dilaporkan = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Pesan dan traceback dirender di sini agar record aman diproses
+        # thread lain, tetapi exception tetap terpisah dari pesan untuk JSON
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # Dipanggil dengan lock handler, jadi penghitung aman antar thread
+        try:
+            if self._belum_dilaporkan:
+                self.queue.put_nowait(self._record_dibuang())
+                self._belum_dilaporkan = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.jumlah_dibuang += 1
+            self._belum_dilaporkan += 1
+
+    def _record_dibuang(self) -> logging.LogRecord:
+        """Record peringatan jumlah record yang dibuang sejak laporan terakhir."""
+        return logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0,
+            f"{self._belum_dilaporkan} record log dibuang karena antrian log penuh", None, None
+        )
+
+
+class _ListenerAntrian(logging.handlers.QueueListener):
+    """QueueListener yang tetap bisa dihentikan saat antrian penuh."""
+
+    def enqueue_sentinel(self) -> None:
+        # Blocking: listener sendiri yang mengosongkan antrian
+        self.queue.put(self._sentinel)
+
+
+class _PipelineLogging:
+    """State pipeline aktif (handler antrian dan listener) per proses."""
+
+    def __init__(self, handler_antrian: QueueHandlerNonBlocking,
+                 handler_tujuan: List[logging.Handler], ukuran_antrian: int):
+        self.handler_antrian = handler_antrian
+        self.handler_tujuan = handler_tujuan
+        self.ukuran_antrian = ukuran_antrian
+        self.listener: Optional[_ListenerAntrian] = None
+
+    def mulai(self) -> None:
+        self.listener = _ListenerAntrian(
+            self.handler_antrian.queue, *self.handler_tujuan, respect_handler_level=True
+        )
+        self.listener.start()
+
+    def hentikan(self) -> None:
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        for handler in self.handler_tujuan:
+            handler.flush()
+
+    def setelah_fork(self) -> None:
+        # Thread listener tidak ikut ter-fork dan lock antrian lama bisa
+        # tertahan, jadi proses anak memakai antrian dan listener baru
+        self.listener = None
+        self.handler_antrian.queue = queue.Queue(self.ukuran_antrian)
+        self.mulai()
+
+
+_pipeline: Optional[_PipelineLogging] = None
+
+
+def parse_level_logger(teks: str) -> Dict[str, str]:
+    """
+    Parse level per logger dengan format 'services.database=WARNING,werkzeug=ERROR'.
+
+    Args:
+        teks: Daftar nama_logger=LEVEL dipisah koma
+
+    Returns:
+        Dict[str, str]: Level per nama logger
+    """
+    hasil: Dict[str, str] = {}
+    for bagian in teks.split(','):
+        nama, _, level = bagian.strip().partition('=')
+        if nama and level:
+            hasil[nama.strip()] = level.strip().upper()
+    return hasil
+
+
+def _buat_handler_file(path_file: str, rotasi: str, ukuran_maks: int, jumlah_cadangan: int) -> logging.Handler:
+    """Buat handler file sesuai mode rotasi ('ukuran', 'harian', atau 'eksternal')."""
+    if rotasi == 'harian':
+        return logging.handlers.TimedRotatingFileHandler(
+            path_file, when='midnight', backupCount=jumlah_cadangan, encoding='utf-8', delay=True
+        )
+    if rotasi == 'eksternal':
+        # Rotasi oleh logrotate; file dibuka ulang saat diganti
+        return logging.handlers.WatchedFileHandler(path_file, encoding='utf-8', delay=True)
+    return logging.handlers.RotatingFileHandler(
+        path_file, maxBytes=ukuran_maks, backupCount=jumlah_cadangan, encoding='utf-8', delay=True
+    )
+
+
+def siapkan_logging(
+    level: str = 'INFO',
+    level_per_logger: Optional[Dict[str, str]] = None,
+    format_log: str = 'json',
+    folder_log: Optional[str] = 'logs',
+    nama_file: str = 'app.log',
+    rotasi: str = 'ukuran',
+    ukuran_maks: int = 10 * 1024 * 1024,
+    jumlah_cadangan: int = 10,
+    konsol: bool = True,
+    ukuran_antrian: int = 10000,
+    rasio_sampling: float = 1.0
+) -> None:
+    """
+    Pasang pipeline logging berbasis antrian pada root logger.
+
+    Pemanggilan berikutnya mengganti pipeline sebelumnya.
+
+    Args:
+        level: Level root logger
+        level_per_logger: Level khusus per nama logger
+        format_log: 'json' (satu objek per baris) atau 'teks'
+        folder_log: Folder file log; None/kosong untuk tanpa file
+        nama_file: Nama file log di folder_log
+        rotasi: 'ukuran' (per ukuran_maks), 'harian' (tengah malam), atau
+                'eksternal' (logrotate; dipakai untuk beberapa worker
+                gunicorn yang menulis ke file yang sama)
+        ukuran_maks: Ukuran maksimal file sebelum dirotasi (mode 'ukuran')
+        jumlah_cadangan: Jumlah file lama yang disimpan
+        konsol: Tulis juga ke stderr
+        ukuran_antrian: Kapasitas antrian; record dibuang jika penuh
+        rasio_sampling: Bagian record DEBUG yang diloloskan per baris kode
+    """
+    global _pipeline
+
+    formatter = FormatterJSON() if format_log == 'json' else logging.Formatter(FORMAT_TEKS)
+    handler_tujuan: List[logging.Handler] = []
+    if folder_log:
+        os.makedirs(folder_log, exist_ok=True)
+        handler_tujuan.append(_buat_handler_file(
+            os.path.join(folder_log, nama_file), rotasi, ukuran_maks, jumlah_cadangan
+        ))
+    if konsol:
+        handler_tujuan.append(logging.StreamHandler(sys.stderr))
+    for handler in handler_tujuan:
+        handler.setFormatter(formatter)
+
+    handler_antrian = QueueHandlerNonBlocking(queue.Queue(ukuran_antrian))
+    if rasio_sampling < 1:
+        handler_antrian.addFilter(FilterSampling(rasio_sampling))
+
+    root = logging.getLogger()
+    if _pipeline is not None:
+        root.removeHandler(_pipeline.handler_antrian)
+        _pipeline.hentikan()
+    for handler in list(root.handlers):
+        # Handler bawaan (basicConfig, dll.) akan menulis sinkron di thread request
+        root.removeHandler(handler)
+    root.addHandler(handler_antrian)
+    root.setLevel(level.upper())
+
+    for nama, level_logger in (level_per_logger or {}).items():
+        logging.getLogger(nama).setLevel(level_logger)
+
+    if _pipeline is None:
+        atexit.register(_hentikan_pipeline)
+        os.register_at_fork(after_in_child=_pipeline_setelah_fork)
+    _pipeline = _PipelineLogging(handler_antrian, handler_tujuan, ukuran_antrian)
+    _pipeline.mulai()
+
+
+def _hentikan_pipeline() -> None:
+    # Kosongkan antrian ke file sebelum proses keluar
+    if _pipeline is not None:
+        _pipeline.hentikan()
+
+
+def _pipeline_setelah_fork() -> None:
+    if _pipeline is not None and _pipeline.listener is not None:
+        _pipeline.setelah_fork()
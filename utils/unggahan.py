@@ -0,0 +1,261 @@
+"""
+Penampung upload yang memvalidasi file selama body request masih diterima.
+
+Werkzeug menulis setiap file multipart ke objek dari stream factory request
+sepotong demi sepotong. PenampungUnggahan dipakai sebagai objek tersebut:
+tipe file dicek dari magic bytes potongan pertama dan ukuran dicek di setiap
+potongan, sehingga upload yang tidak valid ditolak tanpa menunggu seluruh
+body. Setelah file selesai diterima isinya diverifikasi dengan PIL agar file
+yang hanya berisi magic bytes atau rusak tidak ikut disimpan. Upload yang valid ditulis langsung ke memori atau ke file sementara di
+folder tujuan, lalu cukup dipindahkan (tanpa disalin ulang) saat disimpan.
+Hash SHA-256 isi file dihitung sambil data diterima.
+"""
+
+import io
+import os
+import hashlib
+import logging
+import tempfile
+from typing import IO, Any, Optional, Set, Union
+from PIL import Image  # type: ignore
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Magic bytes format gambar dan ekstensi yang sesuai
+MAGIC_GAMBAR = (
+    (b'\xff\xd8\xff', {'jpg', 'jpeg'}),
+    (b'\x89PNG\r\n\x1a\n', {'png'}),
+    (b'GIF87a', {'gif'}),
+    (b'GIF89a', {'gif'}),
+    (b'BM', {'bmp'}),
+)
+
+# Jumlah byte awal yang dikumpulkan sebelum tipe file dicek
+UKURAN_KEPALA = 16
+
+
+def deteksi_ekstensi_gambar(kepala: bytes) -> Set[str]:
+    """
+    Tentukan ekstensi gambar dari magic bytes di awal file.
+
+    Args:
+        kepala: Beberapa byte pertama file (minimal 8 byte untuk PNG)
+
+    Returns:
+        Set[str]: Ekstensi yang sesuai, atau set kosong jika bukan gambar dikenal
+    """
+    for magic, ekstensi in MAGIC_GAMBAR:
+        if kepala.startswith(magic):
+            return ekstensi
+    # WebP: container RIFF dengan penanda format di byte 8-11
+    if kepala[:4] == b'RIFF' and kepala[8:12] == b'WEBP':
+        return {'webp'}
+    return set()
+
+
+def gambar_valid(sumber: Union[bytes, IO[bytes]]) -> bool:
+    """
+    Cek apakah isi file benar-benar gambar yang bisa dibuka PIL.
+
+    Args:
+        sumber: Isi gambar, atau file object yang posisinya di awal file
+
+    Returns:
+        bool: True jika PIL bisa membuka dan memverifikasi gambar
+    """
+    if isinstance(sumber, (bytes, bytearray)):
+        sumber = io.BytesIO(sumber)
+    try:
+        with Image.open(sumber) as gambar:
+            gambar.verify()
+        return True
+    except Exception:
+        return False
+
+
+class UnggahanDitolak(Exception):
+    """
+    Upload ditolak saat body request masih diterima.
+
+    Attributes:
+        pesan: Pesan error untuk klien
+        status_http: Status HTTP response (400 tipe tidak valid, 413 terlalu besar)
+    """
+
+    def __init__(self, pesan: str, status_http: int = 400):
+        super().__init__(pesan)
+        self.pesan = pesan
+        self.status_http = status_http
+
+
+class PenampungUnggahan:
+    """
+    Tujuan tulis satu file upload yang memvalidasi isinya secara streaming.
+
+    Objek ini dikembalikan dari stream factory request werkzeug dan dibungkus
+    FileStorage setelah file selesai diterima; operasi baca (read, seek, dll.)
+    diteruskan ke penyimpanan di belakangnya.
+    """
+
+    def __init__(
+        self,
+        ukuran_maks: int,
+        ekstensi_diizinkan: set,
+        folder_tujuan: Optional[str] = None,
+        lempar_error: bool = True
+    ):
+        """
+        Inisialisasi penampung.
+
+        Args:
+            ukuran_maks: Ukuran maksimal file dalam bytes
+            ekstensi_diizinkan: Set ekstensi gambar yang diizinkan
+            folder_tujuan: Folder file sementara; None untuk menampung di memori
+            lempar_error: True untuk menghentikan parsing request saat file
+                          ditolak; False untuk membuang sisa file dan mencatat
+                          alasannya di atribut error
+        """
+        self.ukuran_maks = ukuran_maks
+        self.ekstensi_diizinkan = ekstensi_diizinkan
+        self.lempar_error = lempar_error
+        self.ukuran = 0
+        self.error: Optional[UnggahanDitolak] = None
+        self._sha256 = hashlib.sha256()
+        self._kepala: Optional[bytearray] = bytearray()
+        self._selesai = False
+        self._path_sementara: Optional[str] = None
+
+        if folder_tujuan:
+            os.makedirs(folder_tujuan, exist_ok=True)
+            self._stream: Any = tempfile.NamedTemporaryFile(
+                dir=folder_tujuan, prefix='.unggah-', suffix='.part', delete=False
+            )
+            self._path_sementara = self._stream.name
+        else:
+            self._stream = io.BytesIO()
+
+    def write(self, data: bytes) -> int:
+        """Terima satu potongan data file dari parser multipart."""
+        if self.error is not None:
+            return len(data)
+
+        self.ukuran += len(data)
+        if self.ukuran > self.ukuran_maks:
+            self._tolak(
+                f"Ukuran file terlalu besar. Maksimal {self.ukuran_maks / (1024*1024)} MB",
+                413
+            )
+            return len(data)
+
+        if self._kepala is None:
+            return self._tulis(data)
+
+        self._kepala.extend(data)
+        if len(self._kepala) >= UKURAN_KEPALA:
+            self._validasi_kepala()
+        return len(data)
+
+    def seek(self, posisi: int, dari: int = io.SEEK_SET) -> int:
+        # Parser memanggil seek(0) sekali setelah file selesai diterima
+        if not self._selesai:
+            self._selesai = True
+            self._validasi_isi()
+        return self._stream.seek(posisi, dari)
+
+    @property
+    def hash_isi(self) -> str:
+        """Hash SHA-256 (heksadesimal) seluruh isi file yang diterima."""
+        return self._sha256.hexdigest()
+
+    def lepaskan(self) -> Optional[str]:
+        """
+        Tutup file sementara dan serahkan kepemilikannya ke pemanggil.
+
+        Returns:
+            str: Path file sementara (tidak lagi dihapus saat penampung
+                 ditutup), atau None jika file ditampung di memori, ditolak,
+                 atau sudah dilepaskan
+        """
+        if self._path_sementara is None or self.error is not None:
+            return None
+
+        self._stream.close()
+        path_sementara, self._path_sementara = self._path_sementara, None
+        return path_sementara
+
+    def pindahkan(self, path_tujuan: str) -> bool:
+        """
+        Pindahkan file sementara ke path tujuan tanpa menyalin isinya.
+
+        Args:
+            path_tujuan: Path akhir file (sebaiknya di folder_tujuan yang sama)
+
+        Returns:
+            bool: True jika berhasil, False jika tidak ada file sementara
+        """
+        path_sementara = self.lepaskan()
+        if path_sementara is None:
+            return False
+        os.replace(path_sementara, path_tujuan)
+        return True
+
+    def close(self) -> None:
+        """Tutup penampung; file sementara yang belum dipindahkan dihapus."""
+        self._stream.close()
+        self._hapus_sementara()
+
+    @property
+    def closed(self) -> bool:
+        return self._stream.closed
+
+    def __getattr__(self, nama: str) -> Any:
+        return getattr(self._stream, nama)
+
+    def _validasi_kepala(self) -> None:
+        """Cek magic bytes lalu tulis byte awal yang sudah terkumpul."""
+        kepala = bytes(self._kepala or b'')
+        self._kepala = None
+
+        if not deteksi_ekstensi_gambar(kepala) & self.ekstensi_diizinkan:
+            self._tolak(
+                f"Isi file bukan gambar yang diizinkan. Gunakan: {', '.join(self.ekstensi_diizinkan)}",
+                400
+            )
+            return
+        self._tulis(kepala)
+
+    def _validasi_isi(self) -> None:
+        """Validasi file yang sudah lengkap: kepala file pendek lalu isi gambar."""
+        if self.error is None and self._kepala is not None:
+            self._validasi_kepala()
+        if self.error is not None:
+            return
+
+        self._stream.seek(0)
+        if not gambar_valid(self._stream):
+            self._tolak("File gambar rusak atau tidak bisa dibaca", 400)
+
+    def _tulis(self, data: bytes) -> int:
+        self._sha256.update(data)
+        return self._stream.write(data)
+
+    def _tolak(self, pesan: str, status_http: int) -> None:
+        """Buang isi file yang sudah diterima lalu tandai/lempar penolakan."""
+        logger.warning(f"Upload ditolak setelah {self.ukuran} byte: {pesan}")
+        self.error = UnggahanDitolak(pesan, status_http)
+        self._kepala = None
+        self._stream.close()
+        self._hapus_sementara()
+        self._stream = io.BytesIO()
+
+        if self.lempar_error:
+            raise self.error
+
+    def _hapus_sementara(self) -> None:
+        if self._path_sementara is not None:
+            try:
+                os.remove(self._path_sementara)
+            except OSError:
+                pass
+            self._path_sementara = None